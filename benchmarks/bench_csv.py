@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the CSV parser engines on large chest exports.
+
+For every size a synthetic export (ChestDataGenerator, 2% mojibake) is
+written twice, as UTF-8 with ',' and as Windows-1252 with ';'. Each file is
+parsed with every available engine of modules.csvengine using the schema
+sniffed from it, and the best of --repeat runs is compared with the pandas
+engine. One line in --malformed is cut short, so the engines also
+quarantine lines while parsing. The engines must return the same rows and
+quarantine the same lines; the script exits with status 1 if they do not.
+
+Usage:
+    python benchmarks/bench_csv.py [--sizes 100k,1M,5M] [--repeat 3] [--malformed 10000]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from modules import csvengine  # noqa: E402
+from modules.datagenerator import ChestDataGenerator  # noqa: E402
+
+DEFAULT_SIZES = "100k,1M,5M"
+
+# (label, encoding, separator) of the files written for every size
+VARIANTS = [('utf-8 ,', 'utf-8', ','), ('cp1252 ;', 'cp1252', ';')]
+
+
+def parse_size(text):
+    """Parse a row count such as 10000, 100k or 1M."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def cut_lines(path, every):
+    """Cut every `every`-th data line of a file after its second field; returns the number cut."""
+    with open(path, 'rb') as f:
+        lines = f.read().split(b'\n')
+    sep = b';' if lines[0].count(b';') > lines[0].count(b',') else b','
+    cut = 0
+    for i in range(every, len(lines) - 1, every):
+        lines[i] = sep.join(lines[i].split(sep)[:2])
+        cut += 1
+    with open(path, 'wb') as f:
+        f.write(b'\n'.join(lines))
+    return cut
+
+
+def best_of(repeat, func):
+    """Run func repeat times and return (best seconds, last return value)."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def same_rows(left, right):
+    """Check that two parsed frames hold the same values, whatever the datetime resolution."""
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    for column in left.columns:
+        a, b = left[column], right[column]
+        if a.dtype.kind == 'M' and b.dtype.kind == 'M':
+            a, b = a.astype('datetime64[ns]'), b.astype('datetime64[ns]')
+        if not a.reset_index(drop=True).equals(b.reset_index(drop=True)):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CSV parser engines.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"Row counts (default: {DEFAULT_SIZES})")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per engine, the best is kept (default: 3)")
+    parser.add_argument('--malformed', type=int, default=10_000,
+                        help="Cut one line in this many short, 0 for none (default: 10000)")
+    args = parser.parse_args()
+
+    engines = csvengine.available_engines()
+    print(f"Engines: {', '.join(engines)}; {os.cpu_count() or 1} CPUs")
+    workdir = tempfile.mkdtemp(prefix='bench_csv_')
+    mismatches = []
+    try:
+        for rows in [parse_size(size) for size in args.sizes.split(',')]:
+            for label, encoding, sep in VARIANTS:
+                path = os.path.join(workdir, f'chests_{rows}.csv')
+                ChestDataGenerator(seed=42, mojibake_rate=0.02).write_csv(path, rows, encoding=encoding, sep=sep)
+                cut = cut_lines(path, args.malformed) if args.malformed else 0
+                size_mb = os.path.getsize(path) / 1e6
+                sniff_seconds, schema = best_of(args.repeat, lambda: csvengine.sniff_schema(path))
+                print(f"{rows:>10,} rows, {label} ({size_mb:,.0f} MB), sniffed in {sniff_seconds * 1000:.1f} ms: "
+                      f"{schema.encoding}, {schema.date_format}")
+
+                timings, frames, quarantines = {}, {}, {}
+                for name in engines:
+                    timings[name], (frames[name], _, used, quarantines[name]) = best_of(
+                        args.repeat, lambda: csvengine.read_csv(path, schema, engine=name))
+                    if used != name:
+                        print(f"  {name} fell back to {used}")
+                for name in engines:
+                    speedup = timings['pandas'] / timings[name]
+                    print(f"  {name:<8} {timings[name]:8.3f}s  {rows / timings[name] / 1e6:6.2f} M rows/s  "
+                          f"{speedup:5.2f}x  {len(quarantines[name]):,} of {cut:,} cut lines quarantined")
+                    if not same_rows(frames[name], frames['pandas']) or len(quarantines[name]) != cut \
+                            or not quarantines[name].equals(quarantines['pandas']):
+                        mismatches.append(f"{name} at {rows:,} rows ({label})")
+                os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if mismatches:
+        print("FAIL: different rows from " + "; ".join(mismatches))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the streaming Excel workbook export.
+
+Builds a synthetic raw data table (one million rows by default), runs
+DataProcessor.analyze_data on it and writes every result table to one
+workbook with DataProcessor.write_excel_workbook. Prints the elapsed time,
+rows per second and the peak resident memory growth.
+
+Usage:
+    python benchmarks/bench_excel_export.py [rows] [output.xlsx]
+"""
+
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from modules.dataprocessor import DataProcessor
+
+
+def make_raw_data(rows, seed=42):
+    """Create a synthetic chest table with realistic cardinalities."""
+    rng = np.random.default_rng(seed)
+    players = np.array([f"Player {i}" for i in range(250)])
+    chests = np.array([f"Chest {i}" for i in range(60)])
+    sources = np.array([f"Level {i} Crypt" for i in range(5, 45)])
+    dates = pd.date_range('2024-01-01', periods=365, freq='D')
+    return pd.DataFrame({
+        'DATE': dates[rng.integers(0, len(dates), rows)],
+        'PLAYER': players[rng.integers(0, len(players), rows)],
+        'SOURCE': sources[rng.integers(0, len(sources), rows)],
+        'CHEST': chests[rng.integers(0, len(chests), rows)],
+        'SCORE': rng.integers(1, 500, rows),
+    })
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), 'bench_workbook.xlsx')
+
+    print(f"Generating {rows:,} rows...")
+    raw = make_raw_data(rows)
+    results = DataProcessor.analyze_data(raw)
+    sheets = DataProcessor.analysis_sheets(results)
+    total_rows = sum(len(df) for df in sheets.values())
+    print(f"Sheets: {', '.join(f'{title} ({len(df):,})' for title, df in sheets.items())}")
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    DataProcessor.write_excel_workbook(sheets, output)
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+
+    print(f"Wrote {total_rows:,} rows to {output}")
+    print(f"Time: {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
+    print(f"File size: {os.path.getsize(output) / (1024 * 1024):.1f} MB")
+    print(f"Peak RSS growth during write: {rss_after - rss_before:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the ingest -> analyze -> render pipeline at several data sizes.
+
+For every size a synthetic chest CSV (ChestDataGenerator, 2% mojibake) is written to a temporary directory and
+each stage of the pipeline is timed on it:
+
+    read_csv        DataProcessor.read_csv_with_encoding_fix
+    fix_text        DataProcessor.fix_dataframe_text
+    process         DataProcessor.process_data (column typing)
+    analyze         DataProcessor.analyze_data
+    filter          DataProcessor.filter_data on the ten most active players
+    table_scroll    CustomTableModel.data for a 40 row window at 200 positions
+    update_chart    MainWindow.update_chart for every chart data category
+    report:<type>   ReportBuilder.build for every report type, with charts
+
+Each stage keeps the best of --repeat runs. The timings are written to a JSON
+file and, when a baseline is given, compared against it. A stage regresses
+when it is slower than the baseline by more than --threshold (relative) and
+--min-delta (absolute seconds); the script then exits with status 1.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10k,100k,1M,10M] [--baseline FILE]
+                                        [--save-baseline FILE] [--output FILE]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from modules.datagenerator import ChestDataGenerator  # noqa: E402
+from modules.dataprocessor import DataProcessor  # noqa: E402
+from modules.reportcharts import ReportChartRenderer  # noqa: E402
+from modules.reporttemplates import ReportBuilder  # noqa: E402
+
+DEFAULT_SIZES = "10k,100k,1M,10M"
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), 'results', 'pipeline.json')
+
+# Rows shown by a table view window and the number of scroll positions sampled
+TABLE_WINDOW_ROWS = 40
+TABLE_SCROLL_STEPS = 200
+
+
+def parse_size(text):
+    """Parse a row count such as 10000, 100k or 1M."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def best_of(repeat, func):
+    """Run func repeat times and return (best seconds, last return value)."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def scroll_table(model):
+    """Request every cell of a window of rows at evenly spaced scroll positions."""
+    from PySide6.QtCore import Qt
+
+    rows, columns = model.rowCount(), model.columnCount()
+    last_top = max(rows - TABLE_WINDOW_ROWS, 0)
+    for step in range(TABLE_SCROLL_STEPS):
+        top = last_top * step // max(TABLE_SCROLL_STEPS - 1, 1)
+        for row in range(top, min(top + TABLE_WINDOW_ROWS, rows)):
+            for column in range(columns):
+                index = model.index(row, column)
+                for role in (Qt.DisplayRole, Qt.TextAlignmentRole, Qt.BackgroundRole):
+                    model.data(index, role)
+
+
+def draw_all_charts(window):
+    """Draw the chart of every data category once, bypassing the debounce."""
+    selector = window.chart_data_category
+    for i in range(selector.count()):
+        selector.blockSignals(True)
+        selector.setCurrentIndex(i)
+        selector.blockSignals(False)
+        window.update_available_measures()
+        window._chart_data_cache = {}
+        window._last_chart_update_time = 0
+        window.update_chart()
+
+
+def run_size(rows, repeat, workdir, window):
+    """Time every pipeline stage for one data size and return {stage: seconds}."""
+    from modules.customtablemodel import CustomTableModel
+
+    timings = {}
+    csv_path = os.path.join(workdir, f'chests_{rows}.csv')
+    ChestDataGenerator(seed=42, mojibake_rate=0.02).write_csv(csv_path, rows)
+
+    def stage(name, func):
+        seconds, result = best_of(repeat, func)
+        timings[name] = round(seconds, 6)
+        print(f"  {name:<32} {seconds:9.3f}s")
+        return result
+
+    df, success, error_message = stage('read_csv', lambda: DataProcessor.read_csv_with_encoding_fix(csv_path))
+    if not success:
+        raise RuntimeError(f"Could not read {csv_path}: {error_message}")
+    df = stage('fix_text', lambda: DataProcessor.fix_dataframe_text(df))
+    df = stage('process', lambda: DataProcessor.process_data(df))
+    results = stage('analyze', lambda: DataProcessor.analyze_data(df))
+
+    top_players = results['player_totals']['PLAYER'].head(10).tolist()
+    stage('filter', lambda: DataProcessor.filter_data(df, 'PLAYER', top_players))
+
+    model = CustomTableModel(df)
+    stage('table_scroll', lambda: scroll_table(model))
+
+    window.analysis_results = results
+    stage('update_chart', lambda: draw_all_charts(window))
+
+    renderer = ReportChartRenderer(results)
+    for report_type in ReportBuilder.REPORT_TYPES:
+        # A new builder per run, so the fragment cache does not hide the work
+        stage(f'report:{report_type}', lambda: ReportBuilder(results, renderer).build(report_type))
+
+    os.remove(csv_path)
+    return timings
+
+
+def compare(current, baseline, threshold, min_delta):
+    """
+    Compare timings with a baseline.
+
+    Returns:
+        list: Regression messages, empty if nothing regressed
+    """
+    regressions = []
+    for size, stages in current['results'].items():
+        base_stages = baseline.get('results', {}).get(size)
+        if not base_stages:
+            continue
+        for name, seconds in stages.items():
+            base = base_stages.get(name)
+            if base is None:
+                continue
+            delta = seconds - base
+            ratio = seconds / base if base > 0 else float('inf')
+            marker = ""
+            if delta > min_delta and ratio > 1 + threshold:
+                marker = "  REGRESSION"
+                regressions.append(f"{name} at {int(size):,} rows: {base:.3f}s -> {seconds:.3f}s ({ratio:.2f}x)")
+            print(f"  {int(size):>10,} {name:<32} {base:9.3f}s -> {seconds:9.3f}s ({ratio:5.2f}x){marker}")
+    return regressions
+
+
+def write_json(data, path):
+    """Write data as indented JSON, creating the directory if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingest -> analyze -> render pipeline.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"Comma-separated row counts (default: {DEFAULT_SIZES})")
+    parser.add_argument('--repeat', type=int, default=None,
+                        help="Runs per stage, best kept (default: 3 up to 100k rows, else 1)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--save-baseline', metavar='FILE', help="Also write the results to FILE as a new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative slowdown before failing (default: 0.25)")
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many seconds (default: 0.05)")
+    args = parser.parse_args()
+
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from modules.mainwindow import MainWindow
+    window = MainWindow()
+    window.ensure_charts_tab()
+
+    current = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+        },
+        'results': {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    try:
+        for rows in (parse_size(size) for size in args.sizes.split(',')):
+            repeat = args.repeat or (3 if rows <= 100_000 else 1)
+            print(f"{rows:,} rows (best of {repeat}):")
+            current['results'][str(rows)] = run_size(rows, repeat, workdir, window)
+            app.processEvents()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        window.close()
+
+    write_json(current, args.output)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        write_json(current, args.save_baseline)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"Comparison with {args.baseline}:")
+        regressions = compare(current, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print("FAIL: " + "; ".join(regressions))
+            return 1
+        print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
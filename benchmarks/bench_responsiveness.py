@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure how responsive the GUI stays during typical interactions.
+
+An EventLoopProbe ticks every few milliseconds while the following actions
+are driven from inside the running event loop, the way a user would trigger
+them:
+
+    import          MainWindow.load_csv_file on a synthetic chest CSV
+    analysis_view   every entry of the analysis selector
+    table_sort      every column of the raw data table, ascending and descending
+    report          every report type, generated in the background until finished
+
+Every late tick is added to a latency histogram; ticks later than
+--stall-threshold are stalls and are attributed to the stage that was running
+on the GUI thread at the time. The summary is printed and written as JSON.
+Runs under the offscreen Qt platform, so it works without a display.
+
+Usage:
+    python benchmarks/bench_responsiveness.py [--rows 20k] [--interval 5]
+                                              [--stall-threshold 50] [--output FILE]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from modules.datagenerator import ChestDataGenerator  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), 'results', 'responsiveness.json')
+
+# Idle time between actions, so each stall can be told apart
+SETTLE_MS = 100
+
+
+def parse_size(text):
+    """Parse a row count such as 10000, 100k or 1M."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def build_actions(window, csv_path):
+    """
+    List the actions to drive.
+
+    Returns:
+        list: (label, start callable, done callable) tuples; done returns True
+        once a background action has finished
+    """
+    actions = [('import', lambda: window.load_csv_file(csv_path), None)]
+
+    def select_analysis(index):
+        return lambda: window.analysis_selector.setCurrentIndex(index)
+
+    def sort_table(column, order):
+        return lambda: window.raw_data_table.sortByColumn(column, order)
+
+    def generate(index):
+        def start():
+            window.report_type_selector.setCurrentIndex(index)
+            window.generate_report()
+        return start
+
+    def report_done():
+        return window._report_task is None or (
+            not window._report_task.is_running() and window.generate_report_button.isEnabled())
+
+    from PySide6.QtCore import Qt
+
+    def later_actions():
+        result = []
+        for index in range(window.analysis_selector.count()):
+            result.append((f'analysis_view:{window.analysis_selector.itemText(index)}', select_analysis(index), None))
+        model = window.raw_data_table.model()
+        for column in range(model.columnCount()):
+            name = model.headerData(column, Qt.Horizontal, Qt.DisplayRole)
+            for order, suffix in ((Qt.AscendingOrder, 'asc'), (Qt.DescendingOrder, 'desc')):
+                result.append((f'table_sort:{name}:{suffix}', sort_table(column, order), None))
+        window.ensure_report_tab()
+        for index in range(window.report_type_selector.count()):
+            result.append((f'report:{window.report_type_selector.itemText(index)}', generate(index), report_done))
+        return result
+
+    # The analysis types and table columns are only known after the import
+    actions.append(('plan', lambda: actions.extend(later_actions()), None))
+    return actions
+
+
+def run(probe, actions):
+    """Run the actions one after another inside the event loop and time each of them."""
+    from PySide6.QtCore import QTimer, QEventLoop
+
+    loop = QEventLoop()
+    timings = []
+    state = {'index': 0, 'label': None, 'started': None, 'done': None}
+
+    def finish_current():
+        if state['label'] is not None and state['label'] != 'plan':
+            timings.append({'action': state['label'],
+                            'seconds': round(time.perf_counter() - state['started'], 4)})
+            print(f"  {state['label']:<48} {timings[-1]['seconds']:8.3f}s")
+        state['label'] = None
+
+    def poll():
+        if state['done'] is not None and not state['done']():
+            QTimer.singleShot(10, poll)
+            return
+        finish_current()
+        QTimer.singleShot(SETTLE_MS, step)
+
+    def step():
+        if state['index'] >= len(actions):
+            loop.quit()
+            return
+        label, start, done = actions[state['index']]
+        state['index'] += 1
+        state.update(label=label, started=time.perf_counter(), done=done)
+        start()
+        QTimer.singleShot(0, poll)
+
+    probe.start()
+    QTimer.singleShot(SETTLE_MS, step)
+    loop.exec()
+    probe.stop()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event-loop stalls during typical GUI interactions.")
+    parser.add_argument('--rows', default='20k', help="Rows in the synthetic CSV (default: 20k)")
+    parser.add_argument('--interval', type=int, default=5, help="Probe interval in ms (default: 5)")
+    parser.add_argument('--stall-threshold', type=float, default=50,
+                        help="Latency in ms counted as a stall (default: 50)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    args = parser.parse_args()
+    rows = parse_size(args.rows)
+
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from modules.mainwindow import MainWindow
+    from modules.responsiveness import EventLoopProbe
+    from modules.timing import stage_timer
+
+    workdir = tempfile.mkdtemp(prefix='bench_responsiveness_')
+    window = MainWindow()
+    window.show()
+    try:
+        csv_path = os.path.join(workdir, f'chests_{rows}.csv')
+        ChestDataGenerator(seed=42, mojibake_rate=0.02).write_csv(csv_path, rows)
+        probe = EventLoopProbe(args.interval, args.stall_threshold)
+        print(f"{rows:,} rows, probe every {args.interval} ms, stalls over {args.stall_threshold} ms:")
+        timings = run(probe, build_actions(window, csv_path))
+    finally:
+        window.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(probe.to_text())
+
+    result = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt_platform': app.platformName(),
+            'rows': rows,
+        },
+        'actions': timings,
+        'probe': probe.summary(),
+        'stages': stage_timer.summary(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark GUI time-to-first-window and fail when it exceeds a budget.
+
+Each run starts a fresh interpreter (offscreen Qt platform), creates the
+QApplication, imports and shows MainWindow and processes the first events.
+The script also checks that modules meant to load on first use have not
+been imported by then.
+
+Exits with status 1 if the median wall time is over the budget or a lazy
+module was imported at startup, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--budget SECONDS]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Modules that must not be imported before the first window is shown
+LAZY_MODULES = [
+    'ftfy',
+    'charset_normalizer',
+    'unidecode',
+    'PySide6.QtPrintSupport',
+    'matplotlib',
+]
+
+# Modules worth reporting when they are loaded at startup
+REPORTED_MODULES = LAZY_MODULES + ['matplotlib.pyplot', 'pyarrow', 'openpyxl']
+
+CHILD_SCRIPT = """
+import time
+start = time.perf_counter()
+import json, sys
+sys.path.insert(0, {src!r})
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from modules.mainwindow import MainWindow
+window = MainWindow()
+window.show()
+app.processEvents()
+elapsed = time.perf_counter() - start
+print("RESULT " + json.dumps({{
+    'in_process_s': elapsed,
+    'loaded': [name for name in {modules!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_once():
+    """Start one GUI process and return (wall seconds, child result dict)."""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    script = CHILD_SCRIPT.format(src=SRC_DIR, modules=REPORTED_MODULES)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+    for line in completed.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return wall, json.loads(line[len('RESULT '):])
+    raise RuntimeError(f"No result from child process:\n{completed.stdout}\n{completed.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GUI time-to-first-window.")
+    parser.add_argument('--runs', type=int, default=5, help="Number of fresh processes (default: 5)")
+    parser.add_argument('--budget', type=float, default=4.0,
+                        help="Maximum median wall time in seconds (default: 4.0)")
+    args = parser.parse_args()
+
+    walls, in_process, loaded = [], [], set()
+    for _ in range(args.runs):
+        wall, result = run_once()
+        walls.append(wall)
+        in_process.append(result['in_process_s'])
+        loaded.update(result['loaded'])
+
+    median_wall = statistics.median(walls)
+    print(f"Runs: {args.runs}")
+    print(f"Time to first window (wall, incl. interpreter): median {median_wall:.2f}s, min {min(walls):.2f}s")
+    print(f"Time to first window (in process): median {statistics.median(in_process):.2f}s")
+    print(f"Optional modules loaded at startup: {', '.join(sorted(loaded)) or 'none'}")
+
+    failures = []
+    if median_wall > args.budget:
+        failures.append(f"median {median_wall:.2f}s exceeds budget {args.budget:.2f}s")
+    eager = sorted(loaded & set(LAZY_MODULES))
+    if eager:
+        failures.append(f"lazy modules imported at startup: {', '.join(eager)}")
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
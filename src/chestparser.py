@@ -0,0 +1,494 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Command-line interface for the Total Battle Analyzer.
+
+Runs the same loading, analysis and report pipeline as the desktop
+application without starting Qt, so it can be used from scripts and cron
+jobs on machines without a display.
+
+Examples:
+    python -m chestparser analyze data/imports/*.csv --report out/report.html
+    python -m chestparser analyze chests.csv --export out/analysis.xlsx
+    python -m chestparser analyze chests.csv --filter PLAYER=Feldjäger,Nyx --export out/raw.parquet
+    python -m chestparser memory chests.csv --repeat 5
+    python -m chestparser generate out/big.csv --rows 50M --clans RED,BLUE --mojibake 0.05
+    python -m chestparser history add data/imports/*.csv
+    python -m chestparser history query --by PLAYER --period week --from 2025-01-01 --player Feldjäger
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from modules.clans import NO_CLAN, ClanAnalyzer, clan_comparison
+from modules.configmanager import ConfigManager
+from modules.datagenerator import ChestDataGenerator
+from modules.dataprocessor import DataProcessor
+from modules.historystore import GROUP_COLUMNS, PERIODS, HistoryStore, clan_values
+from modules.memoryreport import MemoryReport, PeakRSSMonitor, current_rss, format_bytes
+from modules.partitioned import PartitionedDataset, analyze_dataset
+from modules.reportcharts import ReportChartRenderer
+from modules.reporttemplates import ReportBuilder
+from modules.timing import stage_timer
+
+
+def load_files(paths, quarantine=None):
+    """
+    Load and process one or more chest data files into a single DataFrame.
+
+    Args:
+        paths (list): Paths to CSV, Parquet or Feather files
+        quarantine (str, optional): CSV file to write the malformed lines of all files to,
+            with the file each came from
+
+    Returns:
+        pandas.DataFrame: The processed data of all files; rows found in an
+        earlier file, e.g. where two exports overlap, are only kept once
+    """
+    frames, malformed = [], []
+    for path in paths:
+        file_malformed = []
+        df, success, error_message = DataProcessor.load_file(path, file_malformed)
+        if not success:
+            raise RuntimeError(f"{path}: {error_message}")
+        for lines in file_malformed:
+            reasons = ", ".join(f"{count:,} {reason}" for reason, count in lines['REASON'].value_counts().items())
+            print(f"Left out {len(lines):,} malformed lines of {path} ({reasons}), "
+                  f"first at line {lines['LINE'].min()}")
+            malformed.append(lines.assign(SOURCE=str(path)))
+        frames.append((path, DataProcessor.process_data(df)))
+    if quarantine:
+        rows = pd.concat(malformed, ignore_index=True) if malformed else pd.DataFrame(
+            columns=['LINE', 'REASON', 'TEXT', 'SOURCE'])
+        rows.to_csv(quarantine, index=False, encoding='utf-8')
+        print(f"Wrote {len(rows):,} malformed lines to {quarantine}")
+    if len(frames) == 1:
+        print(f"Loaded {len(frames[0][1]):,} rows from {paths[0]}")
+        return frames[0][1]
+    combined, report = DataProcessor.deduplicate(frames)
+    for entry in report:
+        print(f"Loaded {entry['rows']:,} rows from {entry['source']}: "
+              f"{entry['added']:,} added, {entry['duplicates']:,} duplicates")
+    return combined
+
+
+def parse_filters(filters):
+    """
+    Parse COLUMN=VALUE[,VALUE...] filters.
+
+    Args:
+        filters (list): Filter expressions from the command line
+
+    Returns:
+        dict: Upper-case column name -> list of values
+    """
+    parsed = {}
+    for expression in filters or []:
+        column, _, values = expression.partition('=')
+        column = column.strip().upper()
+        if not column or not values:
+            raise ValueError(f"Invalid filter '{expression}', expected COLUMN=VALUE[,VALUE...]")
+        parsed[column] = [value.strip() for value in values.split(',')]
+    return parsed
+
+
+def apply_filters(df, filters, start=None, end=None):
+    """
+    Apply COLUMN=VALUE[,VALUE...] filters and a date window to the data.
+
+    Args:
+        df (pandas.DataFrame): The processed data
+        filters (list): Filter expressions from the command line
+        start (str, optional): First date, inclusive
+        end (str, optional): Last date, inclusive
+
+    Returns:
+        pandas.DataFrame: The filtered data
+    """
+    for column, values in parse_filters(filters).items():
+        if column not in df.columns:
+            raise ValueError(f"Invalid filter column '{column}'")
+        df = DataProcessor.filter_data(df, column, values)
+    if start is not None:
+        df = df[df['DATE'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['DATE'] <= pd.Timestamp(end)]
+    return df
+
+
+def write_report(results, path, report_type, include_charts, include_tables, include_stats):
+    """
+    Write an HTML report with its chart images next to it.
+
+    Charts are saved to a "<report name>_charts" directory and referenced
+    with relative paths, so the report and its directory can be published
+    together.
+
+    Args:
+        results (dict): Results returned by DataProcessor.analyze_data
+        path (Path): Path of the HTML file
+        report_type (str): One of ReportBuilder.REPORT_TYPES
+        include_charts (bool): Whether to include charts in the report
+        include_tables (bool): Whether to include tables in the report
+        include_stats (bool): Whether to include statistics in the report
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    charts_dir = path.parent / f"{path.stem}_charts"
+    renderer = ReportChartRenderer(results)
+
+    def render_chart(chart_type, category_field, title):
+        chart_file = renderer.render(chart_type, category_field, title)
+        if not chart_file:
+            return None
+        charts_dir.mkdir(exist_ok=True)
+        target = charts_dir / f"chart_{len(list(charts_dir.glob('*.png'))) + 1:02d}.png"
+        shutil.move(chart_file, target)
+        return target.relative_to(path.parent).as_posix()
+
+    builder = ReportBuilder(results, render_chart)
+    html = builder.build(report_type, include_charts, include_tables, include_stats)
+    path.write_text(html, encoding='utf-8')
+    print(f"Report written to {path}")
+
+
+def write_export(df, results, path):
+    """
+    Export the data in the format given by the file suffix.
+
+    .xlsx writes a workbook with every analysis table; .csv, .parquet,
+    .feather and .arrow write the processed raw data.
+
+    Args:
+        df (pandas.DataFrame): The processed data
+        results (dict): Results returned by DataProcessor.analyze_data
+        path (Path): Destination path
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = path.suffix.lower()
+    if suffix == '.xlsx':
+        DataProcessor.write_excel_workbook(DataProcessor.analysis_sheets(results), path)
+    elif DataProcessor.is_columnar_file(path):
+        DataProcessor.write_columnar(df, path)
+    elif suffix == '.csv':
+        DataProcessor.write_csv_chunked(df, path)
+    else:
+        raise ValueError(f"Unsupported export type: {path.suffix}")
+    print(f"Data exported to {path}")
+
+
+def run_analyze(args):
+    """Run the analyze command."""
+    start = time.perf_counter()
+    if len(args.files) == 1 and Path(args.files[0]).is_dir():
+        # A dataset directory is aggregated partition by partition instead of loaded
+        if any(Path(path).suffix.lower() != '.xlsx' for path in args.export or []):
+            raise ValueError("The rows of a dataset directory are not loaded; export the analysis to .xlsx")
+        df = None
+        dataset = PartitionedDataset(args.files[0])
+        filters = parse_filters(args.filter)
+        results = analyze_dataset(dataset, args.start, args.end, filters=filters)
+        rows = int(results['player_totals']['CHEST_COUNT'].sum())
+    else:
+        df = apply_filters(load_files(args.files, args.quarantine), args.filter, args.start, args.end)
+        results = DataProcessor.analyze_data(df)
+        rows = len(df)
+    if rows == 0:
+        print("No rows left to analyze.", file=sys.stderr)
+        return 1
+
+    players = results['player_totals']
+    print(f"Analyzed {rows:,} rows: {len(players)} players, "
+          f"{len(results['chest_totals'])} chest types, {len(results['source_totals'])} sources")
+    if args.by_clan:
+        if df is None:
+            results['clan_comparison'] = clan_comparison({
+                clan or NO_CLAN: analyze_dataset(dataset, args.start, args.end, [clan], filters)
+                for clan in dataset.clans()
+            })
+        else:
+            results['clan_comparison'] = ClanAnalyzer(max_workers=args.workers).comparison(df)
+        print(results['clan_comparison'].to_string(index=False))
+
+    if args.report:
+        write_report(results, Path(args.report), args.report_type,
+                     not args.no_charts, not args.no_tables, not args.no_stats)
+    if args.export:
+        for path in args.export:
+            write_export(df, results, Path(path))
+    if not args.report and not args.export:
+        print(players.head(args.top).to_string(index=False))
+
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def run_memory(args):
+    """Run the memory command."""
+    report = None
+    for iteration in range(1, args.repeat + 1):
+        # Drop the previous iteration's data first, as a new import in the GUI does
+        report = None
+        with PeakRSSMonitor() as monitor:
+            df = apply_filters(load_files(args.files), args.filter)
+            results = DataProcessor.analyze_data(df)
+        load_memory = monitor.result
+        report = MemoryReport({'processed_data': df, 'analysis_results': results}, load_memory)
+        if args.repeat > 1:
+            print(f"Import {iteration}: RSS {format_bytes(load_memory['end_rss'])}, "
+                  f"peak {format_bytes(load_memory['peak_rss'])}")
+        del df, results
+
+    print(report.to_text())
+    if args.json:
+        Path(args.json).write_text(json.dumps(report.to_dict(), indent=2), encoding='utf-8')
+        print(f"Memory report written to {args.json}")
+    if args.repeat > 1:
+        print(f"RSS after {args.repeat} imports: {format_bytes(current_rss())}")
+    return 0
+
+
+def row_count(text):
+    """Parse a row count such as 5000, 250k or 10M."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000, 'g': 1_000_000_000}.get(text[-1:], 1)
+    try:
+        rows = int(float(text.rstrip('kmg')) * factor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid row count: '{text}'")
+    if rows < 0:
+        raise argparse.ArgumentTypeError("row count must not be negative")
+    return rows
+
+
+def run_generate(args):
+    """Run the generate command."""
+    start = time.perf_counter()
+    generator = ChestDataGenerator(
+        seed=args.seed, players=args.players, clans=[c.strip() for c in args.clans.split(',')],
+        start_date=args.start_date, days=args.days, zipf_exponent=args.zipf,
+        umlaut_rate=args.umlauts, mojibake_rate=args.mojibake
+    )
+    path = Path(args.output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    def progress(written, total):
+        print(f"\r{written:,}/{total:,} rows", end="", flush=True)
+
+    rows = generator.write_csv(path, args.rows, encoding=args.encoding, sep=args.sep,
+                               chunk_size=args.chunk_size, progress=progress)
+    elapsed = time.perf_counter() - start
+    size_mb = path.stat().st_size / (1024 * 1024)
+    print(f"\nWrote {rows:,} rows ({size_mb:,.1f} MB) to {path} in {elapsed:.1f}s")
+    return 0
+
+
+def run_history(args):
+    """Run the history command."""
+    path = args.db or ConfigManager().get_history_path()
+    with HistoryStore(path) as store:
+        if args.action == 'add':
+            for file in args.files:
+                malformed = []
+                df, success, error_message = DataProcessor.load_file(file, malformed)
+                if not success:
+                    raise RuntimeError(f"{file}: {error_message}")
+                processed = DataProcessor.process_data(df)
+                clan = args.clan if args.clan else clan_values(df, processed)
+                rows = store.ingest(processed, source=str(Path(file).resolve()), clan=clan)
+                left_out = sum(len(lines) for lines in malformed)
+                print(f"Added {rows:,} rows from {file} ({len(processed) - rows:,} already stored"
+                      + (f", {left_out:,} malformed lines left out)" if left_out else ")"))
+        elif args.action == 'dataset':
+            start = time.perf_counter()
+            dataset = store.dataset()
+            print(f"{dataset.path}: {dataset.num_rows:,} rows in {len(dataset.parts())} parts "
+                  f"({format_bytes(dataset.size_bytes())}), mapped in {time.perf_counter() - start:.3f}s")
+            print(f"Analyze it with: chestparser analyze {dataset.path}")
+            return 0
+        elif args.action == 'ranks':
+            result, compared_with = store.rank_changes(args.days)
+            if args.top:
+                result = result[result['RANK'] <= args.top]
+            if args.export:
+                write_export(result, {'ranks': result}, Path(args.export))
+            else:
+                print(f"Rank changes since {compared_with}:")
+                print(result.to_string(index=False) if not result.empty else "No players in the history.")
+            return 0
+        elif args.action == 'players':
+            result = store.players()
+            if not args.aliases:
+                result = result.drop(columns='ALIASES')
+            print(result.to_string(index=False) if not result.empty else "No players in the history.")
+            return 0
+        elif args.action == 'query':
+            # Any spelling of a stored player selects it
+            players = store.identities.lookup([p.strip() for p in args.player.split(',')]) if args.player else None
+            if args.percentiles:
+                result = store.score_quantiles(args.by, start=args.start, end=args.end, clan=args.clan)
+            elif args.rolling:
+                if args.by not in ('PLAYER', 'DATE'):
+                    raise ValueError("--rolling totals are per PLAYER or, with --by DATE, clan-wide")
+                result = store.rolling(args.rolling, by='PLAYER' if args.by == 'PLAYER' else None,
+                                       start=args.start, end=args.end, clan=args.clan, players=players)
+            elif args.period:
+                result = store.timeseries(args.period, by=args.by if args.by != 'DATE' else None,
+                                          start=args.start, end=args.end, clan=args.clan, players=players)
+            else:
+                result = store.totals(args.by, start=args.start, end=args.end, clan=args.clan, players=players)
+            if args.export:
+                # A workbook gets the result as its only sheet
+                write_export(result, {'history': result}, Path(args.export))
+            else:
+                print(result.to_string(index=False) if not result.empty else "No rows in this window.")
+            return 0
+
+        first, last = store.date_range()
+        print(f"{path}: {store.row_count():,} rows"
+              + (f" from {first:%Y-%m-%d} to {last:%Y-%m-%d}" if first is not None else ""))
+        if args.action == 'info':
+            print(store.imports().to_string(index=False))
+    return 0
+
+
+def write_timings(path):
+    """Write the recorded stage timings as JSON lines and print a summary."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = stage_timer.export_jsonl(path)
+    print(f"Wrote {count} stage timings to {path}")
+    for stage, entry in sorted(stage_timer.summary().items(), key=lambda item: -item[1]['total_ms']):
+        print(f"  {stage:<16} {entry['count']:>4}x {entry['total_ms']:>10,.1f} ms")
+
+
+def build_parser():
+    """Create the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog='chestparser',
+        description="Analyze Total Battle chest exports without the desktop application."
+    )
+    parser.add_argument('--debug', action='store_true', help="Print debug output")
+    parser.add_argument('--csv-engine', choices=['auto', 'pyarrow', 'pandas'], default='auto',
+                        help="CSV parser: pyarrow's multi-threaded reader, pandas, or auto for pyarrow "
+                             "if installed (default: auto)")
+    parser.add_argument('--timings', metavar='JSONL',
+                        help="Record the duration of every pipeline stage and write them as JSON lines")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help="Analyze chest files and write reports or exports")
+    analyze.add_argument('files', nargs='+',
+                         help="CSV, Parquet, Feather or Arrow files, or Arrow dataset directories, to analyze")
+    analyze.add_argument('--filter', action='append', metavar='COLUMN=VALUES',
+                         help="Keep rows whose COLUMN is one of the comma-separated VALUES (repeatable)")
+    analyze.add_argument('--from', dest='start', metavar='DATE', help="First date, inclusive")
+    analyze.add_argument('--to', dest='end', metavar='DATE', help="Last date, inclusive")
+    analyze.add_argument('--report', metavar='HTML', help="Write an HTML report")
+    analyze.add_argument('--report-type', choices=ReportBuilder.REPORT_TYPES, default="Full Report",
+                         help="Report type (default: Full Report)")
+    analyze.add_argument('--no-charts', action='store_true', help="Leave charts out of the report")
+    analyze.add_argument('--no-tables', action='store_true', help="Leave tables out of the report")
+    analyze.add_argument('--no-stats', action='store_true', help="Leave statistics out of the report")
+    analyze.add_argument('--export', action='append', metavar='PATH',
+                         help="Export to .csv, .parquet, .feather, .arrow or .xlsx (repeatable)")
+    analyze.add_argument('--quarantine', metavar='CSV',
+                         help="Write the malformed lines left out of the CSV files, with their line numbers")
+    analyze.add_argument('--top', type=int, default=10,
+                         help="Players to print when nothing is written (default: 10)")
+    analyze.add_argument('--by-clan', action='store_true',
+                         help="Also analyze every clan separately and print a clan comparison")
+    analyze.add_argument('--workers', type=int,
+                         help="Worker processes for --by-clan (default: one per CPU)")
+    analyze.set_defaults(func=run_analyze)
+
+    memory = commands.add_parser('memory', help="Report the memory used by loaded data and analysis results")
+    memory.add_argument('files', nargs='+', help="CSV, Parquet or Feather files to load")
+    memory.add_argument('--filter', action='append', metavar='COLUMN=VALUES',
+                        help="Keep rows whose COLUMN is one of the comma-separated VALUES (repeatable)")
+    memory.add_argument('--repeat', type=int, default=1,
+                        help="Import the files this many times to check for growth between imports (default: 1)")
+    memory.add_argument('--json', metavar='PATH', help="Also write the report as JSON")
+    memory.set_defaults(func=run_memory)
+
+    generate = commands.add_parser('generate', help="Write a synthetic chest file for scale testing")
+    generate.add_argument('output', help="CSV file to write")
+    generate.add_argument('--rows', type=row_count, default=100_000,
+                          help="Number of rows, e.g. 250k or 10M (default: 100k)")
+    generate.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    generate.add_argument('--players', type=int, default=250, help="Distinct players (default: 250)")
+    generate.add_argument('--clans', default="MY_CLAN", help="Comma-separated clan names (default: MY_CLAN)")
+    generate.add_argument('--start-date', default="2025-01-01", help="First date (default: 2025-01-01)")
+    generate.add_argument('--days', type=int, default=90, help="Days covered (default: 90)")
+    generate.add_argument('--zipf', type=float, default=1.1,
+                          help="Skew of player activity, 0 for uniform (default: 1.1)")
+    generate.add_argument('--umlauts', type=float, default=0.15,
+                          help="Share of player names with umlauts or accents (default: 0.15)")
+    generate.add_argument('--mojibake', type=float, default=0.0,
+                          help="Share of non-ASCII values written as mojibake (default: 0)")
+    generate.add_argument('--encoding', choices=['utf-8', 'cp1252'], default='utf-8',
+                          help="File encoding (default: utf-8)")
+    generate.add_argument('--sep', choices=[',', ';'], default=',', help="Field separator (default: ,)")
+    generate.add_argument('--chunk-size', type=int, default=1_000_000,
+                          help="Rows generated and written at a time (default: 1000000)")
+    generate.set_defaults(func=run_generate)
+
+    history = commands.add_parser('history', help="Keep chest data of many imports in a local database and query it")
+    history.add_argument('--db', help="History database (default: the one used by the desktop application)")
+    actions = history.add_subparsers(dest='action', required=True)
+    history_add = actions.add_parser('add', help="Add chest files to the history")
+    history_add.add_argument('files', nargs='+', help="CSV, Parquet or Feather files to add")
+    history_add.add_argument('--clan', help="Clan of all rows (default: the CLAN column of each file)")
+    actions.add_parser('info', help="Show the date range and the imports in the history")
+    history_query = actions.add_parser('query', help="Aggregate the history over a date window")
+    history_query.add_argument('--by', choices=GROUP_COLUMNS, default='PLAYER', help="Group by (default: PLAYER)")
+    history_query.add_argument('--period', choices=list(PERIODS), help="Also total per day, week or month")
+    history_query.add_argument('--rolling', type=int, metavar='DAYS',
+                               help="Trailing totals over DAYS days for every day, e.g. 7 or 28 "
+                                    "(per player, or clan-wide with --by DATE)")
+    history_query.add_argument('--percentiles', action='store_true',
+                               help="Median, 90th and 99th percentile score per chest instead of totals "
+                                    "(per PLAYER, CHEST or SOURCE; within 1%%)")
+    history_query.add_argument('--from', dest='start', metavar='DATE', help="First date, inclusive")
+    history_query.add_argument('--to', dest='end', metavar='DATE', help="Last date, inclusive")
+    history_query.add_argument('--clan', help="Only this clan")
+    history_query.add_argument('--player', help="Comma-separated players to include")
+    history_query.add_argument('--export', metavar='PATH', help="Write the result to CSV, Parquet or Excel")
+    actions.add_parser('dataset', help="Write the memory-mapped Arrow copy of the history and show where it is")
+    history_players = actions.add_parser('players', help="List the players and how many spellings of each were seen")
+    history_players.add_argument('--aliases', action='store_true', help="Also show the spellings")
+    history_ranks = actions.add_parser('ranks', help="Show how the players' ranks moved")
+    history_ranks.add_argument('--days', type=int,
+                               help="Compare with the data of DAYS days earlier, e.g. 1 or 7 "
+                                    "(default: the history before the latest import)")
+    history_ranks.add_argument('--top', type=int, help="Only show the best TOP players")
+    history_ranks.add_argument('--export', metavar='PATH', help="Write the result to CSV, Parquet or Excel")
+    history.set_defaults(func=run_history)
+    return parser
+
+
+def main(argv=None):
+    """Main entry point for the command-line interface."""
+    args = build_parser().parse_args(argv)
+    DataProcessor.debug = args.debug
+    DataProcessor.csv_engine = args.csv_engine
+    stage_timer.enabled = bool(args.timings)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        if args.debug:
+            import traceback
+            traceback.print_exc()
+        return 1
+    finally:
+        if args.timings:
+            write_timings(Path(args.timings))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures shared by the tests.
+
+Run the tests from the src directory with pytest.
+"""
+
+import pytest
+
+from modules.datagenerator import ChestDataGenerator
+from modules.dataprocessor import DataProcessor
+
+
+@pytest.fixture
+def chest_data():
+    """
+    Generate chest data and process it as a load would.
+
+    Returns:
+        callable: chest_data(rows, seed=0, **options) returning the processed DataFrame;
+            options are passed on to ChestDataGenerator
+    """
+    def generate(rows, seed=0, **options):
+        return DataProcessor.process_data(ChestDataGenerator(seed=seed, **options).generate(rows))
+    return generate
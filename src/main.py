@@ -11,6 +11,7 @@ and handles high-level configuration and error handling.
 import os
 import sys
 import logging
+import multiprocessing
 import traceback
 from pathlib import Path
 
@@ -98,4 +99,6 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    # Clan analysis starts worker processes, which a frozen executable must support
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,285 @@
+# arrowdataset.py - Memory-mapped Arrow IPC files of normalized chest data
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .dataprocessor import DataProcessor
+from .timing import stage_timer
+
+# Suffix of the part files of a dataset directory
+PART_SUFFIX = '.arrow'
+
+# Rows per record batch; a column touched in a mapped file is read batch by batch
+BATCH_ROWS = 1 << 20
+
+# Text columns stored as dictionaries: a small table of values plus an index per row
+DICTIONARY_COLUMNS = DataProcessor.CATEGORICAL_COLUMNS + DataProcessor.OPTIONAL_COLUMNS
+
+
+def _pyarrow():
+    """Import pyarrow on first use; it is an optional dependency."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401 - loads the ipc submodule
+    except ImportError:
+        raise ImportError("Memory-mapped Arrow files require the pyarrow package")
+    return pyarrow
+
+
+def to_arrow_table(df):
+    """
+    Convert normalized chest data to an Arrow table for a mapped file.
+
+    DATE is stored as a plain timestamp and SCORE as a number, so both map
+    to pandas columns without conversion; text columns are stored as
+    dictionaries with int32 indices, so the parts of a dataset share one
+    schema whatever the number of distinct values.
+
+    Args:
+        df (pandas.DataFrame): Data as returned by DataProcessor.process_data
+
+    Returns:
+        pyarrow.Table: The table, without the index
+    """
+    pa = _pyarrow()
+    df = df.reset_index(drop=True)
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if name == 'DATE':
+            column = DataProcessor.to_datetime(column).astype('datetime64[ns]')
+            columns[name] = pa.array(column, type=pa.timestamp('ns'))
+        elif name in DICTIONARY_COLUMNS:
+            column = column.astype('category')
+            columns[name] = pa.DictionaryArray.from_arrays(
+                pa.array(column.cat.codes.to_numpy().astype('int32'), mask=column.isna().to_numpy()),
+                pa.array(column.cat.categories.astype(str), type=pa.string()))
+        else:
+            columns[name] = pa.array(column)
+    return pa.table(columns)
+
+
+def write_ipc(df, path):
+    """
+    Write chest data to an uncompressed Arrow IPC file that can be memory-mapped.
+
+    The file is written next to its destination and moved into place, so a
+    process that has the previous file mapped keeps reading a complete file.
+
+    Args:
+        df (pandas.DataFrame): Data as returned by DataProcessor.process_data
+        path (str or Path): Destination file
+
+    Returns:
+        int: Size of the file in bytes
+    """
+    pa = _pyarrow()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = to_arrow_table(df)
+    temporary = path.with_name(path.name + '.tmp')
+    with stage_timer.stage('ipc_write', rows=table.num_rows):
+        # Compressed buffers would have to be decompressed into fresh memory when read
+        with pa.OSFile(str(temporary), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=BATCH_ROWS)
+        os.replace(temporary, path)
+    return path.stat().st_size
+
+
+def map_ipc(path):
+    """
+    Memory-map an Arrow IPC file.
+
+    Only the file footer is read; the column buffers of the returned table
+    point into the mapping and are paged in by the operating system when
+    they are first touched. Processes mapping the same file share its pages.
+
+    Args:
+        path (str or Path): Arrow IPC file
+
+    Returns:
+        pyarrow.Table: Table backed by the mapped file
+    """
+    pa = _pyarrow()
+    with stage_timer.stage('ipc_map'):
+        source = pa.memory_map(str(path), 'r')
+        return pa.ipc.open_file(source).read_all()
+
+
+def table_to_pandas(table, columns=None):
+    """
+    Convert a mapped table, or some of its columns, to a DataFrame.
+
+    Numeric and timestamp columns without missing values become views of the
+    mapped buffers; dictionary columns become categoricals whose codes are
+    the only copied data.
+
+    Args:
+        table (pyarrow.Table): Table as returned by map_ipc
+        columns (list, optional): Columns to convert. Defaults to all.
+
+    Returns:
+        pandas.DataFrame: The converted columns
+    """
+    if columns is not None:
+        table = table.select(list(columns))
+    with stage_timer.stage('ipc_to_pandas', rows=table.num_rows):
+        return table.to_pandas(split_blocks=True)
+
+
+def read_ipc(path):
+    """
+    Read an Arrow IPC file through a memory map.
+
+    Files written by write_columnar with compression are also read, but
+    their buffers are decompressed into memory instead of mapped.
+
+    Args:
+        path (str or Path): Arrow IPC (.arrow or .feather) file
+
+    Returns:
+        pandas.DataFrame: The file's data
+    """
+    return table_to_pandas(map_ipc(path))
+
+
+class MappedDataset:
+    """
+    A directory of memory-mapped Arrow IPC files holding normalized chest data.
+
+    Each file is one part, e.g. the rows added by one import. Opening the
+    dataset maps every part and reads only the file footers, so it costs
+    about the same for a few rows or for gigabytes of history; the rows of
+    a column are read when the column is converted to pandas, and only
+    that column is converted::
+
+        with MappedDataset('history_dataset') as dataset:
+            scores = dataset.column('SCORE')
+            df = dataset.to_pandas(['DATE', 'PLAYER', 'SCORE'])
+
+    Parts are written uncompressed and replaced atomically, so several
+    processes, e.g. the desktop application and the command line, can map
+    the same dataset and share its pages without copying.
+    """
+
+    def __init__(self, path):
+        """
+        Create a dataset object for a directory; nothing is read until open().
+
+        Args:
+            path (str or Path): Dataset directory
+        """
+        self.path = Path(path)
+        self.table = None
+        self._columns = {}
+
+    @staticmethod
+    def is_dataset(path):
+        """Check whether a path is a directory of Arrow IPC parts."""
+        path = Path(path)
+        return path.is_dir() and any(path.rglob(f'*{PART_SUFFIX}'))
+
+    def parts(self):
+        """Get the part files, including those in subdirectories, in path order."""
+        return sorted(self.path.rglob(f'*{PART_SUFFIX}'))
+
+    def part_path(self, name):
+        """Get the file of the part with the given name."""
+        return self.path / f"{name}{PART_SUFFIX}"
+
+    def write_part(self, name, df):
+        """
+        Write a part, replacing a part of the same name.
+
+        Args:
+            name (str): Part name, e.g. 'import-000042'
+            df (pandas.DataFrame): Data as returned by DataProcessor.process_data
+
+        Returns:
+            Path: The part file
+        """
+        path = self.part_path(name)
+        write_ipc(df, path)
+        # The open table no longer matches the files
+        self.close()
+        return path
+
+    def open(self):
+        """
+        Map every part.
+
+        Returns:
+            MappedDataset: self
+        """
+        pa = _pyarrow()
+        tables = [map_ipc(path) for path in self.parts()]
+        if tables:
+            # Parts may differ in the type of SCORE (integer or float); concatenating does not copy
+            self.table = pa.concat_tables(tables, promote_options='permissive')
+        else:
+            self.table = pa.table({})
+        self._columns = {}
+        if DataProcessor.debug:
+            print(f"Mapped {len(tables)} parts with {self.table.num_rows:,} rows from {self.path}")
+        return self
+
+    def close(self):
+        """Drop the mapped table and converted columns; the mappings close when no DataFrame uses them."""
+        self.table = None
+        self._columns = {}
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def _mapped(self):
+        """Get the mapped table, opening the dataset if needed."""
+        if self.table is None:
+            self.open()
+        return self.table
+
+    @property
+    def num_rows(self):
+        """Number of rows in all parts."""
+        return self._mapped().num_rows
+
+    @property
+    def columns(self):
+        """Column names."""
+        return self._mapped().column_names
+
+    def size_bytes(self):
+        """Total size of the part files."""
+        return sum(path.stat().st_size for path in self.parts())
+
+    def column(self, name):
+        """
+        Get one column as a pandas Series, converting it on first use.
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            pandas.Series: The column
+        """
+        if name not in self._columns:
+            self._columns[name] = table_to_pandas(self._mapped(), [name])[name]
+        return self._columns[name]
+
+    def to_pandas(self, columns=None):
+        """
+        Get the dataset, or some of its columns, as a DataFrame.
+
+        Args:
+            columns (list, optional): Columns to include. Defaults to all.
+
+        Returns:
+            pandas.DataFrame: The data, with a default index
+        """
+        columns = list(columns) if columns is not None else self.columns
+        return pd.DataFrame({name: self.column(name) for name in columns}, copy=False)
@@ -0,0 +1,103 @@
+# backgroundtask.py - BackgroundTask class implementation
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+
+class BackgroundTask(QObject):
+    """
+    Run a long job on a worker thread and report back through Qt signals.
+
+    The job is a callable that receives the task as its only argument. It can
+    call report_progress() and emit_partial() while it runs and should check
+    is_cancelled() between steps. Signals are delivered to the GUI thread, so
+    connected slots may update widgets directly.
+    """
+
+    # done, total, label
+    progress = Signal(int, int, str)
+    # Intermediate result (e.g. one rendered report section)
+    partial = Signal(object)
+    # Return value of the job
+    finished = Signal(object)
+    # Error message
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, job, debug=False):
+        """
+        Initialize the task.
+
+        Args:
+            job (callable): Callable taking the task and returning the result
+            debug (bool, optional): Enable debug output. Defaults to False.
+        """
+        super().__init__()
+        self.job = job
+        self.debug = debug
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the job on a new worker thread."""
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self.run)
+        self._thread.start()
+
+    def cancel(self):
+        """Request cancellation. The job stops at its next is_cancelled() check."""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        """Check whether cancellation was requested."""
+        return self._cancel_event.is_set()
+
+    def is_running(self):
+        """Check whether the worker thread is still running."""
+        return self._thread is not None and self._thread.isRunning()
+
+    def wait(self, msecs=-1):
+        """
+        Block until the worker thread has stopped.
+
+        Args:
+            msecs (int, optional): Timeout in milliseconds, -1 waits forever. Defaults to -1.
+
+        Returns:
+            bool: True if the thread has stopped
+        """
+        if self._thread is None:
+            return True
+        if msecs < 0:
+            return self._thread.wait()
+        return self._thread.wait(msecs)
+
+    def report_progress(self, done, total, label=""):
+        """Emit a progress update from the job."""
+        self.progress.emit(done, total, label)
+
+    def emit_partial(self, result):
+        """Emit an intermediate result from the job."""
+        self.partial.emit(result)
+
+    @Slot()
+    def run(self):
+        """Run the job and emit the signal matching its outcome."""
+        try:
+            result = self.job(self)
+        except Exception as e:
+            if self.debug:
+                traceback.print_exc()
+            self.failed.emit(str(e))
+            return
+        finally:
+            # Quit directly rather than through a queued signal, so a GUI thread
+            # blocked in wait() cannot deadlock the worker
+            self._thread.quit()
+
+        if self.is_cancelled():
+            self.cancelled.emit()
+        else:
+            self.finished.emit(result)
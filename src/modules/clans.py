@@ -0,0 +1,173 @@
+# clans.py - Per-clan partitions, parallel per-clan analysis and clan comparison
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .dataprocessor import DataProcessor
+from .timing import stage_timer
+
+# Partition of rows without a clan
+NO_CLAN = "(no clan)"
+
+# Below this many rows in the partitions to analyze, starting worker processes costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+
+
+def split_by_clan(df):
+    """
+    Split chest data into one partition per clan.
+
+    Args:
+        df (pandas.DataFrame): Data with an optional CLAN column (matched case-insensitively)
+
+    Returns:
+        dict: Clan name -> DataFrame, in order of clan name; rows without a clan, or all
+        rows if there is no CLAN column, are under NO_CLAN. Categorical columns of a
+        partition only have the categories its rows use.
+    """
+    column = next((col for col in df.columns if str(col).strip().upper() == 'CLAN'), None)
+    if column is None:
+        return {NO_CLAN: df}
+    # Clean up the distinct values, not every row; missing values get code -1,
+    # which indexes the NO_CLAN entry appended last
+    codes, values = pd.factorize(df[column])
+    cleaned = [str(value).strip() or NO_CLAN for value in values] + [NO_CLAN]
+    names, merged = np.unique(np.array(cleaned, dtype=object), return_inverse=True)
+    codes = merged[codes]
+    # One stable argsort groups the rows of every clan together
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    return {name: DataProcessor.drop_unused_categories(df.iloc[order[bounds[i]:bounds[i + 1]]])
+            for i, name in enumerate(names) if bounds[i + 1] > bounds[i]}
+
+
+def partition_key(df):
+    """Cheap content key of a partition: its length and the sum of its row hashes."""
+    row_hashes = pd.util.hash_pandas_object(df[DataProcessor.REQUIRED_COLUMNS], index=False)
+    return len(df), int(row_hashes.sum())
+
+
+def _analyze_partition(df):
+    """Worker process entry point: analyze_data without echoing the raw rows back."""
+    results = DataProcessor.analyze_data(df)
+    results.pop('raw_data', None)
+    return results
+
+
+class ClanAnalyzer:
+    """
+    Analyze every clan of the loaded data separately.
+
+    Results are cached per clan under the partition's content key, so after
+    an import that changes one clan only that clan is analyzed again. Clans
+    that need analysis run in parallel worker processes once there are
+    enough rows to make that worthwhile. Workers are spawned, not forked,
+    as the desktop application runs the analysis next to Qt's threads.
+    """
+
+    def __init__(self, max_workers=None, parallel_min_rows=PARALLEL_MIN_ROWS):
+        """
+        Initialize the analyzer.
+
+        Args:
+            max_workers (int, optional): Worker processes. Defaults to the CPU count.
+            parallel_min_rows (int, optional): Rows to analyze below which no workers are started
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_rows = parallel_min_rows
+        self.partitions = {}
+        self._cache = {}
+
+    def analyze(self, df):
+        """
+        Get the analyze_data results of every clan.
+
+        Args:
+            df (pandas.DataFrame): Data with REQUIRED_COLUMNS and an optional CLAN column
+
+        Returns:
+            dict: Clan name -> analysis results (without 'raw_data')
+        """
+        with stage_timer.stage('clan_partition', rows=len(df)):
+            self.partitions = split_by_clan(df)
+            keys = {clan: partition_key(part) for clan, part in self.partitions.items()}
+        stale = [clan for clan in self.partitions
+                 if clan not in self._cache or self._cache[clan][0] != keys[clan]]
+        stale_rows = sum(len(self.partitions[clan]) for clan in stale)
+
+        with stage_timer.stage('clan_analysis', rows=stale_rows, clans=len(self.partitions), analyzed=len(stale)):
+            if len(stale) > 1 and self.max_workers > 1 and stale_rows >= self.parallel_min_rows:
+                workers = min(self.max_workers, len(stale))
+                # Forking the multi-threaded Qt process could copy locks held by other threads
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    analyzed = dict(zip(stale, pool.map(_analyze_partition,
+                                                        [self.partitions[clan] for clan in stale])))
+            else:
+                analyzed = {clan: _analyze_partition(self.partitions[clan]) for clan in stale}
+
+        self._cache = {clan: (keys[clan], analyzed[clan] if clan in analyzed else self._cache[clan][1])
+                       for clan in self.partitions}
+        if DataProcessor.debug:
+            print(f"Analyzed {len(stale)} of {len(self.partitions)} clans")
+        return {clan: results for clan, (_, results) in self._cache.items()}
+
+    def comparison(self, df):
+        """Analyze the clans of df and compare them with clan_comparison()."""
+        return clan_comparison(self.analyze(df))
+
+    def clear(self):
+        """Drop the partitions and cached results."""
+        self.partitions = {}
+        self._cache = {}
+
+
+def clan_comparison(results_by_clan):
+    """
+    Compare clans side by side from their analysis results.
+
+    Only the per-clan aggregate tables are read, so the same comparison works
+    for results computed in worker processes or by the history store.
+
+    Args:
+        results_by_clan (dict): Clan name -> results as from DataProcessor.analyze_data
+
+    Returns:
+        pandas.DataFrame: One row per clan with player and chest counts, total score,
+        score per player and per chest, score percentiles, and the top player and
+        chest type; highest total score first
+    """
+    rows = []
+    for clan, results in results_by_clan.items():
+        players = results['player_totals']
+        chests = results['chest_totals']
+        if players.empty:
+            continue
+        total_score = players['SCORE'].sum()
+        chest_count = players['CHEST_COUNT'].sum()
+        top_player = players.loc[players['SCORE'].idxmax()]
+        top_chest = chests.loc[chests['SCORE'].idxmax()]
+        row = {
+            'CLAN': clan,
+            'PLAYERS': len(players),
+            'CHEST_COUNT': int(chest_count),
+            'TOTAL_SCORE': total_score,
+            'SCORE_PER_PLAYER': round(total_score / len(players), 2),
+            'SCORE_PER_CHEST': round(total_score / chest_count, 2) if chest_count else 0.0,
+        }
+        quantiles = results.get('score_quantiles')
+        if quantiles is not None and not quantiles.empty:
+            row['P50'] = quantiles.iloc[0]['P50']
+            row['P90'] = quantiles.iloc[0]['P90']
+        row.update({
+            'TOP_PLAYER': top_player['PLAYER'],
+            'TOP_PLAYER_SCORE': top_player['SCORE'],
+            'TOP_CHEST': top_chest['CHEST'],
+        })
+        rows.append(row)
+    if not rows:
+        return pd.DataFrame(columns=['CLAN', 'PLAYERS', 'CHEST_COUNT', 'TOTAL_SCORE'])
+    result = pd.DataFrame(rows)
+    return result.sort_values('TOTAL_SCORE', ascending=False, kind='stable').reset_index(drop=True)
@@ -1,5 +1,4 @@
 # configmanager.py - ConfigManager class implementation
-from modules.utils import *
 import os
 import json
 from pathlib import Path
@@ -197,5 +196,12 @@ class ConfigManager:
             str: The export directory path.
         """
         return self.config.get('export_dir', str(Path.cwd() / 'data' / 'exports'))
-
-
+        
+    def get_history_path(self):
+        """
+        Get the path of the chest history database.
+        
+        Returns:
+            str: The history database path.
+        """
+        return self.config.get('history_db', str(self.config_dir / 'history.sqlite3'))
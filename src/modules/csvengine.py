@@ -0,0 +1,550 @@
+# csvengine.py - Pluggable CSV parser backends driven by a sniffed file schema
+import codecs
+import csv
+import mmap
+import os
+import re
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .dataprocessor import DataProcessor
+from .schema import ChestSchema
+from .timing import stage_timer
+
+# Bytes read from the start of a file to sniff its schema
+SAMPLE_BYTES = 1 << 16
+
+# Encodings tried on the sample after UTF-8; Windows-1252 first, as most German exports use it
+FALLBACK_ENCODINGS = ['cp1252', 'latin1']
+
+# Date formats tried on the sampled DATE values, in order
+DATE_FORMATS = ChestSchema.DATE_FORMATS
+
+# Columns of the quarantine table of malformed lines, see read_csv()
+QUARANTINE_COLUMNS = ['LINE', 'REASON', 'TEXT']
+
+# Reasons a line is quarantined
+BAD_FIELD_COUNT = "wrong number of fields"
+UNDECODABLE = "undecodable bytes"
+BAD_SCORE = "SCORE is not a number"
+BAD_DATE = "DATE is not a date"
+
+# Codec error handler used by both engines for bytes of a UTF-8 file that are not valid UTF-8
+CP1252_FALLBACK = 'chestparser-cp1252'
+
+# Lines pandas' C parser skips with on_bad_lines='warn'
+_SKIPPED_LINE = re.compile(r"Skipping line (\d+): (.*)")
+
+
+class CsvSchema:
+    """
+    How to parse one CSV file: its encoding, delimiter, columns, the columns
+    read as text and the format of its DATE column.
+
+    Sniffed from the first SAMPLE_BYTES of the file by sniff_schema(), so
+    every engine parses the file the same way without guessing per row.
+    """
+
+    def __init__(self, encoding, delimiter, columns, text_columns=(), date_column=None, date_format=None):
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.columns = list(columns)
+        self.text_columns = list(text_columns)
+        self.date_column = date_column
+        self.date_format = date_format
+
+    def __repr__(self):
+        return (f"CsvSchema(encoding={self.encoding!r}, delimiter={self.delimiter!r}, "
+                f"columns={self.columns!r}, date_format={self.date_format!r})")
+
+
+def _sniff_encoding(sample):
+    """
+    Pick the encoding of a sample: UTF-8 if it decodes, else the first fallback that does.
+
+    A few invalid bytes among many valid multi-byte characters, e.g. one
+    value saved in another encoding, still count as UTF-8; those values
+    are quarantined or decoded on their own when the file is parsed.
+    """
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    text = sample.decode('utf-8', errors='replace')
+    invalid = text.count('\ufffd')
+    if not invalid:
+        return 'utf-8'
+    valid = sum(1 for char in text if char > '\x7f') - invalid
+    # The sample may end in the middle of a multi-byte character
+    if valid > 10 * invalid or (invalid == 1 and text.endswith('\ufffd')):
+        return 'utf-8'
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin1'
+
+
+def _read_sample(filepath, sample_bytes):
+    """
+    Read the start of a file, and for larger files also whole lines from
+    its middle and end, so an encoding that only shows late is noticed.
+
+    Returns:
+        tuple: (bytes at the start of the file, bytes of the later lines, whether the start is the whole file)
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        head = f.read(sample_bytes)
+        later = []
+        chunk = sample_bytes // 4
+        if size > sample_bytes + chunk:
+            for fraction in (0.25, 0.5, 0.75, 1.0):
+                f.seek(max(sample_bytes, int(size * fraction) - chunk))
+                lines = f.read(chunk).split(b'\n')
+                # The first and last line of a chunk may be cut off
+                later.append(b'\n'.join(lines[1:-1]))
+    return head, b'\n'.join(later), len(head) == size
+
+
+def _sniff_date_format(values):
+    """
+    Get the first of DATE_FORMATS that parses all sampled values, else the one
+    that parses the most of them, or None if none parses any.
+
+    Invalid dates in the sample (e.g. 31.02.) then do not leave the format to
+    be guessed from a single value; the rows of those are quarantined.
+    """
+    values = pd.Series([value for value in values if value])
+    if values.empty:
+        return None
+    best, best_parsed = None, 0
+    for date_format in DATE_FORMATS:
+        parsed = int(pd.to_datetime(values, format=date_format, errors='coerce').notna().sum())
+        if parsed == len(values):
+            return date_format
+        if parsed > best_parsed:
+            best, best_parsed = date_format, parsed
+    return best
+
+
+def sniff_schema(filepath, sample_bytes=SAMPLE_BYTES):
+    """
+    Sniff the parse options of a CSV file from its first bytes.
+
+    The encoding is checked on lines from the middle and end of the file too.
+
+    The delimiter is ';' if the header has more semicolons than commas.
+    The columns matched to PLAYER, SOURCE, CHEST and CLAN by
+    ChestSchema.column_mapping() are read as text; DATE gets the first of
+    DATE_FORMATS that parses every sampled value, or the one parsing most.
+
+    Args:
+        filepath (str or Path): CSV file
+        sample_bytes (int, optional): Bytes to read. Defaults to SAMPLE_BYTES.
+
+    Returns:
+        CsvSchema: The sniffed schema
+
+    Raises:
+        ValueError: If the file has no header line
+    """
+    sample, later, complete = _read_sample(filepath, sample_bytes)
+    encoding = _sniff_encoding(sample)
+    if encoding.startswith('utf-8') and later and _sniff_encoding(later) != 'utf-8':
+        encoding = _sniff_encoding(later)
+    header = sample.split(b'\n', 1)[0]
+    if not header.strip():
+        raise ValueError(f"{Path(filepath).name} has no header line")
+    delimiter = ';' if header.count(b';') > header.count(b',') else ','
+
+    text = sample.decode(encoding, errors='replace')
+    lines = text.splitlines()
+    if not complete:
+        # The last line may be cut off
+        lines = lines[:-1]
+    rows = list(csv.reader(lines, delimiter=delimiter))
+    columns = rows[0]
+    by_name = {name: column for column, name in ChestSchema.column_mapping(columns).items()}
+    text_columns = [by_name[name] for name in ChestSchema.columns_of_type('category') if name in by_name]
+
+    date_column = by_name.get('DATE')
+    date_format = None
+    if date_column is not None:
+        position = columns.index(date_column)
+        date_format = _sniff_date_format([row[position].strip() for row in rows[1:] if len(row) > position])
+    return CsvSchema(encoding, delimiter, columns, text_columns, date_column, date_format)
+
+
+def _decode_as_cp1252(error):
+    """Codec error handler: decode bytes that are not valid UTF-8 as Windows-1252, U+FFFD where that fails too."""
+    return error.object[error.start:error.end].decode('cp1252', errors='replace'), error.end
+
+
+codecs.register_error(CP1252_FALLBACK, _decode_as_cp1252)
+
+
+def _decode_errors(schema):
+    """Codec error handler for the text of a file; a UTF-8 file may hold values saved as Windows-1252."""
+    return CP1252_FALLBACK if schema.encoding.startswith('utf-8') else 'replace'
+
+
+class PandasEngine:
+    """pandas' C parser: always available, single-threaded."""
+
+    name = 'pandas'
+
+    # Lines with too few fields are read as rows padded with missing values
+    pads_short_lines = True
+
+    @staticmethod
+    def available():
+        return True
+
+    def read(self, filepath, schema):
+        """
+        Parse a file with the given schema, skipping malformed lines.
+
+        Lines with too many fields are skipped. In a UTF-8 file, bytes that
+        are not valid UTF-8 are decoded as Windows-1252; bytes that are not
+        valid in the sniffed encoding either are replaced by U+FFFD.
+
+        Returns:
+            tuple: (pandas.DataFrame, list of (line number, None) per skipped line,
+            numpy.ndarray marking the rows with undecodable bytes)
+        """
+        kwargs = {}
+        if schema.date_format is not None:
+            # Values that do not match leave the column as text for quarantine_rows() to convert
+            kwargs = {'parse_dates': [schema.date_column], 'date_format': schema.date_format}
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            df = pd.read_csv(filepath, encoding=schema.encoding, sep=schema.delimiter,
+                             dtype={column: 'str' for column in schema.text_columns},
+                             on_bad_lines='warn', encoding_errors=_decode_errors(schema), **kwargs)
+        skipped = []
+        for warning in caught:
+            found = _SKIPPED_LINE.findall(str(warning.message))
+            if found:
+                skipped += [(int(line), None) for line, _ in found]
+            elif not issubclass(warning.category, pd.errors.DtypeWarning):
+                # Mixed types only occur in SCORE values that quarantine_rows() converts
+                warnings.showwarning(warning.message, warning.category, warning.filename, warning.lineno)
+
+        undecodable = np.zeros(len(df), dtype=bool)
+        for column in schema.text_columns:
+            # Check the distinct values, not every row
+            codes, values = pd.factorize(df[column])
+            replaced = [i for i, value in enumerate(values) if '\ufffd' in value]
+            if replaced:
+                undecodable |= np.isin(codes, replaced)
+        return df, skipped, undecodable
+
+
+class PyArrowEngine:
+    """
+    pyarrow's CSV reader: parses blocks of the file in parallel threads and
+    converts every column in one pass. Used when pyarrow is installed.
+    """
+
+    name = 'pyarrow'
+
+    # Lines with the wrong number of fields are skipped
+    pads_short_lines = False
+
+    # Bytes parsed per block; each thread parses one block at a time
+    BLOCK_SIZE = 4 << 20
+
+    @staticmethod
+    def available():
+        try:
+            import pyarrow.csv  # noqa: F401 - imported on first use; it is slow to load
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def is_utf8(filepath):
+        """Check whether a whole file is valid UTF-8, with Arrow's vectorized check of the mapped file."""
+        import pyarrow as pa
+        with pa.memory_map(str(filepath), 'r') as source:
+            data = source.read_buffer()
+            # The file as the one value of a binary array; casting it to text validates it
+            offsets = pa.py_buffer(np.array([0, data.size], dtype=np.int64))
+            try:
+                pa.Array.from_buffers(pa.large_binary(), 1, [None, offsets, data]).cast(pa.large_string())
+            except pa.ArrowInvalid:
+                return False
+        return True
+
+    def read(self, filepath, schema):
+        """
+        Parse a file with the given schema, skipping malformed lines.
+
+        Text columns are read as bytes and only their distinct values are
+        decoded. Files in other encodings than UTF-8, or with bytes that are
+        not valid UTF-8, are passed to pyarrow as Latin-1, which maps every
+        byte to one character, so no line fails to decode, the text of every
+        skipped line reaches the invalid row handler and the bytes are
+        recovered for decoding.
+
+        Returns:
+            tuple: (pandas.DataFrame, list of (None, bytes of the line) per line with
+            the wrong number of fields, numpy.ndarray marking the rows with undecodable bytes)
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pacsv
+
+        transcoded = not schema.encoding.startswith('utf-8') or not self.is_utf8(filepath)
+        skipped = []
+
+        def skip(row):
+            # Line numbers are unknown when blocks are parsed in parallel; see quarantine_rows()
+            skipped.append((None, row.text.encode('latin1' if transcoded else 'utf-8')))
+            return 'skip'
+
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=self.BLOCK_SIZE,
+                                         column_names=schema.columns, skip_rows=1,
+                                         encoding='latin1' if transcoded else 'utf8')
+        parse_options = pacsv.ParseOptions(delimiter=schema.delimiter, invalid_row_handler=skip)
+        column_types = {column: pa.binary() for column in schema.text_columns}
+        if schema.date_column is not None:
+            # pyarrow's date parser rolls invalid days over (31.02. becomes 03.03.); read the
+            # dates as a dictionary so ChestSchema.apply() converts each distinct value strictly
+            column_types[schema.date_column] = pa.dictionary(pa.int32(), pa.string())
+        convert_options = pacsv.ConvertOptions(
+            column_types=column_types,
+            # Empty fields are missing, as pandas reads them
+            strings_can_be_null=True,
+        )
+        table = pacsv.read_csv(str(filepath), read_options=read_options, parse_options=parse_options,
+                               convert_options=convert_options)
+
+        undecodable = np.zeros(table.num_rows, dtype=bool)
+        errors = _decode_errors(schema)
+        for column in schema.text_columns:
+            encoded = pc.dictionary_encode(table[column]).combine_chunks()
+            values, failed = [], []
+            for i, raw in enumerate(encoded.dictionary.to_pylist()):
+                if transcoded:
+                    raw = raw.decode('utf-8').encode('latin1')
+                # Decoded as the pandas engine decodes the file
+                values.append(raw.decode(schema.encoding, errors=errors))
+                if '\ufffd' in values[-1]:
+                    failed.append(i)
+            if failed:
+                undecodable |= pc.is_in(encoded.indices, value_set=pa.array(failed, encoded.indices.type)) \
+                    .fill_null(False).to_numpy(zero_copy_only=False)
+            decoded = pa.array(values, pa.string()).take(encoded.indices)
+            table = table.set_column(table.schema.get_field_index(column), column, decoded)
+        return table.to_pandas(), skipped, undecodable
+
+
+# Engines by name, fastest first; 'auto' picks the first available one
+ENGINES = {engine.name: engine for engine in (PyArrowEngine, PandasEngine)}
+
+
+def available_engines():
+    """Get the names of the engines that can be used here."""
+    return [name for name, engine in ENGINES.items() if engine.available()]
+
+
+def get_engine(name='auto'):
+    """
+    Get a CSV engine by name.
+
+    Args:
+        name (str, optional): 'pyarrow', 'pandas' or 'auto' for the fastest available
+
+    Returns:
+        PandasEngine or PyArrowEngine: The engine
+
+    Raises:
+        ValueError: If the engine is unknown or not installed
+    """
+    if name == 'auto':
+        name = available_engines()[0]
+    if name not in ENGINES:
+        raise ValueError(f"Unknown CSV engine {name!r}; choose from {', '.join(['auto', *ENGINES])}")
+    if not ENGINES[name].available():
+        raise ValueError(f"The {name} CSV engine is not installed")
+    return ENGINES[name]()
+
+
+def _scan_lines(data, schema):
+    """
+    Find the physical lines of a file's bytes.
+
+    Both parsers skip blank lines and read one row per remaining line after
+    the header; values with line breaks are not expected in exports.
+
+    Args:
+        data (bytes-like): The file's bytes
+        schema (CsvSchema): The parse options
+
+    Returns:
+        tuple: (start and end offset of every line without its line break, the 1-based
+        numbers of the data lines, the number of fields per line or None if the file
+        quotes values, so delimiters cannot be counted)
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(buffer)]))
+    if starts[-1] == len(buffer):
+        # No line after the final line break
+        starts, ends = starts[:-1], ends[:-1]
+    lengths = ends - starts
+    carriage_return = buffer[np.maximum(ends - 1, 0)] == ord('\r')
+    blank = (lengths == 0) | ((lengths == 1) & carriage_return)
+    data_lines = np.flatnonzero(~blank[1:]) + 2
+
+    fields = None
+    if data.find(b'"') < 0:
+        # No line break is a delimiter, so the delimiters of a line are those before its end
+        # that are not before the end of the previous line
+        before_end = np.searchsorted(np.flatnonzero(buffer == ord(schema.delimiter)), ends)
+        fields = np.diff(before_end, prepend=0) + 1
+    return starts, ends, data_lines, fields
+
+
+def _find_lines(data, starts, texts):
+    """Find the line numbers of lines by their bytes, None for a line not found."""
+    lines, searched_from = [], {}
+    for text in texts:
+        # Identical lines are found one after the other
+        position = data.find(b'\n' + text, searched_from.get(text, 0))
+        if position < 0:
+            lines.append(None)
+            continue
+        searched_from[text] = position + 1
+        lines.append(int(np.searchsorted(starts, position + 1, side='right')))
+    return lines
+
+
+def quarantine_rows(filepath, df, skipped, undecodable, schema, pads_short_lines=False):
+    """
+    Move the malformed rows of a parsed file to a quarantine table.
+
+    The rows are typed with ChestSchema.apply() first, in the same pass:
+    rows with undecodable text, a SCORE that is not a number, a DATE that
+    does not match the sniffed format or, from a parser that pads short
+    lines, too few fields are taken out of df.
+    Together with the lines the parser skipped they are listed by line
+    number with the reason and the line as found in the file. Lines are
+    only counted when something was quarantined, or when a parser that
+    pads short lines left a missing value in the last column, in one
+    vectorized pass over the mapped file.
+
+    Args:
+        filepath (str or Path): The parsed file
+        df (pandas.DataFrame): The parsed rows
+        skipped (list): (line number or None, bytes of the line or None) per line the parser skipped
+        undecodable (numpy.ndarray): Rows with bytes not valid in the sniffed encoding
+        schema (CsvSchema): The parse options
+        pads_short_lines (bool, optional): Whether the parser read lines with too few fields as rows
+
+    Returns:
+        tuple: (pandas.DataFrame of the valid, typed rows with a default index,
+        pandas.DataFrame with QUARANTINE_COLUMNS, ordered by line)
+    """
+    reasons = np.where(undecodable, UNDECODABLE, '').astype(object)
+    df, unparseable = ChestSchema.apply(df, schema.date_format)
+    for column, reason in (('SCORE', BAD_SCORE), ('DATE', BAD_DATE)):
+        if column in unparseable:
+            reasons[unparseable[column] & (reasons == '')] = reason
+    empty = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    # A padded line has no value in the last column; without missing values there, no line was padded
+    maybe_padded = pads_short_lines and len(df.columns) > 0 and bool(df.iloc[:, -1].isna().any())
+    if not skipped and not (reasons != '').any() and not maybe_padded:
+        return df, empty
+
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        starts, ends, data_lines, fields = _scan_lines(data, schema)
+        wrong = data_lines[fields[data_lines - 1] != len(schema.columns)] if fields is not None else None
+        if all(line is not None for line, _ in skipped):
+            dropped = [line for line, _ in skipped]
+        elif wrong is not None and len(wrong) == len(skipped):
+            # The parser skipped every line with the wrong number of fields
+            dropped = wrong.tolist()
+        else:
+            dropped = [line if line is not None else found for (line, _), found in
+                       zip(skipped, _find_lines(data, starts, [text for _, text in skipped]))]
+        parsed = data_lines[~np.isin(data_lines, [line for line in dropped if line is not None])]
+        row_lines = parsed if len(parsed) == len(df) else None
+        padded = None
+        if maybe_padded and row_lines is not None and wrong is not None:
+            padded = np.isin(row_lines, wrong)
+            reasons[padded] = BAD_FIELD_COUNT
+        bad = reasons != ''
+        if not dropped and not bad.any():
+            return df, empty
+
+        lines = dropped + (row_lines[bad].tolist() if row_lines is not None else [None] * int(bad.sum()))
+        texts = [text for _, text in skipped] + [None] * int(bad.sum())
+        texts = [(data[starts[line - 1]:ends[line - 1]] if line is not None else text or b'')
+                 .decode(schema.encoding, errors='replace').rstrip('\r')
+                 for line, text in zip(lines, texts)]
+    quarantine = pd.DataFrame({
+        'LINE': pd.array(lines, dtype='Int64'),
+        'REASON': [BAD_FIELD_COUNT] * len(dropped) + reasons[bad].tolist(),
+        'TEXT': texts,
+    }).sort_values('LINE', kind='stable').reset_index(drop=True)
+    df = df[~bad].reset_index(drop=True)
+    if bad.any():
+        # Integer columns became float to hold padding or values that are not numbers; without
+        # those rows they are integers again, as a parser reads the remaining lines
+        for column in df.columns:
+            values = df[column]
+            if values.dtype.kind == 'f' and values.notna().all() and (values % 1 == 0).all():
+                df[column] = values.astype('int64')
+        # Whichever parser read them, the categoricals only keep the values of the remaining rows
+        df = DataProcessor.drop_unused_categories(df)
+    return df, quarantine
+
+
+def read_csv(filepath, schema=None, engine='auto'):
+    """
+    Parse a CSV file with a pluggable engine in one tolerant pass.
+
+    The rows come back typed by ChestSchema: columns have their standard
+    names, DATE and SCORE are converted and the dimensions are categoricals,
+    so no later stage converts them again. Malformed lines do not fail the
+    parse: lines with the wrong number of fields, undecodable bytes, a
+    SCORE that is not a number or a DATE that is not a date are left out of
+    the data and listed in a quarantine table (see quarantine_rows()), and
+    every valid row is kept. If the chosen engine fails anyway, the
+    file is parsed again with pandas before the error is raised.
+
+    Args:
+        filepath (str or Path): CSV file
+        schema (CsvSchema, optional): Parse options. Defaults to sniff_schema(filepath).
+        engine (str, optional): Engine name, see get_engine(). Defaults to 'auto'.
+
+    Returns:
+        tuple: (pandas.DataFrame, CsvSchema, name of the engine that parsed the file,
+        pandas.DataFrame of the quarantined lines with QUARANTINE_COLUMNS)
+    """
+    if schema is None:
+        schema = sniff_schema(filepath)
+    chosen = get_engine(engine)
+    with stage_timer.stage('csv_parse', engine=chosen.name, file=Path(filepath).name) as stage:
+        try:
+            df, skipped, undecodable = chosen.read(filepath, schema)
+        except Exception as e:
+            if chosen.name == PandasEngine.name:
+                raise
+            if DataProcessor.debug:
+                print(f"{chosen.name} could not parse {filepath} ({e}); parsing with pandas")
+            chosen = PandasEngine()
+            df, skipped, undecodable = chosen.read(filepath, schema)
+        df, quarantine = quarantine_rows(filepath, df, skipped, undecodable, schema, chosen.pads_short_lines)
+        stage.rows = len(df)
+    if DataProcessor.debug:
+        print(f"Parsed {len(df):,} rows with the {chosen.name} engine using {schema} "
+              f"({os.cpu_count() or 1} CPUs); {len(quarantine):,} malformed lines quarantined")
+    return df, schema, chosen.name, quarantine
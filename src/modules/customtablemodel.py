@@ -1,9 +1,10 @@
 # customtablemodel.py - CustomTableModel class implementation
-from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex
+from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, QSortFilterProxyModel
 from PySide6.QtGui import QColor
 import pandas as pd
 import numpy as np
 from .stylemanager import DARK_THEME
+from .timing import stage_timer
 
 class CustomTableModel(QAbstractTableModel):
     """Custom table model for displaying pandas DataFrame data."""
@@ -28,6 +29,18 @@ class CustomTableModel(QAbstractTableModel):
                 return f"{value:,}"  # Format integers with commas
             return str(value)
             
+        elif role == Qt.UserRole:
+            # Raw value used as the sort key, so numbers and dates sort by value
+            value = self._data.iloc[index.row(), index.column()]
+            if pd.isna(value):
+                return None
+            elif isinstance(value, pd.Timestamp):
+                # Qt cannot compare Python datetimes; nanoseconds since the epoch sort the same
+                return value.value
+            elif isinstance(value, np.generic):
+                return value.item()
+            return value
+            
         elif role == Qt.TextAlignmentRole:
             value = self._data.iloc[index.row(), index.column()]
             if isinstance(value, (int, float, np.number)):
@@ -45,6 +58,10 @@ class CustomTableModel(QAbstractTableModel):
             
         return None
         
+    def dataframe(self):
+        """Return the DataFrame backing the model."""
+        return self._data
+        
     def rowCount(self, parent=None):
         """Return the number of rows."""
         return len(self._data)
@@ -80,10 +97,73 @@ class CustomTableModel(QAbstractTableModel):
             column (int): The column to sort by.
             order (Qt.SortOrder): The sort order.
         """
-        self.layoutAboutToBeChanged.emit()
-        col_name = self._data.columns[column]
-        ascending = order == Qt.AscendingOrder
-        self._data = self._data.sort_values(col_name, ascending=ascending)
-        self.layoutChanged.emit()
+        with stage_timer.stage('table_sort', rows=len(self._data), column=column):
+            self.layoutAboutToBeChanged.emit()
+            col_name = self._data.columns[column]
+            ascending = order == Qt.AscendingOrder
+            self._data = self._data.sort_values(col_name, ascending=ascending)
+            self.layoutChanged.emit()
+
+
+class TimedSortProxyModel(QSortFilterProxyModel):
+    """
+    Sort proxy that records each sort as a 'table_sort' stage.
+
+    The sorts are also kept, so source_rows() can give the rows in the
+    order they are shown without mapping every proxy row back to the
+    source model. The proxy is only used for sorting, not filtering.
+    """
+
+    def __init__(self, parent=None):
+        """Initialize the proxy."""
+        super().__init__(parent)
+        self._source_rows = None
+        self._pending_sorts = []
+
+    def setSourceModel(self, source_model):
+        """Set the source model; a sorted proxy sorts its rows again."""
+        self._source_rows = None
+        self._pending_sorts = [(self.sortColumn(), self.sortOrder())] if self.sortColumn() >= 0 else []
+        super().setSourceModel(source_model)
+        # Build the proxy's row mapping now; a sort before it exists orders tied rows differently
+        self.rowCount()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort the proxy by the given column and order."""
+        source = self.sourceModel()
+        rows = source.rowCount() if source is not None else None
+        with stage_timer.stage('table_sort', rows=rows, column=column):
+            super().sort(column, order)
+        self._pending_sorts.append((column, order))
+
+    def source_rows(self):
+        """
+        Get the source rows in the order the proxy shows them.
 
+        The proxy's sorts are replayed on the source DataFrame, with the sort
+        role's values (CustomTableModel gives the raw values for Qt.UserRole),
+        in one vectorized sort each. Like the proxy's, every sort is stable:
+        tied rows keep the order the previous sort left them in.
 
+        Returns:
+            numpy.ndarray or None: Positional source rows in display order, or None
+            while they are shown in source order
+        """
+        df = self.sourceModel().dataframe()
+        for column, order in self._pending_sorts:
+            if column < 0 or column >= len(df.columns):
+                # Sorting by no column restores the source order
+                self._source_rows = None
+                continue
+            values = pd.Series(df.iloc[:, column].to_numpy())
+            if self._source_rows is not None:
+                values = values.iloc[self._source_rows]
+            if order == Qt.AscendingOrder:
+                rows = values.sort_values(kind='stable', na_position='last').index.to_numpy()
+            else:
+                # The reverse of an ascending sort of the reversed rows: missing values
+                # first, tied rows in their current order
+                rows = values.iloc[::-1].sort_values(kind='stable', na_position='last').index.to_numpy()[::-1]
+            self._source_rows = rows
+        self._pending_sorts = []
+        return self._source_rows
@@ -0,0 +1,251 @@
+# datagenerator.py - Synthetic chest data for scale and stress testing
+import io
+
+import numpy as np
+import pandas as pd
+
+# Column order of a Total Battle chest export
+GENERATED_COLUMNS = ['DATE', 'PLAYER', 'SOURCE', 'CHEST', 'SCORE', 'CLAN']
+
+# Crypt score by level; rare crypts give 1.5x and epic crypts 2x the points
+CRYPT_SCORES = {5: 1, 10: 4, 15: 17, 20: 84, 25: 275, 30: 380, 35: 500, 40: 650, 45: 800}
+CRYPT_RARITIES = [("", 1.0, 0.60), ("rare ", 1.5, 0.25), ("epic ", 2.0, 0.15)]
+
+# Sources that are not crypts: (name, score, relative weight)
+OTHER_SOURCES = [
+    ("Epic Ancient squad", 10, 2500),
+    ("Rise of the Ancients event", 10, 1200),
+    ("Union of Triumph personal rew.", 10, 300),
+    ("Epic Chimera squad", 0, 150),
+    ("Bank", 20, 100),
+    ("Clan wealth", 0, 90),
+    ("Authority Rush tournament", 100, 55),
+    ("Epic Undead squad", 500, 55),
+    ("Arena", 2, 40),
+    ("Epic Basilisk squad", 0, 40),
+    ("Clash for the Throne tournament", 10, 35),
+    ("Mercenary Exchange", 20, 20),
+    ("Shadow City", 500, 15),
+    ("Lvl 45 Raid Runic squad", 10, 20),
+    ("Story", 1, 5),
+]
+
+CHEST_NAMES = [
+    "Golden Chest", "Ancients’ Chest", "Elven Citadel Chest", "Cobra Chest", "Rare Dragon Chest",
+    "Orc Chest", "Barbarian Chest", "Fire Chest", "Forgotten Chest", "Stone Chest", "Infernal Chest",
+    "Sand Chest", "Union Chest", "Mayan Chest", "Elegant Chest", "Bone Chest", "Gnome Workshop Chest",
+    "White Wood Chest", "Ancient Warrior's Chest", "Cobalt Chest", "Priest's Chest", "Scarab Chest",
+    "Quick March Chest", "Turtle Chest", "Braided Chest", "Minotaur Chest", "Harpy Chest",
+    "Titansteel Chest", "Scorpion Chest", "Trillium Chest", "Abandoned Chest", "Chest of the Cursed",
+    "Wooden Chest", "House of Horrors Chest", "Cursed Citadel Chest", "Chest of Authority",
+    "Epic Monster Chest", "Ancient Bastion Chest", "Gladiator's Chest", "Basilisk Chest",
+    "Inferno Chest", "Bronze Chest", "Elven Chest", "Runic Chest", "Undead Chest", "Cursed Chest",
+    "Common Chest of Wealth", "Rare Chest of Wealth", "Epic Chest of Wealth", "Merchant's Chest",
+    "Precious Chest", "Shadow Chest", "Silver Chest", "Governor's Chest", "Jormungandr's Chest",
+]
+
+# Syllables for player names; the non-ASCII endings give names with umlauts and accents
+NAME_PARTS = ["Feld", "Nyx", "Kaj", "Bier", "Krum", "Dra", "Wolf", "Stahl", "Eis", "Sturm", "Grim",
+              "Thor", "Val", "Rag", "Hel", "Mor", "Zar", "Kor", "Lun", "Fal"]
+NAME_ENDINGS = ["jäger", "urus", "monster", "börse", "mel", "ken", "gar", "heim", "brück", "rik",
+                "ström", "bärt", "léon", "ius", "ax", "orn", "wyn", "ath", "ir", "o"]
+
+
+def mojibake(text):
+    """Return text as it looks when its UTF-8 bytes are decoded as cp1252 (e.g. 'Ã¤' for 'ä')."""
+    return text.encode('utf-8').decode('cp1252', errors='replace')
+
+
+class ChestDataGenerator:
+    """
+    Generate synthetic Total Battle chest exports.
+
+    Output is deterministic for a given seed and configuration. Player
+    activity follows a Zipf-like distribution, sources mimic crypt levels and
+    rarities with matching scores, and player and chest names include umlauts.
+    A configurable share of non-ASCII values can be written as mojibake to
+    exercise the encoding repair on import.
+
+    Rows are produced in vectorized chunks, so files of several gigabytes can
+    be written without holding them in memory.
+    """
+
+    def __init__(self, seed=0, players=250, clans=("MY_CLAN",), start_date="2025-01-01", days=90,
+                 zipf_exponent=1.1, umlaut_rate=0.15, mojibake_rate=0.0):
+        """
+        Initialize the generator.
+
+        Args:
+            seed (int, optional): Random seed. Defaults to 0.
+            players (int, optional): Number of distinct players. Defaults to 250.
+            clans (sequence, optional): Clan names; players are spread evenly over them
+            start_date (str, optional): First date in the data. Defaults to "2025-01-01".
+            days (int, optional): Number of consecutive days covered. Defaults to 90.
+            zipf_exponent (float, optional): Skew of player activity. Defaults to 1.1.
+            umlaut_rate (float, optional): Share of player names with umlauts or accents. Defaults to 0.15.
+            mojibake_rate (float, optional): Share of non-ASCII values written as mojibake. Defaults to 0.0.
+        """
+        if players < 1 or days < 1 or not clans:
+            raise ValueError("players, days and clans must not be empty")
+        self.seed = seed
+        self.mojibake_rate = mojibake_rate
+
+        rng = np.random.default_rng(seed)
+        self.player_names = self._make_player_names(rng, players, umlaut_rate)
+        self.clan_names = list(clans)
+        # Each player belongs to exactly one clan
+        self.player_clans = rng.permutation(np.arange(players) % len(self.clan_names))
+
+        # Zipf-like activity with a random rank per player
+        ranks = rng.permutation(players) + 1
+        weights = 1.0 / ranks ** zipf_exponent
+        self.player_weights = weights / weights.sum()
+
+        sources, scores, source_weights = [], [], []
+        for level, score in CRYPT_SCORES.items():
+            level_weight = 1.0 / (1 + abs(level - 25) / 5)
+            for rarity, factor, rarity_weight in CRYPT_RARITIES:
+                sources.append(f"Level {level} {rarity}Crypt")
+                scores.append(int(round(score * factor)))
+                source_weights.append(4000 * level_weight * rarity_weight)
+        for name, score, weight in OTHER_SOURCES:
+            sources.append(name)
+            scores.append(score)
+            source_weights.append(weight)
+        self.source_names = sources
+        self.source_scores = np.array(scores, dtype=np.int64)
+        source_weights = np.array(source_weights)
+        self.source_weights = source_weights / source_weights.sum()
+
+        chest_weights = 1.0 / np.arange(1, len(CHEST_NAMES) + 1) ** 0.8
+        self.chest_weights = chest_weights / chest_weights.sum()
+        self.dates = pd.date_range(start_date, periods=days, freq='D').to_numpy()
+
+    @staticmethod
+    def _make_player_names(rng, players, umlaut_rate):
+        """Create unique player names, some of them with umlauts or accents."""
+        def combinations(endings):
+            names = [part + ending for part in NAME_PARTS for ending in endings]
+            names += [part + middle.lower() + ending
+                      for part in NAME_PARTS for middle in NAME_PARTS for ending in endings]
+            return [names[i] for i in rng.permutation(len(names))]
+
+        plain = combinations([ending for ending in NAME_ENDINGS if ending.isascii()])
+        special = combinations([ending for ending in NAME_ENDINGS if not ending.isascii()])
+        special_count = min(int(round(players * umlaut_rate)), len(special))
+        names = special[:special_count] + plain[:players - special_count]
+        # Very large player counts run out of combinations and get numbered names
+        names += [f"Player{i}" for i in range(len(names), players)]
+        return [names[i] for i in rng.permutation(len(names))]
+
+    def _column(self, rng, codes, names):
+        """Build a categorical column, writing some non-ASCII values as mojibake."""
+        categories = list(names)
+        if self.mojibake_rate > 0:
+            garbled = [i for i, name in enumerate(names) if not name.isascii()]
+            if garbled:
+                # Garbled variants are appended after the clean categories
+                offset = {code: len(names) + i for i, code in enumerate(garbled)}
+                categories += [mojibake(names[code]) for code in garbled]
+                lookup = np.arange(len(names))
+                lookup[garbled] = [offset[code] for code in garbled]
+                replace = rng.random(len(codes)) < self.mojibake_rate
+                codes = np.where(replace, lookup[codes], codes)
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    def chunk(self, rows, index=0):
+        """
+        Generate one chunk of rows.
+
+        Args:
+            rows (int): Number of rows
+            index (int, optional): Chunk number; each chunk has its own random stream. Defaults to 0.
+
+        Returns:
+            pandas.DataFrame: Rows with GENERATED_COLUMNS
+        """
+        rng = np.random.default_rng([self.seed, index])
+        players = rng.choice(len(self.player_names), size=rows, p=self.player_weights)
+        sources = rng.choice(len(self.source_names), size=rows, p=self.source_weights)
+        chests = rng.choice(len(CHEST_NAMES), size=rows, p=self.chest_weights)
+        dates = np.sort(rng.integers(0, len(self.dates), size=rows))
+        return pd.DataFrame({
+            'DATE': self.dates[dates],
+            'PLAYER': self._column(rng, players, self.player_names),
+            'SOURCE': pd.Categorical.from_codes(sources, categories=self.source_names),
+            'CHEST': self._column(rng, chests, CHEST_NAMES),
+            'SCORE': self.source_scores[sources],
+            'CLAN': pd.Categorical.from_codes(self.player_clans[players], categories=self.clan_names),
+        })
+
+    def iter_chunks(self, rows, chunk_size=1_000_000):
+        """
+        Generate rows in chunks.
+
+        Args:
+            rows (int): Total number of rows
+            chunk_size (int, optional): Rows per chunk. Defaults to 1,000,000.
+
+        Yields:
+            pandas.DataFrame: The next chunk
+        """
+        for index, start in enumerate(range(0, rows, chunk_size)):
+            yield self.chunk(min(chunk_size, rows - start), index)
+
+    def generate(self, rows, chunk_size=1_000_000):
+        """Generate all rows as one DataFrame."""
+        chunks = list(self.iter_chunks(rows, chunk_size))
+        if not chunks:
+            return self.chunk(0)
+        return pd.concat(chunks, ignore_index=True)
+
+    def write_csv(self, filepath, rows, encoding='utf-8', sep=',', chunk_size=1_000_000, progress=None):
+        """
+        Write rows to a CSV file chunk by chunk.
+
+        Uses pyarrow's CSV writer when it is installed, which is several times
+        faster than pandas.to_csv, and falls back to pandas otherwise.
+
+        Args:
+            filepath (str or Path): Destination file
+            rows (int): Total number of rows
+            encoding (str, optional): File encoding, e.g. 'utf-8' or 'cp1252'. Defaults to 'utf-8'.
+            sep (str, optional): Field separator, e.g. ',' or ';'. Defaults to ','.
+            chunk_size (int, optional): Rows generated and written at a time. Defaults to 1,000,000.
+            progress (callable, optional): Called with (rows_written, total_rows) after each chunk
+
+        Returns:
+            int: Number of rows written
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            pa = None
+
+        # Generated names never need quoting; clan names come from the caller
+        needs_quoting = any(sep in name or '"' in name for name in self.clan_names)
+        written = 0
+        with open(filepath, 'wb') as f:
+            f.write((sep.join(GENERATED_COLUMNS) + '\n').encode(encoding))
+            for chunk in self.iter_chunks(rows, chunk_size):
+                if pa is not None:
+                    buffer = io.BytesIO()
+                    options = pa_csv.WriteOptions(include_header=False, delimiter=sep,
+                                                  quoting_style='needed' if needs_quoting else 'none')
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    # Written as the game exports them, without a time of day
+                    table = table.set_column(0, 'DATE', table['DATE'].cast(pa.date32()))
+                    pa_csv.write_csv(table, buffer, options)
+                    data = buffer.getvalue()
+                    if encoding.replace('-', '').lower() != 'utf8':
+                        # Characters the encoding cannot represent are written as '?'
+                        data = data.decode('utf-8').encode(encoding, errors='replace')
+                else:
+                    data = chunk.to_csv(sep=sep, index=False, header=False, lineterminator='\n')
+                    data = data.encode(encoding, errors='replace')
+                f.write(data)
+                written += len(chunk)
+                if progress is not None:
+                    progress(written, rows)
+        return written
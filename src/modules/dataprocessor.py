@@ -1,22 +1,55 @@
 # dataprocessor.py - DataProcessor class implementation
-from modules.utils import *
+# Kept free of Qt imports so the command-line interface can use it headless
 import os
 import re
 import pandas as pd
+import numpy as np
 import unicodedata
-import ftfy
-from charset_normalizer import detect
-from unidecode import unidecode
 import io
 from pathlib import Path
 import traceback
 
+from .sketches import quantile_table, score_buckets
+from .timing import stage_timer
+
 class DataProcessor:
     """Class to handle data processing logic"""
     
     # Debug flag - set to False to reduce console output
     debug = False
     
+    # CSV parser backend: 'auto' (pyarrow's multi-threaded reader if installed), 'pyarrow' or 'pandas'
+    csv_engine = 'auto'
+    
+    # Columns every chest data file must provide
+    REQUIRED_COLUMNS = ['DATE', 'PLAYER', 'SOURCE', 'CHEST', 'SCORE']
+    
+    # Columns kept on import when a file has them
+    OPTIONAL_COLUMNS = ['CLAN']
+    
+    # Columnar file suffixes and the format written for each
+    # .arrow files are written uncompressed and memory-mapped when read
+    COLUMNAR_FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'arrow'}
+    
+    # Low-cardinality text columns stored as categoricals in columnar files
+    CATEGORICAL_COLUMNS = ['PLAYER', 'SOURCE', 'CHEST']
+    
+    # Analysis result tables and their sheet titles in exported workbooks
+    WORKBOOK_SHEETS = {
+        'player_overview': 'Player Overview',
+        'player_totals': 'Player Totals',
+        'chest_totals': 'Chest Totals',
+        'source_totals': 'Source Totals',
+        'date_totals': 'Date Totals',
+        'player_quantiles': 'Player Percentiles',
+        'chest_quantiles': 'Chest Percentiles',
+        'clan_comparison': 'Clan Comparison',
+        'raw_data': 'Raw Data'
+    }
+    
+    # Rows per worksheet in .xlsx files, including the header row
+    EXCEL_MAX_ROWS = 1_048_576
+    
     @staticmethod
     def fix_encoding(text):
         """
@@ -30,6 +63,7 @@ class DataProcessor:
         """
         if not isinstance(text, str):
             return str(text)
+        import ftfy  # Imported on first use; it is slow to load
         return ftfy.fix_text(text)
     
     @staticmethod
@@ -61,6 +95,7 @@ class DataProcessor:
         """
         if not isinstance(text, str):
             return str(text)
+        from unidecode import unidecode  # Imported on first use
         return unidecode(text)
     
     @staticmethod
@@ -74,12 +109,14 @@ class DataProcessor:
         Returns:
             str: Detected encoding or 'utf-8' as fallback
         """
+        from charset_normalizer import detect  # Imported on first use
         detection_result = detect(raw_data)
         if detection_result:
             return detection_result[0].encoding
         return 'utf-8'  # Default fallback
     
     @staticmethod
+    @stage_timer.timed('text_repair')
     def fix_dataframe_text(df, columns=None):
         """
         Fix encoding issues in DataFrame text columns.
@@ -87,6 +124,7 @@ class DataProcessor:
         Args:
             df (pandas.DataFrame): The DataFrame to process
             columns (list, optional): List of columns to process. If None, processes all object columns.
+                Categorical columns are fixed per category.
             
         Returns:
             pandas.DataFrame: DataFrame with fixed text encoding
@@ -104,6 +142,17 @@ class DataProcessor:
                     print(f"Warning: Column {col} not found in DataFrame")
                 continue
                 
+            if isinstance(df_fixed[col].dtype, pd.CategoricalDtype):
+                # Fix each category once instead of every row; fixed spellings may merge categories
+                values = df_fixed[col]
+                if len(values.cat.categories):
+                    categories = pd.DataFrame({col: values.cat.categories.astype(object)})
+                    codes, fixed = pd.factorize(DataProcessor.fix_dataframe_text(categories)[col])
+                    row_codes = values.cat.codes.to_numpy()
+                    df_fixed[col] = pd.Categorical.from_codes(
+                        np.where(row_codes < 0, -1, codes[row_codes]), fixed)
+                continue
+            
             # Convert to string first (handles non-string values)
             df_fixed[col] = df_fixed[col].astype(str)
             
@@ -147,12 +196,62 @@ class DataProcessor:
             return False
     
     @staticmethod
-    def read_csv_with_encoding_fix(filepath):
+    def write_csv_chunked(df, filepath, rows=None, chunk_size=100_000, progress=None, cancelled=None):
+        """
+        Write a DataFrame to CSV in chunks through a single file handle.
+        
+        Only one chunk is materialized at a time, so memory use stays flat for
+        large frames. The file is written as UTF-8 with BOM so Excel shows
+        umlauts correctly.
+        
+        Args:
+            df (pandas.DataFrame): DataFrame to write
+            filepath (str or Path): Path to write the CSV file to
+            rows (numpy.ndarray, optional): Positional row indexer selecting and ordering
+                the rows to write. Defaults to None (all rows in frame order).
+            chunk_size (int, optional): Rows per chunk. Defaults to 100,000.
+            progress (callable, optional): Called as progress(rows_written, total_rows)
+                after each chunk. Defaults to None.
+            cancelled (callable, optional): Returns True to stop writing. The partial
+                file is removed. Defaults to None.
+            
+        Returns:
+            bool: True if the file was written completely, False if cancelled
+        """
+        filepath = Path(filepath)
+        total = len(df) if rows is None else len(rows)
+        
+        with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+            # Header is written even for empty exports
+            df.iloc[:0].to_csv(f, index=False)
+            for start in range(0, total, chunk_size):
+                if cancelled is not None and cancelled():
+                    break
+                stop = min(start + chunk_size, total)
+                chunk = df.iloc[start:stop] if rows is None else df.iloc[rows[start:stop]]
+                chunk.to_csv(f, index=False, header=False)
+                if progress is not None:
+                    progress(stop, total)
+            else:
+                if DataProcessor.debug:
+                    print(f"Wrote {total} rows to {filepath}")
+                return True
+        
+        # Cancelled: do not leave a truncated export behind
+        filepath.unlink(missing_ok=True)
+        return False
+    
+    @staticmethod
+    def read_csv_with_encoding_fix(filepath, malformed=None):
         """
         Read a CSV file with automatic encoding detection and text fixing.
         
+        Malformed lines are left out of the data; pass a list as malformed to get them.
+        
         Args:
             filepath (str or Path): Path to the CSV file
+            malformed (list, optional): List to append the table of the file's malformed
+                lines to (see csvengine.read_csv), if it has any
             
         Returns:
             tuple: (pandas.DataFrame, bool, str) - DataFrame with fixed text encoding, success flag, error message
@@ -193,80 +292,107 @@ class DataProcessor:
             if DataProcessor.debug:
                 print(f"Will try these encodings in order: {encodings_to_try}")
             
-            # Try to read with each encoding
-            df = None
-            last_error = None
+            # Exports from some locales use ';' as separator; a comma read of those
+            # succeeds with a single column, so pick the separator from the header
+            with open(filepath, 'rb') as f:
+                header = f.readline()
+            separator = ';' if header.count(b';') > header.count(b',') else ','
             
-            for enc in encodings_to_try:
+            with stage_timer.stage('decode', file=filepath.name) as stage:
+                # Parse with the configured engine, using the parse options sniffed from the
+                # start of the file. Malformed lines are quarantined in the same pass; the
+                # encodings are only tried one by one if the file cannot be parsed at all
+                df = None
+                last_error = None
                 try:
-                    if DataProcessor.debug:
-                        print(f"Trying to read with {enc}...")
-                    df = pd.read_csv(filepath, encoding=enc)
-                    encoding = enc
-                    if DataProcessor.debug:
-                        print(f"Success with {enc}")
-                        print(f"DataFrame shape: {df.shape}")
-                        print(f"DataFrame columns: {df.columns.tolist() if hasattr(df, 'columns') else 'None'}")
-                    break
+                    from .csvengine import read_csv
+                    df, schema, engine, quarantine = read_csv(filepath, engine=DataProcessor.csv_engine)
+                    encoding = schema.encoding
+                    if len(quarantine) and malformed is not None:
+                        malformed.append(quarantine)
+                    if len(quarantine) and DataProcessor.debug:
+                        reasons = ", ".join(f"{count:,} {reason}" for reason, count
+                                            in quarantine['REASON'].value_counts().items())
+                        print(f"Quarantined {len(quarantine):,} malformed lines of {filepath.name} "
+                              f"({reasons}), first at line {quarantine['LINE'].min()}")
                 except Exception as e:
                     last_error = e
                     if DataProcessor.debug:
-                        print(f"Failed with {enc}: {str(e)}")
-                    # Try with different separator
-                    try:
-                        if DataProcessor.debug:
-                            print(f"Trying with semicolon separator and {enc}...")
-                        df = pd.read_csv(filepath, encoding=enc, sep=';')
-                        encoding = enc
-                        if DataProcessor.debug:
-                            print(f"Success with {enc} and semicolon separator")
-                            print(f"DataFrame shape: {df.shape}")
-                        break
-                    except Exception as e:
-                        last_error = e
-                        if DataProcessor.debug:
-                            print(f"Failed with {enc} and semicolon separator: {str(e)}")
-                        continue
+                        print(f"Sniffed parse failed: {str(e)}")
             
-            # If all encodings failed, try manual approach
-            if df is None:
-                if DataProcessor.debug:
-                    print("All encoding attempts failed. Trying manual file reading approach...")
-                
-                try:
-                    # Read the entire file as binary
-                    with open(filepath, 'rb') as f:
-                        content = f.read()
-                        if DataProcessor.debug:
-                            print(f"Read entire file of size {len(content)} bytes")
-                    
-                    # Try each encoding manually
+                # Try to read with each encoding
+                if df is None:
                     for enc in encodings_to_try:
                         try:
                             if DataProcessor.debug:
-                                print(f"Trying to decode entire file with {enc}...")
-                            text = content.decode(enc, errors='replace')
-                            # Try to convert text to CSV using StringIO
-                            if DataProcessor.debug:
-                                print(f"Creating StringIO from decoded text...")
-                            import io
-                            csv_io = io.StringIO(text)
-                            if DataProcessor.debug:
-                                print(f"Reading CSV from StringIO...")
-                            df = pd.read_csv(csv_io)
+                                print(f"Trying to read with {enc}...")
+                            df = pd.read_csv(filepath, encoding=enc, sep=separator)
                             encoding = enc
                             if DataProcessor.debug:
-                                print(f"Manual approach succeeded with {enc}")
+                                print(f"Success with {enc}")
                                 print(f"DataFrame shape: {df.shape}")
+                                print(f"DataFrame columns: {df.columns.tolist() if hasattr(df, 'columns') else 'None'}")
                             break
                         except Exception as e:
                             last_error = e
                             if DataProcessor.debug:
-                                print(f"Manual approach failed with {enc}: {str(e)}")
-                            continue
-                except Exception as e:
-                    print(f"ERROR in manual file reading: {str(e)}")
-                    return None, False, f"Failed with manual approach: {str(e)}"
+                                print(f"Failed with {enc}: {str(e)}")
+                            # Try with different separator
+                            try:
+                                if DataProcessor.debug:
+                                    print(f"Trying with semicolon separator and {enc}...")
+                                df = pd.read_csv(filepath, encoding=enc, sep=';')
+                                encoding = enc
+                                if DataProcessor.debug:
+                                    print(f"Success with {enc} and semicolon separator")
+                                    print(f"DataFrame shape: {df.shape}")
+                                break
+                            except Exception as e:
+                                last_error = e
+                                if DataProcessor.debug:
+                                    print(f"Failed with {enc} and semicolon separator: {str(e)}")
+                                continue
+            
+                # If all encodings failed, try manual approach
+                if df is None:
+                    if DataProcessor.debug:
+                        print("All encoding attempts failed. Trying manual file reading approach...")
+                
+                    try:
+                        # Read the entire file as binary
+                        with open(filepath, 'rb') as f:
+                            content = f.read()
+                            if DataProcessor.debug:
+                                print(f"Read entire file of size {len(content)} bytes")
+                    
+                        # Try each encoding manually
+                        for enc in encodings_to_try:
+                            try:
+                                if DataProcessor.debug:
+                                    print(f"Trying to decode entire file with {enc}...")
+                                text = content.decode(enc, errors='replace')
+                                # Try to convert text to CSV using StringIO
+                                if DataProcessor.debug:
+                                    print(f"Creating StringIO from decoded text...")
+                                import io
+                                csv_io = io.StringIO(text)
+                                if DataProcessor.debug:
+                                    print(f"Reading CSV from StringIO...")
+                                df = pd.read_csv(csv_io, sep=separator)
+                                encoding = enc
+                                if DataProcessor.debug:
+                                    print(f"Manual approach succeeded with {enc}")
+                                    print(f"DataFrame shape: {df.shape}")
+                                break
+                            except Exception as e:
+                                last_error = e
+                                if DataProcessor.debug:
+                                    print(f"Manual approach failed with {enc}: {str(e)}")
+                                continue
+                    except Exception as e:
+                        print(f"ERROR in manual file reading: {str(e)}")
+                        return None, False, f"Failed with manual approach: {str(e)}"
+                stage.rows = None if df is None else len(df)
             
             # If still no DataFrame, return error
             if df is None:
@@ -288,7 +414,8 @@ class DataProcessor:
             
             try:
                 # Apply fixes to text columns using our fix_dataframe_text function
-                text_columns = df.select_dtypes(include=['object']).columns
+                # Typed data keeps its text in categoricals, see schema.ChestSchema
+                text_columns = df.select_dtypes(include=['object', 'category']).columns
                 if DataProcessor.debug:
                     print(f"Text columns to fix: {text_columns.tolist()}")
                 df = DataProcessor.fix_dataframe_text(df, columns=text_columns)
@@ -306,7 +433,7 @@ class DataProcessor:
             
             # Drop any extra columns (keep only expected columns)
             try:
-                expected_columns = ['DATE', 'PLAYER', 'SOURCE', 'CHEST', 'SCORE']
+                expected_columns = DataProcessor.REQUIRED_COLUMNS + DataProcessor.OPTIONAL_COLUMNS
                 extra_columns = [col for col in df.columns if col not in expected_columns]
                 
                 if extra_columns and DataProcessor.debug:
@@ -330,6 +457,196 @@ class DataProcessor:
             DataProcessor.debug = False
             return None, False, error_msg
     
+    @staticmethod
+    def analysis_sheets(analysis_results):
+        """
+        Get the analysis tables to export as workbook sheets.
+        
+        Args:
+            analysis_results (dict): Results returned by analyze_data
+            
+        Returns:
+            dict: Sheet title -> DataFrame, in workbook order
+        """
+        sheets = {}
+        for key, title in DataProcessor.WORKBOOK_SHEETS.items():
+            if isinstance(analysis_results.get(key), pd.DataFrame):
+                sheets[title] = analysis_results[key]
+        # Any further result tables follow the known ones
+        for key, value in analysis_results.items():
+            if key not in DataProcessor.WORKBOOK_SHEETS and isinstance(value, pd.DataFrame):
+                sheets[key.replace('_', ' ').title()[:31]] = value
+        return sheets
+    
+    @staticmethod
+    def write_excel_workbook(sheets, filepath, chunk_size=50_000, progress=None, cancelled=None):
+        """
+        Stream several DataFrames into one .xlsx workbook, one sheet each.
+        
+        Uses openpyxl's write-only mode, which spools rows to disk as they are
+        appended, so memory use does not grow with the number of rows. Frames
+        longer than an Excel sheet are continued on "<title> (2)", "<title> (3)"
+        and so on.
+        
+        Args:
+            sheets (dict): Sheet title -> DataFrame, in workbook order
+            filepath (str or Path): Path to write the .xlsx file to
+            chunk_size (int, optional): Rows converted per chunk. Defaults to 50,000.
+            progress (callable, optional): Called as progress(rows_written, total_rows, sheet_title).
+                Defaults to None.
+            cancelled (callable, optional): Returns True to stop writing. No file is
+                written. Defaults to None.
+            
+        Returns:
+            bool: True if the workbook was written, False if cancelled
+            
+        Raises:
+            ImportError: If openpyxl is not installed
+        """
+        from openpyxl import Workbook
+        
+        filepath = Path(filepath)
+        rows_per_sheet = DataProcessor.EXCEL_MAX_ROWS - 1  # Leave room for the header
+        total = sum(len(df) for df in sheets.values())
+        written = 0
+        
+        workbook = Workbook(write_only=True)
+        for title, df in sheets.items():
+            header = [str(col) for col in df.columns]
+            part_starts = range(0, max(len(df), 1), rows_per_sheet)
+            for part, part_start in enumerate(part_starts, start=1):
+                sheet = workbook.create_sheet(title if part == 1 else f"{title[:26]} ({part})")
+                sheet.append(header)
+                part_stop = min(part_start + rows_per_sheet, len(df))
+                for start in range(part_start, part_stop, chunk_size):
+                    if cancelled is not None and cancelled():
+                        return False
+                    chunk = df.iloc[start:min(start + chunk_size, part_stop)]
+                    # Plain Python values; missing values become empty cells
+                    values = chunk.astype(object).where(chunk.notna(), None)
+                    for row in values.itertuples(index=False, name=None):
+                        sheet.append(row)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(written, total, title)
+        
+        workbook.save(filepath)
+        if DataProcessor.debug:
+            print(f"Wrote {len(workbook.worksheets)} sheets ({total} rows) to {filepath}")
+        return True
+    
+    @staticmethod
+    def write_columnar(df, filepath, compression='zstd'):
+        """
+        Write a DataFrame to a compressed Parquet or Feather (Arrow IPC) file.
+        
+        The format is chosen from the file suffix (see COLUMNAR_FORMATS). Text
+        columns with repeated values are stored as categoricals and DATE as a
+        datetime, so both dtypes survive a round trip. .arrow files are always
+        written uncompressed, so they can be memory-mapped when read (see
+        arrowdataset). Requires pyarrow.
+        
+        Args:
+            df (pandas.DataFrame): DataFrame to write
+            filepath (str or Path): Path ending in .parquet, .feather or .arrow
+            compression (str, optional): 'zstd', 'lz4' or None; ignored for .arrow.
+                Defaults to 'zstd'.
+            
+        Raises:
+            ValueError: If the file suffix is not a columnar format
+            ImportError: If pyarrow is not installed
+        """
+        filepath = Path(filepath)
+        file_format = DataProcessor.COLUMNAR_FORMATS.get(filepath.suffix.lower())
+        if file_format is None:
+            raise ValueError(f"Unsupported columnar file type: {filepath.suffix}")
+        
+        df = df.copy()
+        for col in DataProcessor.CATEGORICAL_COLUMNS:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        if 'DATE' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['DATE']):
+            df['DATE'] = DataProcessor.to_datetime(df['DATE'])
+        
+        # Columnar formats need a default index
+        df = df.reset_index(drop=True)
+        
+        if file_format == 'parquet':
+            df.to_parquet(filepath, engine='pyarrow', compression=compression, index=False)
+        elif file_format == 'arrow':
+            from . import arrowdataset
+            arrowdataset.write_ipc(df, filepath)
+            compression = None
+        else:
+            df.to_feather(filepath, compression=compression or 'uncompressed')
+        
+        if DataProcessor.debug:
+            print(f"File saved to {filepath} as {file_format} ({compression} compression)")
+    
+    @staticmethod
+    def read_columnar(filepath):
+        """
+        Read a Parquet or Feather file written by write_columnar, or a dataset directory.
+        
+        Columnar files store typed, already-decoded text, so no encoding
+        detection or text fixing is needed. .arrow files and the parts of a
+        dataset directory (see arrowdataset.MappedDataset) are memory-mapped,
+        so their numeric columns are not copied into memory.
+        
+        Args:
+            filepath (str or Path): Path to the file or dataset directory
+            
+        Returns:
+            tuple: (pandas.DataFrame, bool, str) - DataFrame, success flag, error message
+        """
+        filepath = Path(filepath)
+        file_format = DataProcessor.COLUMNAR_FORMATS.get(filepath.suffix.lower())
+        try:
+            if filepath.is_dir():
+                from .arrowdataset import MappedDataset
+                file_format = 'dataset'
+                df = MappedDataset(filepath).to_pandas()
+            elif file_format == 'parquet':
+                df = pd.read_parquet(filepath, engine='pyarrow')
+            elif file_format == 'arrow':
+                from . import arrowdataset
+                df = arrowdataset.read_ipc(filepath)
+            elif file_format == 'feather':
+                df = pd.read_feather(filepath)
+            else:
+                return None, False, f"Unsupported columnar file type: {filepath.suffix}"
+        except ImportError:
+            return None, False, "Reading Parquet/Feather/Arrow files requires the pyarrow package"
+        except Exception as e:
+            return None, False, f"Error reading {filepath.name}: {str(e)}"
+        
+        if DataProcessor.debug:
+            print(f"Read {len(df)} rows from {filepath} ({file_format})")
+        return df, True, ""
+    
+    @staticmethod
+    @stage_timer.timed('read')
+    def load_file(filepath, malformed=None):
+        """
+        Load a CSV, Parquet or Feather file based on its suffix, or a dataset directory.
+        
+        Args:
+            filepath (str or Path): Path to the file or directory
+            malformed (list, optional): List to append the malformed lines of a CSV file to,
+                see read_csv_with_encoding_fix
+            
+        Returns:
+            tuple: (DataFrame, success, error_message)
+        """
+        if DataProcessor.is_columnar_file(filepath):
+            return DataProcessor.read_columnar(filepath)
+        return DataProcessor.read_csv_with_encoding_fix(filepath, malformed)
+    
+    @staticmethod
+    def is_columnar_file(filepath):
+        """Check whether a path has a Parquet or Feather suffix or is a dataset directory."""
+        return Path(filepath).suffix.lower() in DataProcessor.COLUMNAR_FORMATS or Path(filepath).is_dir()
+    
     @staticmethod
     def load_csv(filepath, encodings=None):
         """
@@ -347,6 +664,232 @@ class DataProcessor:
         return DataProcessor.read_csv_with_encoding_fix(filepath)
     
     @staticmethod
+    def missing_columns(df):
+        """
+        Get the required columns that a DataFrame lacks (case-insensitive).
+        
+        Args:
+            df (pandas.DataFrame): The loaded data
+            
+        Returns:
+            list: Names of the missing required columns
+        """
+        available = {str(col).upper() for col in df.columns}
+        return [col for col in DataProcessor.REQUIRED_COLUMNS if col not in available]
+    
+    @staticmethod
+    @stage_timer.timed('type_conversion')
+    def process_data(df):
+        """
+        Prepare loaded data for analysis.
+        
+        Renames the required and optional columns to their standard upper-case
+        names, converts SCORE to numeric and DATE to datetime, drops rows where
+        either conversion failed and keeps only the required columns and the
+        optional ones present (CLAN, the partition key of multi-clan data).
+        Data typed by schema.ChestSchema when its file was parsed is not
+        renamed or converted again.
+        Spelling variants of a player name, e.g. "Feldjäger" and
+        "FeldjÃ¤ger", are merged under one canonical name (see
+        playeridentity.PlayerIdentities), so PLAYER is a categorical with
+        one category per player.
+        
+        Args:
+            df (pandas.DataFrame): The loaded data
+            
+        Returns:
+            pandas.DataFrame: The processed data
+            
+        Raises:
+            ValueError: If required columns are missing
+        """
+        missing = DataProcessor.missing_columns(df)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        
+        from .schema import ChestSchema
+        if ChestSchema.is_typed(df):
+            # Renamed and converted when the file was parsed; only drop rows without SCORE or DATE
+            df = df.dropna(subset=['SCORE', 'DATE'])
+        else:
+            # Map actual column names to standardized names
+            column_mapping = {
+                col: str(col).upper()
+                for col in df.columns
+                if str(col).upper() in DataProcessor.REQUIRED_COLUMNS + DataProcessor.OPTIONAL_COLUMNS
+            }
+            df = df.rename(columns=column_mapping)
+            
+            # Convert SCORE to numeric and drop rows with NaN SCORE
+            df['SCORE'] = pd.to_numeric(df['SCORE'], errors='coerce')
+            df = df.dropna(subset=['SCORE'])
+            
+            # Convert DATE to datetime and drop rows with invalid dates
+            df['DATE'] = DataProcessor.to_datetime(df['DATE'])
+            df = df.dropna(subset=['DATE'])
+        
+        # Keep only the required and optional columns
+        df = df[DataProcessor.REQUIRED_COLUMNS
+                + [col for col in DataProcessor.OPTIONAL_COLUMNS if col in df.columns]]
+        
+        # Resolve each distinct spelling once instead of every row
+        from .playeridentity import PlayerIdentities
+        df = PlayerIdentities().canonicalize(df)
+        
+        if DataProcessor.debug:
+            print(f"Processed data shape: {df.shape}")
+        return df
+    
+    @staticmethod
+    @stage_timer.timed('filter')
+    def filter_data(df, column, values):
+        """
+        Keep the rows whose column value is one of the selected values.
+        
+        Args:
+            df (pandas.DataFrame): The data to filter
+            column (str): The column to filter on
+            values (list): Selected values, compared as strings. An empty list keeps all rows.
+            
+        Returns:
+            pandas.DataFrame: The filtered data (a copy when no filter applies)
+        """
+        if not values:
+            return df.copy()
+        return DataProcessor.drop_unused_categories(df[df[column].astype(str).isin(values)])
+    
+    @staticmethod
+    def to_datetime(values):
+        """
+        Convert a column to datetime64, invalid dates becoming NaT.
+        
+        pandas converts a categorical of date strings back into a categorical,
+        on which comparisons with a date fail; its categories are converted
+        instead and taken per row, which also only parses each distinct date once.
+        
+        Args:
+            values (pandas.Series): Dates as strings, datetimes or a categorical of either
+            
+        Returns:
+            pandas.Series: The dates as datetime64, with the same index
+        """
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            return pd.to_datetime(values, errors='coerce')
+        categories = pd.to_datetime(values.cat.categories, errors='coerce').to_numpy()
+        # Code -1 (a missing value) takes the NaT appended last
+        dates = np.append(categories, np.array(['NaT'], dtype=categories.dtype))[values.cat.codes.to_numpy()]
+        return pd.Series(dates, index=values.index, name=values.name)
+    
+    @staticmethod
+    def drop_unused_categories(df):
+        """
+        Drop the categories no row uses from the categorical columns of a subset.
+        
+        A subset of categorical data keeps every category of the full data,
+        so counts of distinct values and lists of filter values would also
+        show players, chests or clans it has no rows for.
+        
+        Args:
+            df (pandas.DataFrame): A subset, e.g. filtered rows or one clan's partition
+            
+        Returns:
+            pandas.DataFrame: The subset with pruned categoricals (df itself if none has unused categories)
+        """
+        pruned = {}
+        for col in df.columns:
+            values = df[col]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            # Remap the codes directly; Series.cat.remove_unused_categories rehashes the categories
+            codes = values.cat.codes.to_numpy()
+            used = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories)) > 0
+            if used.all():
+                continue
+            remap = np.cumsum(used) - 1
+            pruned[col] = pd.Categorical.from_codes(np.where(codes >= 0, remap[codes], -1),
+                                                    values.cat.categories[used], ordered=values.cat.ordered)
+        return df.assign(**pruned) if pruned else df
+
+    @staticmethod
+    def row_fingerprints(df):
+        """
+        Compute a 64-bit fingerprint for every row.
+
+        The fingerprint hashes the required columns (DATE, PLAYER, SOURCE,
+        CHEST and SCORE, matched case-insensitively) together with the row's
+        occurrence ordinal: the first of several identical rows gets ordinal
+        0, the second 1 and so on. Identical chests opened on the same day
+        therefore stay distinct within one file, while the same chest in two
+        overlapping exports gets the same fingerprint. DATE and SCORE are
+        normalized first, so text, datetime and numeric columns hash alike.
+
+        Args:
+            df (pandas.DataFrame): Loaded or processed chest data
+
+        Returns:
+            numpy.ndarray: uint64 fingerprints, one per row
+
+        Raises:
+            ValueError: If required columns are missing
+        """
+        missing = DataProcessor.missing_columns(df)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        columns = {str(col).upper(): col for col in df.columns}
+
+        dates = pd.to_datetime(df[columns['DATE']], errors='coerce')
+        key = pd.DataFrame({
+            'DATE': dates.to_numpy(dtype='datetime64[s]').astype(np.int64),
+            'PLAYER': df[columns['PLAYER']],
+            'SOURCE': df[columns['SOURCE']],
+            'CHEST': df[columns['CHEST']],
+            'SCORE': pd.to_numeric(df[columns['SCORE']], errors='coerce').astype(np.float64),
+        })
+        row_hash = pd.util.hash_pandas_object(key, index=False)
+        ordinal = row_hash.groupby(row_hash.to_numpy(), sort=False).cumcount()
+        fingerprint = pd.util.hash_pandas_object(
+            pd.DataFrame({'hash': row_hash.to_numpy(), 'ordinal': ordinal.to_numpy(dtype=np.int64)}),
+            index=False
+        )
+        return fingerprint.to_numpy()
+
+    @staticmethod
+    @stage_timer.timed('dedup')
+    def deduplicate(frames):
+        """
+        Combine several files' data, dropping rows an earlier file already had.
+
+        Rows are compared by row_fingerprints(), computed per file, so a file
+        that repeats part of another (a re-export or a mid-day snapshot) only
+        adds the chests the other file did not have.
+
+        Args:
+            frames (list): (source name, DataFrame) pairs in import order
+
+        Returns:
+            tuple: (combined DataFrame with a fresh index, list of dicts with
+            'source', 'rows', 'added' and 'duplicates' per file)
+        """
+        if not frames:
+            raise ValueError("No data to combine")
+        fingerprints = [DataProcessor.row_fingerprints(df) for _, df in frames]
+        duplicated = pd.Series(np.concatenate(fingerprints)).duplicated().to_numpy()
+
+        kept, report, offset = [], [], 0
+        for source, df in frames:
+            file_duplicated = duplicated[offset:offset + len(df)]
+            offset += len(df)
+            duplicates = int(file_duplicated.sum())
+            kept.append(df[~file_duplicated] if duplicates else df)
+            report.append({'source': source, 'rows': len(df), 'added': len(df) - duplicates,
+                           'duplicates': duplicates})
+            if DataProcessor.debug:
+                print(f"{source}: {len(df) - duplicates} rows added, {duplicates} duplicates dropped")
+        combined = pd.concat(kept, ignore_index=True) if len(kept) > 1 else kept[0].reset_index(drop=True)
+        return combined, report
+    
+    @staticmethod
+    @stage_timer.timed('analysis')
     def analyze_data(df):
         """
         Process data according to requirements and return processed DataFrames.
@@ -358,44 +901,44 @@ class DataProcessor:
             dict: Dictionary containing various analysis results
         """
         # Calculate total score per player (main goal)
-        player_totals = df.groupby('PLAYER')['SCORE'].sum().reset_index()
+        player_totals = df.groupby('PLAYER', observed=True)['SCORE'].sum().reset_index()
         player_totals = player_totals.sort_values('SCORE', ascending=False)
         
         # Add chest counts for player_totals
-        player_counts = df.groupby('PLAYER').size().reset_index(name='CHEST_COUNT')
+        player_counts = df.groupby('PLAYER', observed=True).size().reset_index(name='CHEST_COUNT')
         player_totals = player_totals.merge(player_counts, on='PLAYER', how='left')
         
         # Calculate scores by chest type
-        chest_totals = df.groupby('CHEST')['SCORE'].sum().reset_index()
+        chest_totals = df.groupby('CHEST', observed=True)['SCORE'].sum().reset_index()
         chest_totals = chest_totals.sort_values('SCORE', ascending=False)
         
         # Add chest counts for chest_totals (chest type frequency)
-        chest_counts = df.groupby('CHEST').size().reset_index(name='CHEST_COUNT')
+        chest_counts = df.groupby('CHEST', observed=True).size().reset_index(name='CHEST_COUNT')
         chest_totals = chest_totals.merge(chest_counts, on='CHEST', how='left')
         
         # Calculate scores by source
-        source_totals = df.groupby('SOURCE')['SCORE'].sum().reset_index()
+        source_totals = df.groupby('SOURCE', observed=True)['SCORE'].sum().reset_index()
         source_totals = source_totals.sort_values('SCORE', ascending=False)
         
         # Add chest counts for source_totals
-        source_counts = df.groupby('SOURCE').size().reset_index(name='CHEST_COUNT')
+        source_counts = df.groupby('SOURCE', observed=True).size().reset_index(name='CHEST_COUNT')
         source_totals = source_totals.merge(source_counts, on='SOURCE', how='left')
         
         # Calculate scores by date
-        date_totals = df.groupby('DATE')['SCORE'].sum().reset_index()
+        date_totals = df.groupby('DATE', observed=True)['SCORE'].sum().reset_index()
         date_totals = date_totals.sort_values('DATE')
         
         # Add chest counts for date_totals
-        date_counts = df.groupby('DATE').size().reset_index(name='CHEST_COUNT')
+        date_counts = df.groupby('DATE', observed=True).size().reset_index(name='CHEST_COUNT')
         date_totals = date_totals.merge(date_counts, on='DATE', how='left')
         
         # Calculate average scores
-        player_avg = df.groupby('PLAYER')['SCORE'].mean().reset_index()
+        player_avg = df.groupby('PLAYER', observed=True)['SCORE'].mean().reset_index()
         player_avg = player_avg.sort_values('SCORE', ascending=False)
         player_avg['SCORE'] = player_avg['SCORE'].round(2)
         
         # Most frequent chest types per player
-        player_chest_freq = df.groupby(['PLAYER', 'CHEST']).size().reset_index(name='COUNT')
+        player_chest_freq = df.groupby(['PLAYER', 'CHEST'], observed=True).size().reset_index(name='COUNT')
         
         # Create Player Overview (new)
         # Use the player_totals we already calculated with CHEST_COUNT
@@ -408,7 +951,8 @@ class DataProcessor:
             columns='SOURCE',  
             values='SCORE', 
             aggfunc='sum',
-            fill_value=0
+            fill_value=0,
+            observed=True
         ).reset_index()
         
         # Merge source type scores with player overview
@@ -417,6 +961,16 @@ class DataProcessor:
         # Sort by total score
         player_overview = player_overview.sort_values('TOTAL_SCORE', ascending=False)
         
+        # Score percentiles per chest, from quantile sketches like those of the history
+        player_buckets = score_buckets(df, ['PLAYER'])
+        player_quantiles = quantile_table(player_buckets, ['PLAYER'])
+        player_quantiles = player_quantiles.sort_values('P50', ascending=False, kind='stable')
+        chest_quantiles = quantile_table(score_buckets(df, ['CHEST']), ['CHEST'])
+        chest_quantiles = chest_quantiles.sort_values('P50', ascending=False, kind='stable')
+        source_quantiles = quantile_table(score_buckets(df, ['SOURCE']), ['SOURCE'])
+        source_quantiles = source_quantiles.sort_values('P50', ascending=False, kind='stable')
+        score_quantiles = quantile_table(player_buckets, [])
+        
         return {
             'player_totals': player_totals,
             'chest_totals': chest_totals,
@@ -425,5 +979,9 @@ class DataProcessor:
             'player_avg': player_avg,
             'player_chest_freq': player_chest_freq,
             'player_overview': player_overview,
+            'player_quantiles': player_quantiles,
+            'chest_quantiles': chest_quantiles,
+            'source_quantiles': source_quantiles,
+            'score_quantiles': score_quantiles,
             'raw_data': df
         } 
\ No newline at end of file
@@ -0,0 +1,225 @@
+# diagnosticsdialog.py - Diagnostics dialogs for stage timings and memory usage
+from datetime import datetime
+
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QTableWidget,
+    QTableWidgetItem, QHeaderView, QGroupBox, QFileDialog, QMessageBox, QAbstractItemView,
+    QPlainTextEdit
+)
+
+
+class DiagnosticsDialog(QDialog):
+    """
+    Dialog showing the stage timings recorded by a StageTimer.
+
+    Shows a per-stage summary and the most recent records, lets the user turn
+    recording and allocation tracking on or off, and exports the records as
+    JSON lines. When an EventLoopProbe is set, its latency histogram and
+    stalls are shown as well.
+    """
+
+    # Records shown in the recent stages table
+    MAX_ROWS = 500
+
+    def __init__(self, timer, parent=None):
+        """
+        Initialize the dialog.
+
+        Args:
+            timer (StageTimer): Timer whose records are shown
+            parent (QWidget, optional): Parent widget
+        """
+        super().__init__(parent)
+        self.timer = timer
+        self.probe = None
+        self._shown_count = None
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout(self)
+
+        options_layout = QHBoxLayout()
+        self.enabled_checkbox = QCheckBox("Record stage timings")
+        self.enabled_checkbox.setChecked(timer.enabled)
+        self.enabled_checkbox.toggled.connect(self._set_enabled)
+        options_layout.addWidget(self.enabled_checkbox)
+        self.allocations_checkbox = QCheckBox("Track allocations (slower)")
+        self.allocations_checkbox.setChecked(timer.track_allocations)
+        self.allocations_checkbox.toggled.connect(self.timer.set_track_allocations)
+        options_layout.addWidget(self.allocations_checkbox)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+
+        summary_group = QGroupBox("Summary by Stage")
+        summary_layout = QVBoxLayout(summary_group)
+        self.summary_table = self._create_table(["Stage", "Count", "Total (ms)", "Mean (ms)", "Max (ms)", "Rows"])
+        summary_layout.addWidget(self.summary_table)
+        layout.addWidget(summary_group, 1)
+
+        records_group = QGroupBox("Recent Stages")
+        records_layout = QVBoxLayout(records_group)
+        self.records_table = self._create_table(
+            ["Time", "Stage", "Parent", "Duration (ms)", "Rows", "Alloc (KB)", "Peak (KB)", "Thread", "Details"]
+        )
+        records_layout.addWidget(self.records_table)
+        layout.addWidget(records_group, 2)
+
+        self.probe_group = QGroupBox("Event Loop Responsiveness")
+        probe_layout = QVBoxLayout(self.probe_group)
+        self.probe_text = QPlainTextEdit()
+        self.probe_text.setReadOnly(True)
+        self.probe_text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        probe_layout.addWidget(self.probe_text)
+        self.probe_group.setVisible(False)
+        layout.addWidget(self.probe_group, 1)
+
+        button_layout = QHBoxLayout()
+        self.count_label = QLabel()
+        button_layout.addWidget(self.count_label)
+        button_layout.addStretch()
+        for text, slot in (("Refresh", self.refresh), ("Clear", self.clear_records),
+                           ("Export JSONL", self.export_records), ("Close", self.accept)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+
+        # Pick up stages recorded while the dialog is open
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(1000)
+        self._refresh_timer.timeout.connect(self._refresh_if_changed)
+        self._refresh_timer.start()
+
+        self.refresh()
+
+    @staticmethod
+    def _create_table(headers):
+        """Create a read-only table with the given column headers."""
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    @staticmethod
+    def _fill_table(table, rows):
+        """Replace the contents of a table with rows of values."""
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem("" if value is None else str(value)))
+
+    def refresh(self):
+        """Reload the summary and the recent records from the timer."""
+        summary = self.timer.summary()
+        self._fill_table(self.summary_table, [
+            (stage, entry['count'], f"{entry['total_ms']:,.1f}", f"{entry['mean_ms']:,.1f}",
+             f"{entry['max_ms']:,.1f}", f"{entry['rows']:,}")
+            for stage, entry in sorted(summary.items(), key=lambda item: -item[1]['total_ms'])
+        ])
+
+        records = self.timer.records()
+        standard = {'stage', 'started', 'duration_ms', 'rows', 'parent', 'depth', 'thread', 'ok',
+                    'alloc_kb', 'peak_kb'}
+        rows = []
+        for record in reversed(records[-self.MAX_ROWS:]):
+            details = ", ".join(f"{key}={value}" for key, value in record.items() if key not in standard)
+            if not record.get('ok', True):
+                details = ("failed, " + details) if details else "failed"
+            rows.append((
+                datetime.fromtimestamp(record['started']).strftime('%H:%M:%S.%f')[:-3],
+                "  " * record['depth'] + record['stage'],
+                record['parent'],
+                f"{record['duration_ms']:,.1f}",
+                "" if record['rows'] is None else f"{record['rows']:,}",
+                record.get('alloc_kb'),
+                record.get('peak_kb'),
+                record['thread'],
+                details,
+            ))
+        self._fill_table(self.records_table, rows)
+        if self.probe is not None:
+            self.probe_text.setPlainText(self.probe.to_text())
+        self._shown_count = self.timer.recorded
+        state = "recording" if self.timer.enabled else "not recording"
+        self.count_label.setText(f"{len(records):,} records ({state})")
+
+    def _refresh_if_changed(self):
+        """Refresh when stages were recorded since the last refresh."""
+        if self.timer.recorded != self._shown_count:
+            self.refresh()
+        elif self.probe is not None and self.probe.is_running():
+            self.probe_text.setPlainText(self.probe.to_text())
+
+    def set_probe(self, probe):
+        """Show the measurements of an EventLoopProbe, or hide them when probe is None."""
+        self.probe = probe
+        self.probe_group.setVisible(probe is not None)
+        if probe is not None:
+            self.probe_text.setPlainText(probe.to_text())
+
+    def _set_enabled(self, enabled):
+        """Turn recording on or off."""
+        self.timer.enabled = enabled
+        self.refresh()
+
+    def clear_records(self):
+        """Remove all recorded stages."""
+        self.timer.clear()
+        self.refresh()
+
+    def export_records(self):
+        """Export the recorded stages as a JSON lines file."""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Stage Timings", "stage_timings.jsonl", "JSON Lines (*.jsonl);;All Files (*)"
+        )
+        if not file_path:
+            return
+        try:
+            count = self.timer.export_jsonl(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Export Error", f"Could not export stage timings: {str(e)}")
+            return
+        self.count_label.setText(f"Exported {count:,} records to {file_path}")
+
+
+class MemoryReportDialog(QDialog):
+    """Dialog showing a MemoryReport of the data held by the main window."""
+
+    def __init__(self, build_report, parent=None):
+        """
+        Initialize the dialog.
+
+        Args:
+            build_report (callable): Returns a fresh MemoryReport
+            parent (QWidget, optional): Parent widget
+        """
+        super().__init__(parent)
+        self.build_report = build_report
+        self.setWindowTitle("Memory Report")
+        self.resize(800, 500)
+
+        layout = QVBoxLayout(self)
+        self.report_text = QPlainTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.report_text)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        for text, slot in (("Refresh", self.refresh), ("Close", self.accept)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the report."""
+        self.report_text.setPlainText(self.build_report().to_text())
@@ -132,7 +132,7 @@ class DropArea(QWidget):
         urls = event.mimeData().urls()
         if urls:
             filepath = urls[0].toLocalFile()
-            if filepath.lower().endswith('.csv'):
+            if filepath.lower().endswith(('.csv', '.parquet', '.feather', '.arrow')):
                 if self.debug:
                     print(f"File dropped: {filepath}")
                 self.fileDropped.emit(filepath)
@@ -154,7 +154,8 @@ class DropArea(QWidget):
             start_dir = self.main_window.config_manager.get_import_directory()
         
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Open CSV File", start_dir, "CSV Files (*.csv)"
+            self, "Open Data File", start_dir,
+            "Data Files (*.csv *.parquet *.feather *.arrow);;CSV Files (*.csv);;All Files (*)"
         )
         
         if filepath:
@@ -0,0 +1,663 @@
+# historystore.py - Persistent SQLite store of chest data across imports
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .dataprocessor import DataProcessor
+from . import clans, leaderboard, sketches
+from .partitioned import PartitionedDataset, analysis_tables
+from .playeridentity import PlayerIdentities
+from . import playeridentity
+from .rollups import PERIODS, ROLLUPS, find_rollup, period_start, rebuild_rollups, rollup_schema, \
+    rolling_sums, update_rollups
+from .timing import stage_timer
+
+# Columns stored for every chest; CLAN is '' when the import had no clan information
+HISTORY_COLUMNS = ['DATE', 'PLAYER', 'SOURCE', 'CHEST', 'SCORE', 'CLAN']
+
+# Columns that totals() and timeseries() can group by
+GROUP_COLUMNS = ('PLAYER', 'CHEST', 'SOURCE', 'DATE', 'CLAN')
+
+SCHEMA_VERSION = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    imported_at REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    first_date TEXT,
+    last_date TEXT,
+    added INTEGER
+);
+CREATE TABLE IF NOT EXISTS chests (
+    DATE TEXT NOT NULL,
+    PLAYER TEXT NOT NULL,
+    SOURCE TEXT NOT NULL,
+    CHEST TEXT NOT NULL,
+    SCORE NUMERIC NOT NULL,
+    CLAN TEXT NOT NULL DEFAULT '',
+    import_id INTEGER NOT NULL REFERENCES imports(id),
+    FINGERPRINT INTEGER NOT NULL,
+    PLAYER_ID INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chests_fingerprint ON chests (FINGERPRINT);
+CREATE INDEX IF NOT EXISTS idx_chests_date ON chests (DATE);
+CREATE INDEX IF NOT EXISTS idx_chests_player_date ON chests (PLAYER, DATE);
+CREATE INDEX IF NOT EXISTS idx_chests_clan_date ON chests (CLAN, DATE);
+CREATE INDEX IF NOT EXISTS idx_chests_import ON chests (import_id);
+CREATE INDEX IF NOT EXISTS idx_chests_player_id ON chests (PLAYER_ID);
+""" + rollup_schema() + leaderboard.SCHEMA + sketches.SCHEMA + playeridentity.SCHEMA
+
+
+def dataset_path(path):
+    """Get the directory of the memory-mapped copy of a history database, e.g. history_dataset/."""
+    path = Path(path)
+    return path.with_name(path.stem + '_dataset')
+
+
+def _signed(fingerprints):
+    """View uint64 fingerprints as the signed 64-bit integers SQLite stores."""
+    return fingerprints.view(np.int64).tolist()
+
+
+def _iso_date(value):
+    """Convert a date, datetime, Timestamp or date string to 'YYYY-MM-DD'."""
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def clan_values(raw_df, processed_df):
+    """
+    Get the CLAN value of every processed row from the data as it was loaded.
+
+    DataProcessor.process_data preserves the index, so the clan column of the
+    loaded data can be aligned with it whatever its name in the file.
+
+    Args:
+        raw_df (pandas.DataFrame): The loaded data
+        processed_df (pandas.DataFrame): The result of process_data(raw_df)
+
+    Returns:
+        pandas.Series or None: Clan per processed row, None if the file has no CLAN column
+    """
+    for column in raw_df.columns:
+        if str(column).strip().upper() == 'CLAN':
+            return raw_df[column].reindex(processed_df.index)
+    return None
+
+
+class HistoryStore:
+    """
+    Chest data of every import, kept in a local SQLite database.
+
+    Rows are stored as processed by DataProcessor, with their clan, in one
+    table indexed on (DATE), (PLAYER, DATE) and (CLAN, DATE). Every row also
+    has its DataProcessor.row_fingerprints value under a unique index, so
+    importing overlapping exports stores each chest only once. Per-player
+    totals per day, week and month and chest and source totals per week are
+    kept in rollup tables that every import updates, so time breakdowns do
+    not re-group the stored chests. A leaderboard snapshot is stored after
+    every import, so rank changes between imports are read, not computed
+    from the chests. Score quantile sketches per player, chest and source
+    are kept per day and merged over any date window. Every spelling of a
+    player name is resolved once to a stable player ID (see
+    playeridentity.PlayerIdentities); chests are stored under the player's
+    canonical name with its PLAYER_ID. The chests of every
+    import are also written to a memory-mapped Arrow dataset next to the
+    database, so the whole history can be reopened without reading it
+    (see dataset()). Aggregations
+    run as SQL over a date window, so only the aggregated rows are loaded
+    into pandas::
+
+        with HistoryStore('history.sqlite3') as store:
+            store.ingest(df, source='chests.csv', clan='MY_CLAN')
+            weekly = store.timeseries('week', by='PLAYER', start='2025-01-01')
+
+    A store is used from the thread that opened it.
+    """
+
+    def __init__(self, path):
+        """
+        Open or create a history database.
+
+        Args:
+            path (str or Path): Database file, or ':memory:' for a temporary store
+        """
+        self.path = str(path)
+        # Memory-mapped copy of the chests, see dataset()
+        self.dataset_path = dataset_path(self.path) if self.path != ':memory:' else None
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        if self.path != ':memory:':
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        sketches.register_functions(self.connection)
+        self._create_schema()
+        self.identities = PlayerIdentities(self.connection)
+
+    def _create_schema(self):
+        """Create the tables and indexes of a new database."""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{self.path} was written by a newer version (schema {version})")
+        with self.connection:
+            if version == 1:
+                self._migrate_v1()
+            if 0 < version < 6:
+                self.connection.execute("ALTER TABLE chests ADD COLUMN PLAYER_ID INTEGER NOT NULL DEFAULT 0")
+            self.connection.executescript(SCHEMA)
+            merged = self._migrate_v5() if 0 < version < 6 else False
+            if version < 3 or merged:
+                rebuild_rollups(self.connection)
+            if version < 4 or merged:
+                leaderboard.rebuild_snapshots(self.connection)
+            if version < 5 or merged:
+                sketches.rebuild_score_buckets(self.connection)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_v1(self):
+        """Add row fingerprints to a version 1 database and drop the duplicate rows."""
+        self.connection.execute("ALTER TABLE imports ADD COLUMN added INTEGER")
+        self.connection.execute("ALTER TABLE chests ADD COLUMN FINGERPRINT INTEGER NOT NULL DEFAULT 0")
+        self._recompute_fingerprints()
+
+    def _recompute_fingerprints(self):
+        """Recompute the fingerprints of the stored chests and drop the rows that became duplicates."""
+        # Ordinals are counted per import, as they were when each file was ingested
+        import_ids = [row[0] for row in self.connection.execute("SELECT id FROM imports")]
+        for import_id in import_ids:
+            rows = pd.read_sql_query(
+                "SELECT rowid, DATE, PLAYER, SOURCE, CHEST, SCORE FROM chests "
+                "WHERE import_id = ? ORDER BY rowid",
+                self.connection, params=(import_id,)
+            )
+            if rows.empty:
+                continue
+            self.connection.executemany(
+                "UPDATE chests SET FINGERPRINT = ? WHERE rowid = ?",
+                zip(_signed(DataProcessor.row_fingerprints(rows)), rows['rowid'].tolist())
+            )
+        self.connection.execute(
+            "DELETE FROM chests WHERE rowid NOT IN (SELECT MIN(rowid) FROM chests GROUP BY FINGERPRINT)"
+        )
+        self.connection.execute(
+            "UPDATE imports SET added = (SELECT COUNT(*) FROM chests WHERE import_id = imports.id)"
+        )
+
+    def _migrate_v5(self):
+        """
+        Give the chests of a version 2-5 database their player IDs.
+
+        Stored spellings of one player are renamed to the canonical name, so
+        their chests get new fingerprints and a chest stored under two
+        spellings is kept once.
+
+        Returns:
+            bool: Whether any chest was renamed, so the aggregates must be rebuilt
+        """
+        identities = PlayerIdentities(self.connection)
+        stored = pd.Series([row[0] for row in self.connection.execute("SELECT DISTINCT PLAYER FROM chests")],
+                           dtype=object)
+        ids, canonical = identities.resolve(stored)
+        updates = list(zip(canonical.astype(str).tolist(), ids.tolist(), stored.tolist()))
+        # The unique index would reject a renamed chest before its duplicate is dropped
+        self.connection.execute("DROP INDEX IF EXISTS idx_chests_fingerprint")
+        self.connection.executemany("UPDATE chests SET PLAYER = ?, PLAYER_ID = ? WHERE PLAYER = ?", updates)
+        renamed = any(name != spelling for name, _, spelling in updates)
+        if renamed:
+            self._recompute_fingerprints()
+            if self.dataset_path is not None and self.dataset_path.exists():
+                # Written under the old names; dataset() writes the parts again
+                shutil.rmtree(self.dataset_path)
+        self.connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_chests_fingerprint ON chests (FINGERPRINT)")
+        if DataProcessor.debug:
+            print(f"Resolved {len(stored)} stored spellings to {len(identities)} players")
+        return renamed
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def ingest(self, df, source=None, clan=None):
+        """
+        Add processed chest data to the store.
+
+        Args:
+            df (pandas.DataFrame): Data with DataProcessor.REQUIRED_COLUMNS and datetime DATE
+            source (str, optional): Where the data came from, e.g. the file path
+            clan (str or pandas.Series, optional): Clan of all rows, or of each row.
+                Defaults to the CLAN column of df if it has one.
+
+        Rows already in the store, e.g. from an overlapping export, are
+        skipped.
+
+        Returns:
+            int: Number of rows added
+        """
+        missing = [column for column in HISTORY_COLUMNS[:-1] if column not in df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        if clan is None and 'CLAN' in df.columns:
+            clan = df['CLAN']
+
+        with stage_timer.stage('history_ingest', rows=len(df)):
+            player_ids, players = self.identities.resolve(df['PLAYER'])
+            df = df.assign(PLAYER=players)
+            dates = pd.to_datetime(df['DATE']).dt.strftime('%Y-%m-%d')
+            if isinstance(clan, pd.Series):
+                clans = clan.astype(object).where(clan.notna(), '').astype(str).tolist()
+            else:
+                clans = [clan or ''] * len(df)
+            fingerprints = _signed(DataProcessor.row_fingerprints(df))
+            rows = zip(
+                dates.tolist(),
+                df['PLAYER'].astype(str).tolist(),
+                df['SOURCE'].astype(str).tolist(),
+                df['CHEST'].astype(str).tolist(),
+                df['SCORE'].tolist(),
+                clans,
+                fingerprints,
+                player_ids.tolist(),
+            )
+            with self.connection:
+                cursor = self.connection.execute(
+                    "INSERT INTO imports (source, imported_at, rows, first_date, last_date) VALUES (?, ?, ?, ?, ?)",
+                    (source, time.time(), len(df), dates.min() if len(df) else None,
+                     dates.max() if len(df) else None)
+                )
+                import_id = cursor.lastrowid
+                before = self.connection.total_changes
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO chests "
+                    "(DATE, PLAYER, SOURCE, CHEST, SCORE, CLAN, FINGERPRINT, PLAYER_ID, import_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row + (import_id,) for row in rows)
+                )
+                added = self.connection.total_changes - before
+                self.connection.execute("UPDATE imports SET added = ? WHERE id = ?", (added, import_id))
+                update_rollups(self.connection, import_id)
+                leaderboard.snapshot_import(self.connection, import_id)
+                sketches.update_score_buckets(self.connection, import_id)
+
+            if self.dataset_path is not None and added:
+                chests = df[DataProcessor.REQUIRED_COLUMNS].assign(
+                    DATE=pd.to_datetime(df['DATE']).dt.normalize(), CLAN=clans)
+                if added < len(df):
+                    stored = [row[0] for row in self.connection.execute(
+                        "SELECT FINGERPRINT FROM chests WHERE import_id = ?", (import_id,))]
+                    chests = chests[np.isin(np.asarray(fingerprints, dtype=np.int64), stored)]
+                self._write_dataset_part(import_id, chests)
+        return added
+
+    def _write_dataset_part(self, import_id, chests):
+        """Add the chests of an import to the mapped dataset; skipped without pyarrow."""
+        try:
+            PartitionedDataset(self.dataset_path).write_part(f"import-{import_id:06d}", chests)
+        except ImportError:
+            if DataProcessor.debug:
+                print("pyarrow is not installed, the history dataset is not updated")
+
+    def dataset(self):
+        """
+        Get the memory-mapped copy of the stored chests.
+
+        Every import is written next to the database as one part of a
+        partitioned.PartitionedDataset, split by clan and month. Parts of
+        imports stored without pyarrow, or before the dataset existed, are
+        written from the database first.
+
+        Returns:
+            partitioned.PartitionedDataset: The dataset with HISTORY_COLUMNS
+
+        Raises:
+            ValueError: For an in-memory store
+            ImportError: If pyarrow is not installed
+        """
+        if self.dataset_path is None:
+            raise ValueError("An in-memory history has no dataset")
+        dataset = PartitionedDataset(self.dataset_path)
+        existing = dataset.part_names()
+        with stage_timer.stage('history_dataset_sync'):
+            for (import_id,) in self.connection.execute(
+                    "SELECT id FROM imports WHERE added > 0 ORDER BY id").fetchall():
+                if f"import-{import_id:06d}" in existing:
+                    continue
+                chests = pd.read_sql_query(
+                    "SELECT DATE, PLAYER, SOURCE, CHEST, SCORE, CLAN FROM chests WHERE import_id = ?",
+                    self.connection, params=(import_id,)
+                )
+                chests['DATE'] = pd.to_datetime(chests['DATE'])
+                dataset.write_part(f"import-{import_id:06d}", chests)
+        return dataset
+
+    @staticmethod
+    def _where(start=None, end=None, clan=None, players=None, date_column='DATE'):
+        """Build the WHERE clause and parameters for a date window and optional filters."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{date_column} >= ?")
+            params.append(_iso_date(start))
+        if end is not None:
+            conditions.append(f"{date_column} <= ?")
+            params.append(_iso_date(end))
+        if clan is not None:
+            conditions.append("CLAN = ?")
+            params.append(clan)
+        if players:
+            conditions.append(f"PLAYER IN ({', '.join('?' * len(players))})")
+            params.extend(players)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def _query(self, sql, params, name):
+        """Run a query and return the result as a DataFrame."""
+        with stage_timer.stage('history_query', query=name) as stage:
+            result = pd.read_sql_query(sql, self.connection, params=params)
+            stage.rows = len(result)
+        if 'DATE' in result.columns:
+            result['DATE'] = pd.to_datetime(result['DATE'])
+        return result
+
+    def totals(self, by, start=None, end=None, clan=None, players=None):
+        """
+        Total score and chest count per value of a column.
+
+        Args:
+            by (str): One of GROUP_COLUMNS
+            start (date-like, optional): First date, inclusive
+            end (date-like, optional): Last date, inclusive
+            clan (str, optional): Only count this clan
+            players (list, optional): Only count these players
+
+        Returns:
+            pandas.DataFrame: Columns [by, 'SCORE', 'CHEST_COUNT'], highest score
+            first (oldest first for DATE)
+        """
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Cannot group by '{by}', expected one of {', '.join(GROUP_COLUMNS)}")
+        where, params = self._where(start, end, clan, players)
+        order = "DATE" if by == 'DATE' else "SCORE DESC"
+        sql = (f"SELECT {by}, SUM(SCORE) AS SCORE, COUNT(*) AS CHEST_COUNT FROM chests{where} "
+               f"GROUP BY {by} ORDER BY {order}")
+        return self._query(sql, params, f"totals:{by}")
+
+    def timeseries(self, period='week', by=None, start=None, end=None, clan=None, players=None):
+        """
+        Total score and chest count per day, week or month.
+
+        Args:
+            period (str, optional): 'day', 'week' (starting Monday) or 'month'. Defaults to 'week'.
+            by (str, optional): Also group by one of GROUP_COLUMNS, e.g. 'PLAYER'
+            start, end, clan, players: As for totals()
+
+        Returns:
+            pandas.DataFrame: Columns ['DATE', by, 'SCORE', 'CHEST_COUNT'] where DATE is
+            the first day of the period
+
+        Read from a rollup table when one groups this way and the window
+        starts and ends on period boundaries.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}', expected one of {', '.join(PERIODS)}")
+        if by is not None and (by not in GROUP_COLUMNS or by == 'DATE'):
+            raise ValueError(f"Cannot group by '{by}'")
+        rollup = find_rollup(period, by)
+        if rollup is not None and self._covers_periods(period, start, end) \
+                and (not players or 'PLAYER' in ROLLUPS[rollup]['keys']):
+            return self.rollup(rollup, by=[by] if by else [], start=start, end=end, clan=clan, players=players)
+        where, params = self._where(start, end, clan, players)
+        group = "PERIOD" + (f", {by}" if by else "")
+        sql = (f"SELECT {PERIODS[period]} AS PERIOD{', ' + by if by else ''}, SUM(SCORE) AS SCORE, "
+               f"COUNT(*) AS CHEST_COUNT FROM chests{where} GROUP BY {group} ORDER BY {group}")
+        result = self._query(sql, params, f"timeseries:{period}")
+        result = result.rename(columns={'PERIOD': 'DATE'})
+        result['DATE'] = pd.to_datetime(result['DATE'])
+        return result
+
+    @staticmethod
+    def _covers_periods(period, start, end):
+        """Check whether a date window consists of whole periods."""
+        if start is not None and period_start(start, period) != pd.Timestamp(start):
+            return False
+        if end is not None:
+            next_day = pd.Timestamp(end) + pd.Timedelta(days=1)
+            if period_start(next_day, period) != next_day:
+                return False
+        return True
+
+    def rollup(self, name, by=None, start=None, end=None, clan=None, players=None):
+        """
+        Read a rollup table.
+
+        Args:
+            name (str): One of ROLLUPS, e.g. 'player_week'
+            by (str or list, optional): Columns to keep, from the rollup's columns and
+                CLAN, summing over the others. Defaults to the rollup's columns.
+            start (date-like, optional): Only periods ending on or after this date
+            end (date-like, optional): Only periods starting on or before this date
+            clan (str, optional): Only this clan; all clans are summed otherwise
+            players (list, optional): Only these players, for player rollups
+
+        Returns:
+            pandas.DataFrame: Columns ['DATE', keys..., 'SCORE', 'CHEST_COUNT'] where DATE
+            is the first day of the period, oldest first
+        """
+        if name not in ROLLUPS:
+            raise ValueError(f"Unknown rollup '{name}', expected one of {', '.join(ROLLUPS)}")
+        period = ROLLUPS[name]['period']
+        keys = ROLLUPS[name]['keys'] if by is None else tuple([by] if isinstance(by, str) else by)
+        for key in keys:
+            if key != 'CLAN' and key not in ROLLUPS[name]['keys']:
+                raise ValueError(f"Rollup '{name}' has no column '{key}'")
+        if players and 'PLAYER' not in ROLLUPS[name]['keys']:
+            raise ValueError(f"Rollup '{name}' has no players")
+        # Periods are keyed by their first day, so a window start selects the period it falls in
+        where, params = self._where(period_start(start, period) if start is not None else None, end,
+                                    clan, players, date_column='PERIOD')
+        group = ", ".join(("PERIOD",) + keys)
+        select = ", ".join(("PERIOD AS DATE",) + keys)
+        sql = (f"SELECT {select}, SUM(SCORE) AS SCORE, "
+               f"SUM(CHEST_COUNT) AS CHEST_COUNT FROM rollup_{name}{where} GROUP BY {group} ORDER BY {group}")
+        return self._query(sql, params, f"rollup:{name}")
+
+    def rolling(self, days=7, by='PLAYER', start=None, end=None, clan=None, players=None):
+        """
+        Trailing score and chest count totals over a number of days, for every day.
+
+        Computed from the player_day rollup, so the stored chests are not read.
+
+        Args:
+            days (int, optional): Window length in days, e.g. 7 or 28. Defaults to 7.
+            by (str, optional): 'PLAYER' for one total per player, None for clan-wide
+                totals. Defaults to 'PLAYER'.
+            start (date-like, optional): First day to report, inclusive
+            end (date-like, optional): Last day to report, inclusive
+            clan, players: As for totals()
+
+        Returns:
+            pandas.DataFrame: Columns ['DATE', by, 'SCORE', 'CHEST_COUNT'] with the totals
+            of the window ending on DATE
+        """
+        if by not in (None, 'PLAYER'):
+            raise ValueError("Rolling totals can only be grouped by PLAYER")
+        # The first window also needs the days before start
+        first = pd.Timestamp(start) - pd.Timedelta(days=days - 1) if start is not None else None
+        daily = self.rollup('player_day', by=by or 'PLAYER', start=first, end=end, clan=clan, players=players)
+        if by is None:
+            daily = daily.groupby('DATE', as_index=False, observed=True)[['SCORE', 'CHEST_COUNT']].sum()
+        result = rolling_sums(daily, days, by=by)
+        if start is not None:
+            result = result[result['DATE'] >= pd.Timestamp(start)]
+        if end is not None:
+            result = result[result['DATE'] <= pd.Timestamp(end)]
+        return result.reset_index(drop=True)
+
+    def score_quantiles(self, by=None, start=None, end=None, clan=None, quantiles=sketches.QUANTILES):
+        """
+        Score percentiles per chest over a date window, from the per-day sketches.
+
+        Args:
+            by (str, optional): 'PLAYER', 'CHEST' or 'SOURCE'; None for all chests together
+            start, end, clan: As for totals()
+            quantiles (dict, optional): Column name -> quantile. Defaults to p50, p90 and p99.
+
+        Returns:
+            pandas.DataFrame: Columns [by, 'CHEST_COUNT', *quantiles], within
+            sketches.RELATIVE_ACCURACY of the exact percentiles
+        """
+        if by is not None and by not in sketches.SKETCH_DIMENSIONS:
+            raise ValueError(f"Cannot compute percentiles by '{by}', expected one of "
+                             f"{', '.join(sketches.SKETCH_DIMENSIONS)}")
+        where, params = self._where(start, end, clan)
+        # Every chest is in exactly one CHEST sketch, so those give the overall percentiles
+        dimension = by or 'CHEST'
+        where = (where + " AND" if where else " WHERE") + " DIMENSION = ?"
+        key = "VALUE AS " + by + ", " if by else ""
+        buckets = self._query(
+            f"SELECT {key}BUCKET, SUM(COUNT) AS COUNT FROM score_buckets{where} "
+            f"GROUP BY {'VALUE, ' if by else ''}BUCKET", params + [dimension], f"quantiles:{by}"
+        )
+        return sketches.quantile_table(buckets, [by] if by else [], quantiles)
+
+    def leaderboard(self, import_id=None):
+        """
+        Get the leaderboard of all stored chests after an import.
+
+        Args:
+            import_id (int, optional): Defaults to the latest import
+
+        Returns:
+            pandas.DataFrame: Columns RANK, PLAYER, SCORE and CHEST_COUNT, best first
+        """
+        return leaderboard.load_snapshot(self.connection, import_id=import_id)[2].table()
+
+    def rank_changes(self, days=None):
+        """
+        Compare the latest leaderboard with an earlier one.
+
+        Args:
+            days (int, optional): Compare with the leaderboard of data ending at least
+                this many days before the latest data, e.g. 1 for "since yesterday" or
+                7 for "since last week". Defaults to the leaderboard before the latest import.
+
+        Returns:
+            tuple: (pandas.DataFrame as from LeaderboardSnapshot.compare, description of
+            the earlier leaderboard)
+        """
+        import_id, as_of, current = leaderboard.load_snapshot(self.connection)
+        if import_id is None:
+            return current.compare(current), "empty history"
+        if days is None:
+            previous_id = self.connection.execute(
+                "SELECT MAX(import_id) FROM leaderboard_snapshots WHERE import_id < ?", (import_id,)
+            ).fetchone()[0]
+            if previous_id is None:
+                previous_as_of, previous = None, leaderboard.LeaderboardSnapshot.empty()
+            else:
+                _, previous_as_of, previous = leaderboard.load_snapshot(self.connection, import_id=previous_id)
+        else:
+            cutoff = _iso_date(pd.Timestamp(as_of) - pd.Timedelta(days=days))
+            _, previous_as_of, previous = leaderboard.load_snapshot(self.connection, as_of=cutoff)
+        described = f"data up to {previous_as_of}" if previous_as_of else "before the first import"
+        return current.compare(previous), described
+
+    def analysis_results(self, start=None, end=None, clan=None):
+        """
+        Compute the results of DataProcessor.analyze_data for a date window in SQL.
+
+        Args:
+            start (date-like, optional): First date, inclusive
+            end (date-like, optional): Last date, inclusive
+            clan (str, optional): Only include this clan
+
+        Returns:
+            dict: The same tables as DataProcessor.analyze_data, without 'raw_data'
+        """
+        where, params = self._where(start, end, clan)
+        # Two (PLAYER, x) aggregations give every per-player, per-source and per-chest table
+        player_sources = self._query(
+            f"SELECT PLAYER, SOURCE, SUM(SCORE) AS SCORE, COUNT(*) AS CHEST_COUNT FROM chests{where} "
+            "GROUP BY PLAYER, SOURCE", params, "player_sources"
+        )
+        player_chests = self._query(
+            f"SELECT PLAYER, CHEST, SUM(SCORE) AS SCORE, COUNT(*) AS COUNT FROM chests{where} "
+            "GROUP BY PLAYER, CHEST ORDER BY PLAYER, CHEST", params, "player_chests"
+        )
+        return {
+            **analysis_tables(player_sources, player_chests),
+            'date_totals': self.totals('DATE', start, end, clan),
+            **{
+                f'{column.lower()}_quantiles': self.score_quantiles(column, start, end, clan).sort_values(
+                    'P50', ascending=False, kind='stable')
+                for column in sketches.SKETCH_DIMENSIONS
+            },
+            'score_quantiles': self.score_quantiles(None, start, end, clan),
+        }
+
+    def clan_comparison(self, start=None, end=None):
+        """
+        Compare the stored clans over a date window.
+
+        Returns:
+            pandas.DataFrame: The table of clans.clan_comparison, one row per clan
+        """
+        with stage_timer.stage('history_clan_comparison'):
+            return clans.clan_comparison({
+                clan or clans.NO_CLAN: self.analysis_results(start, end, clan) for clan in self.clans()
+            })
+
+    def date_range(self, clan=None):
+        """
+        First and last date in the store.
+
+        Returns:
+            tuple: (first, last) as Timestamps, or (None, None) if the store is empty
+        """
+        where, params = self._where(clan=clan)
+        first, last = self.connection.execute(f"SELECT MIN(DATE), MAX(DATE) FROM chests{where}", params).fetchone()
+        if first is None:
+            return None, None
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def clans(self):
+        """Get the distinct clan names in the store, sorted."""
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT CLAN FROM chests ORDER BY CLAN")]
+
+    def players(self):
+        """
+        List the players in the store with the spellings resolved to each.
+
+        Returns:
+            pandas.DataFrame: One row per player, see PlayerIdentities.table()
+        """
+        return self.identities.table()
+
+    def row_count(self):
+        """Get the number of stored chests."""
+        return self.connection.execute("SELECT COUNT(*) FROM chests").fetchone()[0]
+
+    def imports(self):
+        """
+        List the imports in the store.
+
+        Returns:
+            pandas.DataFrame: One row per import, oldest first
+        """
+        result = pd.read_sql_query(
+            "SELECT id, source, imported_at, rows, added, first_date, last_date FROM imports ORDER BY id",
+            self.connection
+        )
+        result['imported_at'] = pd.to_datetime(result['imported_at'], unit='s')
+        return result
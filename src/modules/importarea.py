@@ -15,6 +15,8 @@ class ImportArea(QWidget):
     """
     
     fileSelected = Signal(str)
+    # Emitted instead of fileSelected when several files are selected at once
+    filesSelected = Signal(list)
     
     def __init__(self, parent=None, debug=False):
         """
@@ -213,7 +215,7 @@ class ImportArea(QWidget):
         self.setLayout(layout)
     
     def open_file_dialog(self):
-        """Open a file dialog to select a CSV file"""
+        """Open a file dialog to select one or more CSV files"""
         if self.debug:
             print(f"\n--- IMPORTAREA.OPEN_FILE_DIALOG CALLED ---\n")
             import traceback
@@ -246,16 +248,21 @@ class ImportArea(QWidget):
                 if self.debug:
                     print(f"Using import directory from main_window.config_manager: {start_dir}")
             
-            filepath, _ = QFileDialog.getOpenFileName(
-                self, "Open CSV File", start_dir, "CSV Files (*.csv)"
+            filepaths, _ = QFileDialog.getOpenFileNames(
+                self, "Open Data Files", start_dir,
+                "Data Files (*.csv *.parquet *.feather *.arrow);;CSV Files (*.csv);;All Files (*)"
             )
             
-            if filepath:
+            if filepaths:
+                filepath = filepaths[0]
                 if self.debug:
-                    print(f"File selected via dialog: {filepath}")
+                    print(f"Files selected via dialog: {filepaths}")
                 
                 # Update file info label
-                self.file_info.setText(f"Selected: {os.path.basename(filepath)}")
+                if len(filepaths) == 1:
+                    self.file_info.setText(f"Selected: {os.path.basename(filepath)}")
+                else:
+                    self.file_info.setText(f"Selected: {len(filepaths)} files")
                 
                 # Update import directory in config if possible
                 # First try to use the local config_manager if available
@@ -269,10 +276,15 @@ class ImportArea(QWidget):
                     if self.debug:
                         print(f"Updated import directory in main_window.config_manager: {str(Path(filepath).parent)}")
                 
-                # Emit signal with filepath
-                if self.debug:
-                    print(f"Emitting fileSelected signal with: {filepath}")
-                self.fileSelected.emit(filepath)
+                # Emit signal with filepath(s)
+                if len(filepaths) > 1:
+                    if self.debug:
+                        print(f"Emitting filesSelected signal with: {filepaths}")
+                    self.filesSelected.emit(filepaths)
+                else:
+                    if self.debug:
+                        print(f"Emitting fileSelected signal with: {filepath}")
+                    self.fileSelected.emit(filepath)
         finally:
             # Reset the dialog active flags
             if hasattr(ImportArea, '_dialog_active'):
@@ -0,0 +1,249 @@
+# leaderboard.py - Per-import leaderboard snapshots and rank changes between them
+import zlib
+
+import numpy as np
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+    import_id INTEGER PRIMARY KEY REFERENCES imports(id),
+    as_of TEXT,
+    players BLOB NOT NULL,
+    scores BLOB NOT NULL,
+    chest_counts BLOB NOT NULL,
+    ranks BLOB NOT NULL
+);
+"""
+
+# Separates player names in a stored snapshot; cannot occur in a name read from CSV
+_NAME_SEPARATOR = '\x1f'
+
+
+def rank_scores(scores):
+    """
+    Rank scores from highest to lowest; equal scores share the better rank (1, 2, 2, 4).
+
+    Args:
+        scores (numpy.ndarray): Scores in any order
+
+    Returns:
+        numpy.ndarray: int32 rank of every score
+    """
+    descending = np.sort(-scores)
+    return (np.searchsorted(descending, -scores, side='left') + 1).astype(np.int32)
+
+
+class LeaderboardSnapshot:
+    """
+    Total score, chest count and rank of every player at one point in time.
+
+    The players are kept as a sorted array, with the other values in
+    matching arrays, so adding an import's totals and comparing two
+    snapshots are merges of sorted arrays rather than re-aggregations.
+    """
+
+    def __init__(self, players, scores, chest_counts, ranks=None):
+        """
+        Create a snapshot from arrays sorted by player.
+
+        Args:
+            players (numpy.ndarray): Player names, sorted and unique
+            scores (numpy.ndarray): Total score per player
+            chest_counts (numpy.ndarray): Chest count per player
+            ranks (numpy.ndarray, optional): Rank per player; computed when omitted
+        """
+        self.players = players
+        self.scores = scores.astype(np.float64, copy=False)
+        self.chest_counts = chest_counts.astype(np.int64, copy=False)
+        self.ranks = rank_scores(self.scores) if ranks is None else ranks
+
+    @classmethod
+    def empty(cls):
+        """Create a snapshot without players."""
+        return cls(np.array([], dtype=str), np.array([], dtype=np.float64), np.array([], dtype=np.int64))
+
+    @classmethod
+    def from_totals(cls, totals):
+        """
+        Create a snapshot from per-player totals.
+
+        Args:
+            totals (pandas.DataFrame): Columns PLAYER, SCORE and CHEST_COUNT, one row per player
+        """
+        return cls.empty().add(totals)
+
+    def __len__(self):
+        return len(self.players)
+
+    def add(self, totals):
+        """
+        Add per-player totals, e.g. those of a new import, to this snapshot.
+
+        Args:
+            totals (pandas.DataFrame): Columns PLAYER, SCORE and CHEST_COUNT, one row per player
+
+        Returns:
+            LeaderboardSnapshot: A new snapshot with the combined totals and new ranks
+        """
+        new_players = totals['PLAYER'].astype(str).to_numpy(dtype=str)
+        players = np.union1d(self.players, new_players)
+        scores = np.zeros(len(players), dtype=np.float64)
+        chest_counts = np.zeros(len(players), dtype=np.int64)
+        existing = np.searchsorted(players, self.players)
+        scores[existing] = self.scores
+        chest_counts[existing] = self.chest_counts
+        added = np.searchsorted(players, new_players)
+        np.add.at(scores, added, pd.to_numeric(totals['SCORE']).to_numpy(dtype=np.float64))
+        np.add.at(chest_counts, added, totals['CHEST_COUNT'].to_numpy(dtype=np.int64))
+        return LeaderboardSnapshot(players, scores, chest_counts)
+
+    def to_blobs(self):
+        """
+        Encode the snapshot for storage.
+
+        Returns:
+            tuple: (players, scores, chest_counts, ranks) as compressed bytes
+        """
+        names = _NAME_SEPARATOR.join(self.players.tolist()).encode('utf-8')
+        return tuple(zlib.compress(data) for data in (
+            names, self.scores.tobytes(), self.chest_counts.tobytes(), self.ranks.tobytes()))
+
+    @classmethod
+    def from_blobs(cls, players, scores, chest_counts, ranks):
+        """Decode a snapshot written by to_blobs()."""
+        names = zlib.decompress(players).decode('utf-8')
+        return cls(
+            np.array(names.split(_NAME_SEPARATOR) if names else [], dtype=str),
+            np.frombuffer(zlib.decompress(scores), dtype=np.float64),
+            np.frombuffer(zlib.decompress(chest_counts), dtype=np.int64),
+            np.frombuffer(zlib.decompress(ranks), dtype=np.int32),
+        )
+
+    def table(self):
+        """
+        Get the leaderboard.
+
+        Returns:
+            pandas.DataFrame: Columns RANK, PLAYER, SCORE and CHEST_COUNT, best first
+        """
+        order = np.lexsort((self.players, self.ranks))
+        return pd.DataFrame({
+            'RANK': self.ranks[order],
+            'PLAYER': self.players[order],
+            'SCORE': _scores(self.scores[order]),
+            'CHEST_COUNT': self.chest_counts[order],
+        })
+
+    def compare(self, previous):
+        """
+        Compute how every player's rank and score changed since an earlier snapshot.
+
+        Args:
+            previous (LeaderboardSnapshot): The earlier snapshot
+
+        Returns:
+            pandas.DataFrame: Columns RANK, PLAYER, PREVIOUS_RANK (missing for new players),
+            RANK_CHANGE (positive when the player moved up), SCORE and SCORE_CHANGE,
+            best rank first
+        """
+        if len(previous):
+            position = np.minimum(np.searchsorted(previous.players, self.players), len(previous) - 1)
+            found = previous.players[position] == self.players
+            previous_rank = pd.array(previous.ranks[position], dtype='Int32')
+            previous_score = np.where(found, previous.scores[position], 0.0)
+        else:
+            found = np.zeros(len(self), dtype=bool)
+            previous_rank = pd.array(np.zeros(len(self), dtype=np.int32), dtype='Int32')
+            previous_score = np.zeros(len(self))
+        previous_rank[~found] = pd.NA
+
+        result = pd.DataFrame({
+            'RANK': self.ranks,
+            'PLAYER': self.players,
+            'PREVIOUS_RANK': previous_rank,
+            'RANK_CHANGE': previous_rank - self.ranks,
+            'SCORE': _scores(self.scores),
+            'SCORE_CHANGE': _scores(self.scores - previous_score),
+        })
+        order = np.lexsort((self.players, self.ranks))
+        return result.iloc[order].reset_index(drop=True)
+
+
+def _scores(values):
+    """Show scores as integers when they all are."""
+    if len(values) and np.all(np.mod(values, 1) == 0):
+        return values.astype(np.int64)
+    return values
+
+
+def save_snapshot(connection, import_id, as_of, snapshot):
+    """Store the leaderboard after an import."""
+    connection.execute(
+        "INSERT OR REPLACE INTO leaderboard_snapshots "
+        "(import_id, as_of, players, scores, chest_counts, ranks) VALUES (?, ?, ?, ?, ?, ?)",
+        (import_id, as_of) + snapshot.to_blobs()
+    )
+
+
+def load_snapshot(connection, import_id=None, as_of=None):
+    """
+    Load a stored leaderboard.
+
+    Args:
+        connection (sqlite3.Connection): History database
+        import_id (int, optional): The import after which the snapshot was taken.
+            Defaults to the latest snapshot.
+        as_of (str, optional): Latest snapshot whose data ends on or before this
+            'YYYY-MM-DD' date, instead of import_id
+
+    Returns:
+        tuple: (import_id, as_of, LeaderboardSnapshot), or (None, None, empty snapshot)
+        if there is no such snapshot
+    """
+    sql = "SELECT import_id, as_of, players, scores, chest_counts, ranks FROM leaderboard_snapshots"
+    if import_id is not None:
+        row = connection.execute(sql + " WHERE import_id = ?", (import_id,)).fetchone()
+    elif as_of is not None:
+        row = connection.execute(sql + " WHERE as_of <= ? ORDER BY as_of DESC, import_id DESC LIMIT 1",
+                                 (as_of,)).fetchone()
+    else:
+        row = connection.execute(sql + " ORDER BY import_id DESC LIMIT 1").fetchone()
+    if row is None:
+        return None, None, LeaderboardSnapshot.empty()
+    return row[0], row[1], LeaderboardSnapshot.from_blobs(*row[2:])
+
+
+def snapshot_import(connection, import_id):
+    """
+    Store the leaderboard after an import from the previous one and the import's own chests.
+
+    Returns:
+        LeaderboardSnapshot: The new snapshot
+    """
+    _, _, previous = load_snapshot(connection)
+    totals = pd.read_sql_query(
+        "SELECT PLAYER, SUM(SCORE) AS SCORE, COUNT(*) AS CHEST_COUNT FROM chests "
+        "WHERE import_id = ? GROUP BY PLAYER", connection, params=(import_id,)
+    )
+    snapshot = previous.add(totals)
+    as_of = connection.execute("SELECT MAX(DATE) FROM chests").fetchone()[0]
+    save_snapshot(connection, import_id, as_of, snapshot)
+    return snapshot
+
+
+def rebuild_snapshots(connection):
+    """Recompute the snapshot of every import by replaying the imports in order."""
+    connection.execute("DELETE FROM leaderboard_snapshots")
+    totals = pd.read_sql_query(
+        "SELECT import_id, PLAYER, SUM(SCORE) AS SCORE, COUNT(*) AS CHEST_COUNT, MAX(DATE) AS LAST_DATE "
+        "FROM chests GROUP BY import_id, PLAYER", connection
+    )
+    by_import = dict(tuple(totals.groupby('import_id')))
+    snapshot, as_of = LeaderboardSnapshot.empty(), None
+    for (import_id,) in connection.execute("SELECT id FROM imports ORDER BY id").fetchall():
+        import_totals = by_import.get(import_id)
+        if import_totals is not None:
+            snapshot = snapshot.add(import_totals)
+            last_date = import_totals['LAST_DATE'].max()
+            as_of = last_date if as_of is None else max(as_of, last_date)
+        save_snapshot(connection, import_id, as_of, snapshot)
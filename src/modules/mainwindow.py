@@ -19,11 +19,10 @@ import re
 import time
 
 # Data manipulation and visualization
+# matplotlib, the print support module and the text-repair libraries used by
+# DataProcessor are imported on first use to keep startup fast
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 
 # Qt imports
 from PySide6.QtWidgets import (
@@ -36,18 +35,22 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QTimer, QDate, QSettings, QDir, Signal, QSortFilterProxyModel
 from PySide6.QtGui import QIcon, QColor, QAction
-from PySide6.QtPrintSupport import QPrinter, QPrintDialog
-from PySide6 import QtUiTools
 
 # Import custom modules
 from .utils import log_error
 from .stylemanager import StyleManager, DARK_THEME
 from .configmanager import ConfigManager
 from .customtablemodel import CustomTableModel
-from .mplcanvas import MplCanvas
 from .importarea import ImportArea
 from .dataprocessor import DataProcessor
+from .schema import ChestSchema
 from .filterarea import FilterArea
+from .reporttemplates import ReportBuilder, ReportFragmentCache, ReportLayout
+from .backgroundtask import BackgroundTask
+from .timing import stage_timer
+from .memoryreport import MemoryReport, PeakRSSMonitor
+from .historystore import HistoryStore, clan_values
+from .clans import ClanAnalyzer
 
 class MainWindow(QMainWindow):
     """
@@ -55,6 +58,13 @@ class MainWindow(QMainWindow):
     Provides functionality for importing, filtering, and visualizing chest data.
     """
     
+    # File types offered when exporting raw or analysis data
+    DATA_EXPORT_FILTERS = "CSV Files (*.csv);;Parquet Files (*.parquet);;Feather Files (*.feather);;Arrow Files (*.arrow);;All Files (*)"
+    
+    # Emitted for every finished pipeline stage; queued to the GUI thread when
+    # the stage ran on a worker thread
+    stage_recorded = Signal(object)
+    
     def __init__(self, debug=False):
         """
         Initialize the main window.
@@ -73,6 +83,25 @@ class MainWindow(QMainWindow):
         self.analysis_data = None
         self.analysis_results = None
         self.last_loaded_file = None
+        self.last_import_report = []
+        # Malformed lines left out of the loaded files, one table per file
+        self.last_quarantine = []
+        # Per-clan analysis results, kept per clan until that clan's data changes
+        self.clan_analyzer = ClanAnalyzer()
+        # Clan comparison running on a worker thread, if any, and the last result with its data version
+        self._clan_task = None
+        self._clan_comparison = (None, None)
+        
+        # Version of the analyzed data; report fragments are cached per version
+        self._data_version = 0
+        self._analyzed_source = None
+        self._report_cache = ReportFragmentCache()
+        # Report generation job running on a worker thread, if any
+        self._report_task = None
+        self._report_type_in_progress = None
+        # CSV export running on a worker thread, if any
+        self._export_task = None
+        self._export_message = ""
         
         # Add a timestamp for the last file load to prevent rapid successive loads
         self.last_file_load_time = 0
@@ -80,12 +109,32 @@ class MainWindow(QMainWindow):
         # Flag to prevent multiple file dialogs
         self._file_dialog_active = False
         
+        # Stage timings are recorded in debug mode or when CHESTPARSER_TIMING is set
+        if debug or os.environ.get('CHESTPARSER_TIMING'):
+            stage_timer.enabled = True
+        self._diagnostics_dialog = None
+        self._memory_dialog = None
+        # History database, opened on first use, and the date window the analysis tab shows from it
+        self._history_store = None
+        self.history_window = None
+        self._history_dates_initialized = False
+        # Event-loop probe, created when turned on from the Tools menu or CHESTPARSER_PROBE
+        self.responsiveness_probe = None
+        # RSS before, after and at the peak of the last file load
+        self.last_load_memory = None
+        
         # Setup UI components
         self.setup_ui_components()
         
+        self.stage_recorded.connect(self._on_stage_recorded)
+        stage_timer.add_listener(self.stage_recorded.emit)
+        
         # Connect signals
         self.connect_signals()
         
+        if os.environ.get('CHESTPARSER_PROBE'):
+            self.action_responsiveness_probe.setChecked(True)
+        
         # Set window properties
         self.setWindowTitle("Chest Parser")
         self.resize(1200, 800)
@@ -149,12 +198,16 @@ class MainWindow(QMainWindow):
         # Set status message
         self.statusBar().showMessage("Ready")
 
+    @stage_timer.timed('import')
     def load_csv_file(self, file_path):
         """
         Load a CSV file and process the data.
         
+        Several files can be loaded together, e.g. overlapping exports of
+        consecutive days; rows an earlier file already had are dropped.
+        
         Args:
-            file_path (str): Path to the CSV file to load
+            file_path (str or list): Path to the CSV file to load, or a list of paths
         """
         import traceback  # Import at the beginning of the method
         import time
@@ -163,93 +216,82 @@ class MainWindow(QMainWindow):
             print(f"\n--- LOAD CSV FILE CALLED WITH: {file_path} ---\n")
             traceback.print_stack()  # Print stack trace to identify caller
         
-        # Convert file_path to Path object for consistent handling
-        file_path = Path(file_path)
+        # Convert file_path to Path objects for consistent handling
+        file_paths = [Path(path) for path in file_path] if isinstance(file_path, (list, tuple)) else [Path(file_path)]
+        if not file_paths:
+            return False
+        file_path = file_paths[0]
+        loaded_key = "; ".join(str(path.absolute()) for path in file_paths)
+        display_name = file_path.name if len(file_paths) == 1 else f"{len(file_paths)} files"
         
         # Check if we're trying to load the same file again
-        if self.last_loaded_file == str(file_path.absolute()):
+        if self.last_loaded_file == loaded_key:
             if self.debug:
-                print(f"File already loaded, skipping reload: {file_path}")
+                print(f"File already loaded, skipping reload: {loaded_key}")
             # File already processed, just ensure tabs are enabled and return success
             self.enable_all_tabs()
-            self.statusBar().showMessage(f"File already loaded: {file_path.name}")
+            self.statusBar().showMessage(f"File already loaded: {display_name}")
             return True
         
         # Debounce mechanism - prevent multiple calls in quick succession (within 1.5 seconds)
         current_time = time.time()
         if hasattr(self, 'last_file_load_time') and (current_time - self.last_file_load_time < 1.5):
             if self.debug:
-                print(f"Ignoring rapid successive file load request: {file_path}")
+                print(f"Ignoring rapid successive file load request: {loaded_key}")
                 print(f"Time since last load: {current_time - self.last_file_load_time:.2f} seconds")
             return True
         
         # Update the last load time
         self.last_file_load_time = current_time
         
+        # Track the peak RSS of the whole load for the memory report
+        load_monitor = PeakRSSMonitor().start()
+        
         if self.debug:
-            print(f"\n--- PROCESSING NEW CSV FILE: {file_path} ---\n")
+            print(f"\n--- PROCESSING NEW CSV FILE: {loaded_key} ---\n")
         
         try:
-            # Use our enhanced DataProcessor for robust encoding detection and umlaut handling
-            if self.debug:
-                print("Using enhanced DataProcessor.read_csv_with_encoding_fix for better umlaut handling")
-                print(f"File path type: {type(file_path)}")
-                print(f"File path: {file_path}")
-                print(f"Exists: {file_path.exists()}")
-            
-            # Enable debugging in DataProcessor temporarily if our debug is enabled
-            old_debug = DataProcessor.debug
-            DataProcessor.debug = self.debug
-            
-            # Try to load the file with our enhanced function
-            df, success, error_message = DataProcessor.read_csv_with_encoding_fix(file_path)
-            
-            # Restore debug flag
-            DataProcessor.debug = old_debug
-            
-            if not success:
-                print(f"CSV loading error: {error_message}")
-                self.show_error_dialog("Error Loading File", f"Failed to load CSV file: {error_message}")
-                return False
-                
-            # Store the data
-            self.raw_data = df.copy()
+            frames = []
+            # Malformed lines of the files, left out of the data
+            self.last_quarantine = []
+            for path in file_paths:
+                df = self._load_import_file(path)
+                if df is None:
+                    return False
+                frames.append((path.name, df))
+            
+            # Drop the rows an earlier file already had
+            if len(frames) > 1:
+                self.raw_data, self.last_import_report = DataProcessor.deduplicate(frames)
+            else:
+                self.raw_data = frames[0][1]
+                self.last_import_report = [{'source': file_path.name, 'rows': len(self.raw_data),
+                                            'added': len(self.raw_data), 'duplicates': 0}]
             
             # Store the file path so we don't reload the same file
-            self.last_loaded_file = str(file_path.absolute())
-            
-            if self.debug:
-                print(f"Successfully loaded CSV file with enhanced umlaut handling")
-                if 'PLAYER' in self.raw_data.columns:
-                    print(f"Sample players: {self.raw_data['PLAYER'].head().tolist()}")
-            
-            # Apply additional text fixing to ensure all columns are properly processed
-            try:
-                text_columns = self.raw_data.select_dtypes(include=['object']).columns
-                if self.debug:
-                    print(f"Applying fix_dataframe_text to text columns: {text_columns.tolist()}")
-                self.raw_data = DataProcessor.fix_dataframe_text(self.raw_data, columns=text_columns)
-            except Exception as e:
-                print(f"Warning: Error in additional text fixing: {str(e)}")
-                # Continue even if text fixing fails
+            self.last_loaded_file = loaded_key
                 
-            # Convert SCORE to numeric
-            if 'SCORE' in self.raw_data.columns:
-                try:
-                    self.raw_data['SCORE'] = pd.to_numeric(self.raw_data['SCORE'], errors='coerce')
-                except Exception as e:
-                    print(f"Warning: Error converting SCORE to numeric: {str(e)}")
-            
-            # Convert DATE to datetime
-            if 'DATE' in self.raw_data.columns:
-                try:
-                    self.raw_data['DATE'] = pd.to_datetime(self.raw_data['DATE'], errors='coerce')
-                except Exception as e:
-                    print(f"Warning: Error converting DATE to datetime: {str(e)}")
+            # CSV files are typed when parsed (see schema.ChestSchema); convert other data
+            if not ChestSchema.is_typed(self.raw_data):
+                # Convert SCORE to numeric
+                if 'SCORE' in self.raw_data.columns:
+                    try:
+                        self.raw_data['SCORE'] = pd.to_numeric(self.raw_data['SCORE'], errors='coerce')
+                    except Exception as e:
+                        print(f"Warning: Error converting SCORE to numeric: {str(e)}")
+                
+                # Convert DATE to datetime
+                if 'DATE' in self.raw_data.columns:
+                    try:
+                        self.raw_data['DATE'] = DataProcessor.to_datetime(self.raw_data['DATE'])
+                    except Exception as e:
+                        print(f"Warning: Error converting DATE to datetime: {str(e)}")
             
             # Set processed data to raw data initially
             self.processed_data = self.raw_data.copy()
             self.analysis_data = self.raw_data.copy()
+            # Show the new file rather than a history window
+            self.history_window = None
             
             if self.debug:
                 print("\n--- UI COMPONENT UPDATES ---\n")
@@ -301,16 +343,28 @@ class MainWindow(QMainWindow):
             
             # Update file label in the import tab
             if hasattr(self, 'file_label'):
-                self.file_label.setText(f"File loaded: {file_path.name}")
+                if len(file_paths) == 1:
+                    self.file_label.setText(f"File loaded: {file_path.name}")
+                else:
+                    self.file_label.setText("Files loaded:\n" + "\n".join(
+                        f"{entry['source']}: {entry['added']:,} rows, {entry['duplicates']:,} duplicates"
+                        for entry in self.last_import_report))
                 if self.debug:
-                    print(f"Updated file_label with: {file_path.name}")
+                    print(f"Updated file_label with: {display_name}")
             
             # Update status message
-            self.statusBar().showMessage(f"Loaded {len(self.raw_data)} rows from {file_path.name}")
+            duplicates = sum(entry['duplicates'] for entry in self.last_import_report)
+            malformed = sum(len(quarantine) for quarantine in self.last_quarantine)
+            self.statusBar().showMessage(
+                f"Loaded {len(self.raw_data)} rows from {display_name}"
+                + (f" ({duplicates:,} duplicate rows skipped)" if duplicates else "")
+                + (f" ({malformed:,} malformed lines left out, first at line "
+                   f"{min(quarantine['LINE'].min() for quarantine in self.last_quarantine)})"
+                   if malformed else ""))
             
             # Success
             if self.debug:
-                print(f"Successfully loaded and processed {file_path.name}")
+                print(f"Successfully loaded and processed {display_name}")
                 
             return True
                 
@@ -320,6 +374,61 @@ class MainWindow(QMainWindow):
             traceback.print_exc()
             self.show_error_dialog("Error Loading File", error_message)
             return False
+        finally:
+            self.last_load_memory = load_monitor.stop()
+
+    def _load_import_file(self, file_path):
+        """
+        Load one file for load_csv_file and fix its text.
+        
+        Args:
+            file_path (Path): Path to the file
+            
+        Returns:
+            pandas.DataFrame or None: The loaded data, None if loading failed
+        """
+        # Use our enhanced DataProcessor for robust encoding detection and umlaut handling
+        if self.debug:
+            print("Using enhanced DataProcessor.read_csv_with_encoding_fix for better umlaut handling")
+            print(f"File path type: {type(file_path)}")
+            print(f"File path: {file_path}")
+            print(f"Exists: {file_path.exists()}")
+        
+        # Enable debugging in DataProcessor temporarily if our debug is enabled
+        old_debug = DataProcessor.debug
+        DataProcessor.debug = self.debug
+        
+        # Try to load the file; Parquet/Feather files skip encoding detection
+        malformed = []
+        df, success, error_message = DataProcessor.load_file(file_path, malformed)
+        self.last_quarantine += [quarantine.assign(SOURCE=file_path.name) for quarantine in malformed]
+        
+        # Restore debug flag
+        DataProcessor.debug = old_debug
+        
+        if not success:
+            print(f"CSV loading error: {error_message}")
+            self.show_error_dialog("Error Loading File", f"Failed to load {file_path.name}: {error_message}")
+            return None
+        
+        df = df.copy()
+        if self.debug:
+            print(f"Successfully loaded CSV file with enhanced umlaut handling")
+            if 'PLAYER' in df.columns:
+                print(f"Sample players: {df['PLAYER'].head().tolist()}")
+        
+        # Apply additional text fixing to ensure all columns are properly processed.
+        # Columnar files store already-fixed, typed text and skip this step.
+        if not DataProcessor.is_columnar_file(file_path):
+            try:
+                text_columns = df.select_dtypes(include=['object']).columns
+                if self.debug:
+                    print(f"Applying fix_dataframe_text to text columns: {text_columns.tolist()}")
+                df = DataProcessor.fix_dataframe_text(df, columns=text_columns)
+            except Exception as e:
+                print(f"Warning: Error in additional text fixing: {str(e)}")
+                # Continue even if text fixing fails
+        return df
 
     def apply_filter(self):
         """Apply the filter to the raw data."""
@@ -347,7 +456,7 @@ class MainWindow(QMainWindow):
                 print(f"Applying filter on {column} with {len(selected_values)} selected values")
             
             # Store the selected values for reference
-            self.processed_data = self.raw_data[self.raw_data[column].astype(str).isin(selected_values)]
+            self.processed_data = DataProcessor.filter_data(self.raw_data, column, selected_values)
             
             # Update the status message
             self.statusBar().showMessage(f"Filtered by {column}: {len(selected_values)} values selected")
@@ -394,7 +503,7 @@ class MainWindow(QMainWindow):
         
         # Apply filter
         if selected_values:
-            self.analysis_data = self.raw_data[self.raw_data[column].astype(str).isin(selected_values)]
+            self.analysis_data = DataProcessor.filter_data(self.raw_data, column, selected_values)
             self.statusBar().showMessage(f"Analysis filtered by {column}: {len(selected_values)} values selected")
         else:
             self.analysis_data = self.raw_data.copy()
@@ -447,6 +556,10 @@ class MainWindow(QMainWindow):
         """
         import time  # Import at the beginning of the method for debounce mechanism
         
+        # Nothing to draw until the Charts tab has been built
+        if not self._charts_tab_built:
+            return
+        
         # Implement a debounce mechanism to prevent multiple rapid updates
         current_time = time.time()
         if hasattr(self, '_last_chart_update_time') and (current_time - self._last_chart_update_time < 0.2):
@@ -473,96 +586,99 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            # Reset the figure to get a clean canvas with proper styling
-            ax = self.chart_canvas.reset_figure()
-            
-            # Get the selected options
-            data_category = self.chart_data_category.currentText()
-            measure = self.chart_data_column.currentText()
-            chart_type = self.chart_type_selector.currentText()
-            
-            # Get sort options
-            sort_column = self.chart_sort_column.currentText()
-            sort_ascending = self.chart_sort_order.currentText() == "Ascending"
-            
-            # Get limit options
-            limit_results = self.chart_limit_enabled.isChecked()
-            limit_value = self.chart_limit_value.value()
-            
-            # Get display options
-            show_values = self.chart_show_values.isChecked()
-            show_grid = self.chart_show_grid.isChecked()
-            
-            # Set grid visibility according to user preference
-            if show_grid:
-                style = self.chart_canvas.style_presets['default']
-                ax.grid(True, color=style['grid_color'], linestyle='--', linewidth=0.5, alpha=0.7)
-            else:
-                ax.grid(False)
+            with stage_timer.stage('chart_build') as stage:
+                # Reset the figure to get a clean canvas with proper styling
+                ax = self.chart_canvas.reset_figure()
+            
+                # Get the selected options
+                data_category = self.chart_data_category.currentText()
+                measure = self.chart_data_column.currentText()
+                chart_type = self.chart_type_selector.currentText()
+            
+                # Get sort options
+                sort_column = self.chart_sort_column.currentText()
+                sort_ascending = self.chart_sort_order.currentText() == "Ascending"
+            
+                # Get limit options
+                limit_results = self.chart_limit_enabled.isChecked()
+                limit_value = self.chart_limit_value.value()
+            
+                # Get display options
+                show_values = self.chart_show_values.isChecked()
+                show_grid = self.chart_show_grid.isChecked()
+            
+                # Set grid visibility according to user preference
+                if show_grid:
+                    style = self.chart_canvas.style_presets['default']
+                    ax.grid(True, color=style['grid_color'], linestyle='--', linewidth=0.5, alpha=0.7)
+                else:
+                    ax.grid(False)
             
-            # Get data based on data_category
-            data = self._get_chart_data(data_category)
-            if data is None or len(data) == 0:
-                if self.debug:
-                    print(f"No data available for {data_category}")
-                return
+                # Get data based on data_category
+                data = self._get_chart_data(data_category)
+                stage.rows = 0 if data is None else len(data)
+                if data is None or len(data) == 0:
+                    if self.debug:
+                        print(f"No data available for {data_category}")
+                    return
             
-            # Determine category column based on data_category
-            category_column = self._get_category_column(data_category)
-            if category_column not in data.columns:
-                if self.debug:
-                    print(f"Category column {category_column} not found in data")
-                return
+                # Determine category column based on data_category
+                category_column = self._get_category_column(data_category)
+                if category_column not in data.columns:
+                    if self.debug:
+                        print(f"Category column {category_column} not found in data")
+                    return
             
-            # Check if measure column exists
-            if measure not in data.columns:
-                if self.debug:
-                    print(f"Measure column {measure} not found in data: {data.columns.tolist()}")
-                    print(f"Data types: {data.dtypes}")
-                    # Print the first few rows to see what we're dealing with
-                    print(f"Data sample:\n{data.head(3)}")
-                return
+                # Check if measure column exists
+                if measure not in data.columns:
+                    if self.debug:
+                        print(f"Measure column {measure} not found in data: {data.columns.tolist()}")
+                        print(f"Data types: {data.dtypes}")
+                        # Print the first few rows to see what we're dealing with
+                        print(f"Data sample:\n{data.head(3)}")
+                    return
                 
-            # Sort data
-            if sort_column in data.columns:
-                data = data.sort_values(sort_column, ascending=sort_ascending).reset_index(drop=True)
-            else:
-                # Default to sorting by measure
-                data = data.sort_values(measure, ascending=sort_ascending).reset_index(drop=True)
+                # Sort data
+                if sort_column in data.columns:
+                    data = data.sort_values(sort_column, ascending=sort_ascending).reset_index(drop=True)
+                else:
+                    # Default to sorting by measure
+                    data = data.sort_values(measure, ascending=sort_ascending).reset_index(drop=True)
                 
-            # Apply limit if enabled
-            if limit_results and limit_value > 0:
-                data = data.head(limit_value)
-                if self.debug:
-                    print(f"Limited to top {limit_value} items after sorting")
-            
-            # Adjust category order for horizontal bar chart
-            if chart_type == "Horizontal Bar" and not sort_ascending:
-                data = data.iloc[::-1].reset_index(drop=True)
-            
-            # Create chart based on selected chart type
-            chart_title = f"{data_category} by {measure}"
-            
-            # Get colors for the chart
-            colors = self.chart_canvas.get_colors()
-            
-            # Create the appropriate chart type
-            if chart_type == "Bar Chart":
-                self._create_bar_chart(ax, data, category_column, measure, colors, show_values, chart_title)
-            elif chart_type == "Horizontal Bar":
-                self._create_horizontal_bar_chart(ax, data, category_column, measure, colors, show_values, chart_title)
-            elif chart_type == "Pie Chart":
-                self._create_pie_chart(ax, data, category_column, measure, colors, show_values, chart_title)
-            elif chart_type == "Line Chart":
-                self._create_line_chart(ax, data, category_column, measure, colors, show_values, chart_title)
-            else:
-                self._create_scatter_chart(ax, data, category_column, measure, colors, show_values, chart_title)
+                # Apply limit if enabled
+                if limit_results and limit_value > 0:
+                    data = data.head(limit_value)
+                    if self.debug:
+                        print(f"Limited to top {limit_value} items after sorting")
+            
+                # Adjust category order for horizontal bar chart
+                if chart_type == "Horizontal Bar" and not sort_ascending:
+                    data = data.iloc[::-1].reset_index(drop=True)
+            
+                # Create chart based on selected chart type
+                chart_title = f"{data_category} by {measure}"
+            
+                # Get colors for the chart
+                colors = self.chart_canvas.get_colors()
+            
+                # Create the appropriate chart type
+                if chart_type == "Bar Chart":
+                    self._create_bar_chart(ax, data, category_column, measure, colors, show_values, chart_title)
+                elif chart_type == "Horizontal Bar":
+                    self._create_horizontal_bar_chart(ax, data, category_column, measure, colors, show_values, chart_title)
+                elif chart_type == "Pie Chart":
+                    self._create_pie_chart(ax, data, category_column, measure, colors, show_values, chart_title)
+                elif chart_type == "Line Chart":
+                    self._create_line_chart(ax, data, category_column, measure, colors, show_values, chart_title)
+                else:
+                    self._create_scatter_chart(ax, data, category_column, measure, colors, show_values, chart_title)
             
-            # Adjust layout
-            self.chart_canvas.fig.tight_layout()
+                # Adjust layout
+                self.chart_canvas.fig.tight_layout()
             
             # Refresh the canvas
-            self.chart_canvas.draw()
+            with stage_timer.stage('chart_draw'):
+                self.chart_canvas.draw()
             
             if self.debug:
                 print(f"Chart updated: {chart_type} for {data_category} by {measure}")
@@ -719,6 +835,8 @@ class MainWindow(QMainWindow):
     
     def _create_bar_chart(self, ax, data, category_column, measure, colors, show_values, chart_title):
         """Create a bar chart with the given data."""
+        from matplotlib.artist import setp
+        
         # Create list of colors by cycling through the palette
         bar_colors = [colors[i % len(colors)] for i in range(len(data))]
         
@@ -728,7 +846,7 @@ class MainWindow(QMainWindow):
         # Set labels and title
         ax.set_ylabel(f'{measure.replace("_", " ").title()}')
         ax.set_title(chart_title)
-        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        setp(ax.get_xticklabels(), rotation=45, ha='right')
                 
         # Add values on top of bars if requested
         if show_values:
@@ -809,6 +927,7 @@ class MainWindow(QMainWindow):
                 
     def _create_line_chart(self, ax, data, category_column, measure, colors, show_values, chart_title):
         """Create a line chart with the given data."""
+        from matplotlib.artist import setp
         style = self.chart_canvas.style_presets['default']
         
         if category_column == 'DATE':
@@ -843,7 +962,7 @@ class MainWindow(QMainWindow):
             # Set labels and title
                 ax.set_ylabel(f'{measure.replace("_", " ").title()}')
                 ax.set_title(f'{chart_title} Trends')
-                plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+                setp(ax.get_xticklabels(), rotation=45, ha='right')
             
             else:
             # For non-date categories, create points at regular intervals
@@ -881,10 +1000,11 @@ class MainWindow(QMainWindow):
             # Set labels and title
             ax.set_ylabel(f'{measure.replace("_", " ").title()}')
             ax.set_title(f'{chart_title} Trends')
-            plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+            setp(ax.get_xticklabels(), rotation=45, ha='right')
     
     def _create_scatter_chart(self, ax, data, category_column, measure, colors, show_values, chart_title):
         """Create a scatter chart with the given data."""
+        from matplotlib.artist import setp
         style = self.chart_canvas.style_presets['default']
         
         # Plot each point with a different color
@@ -909,7 +1029,7 @@ class MainWindow(QMainWindow):
         # Set labels and title
                 ax.set_ylabel(f'{measure.replace("_", " ").title()}')
                 ax.set_title(f'{chart_title} Comparison')
-                plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+                setp(ax.get_xticklabels(), rotation=45, ha='right')
                 
                 # Add values on data points if requested
             if show_values:
@@ -1234,14 +1354,24 @@ class MainWindow(QMainWindow):
         self.update_analysis_view()
         
         # Update the chart if the chart selector exists
-        if hasattr(self, 'chart_type_selector') and hasattr(self, 'mpl_canvas'):
+        if self._charts_tab_built:
             self.update_chart()
 
     def update_analysis_view(self):
         """Update the analysis view based on the selected analysis type."""
+        # Not decorated with stage_timer.timed: the selector's signal passes an index
+        with stage_timer.stage('analysis_view'):
+            self._update_analysis_view()
+
+    def _update_analysis_view(self):
+        """Rebuild the analysis view; called by update_analysis_view."""
         if self.debug:
             print("\n--- UPDATE ANALYSIS VIEW ---")
         
+        if self.history_window is not None:
+            self._update_history_analysis_view()
+            return
+        
         if not hasattr(self, 'processed_data') or self.processed_data is None:
             if self.debug:
                 print("No processed data available, showing empty message")
@@ -1256,7 +1386,15 @@ class MainWindow(QMainWindow):
         if self.debug:
             print(f"Selected analysis type: {analysis_type}")
         
-        df = self.analysis_data.copy() if hasattr(self, 'analysis_data') and self.analysis_data is not None else self.processed_data.copy()
+        source = self.analysis_data if hasattr(self, 'analysis_data') and self.analysis_data is not None else self.processed_data
+        df = source.copy()
+        
+        # A new source frame invalidates cached report fragments
+        if source is not self._analyzed_source:
+            self._analyzed_source = source
+            self._data_version += 1
+            self.cancel_report()
+            self._report_cache.clear()
         
         if self.debug:
             print(f"Using data source: {'analysis_data' if hasattr(self, 'analysis_data') and self.analysis_data is not None else 'processed_data'}")
@@ -1327,6 +1465,20 @@ class MainWindow(QMainWindow):
                 result = analysis_results['date_totals']
                 if self.debug:
                     print(f"Selected 'date_totals' with shape {result.shape}")
+            elif analysis_type in ("Player Percentiles", "Chest Percentiles"):
+                result = analysis_results[self.ANALYSIS_VIEW_KEYS[analysis_type]]
+                if self.debug:
+                    print(f"Selected '{self.ANALYSIS_VIEW_KEYS[analysis_type]}' with shape {result.shape}")
+            elif analysis_type == "Clan Comparison":
+                version, result = self._clan_comparison
+                if version != self._data_version:
+                    # Comparing many clans takes a while; show the result once the worker thread has it
+                    self._start_clan_comparison(df)
+                    result = pd.DataFrame({"Message": ["Comparing clans..."]})
+                else:
+                    analysis_results['clan_comparison'] = result
+                if self.debug:
+                    print(f"Selected 'clan_comparison' with shape {result.shape}")
             else:
                 # Default to player overview
                 result = analysis_results['player_overview']
@@ -1336,9 +1488,10 @@ class MainWindow(QMainWindow):
             # Update the analysis table
             if self.debug:
                 print(f"Creating table model with {len(result)} rows and {len(result.columns)} columns")
-            model = CustomTableModel(result)
-            self.analysis_view.setModel(model)
-            self.analysis_view.resizeColumnsToContents()
+            with stage_timer.stage('model_build', rows=len(result), table=analysis_type):
+                model = CustomTableModel(result)
+                self.analysis_view.setModel(model)
+                self.analysis_view.resizeColumnsToContents()
             
             # Store the analysis results for chart generation
             self.analysis_results = analysis_results
@@ -1360,6 +1513,191 @@ class MainWindow(QMainWindow):
         if self.debug:
             print("--- UPDATE ANALYSIS VIEW COMPLETE ---\n")
 
+    def _start_clan_comparison(self, df):
+        """
+        Compare the clans of df on a worker thread.
+        
+        Args:
+            df (pandas.DataFrame): Analyzed data of the current data version
+        """
+        # A running comparison is shown or redone for the current data when it finishes
+        if self._clan_task is not None and self._clan_task.is_running():
+            return
+        
+        version = self._data_version
+        
+        def compare_clans(task):
+            return version, self.clan_analyzer.comparison(df)
+        
+        self.statusBar().showMessage("Comparing clans...")
+        self._clan_task = BackgroundTask(compare_clans, debug=self.debug)
+        self._clan_task.finished.connect(self._on_clan_comparison_finished)
+        self._clan_task.failed.connect(self._on_clan_comparison_failed)
+        self._clan_task.start()
+
+    def _on_clan_comparison_finished(self, outcome):
+        """Cache a finished clan comparison and show it if it is still selected."""
+        if outcome[0] == self._data_version:
+            self._clan_comparison = outcome
+        if self.history_window is None and self.analysis_selector.currentText() == "Clan Comparison":
+            self.update_analysis_view()
+
+    def _on_clan_comparison_failed(self, message):
+        """Handle an error raised while comparing clans."""
+        log_error(f"Error comparing clans: {message}", show_traceback=False)
+        self.statusBar().showMessage(f"Error in analysis: {message}")
+
+    # Analysis result shown for each entry of the analysis selector
+    ANALYSIS_VIEW_KEYS = {
+        "Player Overview": 'player_overview',
+        "Player Totals": 'player_totals',
+        "Chest Totals": 'chest_totals',
+        "Source Totals": 'source_totals',
+        "Date Totals": 'date_totals',
+        "Player Percentiles": 'player_quantiles',
+        "Chest Percentiles": 'chest_quantiles',
+        "Clan Comparison": 'clan_comparison',
+    }
+
+    # Rank change comparisons: days before the latest data, None for the previous import
+    RANK_CHANGE_PERIODS = {
+        "Previous import": None,
+        "Yesterday": 1,
+        "Last week": 7,
+        "Last month": 28,
+    }
+
+    def history_store(self):
+        """
+        Get the history database, opening it on first use.
+
+        Returns:
+            HistoryStore: The store, or None if it could not be opened
+        """
+        if self._history_store is None:
+            path = self.config_manager.get_history_path()
+            try:
+                self._history_store = HistoryStore(path)
+            except Exception as e:
+                log_error(f"Error opening history database {path}", e)
+                self.show_error_dialog("History Error", f"Could not open the history database: {str(e)}")
+                return None
+            if self.debug:
+                print(f"Opened history database {path} with {self._history_store.row_count()} rows")
+        return self._history_store
+
+    def _refresh_history_info(self):
+        """Show the size and date range of the history and move the date window inside it."""
+        store = self.history_store()
+        if store is None:
+            return
+        first, last = store.date_range()
+        if first is None:
+            self.history_info_label.setText("The history is empty.")
+            return
+        self.history_info_label.setText(
+            f"{store.row_count():,} chests from {first:%Y-%m-%d} to {last:%Y-%m-%d}"
+        )
+        first, last = QDate(first.year, first.month, first.day), QDate(last.year, last.month, last.day)
+        self.history_start_date.setDateRange(first, last)
+        self.history_end_date.setDateRange(first, last)
+        if not self._history_dates_initialized:
+            # The window starts out covering the whole history
+            self._history_dates_initialized = True
+            self.history_start_date.setDate(first)
+            self.history_end_date.setDate(last)
+
+    def add_to_history(self):
+        """Add the rows of the loaded file to the history database."""
+        if self.raw_data is None:
+            self.statusBar().showMessage("No data loaded to add to the history.", 3000)
+            return
+        store = self.history_store()
+        if store is None:
+            return
+        try:
+            processed = DataProcessor.process_data(self.raw_data)
+            rows = store.ingest(processed, source=getattr(self, 'last_loaded_file', None),
+                                clan=clan_values(self.raw_data, processed))
+        except Exception as e:
+            log_error("Error adding data to the history", e)
+            self.show_error_dialog("History Error", f"Could not add the data to the history: {str(e)}")
+            return
+        self._refresh_history_info()
+        self.statusBar().showMessage(
+            f"Added {rows:,} rows to the history ({len(processed) - rows:,} already stored).", 5000)
+
+    def show_history_window(self):
+        """Analyze the history between the selected dates instead of the loaded file."""
+        if self.history_store() is None:
+            return
+        if not self._history_dates_initialized:
+            self._refresh_history_info()
+        start = self.history_start_date.date().toString("yyyy-MM-dd")
+        end = self.history_end_date.date().toString("yyyy-MM-dd")
+        if start > end:
+            start, end = end, start
+        self.history_window = (start, end)
+        self.show_loaded_data_button.setEnabled(self.raw_data is not None)
+        self.update_analysis_view()
+        if self._charts_tab_built:
+            self.update_chart()
+
+    def show_rank_changes(self):
+        """Show how the players' history ranks moved, from the stored leaderboard snapshots."""
+        store = self.history_store()
+        if store is None:
+            return
+        period = self.rank_changes_selector.currentText()
+        try:
+            changes, compared_with = store.rank_changes(self.RANK_CHANGE_PERIODS.get(period))
+        except Exception as e:
+            log_error("Error reading the leaderboard", e)
+            self.statusBar().showMessage(f"Error reading the leaderboard: {str(e)}")
+            return
+        with stage_timer.stage('model_build', rows=len(changes), table='rank_changes'):
+            self.analysis_view.setModel(CustomTableModel(changes))
+            self.analysis_view.resizeColumnsToContents()
+        self.statusBar().showMessage(f"Rank changes of {len(changes):,} players since {compared_with}")
+
+    def show_loaded_data(self):
+        """Analyze the loaded file again after showing the history."""
+        self.history_window = None
+        self.show_loaded_data_button.setEnabled(False)
+        self.update_analysis_view()
+        if self._charts_tab_built:
+            self.update_chart()
+
+    def _update_history_analysis_view(self):
+        """Show the analysis of the history window; aggregation runs in SQLite."""
+        store = self.history_store()
+        if store is None:
+            return
+        start, end = self.history_window
+        analysis_type = self.analysis_selector.currentText()
+        try:
+            analysis_results = store.analysis_results(start, end)
+            if analysis_type == "Clan Comparison":
+                analysis_results['clan_comparison'] = store.clan_comparison(start, end)
+        except Exception as e:
+            log_error("Error querying the history", e)
+            self.statusBar().showMessage(f"Error querying the history: {str(e)}")
+            return
+
+        # History results replace those of the loaded file, so cached report fragments are stale
+        self._analyzed_source = None
+        self._data_version += 1
+        self.cancel_report()
+        self._report_cache.clear()
+
+        result = analysis_results[self.ANALYSIS_VIEW_KEYS.get(analysis_type, 'player_overview')]
+        with stage_timer.stage('model_build', rows=len(result), table=analysis_type):
+            model = CustomTableModel(result)
+            self.analysis_view.setModel(model)
+            self.analysis_view.resizeColumnsToContents()
+        self.analysis_results = analysis_results
+        self.statusBar().showMessage(f"History {start} to {end}: {analysis_type}")
+
     def filter_analysis_data(self):
         """Apply filters to the analysis data."""
         # Similar to filter_raw_data, but for the analysis table
@@ -1512,29 +1850,30 @@ class MainWindow(QMainWindow):
 
     def _create_raw_data_model(self):
         """Create and set the model for the raw data table."""
-        from modules.customtablemodel import CustomTableModel
-        from PySide6.QtCore import QSortFilterProxyModel
-        
-        # Create a model for the raw data table
-        source_model = CustomTableModel(self.processed_data)
-        
-        # Create a proxy model for sorting and filtering
-        self.raw_data_proxy_model = QSortFilterProxyModel()
-        self.raw_data_proxy_model.setSourceModel(source_model)
+        from modules.customtablemodel import CustomTableModel, TimedSortProxyModel
         
-        # Set the proxy model for the table
-        if hasattr(self, 'raw_data_table'):
-            self.raw_data_table.setModel(self.raw_data_proxy_model)
+        with stage_timer.stage('model_build', rows=len(self.processed_data), table='raw_data'):
+            # Create a model for the raw data table
+            source_model = CustomTableModel(self.processed_data)
             
-            # Enable sorting
-            self.raw_data_table.setSortingEnabled(True)
+            # Create a proxy model for sorting and filtering
+            self.raw_data_proxy_model = TimedSortProxyModel()
+            self.raw_data_proxy_model.setSourceModel(source_model)
+            self.raw_data_proxy_model.setSortRole(Qt.UserRole)
             
-            # Resize columns to content
-            self.raw_data_table.resizeColumnsToContents()
-            
-            if self.debug:
-                print(f"Created raw data model with {len(self.processed_data)} rows and {len(self.processed_data.columns)} columns")
-                print(f"Set up proxy model for raw data table for sorting and filtering")
+            # Set the proxy model for the table
+            if hasattr(self, 'raw_data_table'):
+                self.raw_data_table.setModel(self.raw_data_proxy_model)
+                
+                # Enable sorting
+                self.raw_data_table.setSortingEnabled(True)
+                
+                # Resize columns to content
+                self.raw_data_table.resizeColumnsToContents()
+                
+                if self.debug:
+                    print(f"Created raw data model with {len(self.processed_data)} rows and {len(self.processed_data.columns)} columns")
+                    print(f"Set up proxy model for raw data table for sorting and filtering")
     def setup_ui_components(self):
         """Set up the UI components."""
         # Create central widget and main layout
@@ -1555,12 +1894,14 @@ class MainWindow(QMainWindow):
         self.charts_tab = QWidget()
         self.report_tab = QWidget()
         
-        # Setup tabs
+        # Setup tabs. The Charts and Report tabs stay empty until they are
+        # first shown (see _on_tab_changed), so sessions that only import and
+        # export never build their widgets or load matplotlib.
         self.setup_import_tab()
         self.setup_raw_data_tab()
         self.setup_analysis_tab()
-        self.setup_charts_tab()
-        self.setup_report_tab()
+        self._charts_tab_built = False
+        self._report_tab_built = False
         
         # Add tabs to widget
         self.tab_widget.addTab(self.import_tab, "Import")
@@ -1568,6 +1909,7 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(self.analysis_tab, "Analysis")
         self.tab_widget.addTab(self.charts_tab, "Charts")
         self.tab_widget.addTab(self.report_tab, "Report")
+        self.tab_widget.currentChanged.connect(self._on_tab_changed)
         
         # Initially disable all tabs except Import (index 0)
         self.disable_tabs_except_import()
@@ -1581,6 +1923,11 @@ class MainWindow(QMainWindow):
         # Create status bar
         self.statusBar().showMessage("Ready")
         
+        # Duration of the last top-level pipeline stage, shown while timing is on
+        self.timing_label = QLabel()
+        self.timing_label.setVisible(False)
+        self.statusBar().addPermanentWidget(self.timing_label)
+        
         if self.debug:
             print("UI components initialized")
             
@@ -1782,7 +2129,10 @@ class MainWindow(QMainWindow):
             "Player Totals",
             "Chest Totals",
             "Source Totals",
-            "Date Totals"
+            "Date Totals",
+            "Player Percentiles",
+            "Chest Percentiles",
+            "Clan Comparison"
         ])
         view_layout.addWidget(self.analysis_selector)
         filter_layout.addLayout(view_layout)
@@ -1837,10 +2187,54 @@ class MainWindow(QMainWindow):
         export_layout = QHBoxLayout()
         self.export_analysis_button = QPushButton("Export to CSV")
         export_layout.addWidget(self.export_analysis_button)
+        self.export_workbook_button = QPushButton("Export Workbook")
+        export_layout.addWidget(self.export_workbook_button)
         filter_layout.addLayout(export_layout)
         
         filter_group.setLayout(filter_layout)
         left_layout.addWidget(filter_group, 1)  # Set stretch factor to 1 to use all available space
+        
+        # History controls: store imports and analyze any date window of them
+        history_group = QGroupBox("History")
+        history_layout = QVBoxLayout(history_group)
+        self.history_info_label = QLabel("Add imports to the history to analyze several files together.")
+        self.history_info_label.setWordWrap(True)
+        history_layout.addWidget(self.history_info_label)
+        
+        window_layout = QGridLayout()
+        window_layout.addWidget(QLabel("From:"), 0, 0)
+        self.history_start_date = QDateEdit()
+        self.history_start_date.setCalendarPopup(True)
+        self.history_start_date.setDisplayFormat("yyyy-MM-dd")
+        self.history_start_date.setDate(QDate.currentDate().addMonths(-3))
+        window_layout.addWidget(self.history_start_date, 0, 1)
+        window_layout.addWidget(QLabel("To:"), 1, 0)
+        self.history_end_date = QDateEdit()
+        self.history_end_date.setCalendarPopup(True)
+        self.history_end_date.setDisplayFormat("yyyy-MM-dd")
+        self.history_end_date.setDate(QDate.currentDate())
+        window_layout.addWidget(self.history_end_date, 1, 1)
+        history_layout.addLayout(window_layout)
+        
+        history_buttons = QHBoxLayout()
+        self.add_to_history_button = QPushButton("Add to History")
+        self.show_history_button = QPushButton("Show History")
+        self.show_loaded_data_button = QPushButton("Show Loaded File")
+        self.show_loaded_data_button.setEnabled(False)
+        history_buttons.addWidget(self.add_to_history_button)
+        history_buttons.addWidget(self.show_history_button)
+        history_buttons.addWidget(self.show_loaded_data_button)
+        history_layout.addLayout(history_buttons)
+        
+        rank_layout = QHBoxLayout()
+        rank_layout.addWidget(QLabel("Rank changes since:"))
+        self.rank_changes_selector = QComboBox()
+        self.rank_changes_selector.addItems(list(self.RANK_CHANGE_PERIODS))
+        rank_layout.addWidget(self.rank_changes_selector, 1)
+        self.show_rank_changes_button = QPushButton("Show")
+        rank_layout.addWidget(self.show_rank_changes_button)
+        history_layout.addLayout(rank_layout)
+        left_layout.addWidget(history_group, 0)
         left_layout.addStretch(0)  # Reduce the stretch factor to 0
         
         # Add left panel to splitter
@@ -1980,6 +2374,7 @@ class MainWindow(QMainWindow):
         chart_layout = QVBoxLayout(chart_container)
         chart_layout.setContentsMargins(0, 0, 0, 0)
         
+        from .mplcanvas import MplCanvas
         self.chart_canvas = MplCanvas(width=8, height=6, dpi=100)
         chart_layout.addWidget(self.chart_canvas)
         
@@ -2012,8 +2407,6 @@ class MainWindow(QMainWindow):
         displaying the generated report. Also includes buttons for generating
         and exporting reports.
         """
-        # Create report tab widget if it doesn't exist
-        self.report_tab = QWidget()
         main_layout = QVBoxLayout(self.report_tab)
         main_layout.setContentsMargins(10, 10, 10, 10)
         main_layout.setSpacing(10)
@@ -2060,6 +2453,11 @@ class MainWindow(QMainWindow):
         self.generate_report_button = QPushButton("Generate Report")
         button_layout.addWidget(self.generate_report_button)
 
+        # Cancel button, enabled while a report is being generated
+        self.cancel_report_button = QPushButton("Cancel")
+        self.cancel_report_button.setEnabled(False)
+        button_layout.addWidget(self.cancel_report_button)
+
         # Export report button
         self.export_report_button = QPushButton("Export Report")
         button_layout.addWidget(self.export_report_button)
@@ -2102,9 +2500,6 @@ class MainWindow(QMainWindow):
         
         # Add the report view to the main layout
         main_layout.addWidget(self.report_view)
-        
-        # Add the report tab to the main tab widget
-        self.tab_widget.addTab(self.report_tab, "Report")
 
     def generate_chart_for_report(self, chart_type, category_field, title):
         """
@@ -2121,403 +2516,71 @@ class MainWindow(QMainWindow):
         Returns:
             str: The path to the generated chart image file, or None on failure
         """
+        from .reportcharts import ReportChartRenderer
+        renderer = ReportChartRenderer(self.analysis_results, debug=self.debug)
+        return renderer.render(chart_type, category_field, title)
+
+    def update_available_measures(self):
+        """
+        Update the available measures in the chart_data_column dropdown based on the selected data category.
+        This method is called when the data category is changed.
+        """
+        if not hasattr(self, 'chart_data_column'):
+            return
+            
+        # Remember current selection if possible
         try:
-            # Create a temporary file for the chart
-            temp_file = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-            temp_file.close()
-            
-            # Create a temporary canvas to use its styling
-            temp_canvas = MplCanvas(width=10, height=6)
-            style = temp_canvas.style_presets['default']
-            
-            # Reset matplotlib's global parameters and create a new figure
-            plt.rcdefaults()
-            fig = plt.figure(figsize=(10, 6), facecolor=style['bg_color'])
-            ax = fig.add_subplot(111)
-            
-            # Apply consistent styling to the axes
-            ax.set_facecolor(style['bg_color'])
-            ax.tick_params(axis='both', colors=style['text_color'], labelcolor=style['text_color'])
-            ax.xaxis.label.set_color(style['text_color'])
-            ax.yaxis.label.set_color(style['text_color'])
-            ax.title.set_color(style['title_color'])
-            
-            # Set spine colors to match theme
-            for spine in ax.spines.values():
-                spine.set_color(style['grid_color'])
-            
-            # Clear any existing text objects
-            for text in ax.texts:
-                text.remove()
-            
-            # Get our standard color palette
-            colors = temp_canvas.get_colors()
-            
-            # Get appropriate dataset based on category_field
-            df = self._get_report_chart_data(category_field)
-            if df is None or df.empty:
-                return None
+            current_selection = self.chart_data_column.currentText()
+        except:
+            current_selection = ""
             
-            # Set measure based on chart type and category_field
-            measure = self._get_report_chart_measure(category_field)
-            if measure not in df.columns:
-                if self.debug:
-                    print(f"Measure {measure} not found in data: {df.columns.tolist()}")
-                    print(f"Data types: {df.dtypes}")
-                    # Print the first few rows to see what we're dealing with
-                    print(f"Data sample:\n{df.head(3)}")
-                return None
+        # Block signals to prevent triggering updates during population
+        was_blocked = self.chart_data_column.signalsBlocked()
+        self.chart_data_column.blockSignals(True)
+        
+        try:
+            # First, clear the current options
+            self.chart_data_column.clear()
             
-            # Create the chart based on chart_type
-            if chart_type == 'Bar Chart':
-                self._create_report_bar_chart(ax, df, category_field, measure, colors, title)
-            elif chart_type == 'Pie Chart':
-                self._create_report_pie_chart(ax, df, category_field, measure, colors, title)
-            elif chart_type == 'Line Chart':
-                self._create_report_line_chart(ax, df, category_field, measure, colors, title)
-            elif chart_type == 'Scatter Chart':
-                self._create_report_scatter_chart(ax, df, category_field, measure, colors, title)
-            elif chart_type == 'Bubble Chart':
-                self._create_report_bubble_chart(ax, df, category_field, colors, title)
-            
-            # Setup grid
-            ax.grid(True, color=style['grid_color'], linestyle='--', alpha=0.3)
-            
-            # Adjust layout and save
-            plt.tight_layout()
-            plt.savefig(
-                temp_file.name, 
-                format='png', 
-                dpi=150, 
-                bbox_inches='tight', 
-                facecolor=style['bg_color'], 
-                edgecolor='none'
-            )
-            plt.close()
+            # Get the selected data category
+            data_category = self.chart_data_category.currentText()
             
-            return temp_file.name
+            # Default measure available for all categories
+            self.chart_data_column.addItem("SCORE")
             
-        except Exception as e:
-            print(f"Error generating chart for report: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-    
-    def _get_report_chart_data(self, category_field):
-        """Get the appropriate dataset for a report chart based on category field."""
-        if category_field == 'PLAYER':
-            if 'player_totals' in self.analysis_results and not self.analysis_results['player_totals'].empty:
-                return self.analysis_results['player_totals'].copy()
-        elif category_field == 'CHEST':
-            if 'chest_totals' in self.analysis_results and not self.analysis_results['chest_totals'].empty:
-                return self.analysis_results['chest_totals'].copy()
-        elif category_field == 'SOURCE':
-            if 'source_totals' in self.analysis_results and not self.analysis_results['source_totals'].empty:
-                return self.analysis_results['source_totals'].copy()
-        elif category_field == 'DATE':
-            if 'date_totals' in self.analysis_results and not self.analysis_results['date_totals'].empty:
-                return self.analysis_results['date_totals'].copy()
-        return None
-    
-    def _get_report_chart_measure(self, category_field):
-        """Get the appropriate measure for a report chart based on category field."""
-        if category_field == 'PLAYER':
-            return 'TOTAL_SCORE'
-        else:
-            return 'SCORE'
-    
-    def _create_report_bar_chart(self, ax, df, category_field, measure, colors, title):
-        """Create a bar chart for a report."""
-        # Sort and limit data to top 15 for readability
-        data = df.sort_values(measure, ascending=False).head(15)
-        
-        # Create list of colors by cycling through the palette
-        bar_colors = [colors[i % len(colors)] for i in range(len(data))]
-        
-        # Create the bar chart
-        bars = ax.bar(data[category_field], data[measure], color=bar_colors)
-        
-        # Set labels and title
-        ax.set_ylabel('Score', color=colors[0])
-        ax.set_title(title, color=colors[0], fontsize=14)
-        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+            # Add specific measures based on the data category
+            if data_category == "PLAYER":
+                # Add standard measures
+                self.chart_data_column.addItem("TOTAL_SCORE")
+                self.chart_data_column.addItem("CHEST_COUNT")
+                
+                # Add source columns from player_overview if available
+                if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'player_overview' in self.analysis_results and not self.analysis_results['player_overview'].empty:
+                    # Get all columns except PLAYER, TOTAL_SCORE, and CHEST_COUNT
+                    # These should be the source columns (Guild, Battle, Event, etc.)
+                    source_columns = [col for col in self.analysis_results['player_overview'].columns 
+                                     if col not in ['PLAYER', 'TOTAL_SCORE', 'CHEST_COUNT']]
                     
-         # Add values on top of bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(
-                bar.get_x() + bar.get_width()/2.,
-                height,
-                f'{height:,.0f}',
-                                  ha='center',
-                va='bottom',
-                color='white',
-                fontweight='bold'
-            )
-    
-    def _create_report_pie_chart(self, ax, df, category_field, measure, colors, title):
-        """Create a pie chart for a report."""
-        # Sort and limit data to top 9 + "Others" for readability
-        data = df.sort_values(measure, ascending=False)
-        
-        # Limit to top 9 items + "Others" if there are too many slices
-        pie_data = data
-        if len(data) > 10:
-                top_items = data.iloc[:9].copy()
-                others_sum = data.iloc[9:][measure].sum()
-                others_row = pd.DataFrame({
-                category_field: ['Others'],
-                measure: [others_sum]
-            })
-        pie_data = pd.concat([top_items, others_row]).reset_index(drop=True)
-        
-        # Use multiple colors from the palette (cycle if needed)
-        pie_colors = [colors[i % len(colors)] for i in range(len(pie_data))]
-        
-        # Create the pie chart
-        wedges, texts, autotexts = ax.pie(
-            pie_data[measure].values, 
-            labels=pie_data[category_field].values,
-                        autopct='%1.1f%%', 
-            colors=pie_colors,
-                        startangle=90, 
-            wedgeprops={'edgecolor': '#1A2742', 'linewidth': 1}
-                    )
+                    if self.debug:
+                        print(f"Adding source columns to measures: {source_columns}")
                     
-        # Style the pie chart text
-        for text in texts:
-            text.set_color('white')
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-                        
-        # Set title
-        ax.set_title(title, color=colors[0], fontsize=14)
-    
-    def _create_report_line_chart(self, ax, df, category_field, measure, colors, title):
-        """Create a line chart for a report."""
-        # For date data, ensure it's sorted chronologically
-        if category_field == 'DATE':
-            data = df.sort_values(category_field)
-        else:
-            # For non-date data, sort by measure
-            data = df.sort_values(measure, ascending=False)
-        
-        # If too many points, limit to top 20
-        if len(data) > 20:
-            data = data.head(20)
-        
-        # For non-date categories, use numeric x-axis
-        if category_field != 'DATE':
-            x = np.arange(len(data))
-            line, = ax.plot(
-                x, 
-                data[measure].values,
-                marker='o', 
-                color=colors[1],  # Blue
-                linewidth=2.5, 
-                markersize=8,
-                markerfacecolor=colors[0],  # Gold
-                markeredgecolor='#1A2742'
-            )
-            
-            # Set x-ticks to category names
-            ax.set_xticks(x)
-            ax.set_xticklabels(data[category_field].values)
-        else:
-            # For dates, use actual date values
-            line, = ax.plot(
-                data[category_field].values, 
-                data[measure].values,
-                marker='o', 
-                color=colors[1],  # Blue
-                linewidth=2.5, 
-                markersize=8,
-                markerfacecolor=colors[0],  # Gold
-                markeredgecolor='#1A2742'
-            )
-        
-        # Add values at each point
-        for i, y in enumerate(data[measure].values):
-            if category_field == 'DATE':
-                x_pos = data[category_field].values[i]
-            else:
-                x_pos = i
-            
-            ax.text(
-                x_pos,
-                y,
-                f'{y:,.0f}',
-                ha='center',
-                va='bottom',
-                color='white',
-                fontweight='bold'
-            )
-        
-        # Set labels and title
-        ax.set_ylabel('Score', color='white')
-        ax.set_title(title, color=colors[0], fontsize=14)
-        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
-    
-    def _create_report_scatter_chart(self, ax, df, category_field, measure, colors, title):
-        """Create a scatter chart for a report."""
-        # Sort and limit data
-        data = df.sort_values(measure, ascending=False).head(15)
-        
-        # Plot each point with a different color
-        for i, (category, value) in enumerate(zip(data[category_field].values, data[measure].values)):
-            color_index = i % len(colors)
-            
-            # Add the scatter point
-            ax.scatter(i, value, 
-                     color=colors[color_index],
-                     s=100, zorder=10)
-            
-            # Connect points with lines if there are more than one
-            if i > 0:
-                ax.plot([i-1, i], [data[measure].values[i-1], value], 
-                      color=colors[color_index],
-                      linewidth=1.5, alpha=0.7, zorder=5)
-        
-        # Set the x-tick positions and labels
-        ax.set_xticks(range(len(data)))
-        ax.set_xticklabels(data[category_field].values)
-        
-        # Add values on data points
-        for i, value in enumerate(data[measure].values):
-            ax.text(
-                i,
-                value,
-                f'{value:,.0f}',
-                ha='center',
-                va='bottom',
-                color='white',
-                fontweight='bold'
-            )
-        
-        # Set labels and title
-        ax.set_ylabel('Score', color='white')
-        ax.set_title(title, color=colors[0], fontsize=14)
-    
-    def _create_report_bubble_chart(self, ax, df, category_field, colors, title):
-        """
-        Create a bubble chart for reports where the bubble size represents a value.
-        
-        Args:
-            ax: The matplotlib axis to plot on
-            df: The DataFrame containing the data
-            category_field: The category field to use for labels
-            colors: A list of colors to use for the chart
-            title: The title for the chart
-        """
-        if df is None or len(df) == 0:
-            ax.text(0.5, 0.5, "No data available for this chart", 
-                  ha='center', va='center', fontsize=12, color='white')
-            return
-            
-        # For bubble charts, we need player name, CHEST_COUNT (x-axis), TOTAL_SCORE (y-axis)
-        if not all(col in df.columns for col in ['PLAYER', 'CHEST_COUNT', 'TOTAL_SCORE']):
-            missing = [col for col in ['PLAYER', 'CHEST_COUNT', 'TOTAL_SCORE'] if col not in df.columns]
-            ax.text(0.5, 0.5, f"Missing required columns: {', '.join(missing)}", 
-                  ha='center', va='center', fontsize=12, color='white')
-            return
-        
-        # Get the data
-        data = df.sort_values('TOTAL_SCORE', ascending=False).head(20)  # Top 20 players by score
-        
-        # Create a bubble chart - Each point's size represents efficiency (score per chest)
-        # Calculate efficiency (TOTAL_SCORE / CHEST_COUNT)
-        efficiency = data['TOTAL_SCORE'] / data['CHEST_COUNT']
-        
-        # Normalize for bubble size (for better visualization)
-        sizes = 50 * (efficiency / efficiency.max())
-        
-        # Create the scatter plot with varying bubble sizes
-        scatter = ax.scatter(
-            data['CHEST_COUNT'], 
-            data['TOTAL_SCORE'], 
-            s=sizes,  # Bubble size based on efficiency
-            c=colors[0],  # Use first color from the palette
-            alpha=0.6,  # Semi-transparent
-            edgecolors=colors[1]  # Outline with second color
-        )
-        
-        # Add player labels
-        for i, player in enumerate(data['PLAYER']):
-            ax.annotate(
-                player, 
-                (data['CHEST_COUNT'].iloc[i], data['TOTAL_SCORE'].iloc[i]),
-                xytext=(5, 5), textcoords='offset points',
-                color='white', 
-                fontweight='bold'
-            )
-        
-        # Set labels and title
-        ax.set_xlabel('Chest Count', color='white')
-        ax.set_ylabel('Total Score', color='white')
-        ax.set_title(title, color=colors[0], fontsize=14)
-
-    def update_available_measures(self):
-        """
-        Update the available measures in the chart_data_column dropdown based on the selected data category.
-        This method is called when the data category is changed.
-        """
-        if not hasattr(self, 'chart_data_column'):
-            return
-            
-        # Remember current selection if possible
-        try:
-            current_selection = self.chart_data_column.currentText()
-        except:
-            current_selection = ""
-            
-        # Block signals to prevent triggering updates during population
-        was_blocked = self.chart_data_column.signalsBlocked()
-        self.chart_data_column.blockSignals(True)
-        
-        try:
-            # First, clear the current options
-            self.chart_data_column.clear()
-            
-            # Get the selected data category
-            data_category = self.chart_data_category.currentText()
-            
-            # Default measure available for all categories
-            self.chart_data_column.addItem("SCORE")
-            
-            # Add specific measures based on the data category
-            if data_category == "PLAYER":
-                # Add standard measures
-                self.chart_data_column.addItem("TOTAL_SCORE")
-                self.chart_data_column.addItem("CHEST_COUNT")
-                
-                # Add source columns from player_overview if available
-                if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'player_overview' in self.analysis_results and not self.analysis_results['player_overview'].empty:
-                    # Get all columns except PLAYER, TOTAL_SCORE, and CHEST_COUNT
-                    # These should be the source columns (Guild, Battle, Event, etc.)
-                    source_columns = [col for col in self.analysis_results['player_overview'].columns 
-                                     if col not in ['PLAYER', 'TOTAL_SCORE', 'CHEST_COUNT']]
-                    
-                    if self.debug:
-                        print(f"Adding source columns to measures: {source_columns}")
-                    
-                    # Add all source columns as measures
-                    for col in source_columns:
-                        self.chart_data_column.addItem(col)
-                
-                # Add efficiency metric if both TOTAL_SCORE and CHEST_COUNT are available
-                if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'player_totals' in self.analysis_results and not self.analysis_results['player_totals'].empty:
-                    if 'TOTAL_SCORE' in self.analysis_results['player_totals'].columns and 'CHEST_COUNT' in self.analysis_results['player_totals'].columns:
-                        self.chart_data_column.addItem("EFFICIENCY")
-            elif data_category == "CHEST":
-                # Add standard measures for chest category
-                self.chart_data_column.addItem("CHEST_COUNT")
-                self.chart_data_column.addItem("TOTAL_SCORE")
-                
-                # Add efficiency metric if both SCORE and CHEST_COUNT are available
-                if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'chest_totals' in self.analysis_results and not self.analysis_results['chest_totals'].empty:
-                    if 'SCORE' in self.analysis_results['chest_totals'].columns and 'CHEST_COUNT' in self.analysis_results['chest_totals'].columns:
-                        self.chart_data_column.addItem("EFFICIENCY")
+                    # Add all source columns as measures
+                    for col in source_columns:
+                        self.chart_data_column.addItem(col)
+                
+                # Add efficiency metric if both TOTAL_SCORE and CHEST_COUNT are available
+                if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'player_totals' in self.analysis_results and not self.analysis_results['player_totals'].empty:
+                    if 'TOTAL_SCORE' in self.analysis_results['player_totals'].columns and 'CHEST_COUNT' in self.analysis_results['player_totals'].columns:
+                        self.chart_data_column.addItem("EFFICIENCY")
+            elif data_category == "CHEST":
+                # Add standard measures for chest category
+                self.chart_data_column.addItem("CHEST_COUNT")
+                self.chart_data_column.addItem("TOTAL_SCORE")
+                
+                # Add efficiency metric if both SCORE and CHEST_COUNT are available
+                if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'chest_totals' in self.analysis_results and not self.analysis_results['chest_totals'].empty:
+                    if 'SCORE' in self.analysis_results['chest_totals'].columns and 'CHEST_COUNT' in self.analysis_results['chest_totals'].columns:
+                        self.chart_data_column.addItem("EFFICIENCY")
                         
                 # Add additional player-related metrics if available from other analysis results
                 if hasattr(self, 'analysis_results') and self.analysis_results is not None and 'player_overview' in self.analysis_results and not self.analysis_results['player_overview'].empty:
@@ -2655,6 +2718,11 @@ class MainWindow(QMainWindow):
                 # Signal was not connected, which is fine
                 pass
             self.import_area.fileSelected.connect(self.load_csv_file)
+            try:
+                self.import_area.filesSelected.disconnect()
+            except (TypeError, RuntimeError):
+                pass
+            self.import_area.filesSelected.connect(self.load_csv_file)
         
         # Menu actions
         # Create file menu if not already created
@@ -2662,6 +2730,11 @@ class MainWindow(QMainWindow):
             self.file_menu = self.menuBar().addMenu("&File")
             self.action_import_csv = self.file_menu.addAction("&Import CSV")
             self.action_exit = self.file_menu.addAction("E&xit")
+            self.tools_menu = self.menuBar().addMenu("&Tools")
+            self.action_diagnostics = self.tools_menu.addAction("&Diagnostics...")
+            self.action_memory_report = self.tools_menu.addAction("&Memory Report...")
+            self.action_responsiveness_probe = self.tools_menu.addAction("&Responsiveness Probe")
+            self.action_responsiveness_probe.setCheckable(True)
         
         # Connect menu actions
         if hasattr(self, 'action_import_csv'):
@@ -2682,6 +2755,13 @@ class MainWindow(QMainWindow):
                 pass
             self.action_exit.triggered.connect(self.close)
         
+        if hasattr(self, 'action_diagnostics'):
+            self.action_diagnostics.triggered.connect(self.show_diagnostics)
+        if hasattr(self, 'action_memory_report'):
+            self.action_memory_report.triggered.connect(self.show_memory_report)
+        if hasattr(self, 'action_responsiveness_probe'):
+            self.action_responsiveness_probe.toggled.connect(self.set_responsiveness_probe)
+        
         # Raw data filter signals
         if hasattr(self, 'apply_filter_button'):
             self.apply_filter_button.clicked.connect(self.apply_filter)
@@ -2715,64 +2795,84 @@ class MainWindow(QMainWindow):
             self.export_raw_data_button.clicked.connect(self.export_raw_data)
         if hasattr(self, 'export_analysis_button'):
             self.export_analysis_button.clicked.connect(self.export_analysis_data)
+        if hasattr(self, 'export_workbook_button'):
+            self.export_workbook_button.clicked.connect(self.export_workbook)
         
         # Analysis view selector
         if hasattr(self, 'analysis_selector'):
             self.analysis_selector.currentIndexChanged.connect(self.update_analysis_view)
         
-        # Chart signals - connect in a more organized way to prevent redundant updates
-        if hasattr(self, 'chart_data_category'):
-            # When chart data category changes, we need to update measures and sort options first,
-            # then update the chart afterward
-            self.chart_data_category.currentIndexChanged.connect(self._update_chart_options)
-            
-            # Connect chart export buttons if they exist
-            if hasattr(self, 'save_chart_button'):
-                self.save_chart_button.clicked.connect(self.save_chart)
-            if hasattr(self, 'export_chart_data_button'):
-                self.export_chart_data_button.clicked.connect(self.export_chart_data)
-            
-            # Connect all other chart options directly to update_chart
-            options_to_connect = [
-                'chart_data_column', 'chart_type_selector',
-                'chart_sort_column', 'chart_sort_order',
-                'chart_limit_enabled', 'chart_limit_value',
-                'chart_show_values', 'chart_show_grid'
-            ]
-            
-            for option_name in options_to_connect:
-                if hasattr(self, option_name):
-                    option = getattr(self, option_name)
-                    try:
-                        # Try to disconnect first to prevent duplicate connections
-                        if isinstance(option, QComboBox):
-                            option.currentIndexChanged.disconnect()
-                        elif isinstance(option, QCheckBox):
-                            option.stateChanged.disconnect()
-                        elif isinstance(option, QSpinBox):
-                            option.valueChanged.disconnect()
-                    except (TypeError, RuntimeError):
-                        # Signal was not connected, which is fine
-                        pass
-                        
-                    # Now connect the signal
-                    if isinstance(option, QComboBox):
-                        option.currentIndexChanged.connect(self.update_chart)
-                    elif isinstance(option, QCheckBox):
-                        option.stateChanged.connect(self.update_chart)
-                    elif isinstance(option, QSpinBox):
-                        option.valueChanged.connect(self.update_chart)
-                    
-        # Report signals
-        if hasattr(self, 'report_type_selector'):
-            if hasattr(self, 'generate_report_button'):
-                self.generate_report_button.clicked.connect(self.generate_report)
-            if hasattr(self, 'export_report_button'):
-                self.export_report_button.clicked.connect(self.export_report)
+        # History controls
+        if hasattr(self, 'add_to_history_button'):
+            self.add_to_history_button.clicked.connect(self.add_to_history)
+            self.show_history_button.clicked.connect(self.show_history_window)
+            self.show_loaded_data_button.clicked.connect(self.show_loaded_data)
+            self.show_rank_changes_button.clicked.connect(self.show_rank_changes)
+        
+        # Chart and report signals are connected once their tabs are built
+        self._connect_chart_signals()
+        self._connect_report_signals()
         
         if self.debug:
             print("All signals connected")
             
+    def _on_tab_changed(self, index):
+        """Build the Charts or Report tab the first time it is shown."""
+        widget = self.tab_widget.widget(index)
+        if widget is self.charts_tab:
+            self.ensure_charts_tab()
+        elif widget is self.report_tab:
+            self.ensure_report_tab()
+        elif widget is self.analysis_tab and self._history_store is None:
+            # Show what the history holds before the user picks a date window
+            self._refresh_history_info()
+
+    def ensure_charts_tab(self):
+        """Build the Charts tab and connect its signals if that has not happened yet."""
+        if self._charts_tab_built:
+            return
+        self._charts_tab_built = True
+        self.setup_charts_tab()
+        self._connect_chart_signals()
+
+    def ensure_report_tab(self):
+        """Build the Report tab and connect its signals if that has not happened yet."""
+        if self._report_tab_built:
+            return
+        self._report_tab_built = True
+        self.setup_report_tab()
+        self._connect_report_signals()
+
+    def _connect_chart_signals(self):
+        """Connect the Charts tab controls. Does nothing until the tab is built or once connected."""
+        if not hasattr(self, 'chart_data_category') or getattr(self, '_chart_signals_connected', False):
+            return
+        self._chart_signals_connected = True
+        
+        # When chart data category changes, we need to update measures and sort options first,
+        # then update the chart afterward
+        self.chart_data_category.currentIndexChanged.connect(self._update_chart_options)
+        self.save_chart_button.clicked.connect(self.save_chart)
+        self.export_chart_data_button.clicked.connect(self.export_chart_data)
+        
+        # Connect all other chart options directly to update_chart
+        for option in (self.chart_data_column, self.chart_type_selector,
+                       self.chart_sort_column, self.chart_sort_order):
+            option.currentIndexChanged.connect(self.update_chart)
+        for option in (self.chart_limit_enabled, self.chart_show_values, self.chart_show_grid):
+            option.stateChanged.connect(self.update_chart)
+        self.chart_limit_value.valueChanged.connect(self.update_chart)
+
+    def _connect_report_signals(self):
+        """Connect the Report tab controls. Does nothing until the tab is built or once connected."""
+        if not hasattr(self, 'report_type_selector') or getattr(self, '_report_signals_connected', False):
+            return
+        self._report_signals_connected = True
+        
+        self.generate_report_button.clicked.connect(self.generate_report)
+        self.cancel_report_button.clicked.connect(self.cancel_report)
+        self.export_report_button.clicked.connect(self.export_report)
+
     def _update_chart_options(self):
         """
         Handles updates to chart options when the data category changes.
@@ -2825,13 +2925,16 @@ class MainWindow(QMainWindow):
             if self.debug:
                 print("ImportArea not available, can't open file dialog")
 
+    @stage_timer.timed('report_start')
     def generate_report(self):
         """
         Generate a report based on user selections and display it in the report view.
         
         This method creates an HTML report based on the selected report type and
-        inclusion options (charts, tables, statistics). The report is displayed
-        in the report_view component and can be exported using the export_report method.
+        inclusion options (charts, tables, statistics). Sections are rendered on a
+        worker thread and appended to the report_view as they complete; the finished
+        document replaces them once at the end. The report can be exported using the
+        export_report method.
         """
         try:
             # Check if we have analysis results
@@ -2839,6 +2942,11 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Report Generation Error", 
                                    "No analysis results available. Please import and analyze data first.")
                 return
+            
+            # Only one report is generated at a time
+            if self._report_task is not None and self._report_task.is_running():
+                self.statusBar().showMessage("A report is already being generated.", 3000)
+                return
                 
             # Get report type and inclusion options
             report_type = self.report_type_selector.currentText()
@@ -2846,110 +2954,179 @@ class MainWindow(QMainWindow):
             include_tables = self.include_tables_checkbox.isChecked()
             include_stats = self.include_stats_checkbox.isChecked()
             
+            sections = self._report_builder().sections(report_type, include_charts, include_tables, include_stats)
+            
+            def build_report(task):
+                parts = []
+                for done, (name, build_section) in enumerate(sections):
+                    if task.is_cancelled():
+                        return None
+                    task.report_progress(done, len(sections), name)
+                    with stage_timer.stage('report_section', report=report_type, section=name):
+                        html = build_section()
+                    parts.append(html)
+                    task.emit_partial(html)
+                return ReportLayout.render(report_type, "".join(parts))
+            
+            self._report_type_in_progress = report_type
+            self.report_view.clear()
+            self.generate_report_button.setEnabled(False)
+            self.cancel_report_button.setEnabled(True)
+            
             # Update status
             self.statusBar().showMessage(f"Generating {report_type}...")
             
-            # Colors from the dark theme
-            background_color = '#0E1629'    # Dark blue background
-            text_color = '#FFFFFF'          # White text
-            accent_color = '#D4AF37'        # Gold accent
-            border_color = '#2A3F5F'        # Border color
-            bg_light = '#1A2742'            # Lighter background
-            
-            # Generate HTML content based on report type
-            if report_type == "Full Report":
-                html_content = self.create_full_report_html(include_charts, include_tables, include_stats)
-            elif report_type == "Player Performance":
-                html_content = self.create_player_performance_html(include_charts, include_tables, include_stats)
-            elif report_type == "Chest Type Analysis":
-                html_content = self.create_chest_analysis_html(include_charts, include_tables, include_stats)
-            elif report_type == "Source Analysis":
-                html_content = self.create_source_analysis_html(include_charts, include_tables, include_stats)
-            else:
-                html_content = "<h1>Invalid report type selected</h1>"
-                
-            # Ensure the HTML content has proper styling with background color
-            if "<!DOCTYPE html>" not in html_content:
-                # Add proper HTML structure with styling if not already present
-                html_content = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="UTF-8">
-                    <title>Total Battle Analyzer - {report_type}</title>
-                    <style>
-                        body {{
-                            font-family: Arial, sans-serif;
-                            background-color: {background_color};
-                            color: {text_color};
-                            margin: 20px;
-                        }}
-                        h1, h2, h3, h4 {{
-                            color: {accent_color};
-                        }}
-                        .header {{
-                            border-bottom: 2px solid {accent_color};
-                            padding-bottom: 10px;
-                            margin-bottom: 20px;
-                        }}
-                        .section {{
-                            margin-bottom: 30px;
-                            background-color: {bg_light};
-                            padding: 15px;
-                            border-radius: 5px;
-                        }}
-                        table {{
-                            width: 100%;
-                            border-collapse: collapse;
-                            margin: 15px 0;
-                        }}
-                        th, td {{
-                            border: 1px solid {border_color};
-                            padding: 8px;
-                            text-align: left;
-                        }}
-                        th {{
-                            background-color: {background_color};
-                            color: {accent_color};
-                        }}
-                        .chart-container {{
-                            margin: 20px 0;
-                            text-align: center;
-                        }}
-                        .footer {{
-                            margin-top: 30px;
-                            text-align: center;
-                            font-size: 0.8em;
-                            color: {text_color};
-                            border-top: 1px solid {border_color};
-                            padding-top: 10px;
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <div class="header">
-                        <h1>Total Battle Analyzer - {report_type}</h1>
-                        <p>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                    </div>
-                    {html_content}
-                    <div class="footer">
-                        <p>Total Battle Analyzer - Report generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                    </div>
-                </body>
-                </html>
-                """
-                
-            # Display the report in the report view
-            self.report_view.setHtml(html_content)
-            
-            # Update status
-            self.statusBar().showMessage(f"{report_type} generated successfully.", 5000)
+            self._report_task = BackgroundTask(build_report, debug=self.debug)
+            self._report_task.progress.connect(self._on_report_progress)
+            self._report_task.partial.connect(self._on_report_section)
+            self._report_task.finished.connect(self._on_report_finished)
+            self._report_task.failed.connect(self._on_report_failed)
+            self._report_task.cancelled.connect(self._on_report_cancelled)
+            self._report_task.start()
             
         except Exception as e:
             log_error("Error generating report", e)
             QMessageBox.critical(self, "Report Generation Error", 
                                f"An error occurred during report generation: {str(e)}")
             self.statusBar().showMessage("Error generating report.", 5000)
+            self._reset_report_controls()
+
+    def cancel_report(self):
+        """Cancel the report that is currently being generated, if any."""
+        if self._report_task is not None and self._report_task.is_running():
+            self._report_task.cancel()
+            self.statusBar().showMessage("Cancelling report generation...")
+
+    def _on_report_progress(self, done, total, label):
+        """Show report generation progress in the status bar."""
+        self.statusBar().showMessage(
+            f"Generating {self._report_type_in_progress}: {label} ({done + 1}/{total})..."
+        )
+
+    def _on_report_section(self, html):
+        """Append a finished report section to the report view."""
+        with stage_timer.stage('report_display', chars=len(html)):
+            self.report_view.append(html)
+
+    def _on_report_finished(self, html_content):
+        """Display the finished report document."""
+        # Replace the progressively appended sections with the full document
+        with stage_timer.stage('report_display', chars=len(html_content)):
+            self.report_view.setHtml(html_content)
+        self._reset_report_controls()
+        self.statusBar().showMessage(f"{self._report_type_in_progress} generated successfully.", 5000)
+
+    def _on_report_failed(self, message):
+        """Handle an error raised while generating the report."""
+        self._reset_report_controls()
+        log_error(f"Error generating report: {message}", show_traceback=False)
+        QMessageBox.critical(self, "Report Generation Error", 
+                           f"An error occurred during report generation: {message}")
+        self.statusBar().showMessage("Error generating report.", 5000)
+
+    def _on_report_cancelled(self):
+        """Handle a cancelled report."""
+        self._reset_report_controls()
+        self.statusBar().showMessage("Report generation cancelled.", 5000)
+
+    def _reset_report_controls(self):
+        """Re-enable the report controls after a report has finished or stopped."""
+        self.generate_report_button.setEnabled(True)
+        self.cancel_report_button.setEnabled(False)
+
+    def closeEvent(self, event):
+        """Stop any background report generation, export or clan comparison before the window closes."""
+        for task in (self._report_task, self._export_task, self._clan_task):
+            if task is not None and task.is_running():
+                task.cancel()
+                task.wait()
+        stage_timer.remove_listener(self.stage_recorded.emit)
+        if self.responsiveness_probe is not None:
+            self.responsiveness_probe.stop()
+        if self._history_store is not None:
+            self._history_store.close()
+            self._history_store = None
+        super().closeEvent(event)
+
+    def _on_stage_recorded(self, record):
+        """Show the duration of the last top-level pipeline stage in the status bar."""
+        if record['depth'] != 0:
+            return
+        text = f"{record['stage']}: {record['duration_ms']:,.0f} ms"
+        if record['rows'] is not None:
+            text += f" ({record['rows']:,} rows)"
+        self.timing_label.setText(text)
+        self.timing_label.setVisible(True)
+
+    def show_diagnostics(self):
+        """Open the diagnostics dialog with the recorded stage timings."""
+        from modules.diagnosticsdialog import DiagnosticsDialog
+        
+        if self._diagnostics_dialog is None:
+            self._diagnostics_dialog = DiagnosticsDialog(stage_timer, self)
+        self._diagnostics_dialog.set_probe(self.responsiveness_probe)
+        self._diagnostics_dialog.refresh()
+        self._diagnostics_dialog.show()
+        self._diagnostics_dialog.raise_()
+
+    def set_responsiveness_probe(self, enabled):
+        """
+        Start or stop measuring event-loop stalls.
+
+        Measurements are kept when the probe is stopped and shown in the
+        diagnostics dialog; starting it again begins a new measurement.
+
+        Args:
+            enabled (bool): Whether the probe should run
+        """
+        from modules.responsiveness import EventLoopProbe
+        
+        if enabled:
+            if self.responsiveness_probe is None:
+                self.responsiveness_probe = EventLoopProbe(parent=self)
+            self.responsiveness_probe.reset()
+            self.responsiveness_probe.start()
+            self.statusBar().showMessage("Responsiveness probe running", 3000)
+        elif self.responsiveness_probe is not None:
+            self.responsiveness_probe.stop()
+            if self.debug:
+                print(self.responsiveness_probe.to_text())
+        if self._diagnostics_dialog is not None:
+            self._diagnostics_dialog.set_probe(self.responsiveness_probe)
+
+    def memory_report(self):
+        """
+        Build a memory report of every dataset, result and table model the window holds.
+
+        Returns:
+            MemoryReport: The report
+        """
+        objects = {
+            'raw_data': self.raw_data,
+            'processed_data': self.processed_data,
+            'analysis_data': self.analysis_data,
+            'analysis_results': self.analysis_results,
+        }
+        chart_cache = getattr(self, '_chart_data_cache', None)
+        if chart_cache:
+            objects['chart_data_cache'] = chart_cache.get('data')
+        if hasattr(self, 'raw_data_table') and self.raw_data_table.model() is not None:
+            model = self.raw_data_table.model()
+            objects['raw_data_table model'] = model.sourceModel() if hasattr(model, 'sourceModel') else model
+        if hasattr(self, 'analysis_view') and self.analysis_view.model() is not None:
+            objects['analysis_view model'] = self.analysis_view.model()
+        return MemoryReport(objects, self.last_load_memory)
+
+    def show_memory_report(self):
+        """Open the memory report dialog."""
+        from modules.diagnosticsdialog import MemoryReportDialog
+        
+        if self._memory_dialog is None:
+            self._memory_dialog = MemoryReportDialog(self.memory_report, self)
+        else:
+            self._memory_dialog.refresh()
+        self._memory_dialog.show()
+        self._memory_dialog.raise_()
 
     def create_player_performance_html(self, include_charts=True, include_tables=True, include_stats=True):
         """
@@ -2963,206 +3140,7 @@ class MainWindow(QMainWindow):
         Returns:
             str: HTML content for the report
         """
-        # Get current date and time for the report header
-        current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Colors from the dark theme
-        background_color = '#0E1629'    # Dark blue background
-        text_color = '#FFFFFF'          # White text
-        accent_color = '#D4AF37'        # Gold accent
-        border_color = '#2A3F5F'        # Border color
-        bg_light = '#1A2742'            # Lighter background
-
-        # Start with the HTML header and styling
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Total Battle Analyzer - Player Performance</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: {background_color};
-                    color: {text_color};
-                    margin: 20px;
-                }}
-                h1, h2, h3, h4 {{
-                    color: {accent_color};
-                }}
-                .header {{
-                    border-bottom: 2px solid {accent_color};
-                    padding-bottom: 10px;
-                    margin-bottom: 20px;
-                }}
-                .section {{
-                    margin-bottom: 30px;
-                    background-color: {bg_light};
-                    padding: 15px;
-                    border-radius: 5px;
-                }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin: 15px 0;
-                }}
-                th, td {{
-                    border: 1px solid {border_color};
-                    padding: 8px;
-                    text-align: left;
-                }}
-                th {{
-                    background-color: {background_color};
-                    color: {accent_color};
-                }}
-                .chart-container {{
-                    margin: 20px 0;
-                    text-align: center;
-                }}
-                .footer {{
-                    margin-top: 30px;
-                    text-align: center;
-                    font-size: 0.8em;
-                    color: {text_color};
-                    border-top: 1px solid {border_color};
-                    padding-top: 10px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Total Battle Analyzer - Player Performance</h1>
-                <p>Generated on: {current_datetime}</p>
-            </div>
-        """
-
-        # Player Overview Section
-        html += """
-        <div class="section">
-            <h2>Player Overview</h2>
-        """
-
-        if include_stats and 'player_totals' in self.analysis_results:
-            # Add player statistics
-            player_df = self.analysis_results['player_totals']
-            if not player_df.empty:
-                # Use 'SCORE' instead of 'TOTAL_SCORE' for player_totals
-                top_player = player_df.sort_values('SCORE', ascending=False).iloc[0]
-                total_players = len(player_df)
-                avg_score = player_df['SCORE'].mean()
-                
-                html += f"""
-                <p>Total Players: {total_players}</p>
-                <p>Average Score per Player: {avg_score:.2f}</p>
-                <p>Top Player: {top_player['PLAYER']} with {top_player['SCORE']:.2f} points</p>
-                """
-            else:
-                html += "<p>No player data available for statistics</p>"
-                
-        html += "</div>"  # End of Player Overview section
-        
-        # Player Performance Details Section
-        html += """
-        <div class="section">
-            <h2>Player Performance Details</h2>
-        """
-
-        if include_charts and 'player_totals' in self.analysis_results:
-            # Generate bar chart for player performance
-            bar_chart_file = self.generate_chart_for_report('Bar Chart', 'PLAYER', 'Player Total Scores')
-            if bar_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{bar_chart_file}" alt="Player Performance Chart" style="max-width:100%; height:auto;">
-                    <p>Player Total Scores</p>
-                </div>
-                """
-            
-            # Generate bubble chart for player efficiency if we have the necessary data
-            player_df = self.analysis_results['player_totals']
-            if not player_df.empty and 'CHEST_COUNT' in player_df.columns and 'TOTAL_SCORE' in player_df.columns:
-                bubble_chart_file = self.generate_chart_for_report('Bubble Chart', 'PLAYER', 'Player Efficiency')
-                if bubble_chart_file:
-                    html += f"""
-                    <div class="chart-container">
-                        <img src="file:///{bubble_chart_file}" alt="Player Efficiency Chart" style="max-width:100%; height:auto;">
-                        <p>Player Efficiency (Score vs Chest Count)</p>
-                    </div>
-                    """
-            
-            # Generate stacked bar chart for player source breakdown
-            stacked_chart_file = self.generate_chart_for_report('Stacked Bar Chart', 'PLAYER', 'Player Overview')
-            if stacked_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{stacked_chart_file}" alt="Player Source Breakdown" style="max-width:100%; height:auto;">
-                    <p>Player Scores by Source</p>
-                </div>
-                """
-            
-            if not bar_chart_file and (not 'bubble_chart_file' in locals() or not bubble_chart_file) and (not 'stacked_chart_file' in locals() or not stacked_chart_file):
-                html += """
-                <div class="chart-container">
-                    <p>[Could not generate Player Performance Charts]</p>
-                </div>
-                """
-            
-        if include_tables and 'player_totals' in self.analysis_results:
-            # Add player performance table
-            player_df = self.analysis_results['player_totals']
-            if not player_df.empty:
-                # Convert DataFrame to HTML table
-                player_table = player_df.to_html(index=False, classes="table")
-                html += f"""
-                <h3>Player Performance Data</h3>
-                {player_table}
-                """
-            else:
-                html += "<p>No player performance data available</p>"
-                
-        html += "</div>"  # End of Player Performance Details section
-        
-        # Player Efficiency Section
-        html += """
-        <div class="section">
-            <h2>Player Efficiency Analysis</h2>
-        """
-
-        if include_stats and 'player_totals' in self.analysis_results:
-            # Add player efficiency statistics
-            player_df = self.analysis_results['player_totals']
-            if not player_df.empty and 'CHEST_COUNT' in player_df.columns and 'TOTAL_SCORE' in player_df.columns:
-                # Calculate points per chest for each player
-                player_df['POINTS_PER_CHEST'] = player_df['TOTAL_SCORE'] / player_df['CHEST_COUNT'].replace(0, 1)
-                most_efficient_player = player_df.sort_values('POINTS_PER_CHEST', ascending=False).iloc[0]
-                
-                html += f"""
-                <p>Most Efficient Player: {most_efficient_player['PLAYER']} with {most_efficient_player['POINTS_PER_CHEST']:.2f} points per chest</p>
-                """
-                
-                # Show top 5 most efficient players
-                top_5_efficient = player_df.sort_values('POINTS_PER_CHEST', ascending=False).head(5)
-                efficient_table = top_5_efficient[['PLAYER', 'POINTS_PER_CHEST', 'TOTAL_SCORE', 'CHEST_COUNT']].to_html(index=False, classes="table")
-                
-                html += f"""
-                <h3>Top 5 Most Efficient Players</h3>
-                {efficient_table}
-                """
-            else:
-                html += "<p>No player efficiency data available</p>"
-                
-        html += "</div>"  # End of Player Efficiency section
-        
-        # Footer
-        html += f"""
-        <div class="footer">
-            <p>Total Battle Analyzer - Player Performance Report generated on {current_datetime}</p>
-        </div>
-        </body>
-        </html>
-        """
-
-        return html
+        return self._report_builder().build("Player Performance", include_charts, include_tables, include_stats)
 
     def create_full_report_html(self, include_charts, include_tables, include_stats):
         """
@@ -3176,238 +3154,7 @@ class MainWindow(QMainWindow):
         Returns:
             str: HTML content for the report
         """
-        # Get current date and time for the report header
-        current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Colors from the dark theme
-        background_color = '#0E1629'    # Dark blue background
-        text_color = '#FFFFFF'          # White text
-        accent_color = '#D4AF37'        # Gold accent
-        border_color = '#2A3F5F'        # Border color
-        bg_light = '#1A2742'            # Lighter background
-
-        # Start with the HTML header and styling
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Total Battle Analyzer - Full Report</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: {background_color};
-                    color: {text_color};
-                    margin: 20px;
-                }}
-                h1, h2, h3, h4 {{
-                    color: {accent_color};
-                }}
-                .header {{
-                    border-bottom: 2px solid {accent_color};
-                    padding-bottom: 10px;
-                    margin-bottom: 20px;
-                }}
-                .section {{
-                    margin-bottom: 30px;
-                    background-color: {bg_light};
-                    padding: 15px;
-                    border-radius: 5px;
-                }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin: 15px 0;
-                }}
-                th, td {{
-                    border: 1px solid {border_color};
-                    padding: 8px;
-                    text-align: left;
-                }}
-                th {{
-                    background-color: {background_color};
-                    color: {accent_color};
-                }}
-                .chart-container {{
-                    margin: 20px 0;
-                    text-align: center;
-                }}
-                .footer {{
-                    margin-top: 30px;
-                    text-align: center;
-                    font-size: 0.8em;
-                    color: {text_color};
-                    border-top: 1px solid {border_color};
-                    padding-top: 10px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Total Battle Analyzer - Full Report</h1>
-                <p>Generated on: {current_datetime}</p>
-            </div>
-        """
-
-        # Overview Section
-        html += """
-        <div class="section">
-            <h2>Overview</h2>
-        """
-        
-        if include_stats and 'player_totals' in self.analysis_results and 'chest_totals' in self.analysis_results:
-            player_df = self.analysis_results['player_totals']
-            chest_df = self.analysis_results['chest_totals']
-            
-            if not player_df.empty and not chest_df.empty:
-                total_players = len(player_df)
-                total_chest_types = len(chest_df)
-                total_score = player_df['SCORE'].sum() if 'SCORE' in player_df.columns else 0
-                total_chests = chest_df['CHEST_COUNT'].sum() if 'CHEST_COUNT' in chest_df.columns else 0
-                
-                html += f"""
-                <p>Total Players: {total_players}</p>
-                <p>Total Chest Types: {total_chest_types}</p>
-                <p>Total Score: {total_score:,.0f}</p>
-                <p>Total Chests: {total_chests:,.0f}</p>
-                """
-            else:
-                html += "<p>No overview data available</p>"
-                
-        html += "</div>"  # End of Overview section
-        
-        # Player Performance Section
-        html += """
-        <div class="section">
-            <h2>Player Performance</h2>
-        """
-
-        if include_charts and 'player_totals' in self.analysis_results:
-            # Generate bar chart for player performance
-            bar_chart_file = self.generate_chart_for_report('Bar Chart', 'PLAYER', 'Player Total Scores')
-            if bar_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{bar_chart_file}" alt="Player Performance Chart" style="max-width:100%; height:auto;">
-                    <p>Player Total Scores</p>
-                </div>
-                """
-        
-        if include_tables and 'player_totals' in self.analysis_results:
-            # Add player performance table
-            player_df = self.analysis_results['player_totals']
-            if not player_df.empty:
-                # Sort by score descending
-                player_df = player_df.sort_values('SCORE', ascending=False)
-                # Convert DataFrame to HTML table
-                player_table = player_df.to_html(index=False, classes="table")
-                html += f"""
-                <h3>Player Performance Data</h3>
-                {player_table}
-                """
-            else:
-                html += "<p>No player performance data available</p>"
-                
-        html += "</div>"  # End of Player Performance section
-        
-        # Chest Analysis Section
-        html += """
-        <div class="section">
-            <h2>Chest Analysis</h2>
-        """
-
-        if include_charts and 'chest_totals' in self.analysis_results:
-            # Generate pie chart for chest distribution
-            pie_chart_file = self.generate_chart_for_report('Pie Chart', 'CHEST', 'Chest Score Distribution')
-            if pie_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{pie_chart_file}" alt="Chest Distribution Chart" style="max-width:100%; height:auto;">
-                    <p>Chest Score Distribution</p>
-                </div>
-                """
-                
-            # Generate bar chart for chest scores
-            bar_chart_file = self.generate_chart_for_report('Bar Chart', 'CHEST', 'Chest Scores')
-            if bar_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{bar_chart_file}" alt="Chest Scores Chart" style="max-width:100%; height:auto;">
-                    <p>Chest Scores by Type</p>
-                </div>
-                """
-        
-        if include_tables and 'chest_totals' in self.analysis_results:
-            # Add chest analysis table
-            chest_df = self.analysis_results['chest_totals']
-            if not chest_df.empty:
-                # Sort by score descending
-                chest_df = chest_df.sort_values('SCORE', ascending=False)
-                # Convert DataFrame to HTML table
-                chest_table = chest_df.to_html(index=False, classes="table")
-                html += f"""
-                <h3>Chest Analysis Data</h3>
-                {chest_table}
-                """
-            else:
-                html += "<p>No chest analysis data available</p>"
-                
-        html += "</div>"  # End of Chest Analysis section
-        
-        # Source Analysis Section
-        html += """
-        <div class="section">
-            <h2>Source Analysis</h2>
-        """
-
-        if include_charts and 'source_totals' in self.analysis_results:
-            # Generate pie chart for source distribution
-            pie_chart_file = self.generate_chart_for_report('Pie Chart', 'SOURCE', 'Source Score Distribution')
-            if pie_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{pie_chart_file}" alt="Source Distribution Chart" style="max-width:100%; height:auto;">
-                    <p>Source Score Distribution</p>
-                </div>
-                """
-                
-            # Generate bar chart for source scores
-            bar_chart_file = self.generate_chart_for_report('Bar Chart', 'SOURCE', 'Source Scores')
-            if bar_chart_file:
-                html += f"""
-                <div class="chart-container">
-                    <img src="file:///{bar_chart_file}" alt="Source Scores Chart" style="max-width:100%; height:auto;">
-                    <p>Source Scores by Type</p>
-                </div>
-                """
-        
-        if include_tables and 'source_totals' in self.analysis_results:
-            # Add source analysis table
-            source_df = self.analysis_results['source_totals']
-            if not source_df.empty:
-                # Sort by score descending
-                source_df = source_df.sort_values('SCORE', ascending=False)
-                # Convert DataFrame to HTML table
-                source_table = source_df.to_html(index=False, classes="table")
-                html += f"""
-                <h3>Source Analysis Data</h3>
-                {source_table}
-                """
-            else:
-                html += "<p>No source analysis data available</p>"
-                
-        html += "</div>"  # End of Source Analysis section
-        
-        # Footer
-        html += f"""
-        <div class="footer">
-            <p>Total Battle Analyzer - Full Report generated on {current_datetime}</p>
-        </div>
-        </body>
-        </html>
-        """
-
-        return html
+        return self._report_builder().build("Full Report", include_charts, include_tables, include_stats)
 
     def export_report(self):
         """
@@ -3455,6 +3202,7 @@ class MainWindow(QMainWindow):
             
             elif selected_filter == "PDF Files (*.pdf)":
                 # Export as PDF
+                from PySide6.QtPrintSupport import QPrinter
                 printer = QPrinter(QPrinter.HighResolution)
                 printer.setOutputFormat(QPrinter.PdfFormat)
                 printer.setOutputFileName(filepath)
@@ -3482,233 +3230,7 @@ class MainWindow(QMainWindow):
         Returns:
             str: HTML content for the chest analysis report
         """
-        # Colors
-        background_color = '#0E1629'    # Dark blue background
-        text_color = '#FFFFFF'          # White text
-        accent_color = '#D4AF37'        # Gold accent
-        border_color = '#2A3F5F'        # Border color
-        bg_light = '#1A2742'            # Lighter background
-        
-        # Initial HTML structure
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Chest Analysis Report</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: {background_color};
-                    color: {text_color};
-                    padding: 20px;
-                    margin: 0;
-                }}
-                h1, h2, h3 {{
-                    color: {accent_color};
-                }}
-                h1 {{
-                    border-bottom: 2px solid {accent_color};
-                    padding-bottom: 10px;
-                }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin: 20px 0;
-                    background-color: {bg_light};
-                }}
-                th, td {{
-                    padding: 12px;
-                    text-align: left;
-                    border-bottom: 1px solid {border_color};
-                }}
-                th {{
-                    background-color: {bg_light};
-                    color: {accent_color};
-                    font-weight: bold;
-                }}
-                tr:hover {{
-                    background-color: rgba(42, 63, 95, 0.5);
-                }}
-                .chart-container {{
-                    margin: 20px 0;
-                    text-align: center;
-                }}
-                .chart-container img {{
-                    max-width: 100%;
-                    height: auto;
-                    border: 1px solid {border_color};
-                    background-color: {bg_light};
-                    padding: 10px;
-                }}
-                .stats-container {{
-                    display: flex;
-                    flex-wrap: wrap;
-                    justify-content: space-between;
-                    margin: 20px 0;
-                }}
-                .stat-box {{
-                    background-color: {bg_light};
-                    border: 1px solid {border_color};
-                    border-radius: 5px;
-                    padding: 15px;
-                    margin-bottom: 15px;
-                    width: calc(33% - 20px);
-                    box-sizing: border-box;
-                    text-align: center;
-                }}
-                .stat-box p {{
-                    margin: 5px 0;
-                }}
-                .stat-value {{
-                    font-size: 24px;
-                    font-weight: bold;
-                    color: {accent_color};
-                }}
-                .report-section {{
-                    margin: 30px 0;
-                    padding: 20px;
-                    background-color: {bg_light};
-                    border-radius: 5px;
-                    border: 1px solid {border_color};
-                }}
-            </style>
-        </head>
-        <body>
-            <h1>Chest Analysis Report</h1>
-            <p>This report provides an analysis of chest types in Total Battle, including their distribution and value.</p>
-        """
-        
-        # Check if we have analysis results
-        if not self.analysis_results or 'chest_totals' not in self.analysis_results:
-            html += "<p>No chest analysis data available. Please import and analyze data first.</p>"
-            html += "</body></html>"
-            return html
-            
-        # Get chest totals data
-        chest_data = self.analysis_results['chest_totals']
-        
-        # Charts Section
-        if include_charts:
-            html += """
-            <div class="report-section">
-                <h2>Charts</h2>
-            """
-            
-            # Chest by Score Bar Chart
-            if chest_data is not None and not chest_data.empty:
-                chart_path = self.generate_chart_for_report("bar", "CHEST", "Chest Score Distribution")
-                if chart_path:
-                    html += f"""
-                    <div class="chart-container">
-                        <h3>Chest Score Distribution</h3>
-                        <img src="file:///{chart_path}" alt="Chest Score Distribution">
-                    </div>
-                    """
-                    
-                # Chest by Count Bar Chart
-                chart_path = self.generate_chart_for_report("bar", "CHEST", "Chest Count Distribution")
-                if chart_path:
-                    html += f"""
-                    <div class="chart-container">
-                        <h3>Chest Count Distribution</h3>
-                        <img src="file:///{chart_path}" alt="Chest Count Distribution">
-                    </div>
-                    """
-                    
-                # Chest Score Pie Chart
-                chart_path = self.generate_chart_for_report("pie", "CHEST", "Chest Score Proportion")
-                if chart_path:
-                    html += f"""
-                    <div class="chart-container">
-                        <h3>Chest Score Proportion</h3>
-                        <img src="file:///{chart_path}" alt="Chest Score Proportion">
-                    </div>
-                    """
-            else:
-                html += "<p>No chest data available for charts.</p>"
-                
-            html += "</div>"  # End of charts section
-        
-        # Statistics Section
-        if include_stats:
-            html += """
-            <div class="report-section">
-                <h2>Key Statistics</h2>
-            """
-            
-            if chest_data is not None and not chest_data.empty:
-                try:
-                    # Get stats for the section
-                    chest_types = len(chest_data)
-                    total_score = chest_data['SCORE'].sum()
-                    avg_score = chest_data['SCORE'].mean()
-                    max_score = chest_data['SCORE'].max()
-                    top_chest = chest_data.loc[chest_data['SCORE'].idxmax(), 'CHEST']
-                    total_chests = chest_data['CHEST_COUNT'].sum()
-                    
-                    html += f"""
-                    <div class="stats-container">
-                        <div class="stat-box">
-                            <p>Total Chest Types</p>
-                            <p class="stat-value">{chest_types}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Total Score from Chests</p>
-                            <p class="stat-value">{total_score:,.0f}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Average Score per Chest Type</p>
-                            <p class="stat-value">{avg_score:,.1f}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Highest Scoring Chest</p>
-                            <p class="stat-value">{top_chest}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Highest Score Value</p>
-                            <p class="stat-value">{max_score:,.0f}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Total Number of Chests</p>
-                            <p class="stat-value">{total_chests:,.0f}</p>
-                        </div>
-                    </div>
-                    """
-                except Exception as e:
-                    html += f"<p>Error generating statistics: {str(e)}</p>"
-            else:
-                html += "<p>No chest data available for statistics.</p>"
-                
-            html += "</div>"  # End of statistics section
-        
-        # Table Section
-        if include_tables:
-            html += """
-            <div class="report-section">
-                <h2>Chest Data Table</h2>
-            """
-            
-            if chest_data is not None and not chest_data.empty:
-                # Sort by score descending
-                chest_data = chest_data.sort_values('SCORE', ascending=False)
-                
-                # Convert DataFrame to HTML table
-                table_html = chest_data.to_html(index=False)
-                
-                # Improve table styling
-                table_html = table_html.replace('<table', '<table class="data-table"')
-                
-                html += table_html
-            else:
-                html += "<p>No chest data available for table display.</p>"
-                
-            html += "</div>"  # End of table section
-            
-        # Close HTML
-        html += "</body></html>"
-        
-        return html
+        return self._report_builder().build("Chest Type Analysis", include_charts, include_tables, include_stats)
         
     def create_source_analysis_html(self, include_charts=True, include_tables=True, include_stats=True):
         """
@@ -3722,265 +3244,25 @@ class MainWindow(QMainWindow):
         Returns:
             str: HTML content for the source analysis report
         """
-        # Colors
-        background_color = '#0E1629'    # Dark blue background
-        text_color = '#FFFFFF'          # White text
-        accent_color = '#D4AF37'        # Gold accent
-        border_color = '#2A3F5F'        # Border color
-        bg_light = '#1A2742'            # Lighter background
-        
-        # Initial HTML structure
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Source Analysis Report</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: {background_color};
-                    color: {text_color};
-                    padding: 20px;
-                    margin: 0;
-                }}
-                h1, h2, h3 {{
-                    color: {accent_color};
-                }}
-                h1 {{
-                    border-bottom: 2px solid {accent_color};
-                    padding-bottom: 10px;
-                }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin: 20px 0;
-                    background-color: {bg_light};
-                }}
-                th, td {{
-                    padding: 12px;
-                    text-align: left;
-                    border-bottom: 1px solid {border_color};
-                }}
-                th {{
-                    background-color: {bg_light};
-                    color: {accent_color};
-                    font-weight: bold;
-                }}
-                tr:hover {{
-                    background-color: rgba(42, 63, 95, 0.5);
-                }}
-                .chart-container {{
-                    margin: 20px 0;
-                    text-align: center;
-                }}
-                .chart-container img {{
-                    max-width: 100%;
-                    height: auto;
-                    border: 1px solid {border_color};
-                    background-color: {bg_light};
-                    padding: 10px;
-                }}
-                .stats-container {{
-                    display: flex;
-                    flex-wrap: wrap;
-                    justify-content: space-between;
-                    margin: 20px 0;
-                }}
-                .stat-box {{
-                    background-color: {bg_light};
-                    border: 1px solid {border_color};
-                    border-radius: 5px;
-                    padding: 15px;
-                    margin-bottom: 15px;
-                    width: calc(33% - 20px);
-                    box-sizing: border-box;
-                    text-align: center;
-                }}
-                .stat-box p {{
-                    margin: 5px 0;
-                }}
-                .stat-value {{
-                    font-size: 24px;
-                    font-weight: bold;
-                    color: {accent_color};
-                }}
-                .report-section {{
-                    margin: 30px 0;
-                    padding: 20px;
-                    background-color: {bg_light};
-                    border-radius: 5px;
-                    border: 1px solid {border_color};
-                }}
-            </style>
-        </head>
-        <body>
-            <h1>Source Analysis Report</h1>
-            <p>This report provides an analysis of chest sources in Total Battle, including their distribution and value.</p>
-        """
-        
-        # Check if we have analysis results
-        if not self.analysis_results or 'source_totals' not in self.analysis_results:
-            html += "<p>No source analysis data available. Please import and analyze data first.</p>"
-            html += "</body></html>"
-            return html
-            
-        # Get source totals data
-        source_data = self.analysis_results['source_totals']
-        
-        # Charts Section
-        if include_charts:
-            html += """
-            <div class="report-section">
-                <h2>Charts</h2>
-            """
-            
-            # Source by Score Bar Chart
-            if source_data is not None and not source_data.empty:
-                chart_path = self.generate_chart_for_report("bar", "SOURCE", "Source Score Distribution")
-                if chart_path:
-                    html += f"""
-                    <div class="chart-container">
-                        <h3>Source Score Distribution</h3>
-                        <img src="file:///{chart_path}" alt="Source Score Distribution">
-                    </div>
-                    """
-                    
-                # Source by Count Bar Chart
-                chart_path = self.generate_chart_for_report("bar", "SOURCE", "Source Count Distribution")
-                if chart_path:
-                    html += f"""
-                    <div class="chart-container">
-                        <h3>Source Count Distribution</h3>
-                        <img src="file:///{chart_path}" alt="Source Count Distribution">
-                    </div>
-                    """
-                    
-                # Source Score Pie Chart
-                chart_path = self.generate_chart_for_report("pie", "SOURCE", "Source Score Proportion")
-                if chart_path:
-                    html += f"""
-                    <div class="chart-container">
-                        <h3>Source Score Proportion</h3>
-                        <img src="file:///{chart_path}" alt="Source Score Proportion">
-                    </div>
-                    """
-            else:
-                html += "<p>No source data available for charts.</p>"
-                
-            html += "</div>"  # End of charts section
-        
-        # Statistics Section
-        if include_stats:
-            html += """
-            <div class="report-section">
-                <h2>Key Statistics</h2>
-            """
-            
-            if source_data is not None and not source_data.empty:
-                try:
-                    # Get stats for the section
-                    source_types = len(source_data)
-                    total_score = source_data['SCORE'].sum()
-                    avg_score = source_data['SCORE'].mean()
-                    max_score = source_data['SCORE'].max()
-                    top_source = source_data.loc[source_data['SCORE'].idxmax(), 'SOURCE']
-                    total_chests = source_data['CHEST_COUNT'].sum()
-                    
-                    html += f"""
-                    <div class="stats-container">
-                        <div class="stat-box">
-                            <p>Total Source Types</p>
-                            <p class="stat-value">{source_types}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Total Score from Sources</p>
-                            <p class="stat-value">{total_score:,.0f}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Average Score per Source</p>
-                            <p class="stat-value">{avg_score:,.1f}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Highest Scoring Source</p>
-                            <p class="stat-value">{top_source}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Highest Score Value</p>
-                            <p class="stat-value">{max_score:,.0f}</p>
-                        </div>
-                        <div class="stat-box">
-                            <p>Total Number of Chests</p>
-                            <p class="stat-value">{total_chests:,.0f}</p>
-                        </div>
-                    </div>
-                    """
-                except Exception as e:
-                    html += f"<p>Error generating statistics: {str(e)}</p>"
-            else:
-                html += "<p>No source data available for statistics.</p>"
-                
-            html += "</div>"  # End of statistics section
-        
-        # Table Section
-        if include_tables:
-            html += """
-            <div class="report-section">
-                <h2>Source Data Table</h2>
-            """
-            
-            if source_data is not None and not source_data.empty:
-                # Sort by score descending
-                source_data = source_data.sort_values('SCORE', ascending=False)
-                
-                # Convert DataFrame to HTML table
-                table_html = source_data.to_html(index=False)
-                
-                # Improve table styling
-                table_html = table_html.replace('<table', '<table class="data-table"')
-                
-                html += table_html
-            else:
-                html += "<p>No source data available for table display.</p>"
-                
-            html += "</div>"  # End of table section
-            
-        # Close HTML
-        html += "</body></html>"
-        
-        return html
+        return self._report_builder().build("Source Analysis", include_charts, include_tables, include_stats)
 
-    def _apply_report_chart_style(self, fig, ax, style_dict):
-        """
-        Apply consistent styling to report charts.
-        
-        Args:
-            fig: The matplotlib figure
-            ax: The matplotlib axes
-            style_dict: Dictionary with style settings
+    def _report_builder(self):
         """
-        # Set figure background
-        fig.patch.set_facecolor(style_dict['bg_color'])
-        
-        # Set axes background
-        ax.set_facecolor(style_dict['bg_color'])
+        Get a report builder for the current analysis results.
         
-        # Set text colors
-        ax.xaxis.label.set_color(style_dict['text_color'])
-        ax.yaxis.label.set_color(style_dict['text_color'])
-        ax.title.set_color(style_dict['title_color'])
+        The builder shares the window's fragment cache, so sections rendered for
+        one report type or option combination are reused by the next report as
+        long as the underlying data has not changed.
         
-        # Set tick colors and parameters - ensure label color is explicitly set
-        ax.tick_params(axis='both', colors=style_dict['text_color'], 
-                     labelcolor=style_dict['text_color'])
-        
-        # Set spine colors
-        for spine in ax.spines.values():
-            spine.set_color(style_dict['grid_color'])
-            
-        # Clear any existing text objects
-        for text in ax.texts:
-            text.remove()
+        Returns:
+            ReportBuilder: The report builder
+        """
+        return ReportBuilder(
+            self.analysis_results,
+            self.generate_chart_for_report,
+            cache=self._report_cache,
+            data_version=self._data_version
+        )
 
     def _add_styled_text(self, ax, x, y, text, ha='center', va='bottom', fontweight='bold', size=None):
         """
@@ -3999,117 +3281,9 @@ class MainWindow(QMainWindow):
         # Delegate to the MplCanvas add_styled_text method for consistency
         return self.chart_canvas.add_styled_text(ax, x, y, text, ha, va, fontweight, size)
 
-    def reset_report_chart_style(self, canvas_style):
-        """
-        Reset and apply consistent styling to report charts.
-        
-        Args:
-            canvas_style: Dictionary with style settings from the MplCanvas
-        
-        Returns:
-            tuple: The newly created figure and axes
-        """
-        # Reset all of matplotlib's rc parameters to default
-        plt.rcdefaults()
-        
-        # Create a new figure with correct background color
-        fig = plt.figure(figsize=(10, 6), facecolor=canvas_style['bg_color'])
-        ax = fig.add_subplot(111)
-        
-        # Apply consistent styling
-        self._apply_report_chart_style(fig, ax, canvas_style)
-        
-        return fig, ax
-
-    def _add_report_styled_text(self, ax, x, y, text, temp_canvas, ha='center', va='bottom', fontweight='bold', size=None):
-        """
-        Add styled text to a report chart using the temporary canvas for styling information.
-        
-        This method draws text on the chart with styling based on the temporary canvas's style presets.
-        It ensures consistent text appearance across all charts in reports.
-        
-        Args:
-            ax: The matplotlib axis to add the text to
-            x, y: The coordinates for the text
-            text: The text to add
-            temp_canvas: A temporary canvas containing style information
-            ha: Horizontal alignment (default: 'center')
-            va: Vertical alignment (default: 'bottom')
-            fontweight: Font weight (default: 'bold')
-            size: Font size (default: None, uses default size)
-        """
-        # Get text color from the temp canvas style presets
-        text_color = temp_canvas.style_presets['default']['text_color']
-        
-        # Set font size based on parameter or use default
-        if size is None:
-            size = 10  # Default size
-            
-        # Add the text with styling
-        ax.text(x, y, text, ha=ha, va=va, fontweight=fontweight, 
-                color=text_color, size=size)
-
-    def _create_report_bubble_chart(self, ax, df, category_field, colors, title):
-        """
-        Create a bubble chart for reports where the bubble size represents a value.
-        
-        Args:
-            ax: The matplotlib axis to plot on
-            df: The DataFrame containing the data
-            category_field: The category field to use for labels
-            colors: A list of colors to use for the chart
-            title: The title for the chart
-        """
-        if df is None or len(df) == 0:
-            ax.text(0.5, 0.5, "No data available for this chart", 
-                  ha='center', va='center', fontsize=12, color='white')
-            return
-            
-        # For bubble charts, we need player name, CHEST_COUNT (x-axis), TOTAL_SCORE (y-axis)
-        if not all(col in df.columns for col in ['PLAYER', 'CHEST_COUNT', 'TOTAL_SCORE']):
-            missing = [col for col in ['PLAYER', 'CHEST_COUNT', 'TOTAL_SCORE'] if col not in df.columns]
-            ax.text(0.5, 0.5, f"Missing required columns: {', '.join(missing)}", 
-                  ha='center', va='center', fontsize=12, color='white')
-            return
-        
-        # Get the data
-        data = df.sort_values('TOTAL_SCORE', ascending=False).head(20)  # Top 20 players by score
-        
-        # Create a bubble chart - Each point's size represents efficiency (score per chest)
-        # Calculate efficiency (TOTAL_SCORE / CHEST_COUNT)
-        efficiency = data['TOTAL_SCORE'] / data['CHEST_COUNT']
-        
-        # Normalize for bubble size (for better visualization)
-        sizes = 50 * (efficiency / efficiency.max())
-        
-        # Create the scatter plot with varying bubble sizes
-        scatter = ax.scatter(
-            data['CHEST_COUNT'], 
-            data['TOTAL_SCORE'], 
-            s=sizes,  # Bubble size based on efficiency
-            c=colors[0],  # Use first color from the palette
-            alpha=0.6,  # Semi-transparent
-            edgecolors=colors[1]  # Outline with second color
-        )
-        
-        # Add player labels
-        for i, player in enumerate(data['PLAYER']):
-            ax.annotate(
-                player, 
-                (data['CHEST_COUNT'].iloc[i], data['TOTAL_SCORE'].iloc[i]),
-                xytext=(5, 5), textcoords='offset points',
-                color='white', 
-                fontweight='bold'
-            )
-        
-        # Set labels and title
-        ax.set_xlabel('Chest Count', color='white')
-        ax.set_ylabel('Total Score', color='white')
-        ax.set_title(title, color=colors[0], fontsize=14)
-
     def export_raw_data(self):
         """
-        Export the currently displayed raw data to a CSV file.
+        Export the currently displayed raw data to a CSV, Parquet or Feather file.
         
         This method exports the filtered raw data that is currently displayed in the
         Raw Data tab. The file is saved to the configured export directory.
@@ -4132,40 +3306,27 @@ class MainWindow(QMainWindow):
         default_filename = f"TotalBattle_RawData_{timestamp}.csv"
         
         # Get file path from user
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
             "Export Raw Data",
             str(export_dir / default_filename),
-            "CSV Files (*.csv);;All Files (*)"
+            self.DATA_EXPORT_FILTERS
         )
         
         if not file_path:
             return  # User cancelled
+        file_path = self._apply_export_suffix(file_path, selected_filter)
             
-        try:
-            # Export data to CSV
-            if hasattr(self, 'filter_proxy_model') and self.filter_proxy_model is not None:
-                # Get the filtered data from the proxy model
-                filtered_data = self.raw_data.iloc[
-                    [self.filter_proxy_model.mapToSource(self.filter_proxy_model.index(i, 0)).row() 
-                     for i in range(self.filter_proxy_model.rowCount())]
-                ]
-                # Write to CSV with proper encoding for German characters
-                filtered_data.to_csv(file_path, index=False, encoding='utf-8-sig')
-            else:
-                # Export all raw data if no filter is applied
-                self.raw_data.to_csv(file_path, index=False, encoding='utf-8-sig')
-                
-            self.statusBar().showMessage(f"Data exported to {file_path}", 5000)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Export Error", f"Failed to export data: {str(e)}")
-            if self.debug:
-                print(f"Export error: {e}")
+        # Export the rows in the order they are shown in the table
+        if getattr(self, 'raw_data_proxy_model', None) is not None:
+            df, rows = self._visible_row_indexer(self.raw_data_proxy_model)
+        else:
+            df, rows = self.raw_data, None
+        self._start_export(df, rows, file_path, "Data")
     
     def export_analysis_data(self):
         """
-        Export the currently displayed analysis data to a CSV file.
+        Export the currently displayed analysis data to a CSV, Parquet or Feather file.
         
         This method exports the filtered analysis data that is currently displayed in the
         Analysis tab. The file is saved to the configured export directory.
@@ -4191,36 +3352,165 @@ class MainWindow(QMainWindow):
         default_filename = f"TotalBattle_{view_type}_{timestamp}.csv"
         
         # Get file path from user
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
             f"Export {view_type} Data",
             str(export_dir / default_filename),
-            "CSV Files (*.csv);;All Files (*)"
+            self.DATA_EXPORT_FILTERS
         )
         
         if not file_path:
             return  # User cancelled
+        file_path = self._apply_export_suffix(file_path, selected_filter)
             
-        try:
-            # Export data to CSV
-            if hasattr(self, 'analysis_proxy_model') and self.analysis_proxy_model is not None:
-                # Get the filtered data from the proxy model
-                filtered_data = self.analysis_data.iloc[
-                    [self.analysis_proxy_model.mapToSource(self.analysis_proxy_model.index(i, 0)).row() 
-                     for i in range(self.analysis_proxy_model.rowCount())]
-                ]
-                # Write to CSV with proper encoding for German characters
-                filtered_data.to_csv(file_path, index=False, encoding='utf-8-sig')
-            else:
-                # Export all analysis data if no filter is applied
-                self.analysis_data.to_csv(file_path, index=False, encoding='utf-8-sig')
-                
-            self.statusBar().showMessage(f"{view_type} data exported to {file_path}", 5000)
+        self._start_export(self.analysis_data, None, file_path, f"{view_type} data")
+
+    def export_workbook(self):
+        """
+        Export every analysis table and the raw data to one Excel workbook.
+        
+        Each table in analysis_results is written to its own sheet. The workbook
+        is streamed to disk on a worker thread, so large raw data sheets neither
+        block the UI nor need to be held in memory as a whole.
+        """
+        if not self.analysis_results:
+            QMessageBox.warning(self, "Export Error", "No analysis results available to export.")
+            return
+        
+        # Get export directory from config
+        export_dir = Path(self.config_manager.get_export_directory())
+        export_dir.mkdir(parents=True, exist_ok=True)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        default_filename = f"TotalBattle_Analysis_{timestamp}.xlsx"
+        
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Export Workbook",
+            str(export_dir / default_filename),
+            "Excel Files (*.xlsx)"
+        )
+        
+        if not file_path:
+            return  # User cancelled
+        file_path = self._apply_export_suffix(file_path, selected_filter)
+        
+        sheets = DataProcessor.analysis_sheets(self.analysis_results)
+        
+        def write_workbook(task):
+            return DataProcessor.write_excel_workbook(
+                sheets, file_path,
+                progress=lambda done, total, title: task.report_progress(done, total, title),
+                cancelled=task.is_cancelled
+            )
+        
+        self._run_export_task(write_workbook, "Workbook", file_path)
+
+    def _visible_row_indexer(self, proxy_model):
+        """
+        Resolve the rows shown through the sort proxy without touching each row.
+        
+        Instead of calling mapToSource() for every proxy row, the proxy's
+        sorts are replayed on the source DataFrame (see
+        TimedSortProxyModel.source_rows).
+        
+        Args:
+            proxy_model (TimedSortProxyModel): Proxy in front of a CustomTableModel
             
-        except Exception as e:
-            QMessageBox.critical(self, "Export Error", f"Failed to export data: {str(e)}")
-            if self.debug:
-                print(f"Export error: {e}")
+        Returns:
+            tuple: (DataFrame, numpy.ndarray or None) - the source frame and the positional
+                rows to export in display order, or None to export the frame as-is
+        """
+        return proxy_model.sourceModel().dataframe(), proxy_model.source_rows()
+
+    def _apply_export_suffix(self, file_path, selected_filter):
+        """
+        Make sure the export path ends with the suffix of the selected file type.
+        
+        Args:
+            file_path (str): Path chosen in the save dialog
+            selected_filter (str): The dialog's selected name filter
+            
+        Returns:
+            str: The path with a matching suffix
+        """
+        match = re.search(r'\(\*(\.\w+)\)', selected_filter or "")
+        if match and Path(file_path).suffix.lower() != match.group(1):
+            file_path = str(Path(file_path).with_suffix(match.group(1)))
+        return file_path
+
+    def _start_export(self, df, rows, file_path, label):
+        """
+        Write a data export on a worker thread.
+        
+        CSV files are written in chunks with progress; Parquet and Feather files
+        are written in one pass with compression and typed columns.
+        
+        Args:
+            df (pandas.DataFrame): The data to export
+            rows (numpy.ndarray or None): Positional rows to export in order, or None for all rows
+            file_path (str): Destination path
+            label (str): What is being exported, used in status messages
+        """
+        if DataProcessor.is_columnar_file(file_path):
+            def write_export(task):
+                task.report_progress(0, len(df) if rows is None else len(rows), label)
+                DataProcessor.write_columnar(df if rows is None else df.iloc[rows], file_path)
+                return True
+        else:
+            def write_export(task):
+                return DataProcessor.write_csv_chunked(
+                    df, file_path, rows=rows,
+                    progress=lambda done, total: task.report_progress(done, total, label),
+                    cancelled=task.is_cancelled
+                )
+        
+        self._run_export_task(write_export, label, file_path)
+
+    def _run_export_task(self, job, label, file_path):
+        """
+        Run an export job on a worker thread and report its outcome in the status bar.
+        
+        Args:
+            job (callable): BackgroundTask job returning True when the file was written
+            label (str): What is being exported, used in status messages
+            file_path (str): Destination path
+        """
+        if self._export_task is not None and self._export_task.is_running():
+            QMessageBox.information(self, "Export in Progress", "Please wait for the current export to finish.")
+            return
+        
+        self._export_message = f"{label} exported to {file_path}"
+        self.statusBar().showMessage(f"Exporting {label.lower()}...")
+        
+        self._export_task = BackgroundTask(job, debug=self.debug)
+        self._export_task.progress.connect(self._on_export_progress)
+        self._export_task.finished.connect(self._on_export_finished)
+        self._export_task.failed.connect(self._on_export_failed)
+        self._export_task.cancelled.connect(self._on_export_cancelled)
+        self._export_task.start()
+
+    def _on_export_progress(self, done, total, label):
+        """Show export progress in the status bar."""
+        self.statusBar().showMessage(f"Exporting {label.lower()}: {done:,} of {total:,} rows...")
+
+    def _on_export_finished(self, completed):
+        """Report a finished export."""
+        if completed:
+            self.statusBar().showMessage(self._export_message, 5000)
+        else:
+            self._on_export_cancelled()
+
+    def _on_export_failed(self, message):
+        """Report a failed export."""
+        QMessageBox.critical(self, "Export Error", f"Failed to export data: {message}")
+        if self.debug:
+            print(f"Export error: {message}")
+        self.statusBar().showMessage("Export failed", 5000)
+
+    def _on_export_cancelled(self):
+        """Report a cancelled export."""
+        self.statusBar().showMessage("Export cancelled", 5000)
 
     def process_data(self):
         """Process the loaded data to prepare it for analysis and visualization."""
@@ -4235,15 +3525,11 @@ class MainWindow(QMainWindow):
             # Make a copy of the data
             df = self.raw_data.copy()
             
-            # Check for required columns
-            required_columns = ['DATE', 'PLAYER', 'SOURCE', 'CHEST', 'SCORE']
-            
             if self.debug:
                 print(f"Available columns: {list(df.columns)}")
             
             # Check if all required columns exist (case-insensitive)
-            df_columns_upper = [col.upper() for col in df.columns]
-            missing_columns = [col for col in required_columns if col not in df_columns_upper]
+            missing_columns = DataProcessor.missing_columns(df)
             
             if missing_columns:
                 # Show error message
@@ -4261,40 +3547,10 @@ class MainWindow(QMainWindow):
                 )
                 return
             
-            # Create a mapping from actual column names to standardized names
-            column_mapping = {}
-            for req_col in required_columns:
-                for actual_col in df.columns:
-                    if actual_col.upper() == req_col:
-                        column_mapping[actual_col] = req_col
-            
-            if self.debug:
-                print(f"Column mapping: {column_mapping}")
-            
-            # Rename columns to standardized names
-            df = df.rename(columns=column_mapping)
-            
-            if self.debug:
-                print("Converting SCORE to numeric...")
-            # Convert SCORE to numeric
-            df['SCORE'] = pd.to_numeric(df['SCORE'], errors='coerce')
-            
-            # Drop rows with NaN SCORE
-            df = df.dropna(subset=['SCORE'])
-            
-            if self.debug:
-                print("Converting DATE to datetime...")
-            # Convert DATE to datetime
-            df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
-            
-            # Drop rows with invalid dates
-            df = df.dropna(subset=['DATE'])
-            
-            # Keep only the required columns
-            df = df[required_columns]
+            # Standardize column names, convert SCORE and DATE, keep required columns
+            df = DataProcessor.process_data(df)
             
             if self.debug:
-                print(f"Processed data shape: {df.shape}")
                 print("Sample of processed data:")
                 print(df.head())
             
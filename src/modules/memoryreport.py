@@ -0,0 +1,327 @@
+# memoryreport.py - Memory accounting for loaded data and analysis results
+import hashlib
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Buffers at least this large are hashed to find duplicated copies
+DUPLICATE_MIN_BYTES = 64 * 1024
+
+
+def format_bytes(size):
+    """Format a byte count as B, KB, MB or GB."""
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
+    return f"{size:,.2f} GB"
+
+
+def current_rss():
+    """Current resident set size of this process in bytes, or None if unknown."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def process_peak_rss():
+    """Highest resident set size of this process so far in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        if hasattr(info, 'peak_wset'):
+            return info.peak_wset
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux only). Returns True on success."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class PeakRSSMonitor:
+    """
+    Measure the peak resident set size while an operation runs.
+
+    On Linux the kernel's peak counter is reset at start(). Elsewhere the RSS
+    is sampled on a background thread, and if the RSS cannot be read at all
+    the process-wide peak is reported instead.
+    """
+
+    def __init__(self, interval=0.01):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval (float, optional): Sampling interval in seconds. Defaults to 0.01.
+        """
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._kernel_peak = False
+        self._sampled_peak = 0
+        self.start_rss = None
+
+    def start(self):
+        """Start measuring."""
+        self.start_rss = current_rss()
+        self._kernel_peak = _reset_peak_rss()
+        if not self._kernel_peak and self.start_rss is not None:
+            self._sampled_peak = self.start_rss
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._sample, name='PeakRSSMonitor', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop measuring.
+
+        Returns:
+            dict: 'start_rss', 'end_rss' and 'peak_rss' in bytes, and 'peak_source'
+            ('kernel', 'sampled' or 'process' when only the lifetime peak is known)
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        end_rss = current_rss()
+        if self._kernel_peak:
+            peak, source = process_peak_rss(), 'kernel'
+        elif self.start_rss is not None:
+            peak, source = max(self._sampled_peak, end_rss or 0), 'sampled'
+        else:
+            peak, source = process_peak_rss(), 'process'
+        return {'start_rss': self.start_rss, 'end_rss': end_rss, 'peak_rss': peak, 'peak_source': source}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.result = self.stop()
+        return False
+
+    def _sample(self):
+        """Record the highest RSS until stopped."""
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and rss > self._sampled_peak:
+                self._sampled_peak = rss
+
+
+def _numpy_buffer(array):
+    """(key, size, memoryview) of the memory block owning a numpy array's data."""
+    root = array
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    address = root.__array_interface__['data'][0]
+    view = None
+    if root.flags.c_contiguous and root.dtype != object:
+        view = memoryview(root.view(np.uint8).reshape(-1)) if root.size else None
+    return ('numpy', address, root.nbytes), root.nbytes, view
+
+
+def _column_buffers(values):
+    """
+    Collect the memory buffers behind a pandas array.
+
+    Returns:
+        list: (key, size, memoryview or None) tuples; the key identifies the
+        buffer, so two objects sharing it yield the same key
+    """
+    buffers = []
+    if isinstance(values, pd.Categorical):
+        buffers.append(_numpy_buffer(values.codes))
+        buffers.extend(_column_buffers(values.categories.array))
+        return buffers
+    pa_array = getattr(values, '_pa_array', None)
+    if pa_array is not None:
+        for chunk in pa_array.chunks:
+            for buffer in chunk.buffers():
+                if buffer is not None and buffer.size:
+                    buffers.append((('arrow', buffer.address, buffer.size), buffer.size, memoryview(buffer)))
+        return buffers
+    for name in ('_ndarray', '_data', '_mask'):
+        array = getattr(values, name, None)
+        if isinstance(array, np.ndarray):
+            buffers.append(_numpy_buffer(array))
+    if not buffers and isinstance(values, np.ndarray):
+        buffers.append(_numpy_buffer(values))
+    return buffers
+
+
+def frame_buffers(df):
+    """Collect the buffers behind every column and the index of a DataFrame."""
+    buffers = []
+    for column in df.columns:
+        buffers.extend(_column_buffers(df[column].array))
+    if not isinstance(df.index, pd.RangeIndex):
+        buffers.extend(_column_buffers(df.index.array))
+    return buffers
+
+
+class MemoryReport:
+    """
+    Deep memory usage of a set of named objects.
+
+    Objects can be DataFrames, Series, dicts of those (e.g. analysis results)
+    or table models with a dataframe() method. Buffers referenced by more than
+    one object are reported as shared; distinct buffers with identical
+    contents are reported as duplicated, which points at avoidable copies.
+    Memory held by Python string objects in object columns is counted per
+    column and cannot be attributed to buffers.
+    """
+
+    def __init__(self, objects, load_memory=None):
+        """
+        Build the report.
+
+        Args:
+            objects (dict): Name -> object to account for; None values are skipped
+            load_memory (dict, optional): Result of PeakRSSMonitor.stop() for the last load
+        """
+        self.load_memory = load_memory
+        self.entries = []
+        self._owners = {}
+        self._buffers = {}
+        for name, obj in objects.items():
+            self._add(name, obj)
+        self.current_rss = current_rss()
+
+    def _add(self, name, obj):
+        """Add one object, expanding dicts of frames into one entry per frame."""
+        if obj is None:
+            return
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                self._add(f"{name}[{key!r}]", value)
+            return
+        if hasattr(obj, 'dataframe') and callable(obj.dataframe):
+            obj = obj.dataframe()
+        if isinstance(obj, pd.Series):
+            obj = obj.to_frame()
+        if not isinstance(obj, pd.DataFrame):
+            return
+
+        buffers = frame_buffers(obj)
+        keys = set()
+        for key, size, view in buffers:
+            keys.add(key)
+            self._buffers.setdefault(key, (size, view))
+            self._owners.setdefault(key, set()).add(name)
+        self.entries.append({
+            'name': name,
+            'rows': len(obj),
+            'columns': len(obj.columns),
+            'deep_bytes': int(obj.memory_usage(deep=True, index=True).sum()),
+            'buffer_keys': keys,
+        })
+
+    def shared_bytes(self, entry):
+        """Bytes of an entry's buffers that other objects reference too."""
+        return sum(self._buffers[key][0] for key in entry['buffer_keys'] if len(self._owners[key]) > 1)
+
+    def unique_buffer_bytes(self):
+        """Bytes of all distinct buffers, counting shared buffers once."""
+        return sum(size for size, _ in self._buffers.values())
+
+    def duplicated_buffers(self):
+        """
+        Find distinct buffers with identical contents.
+
+        Returns:
+            list: (size, owner names, copies) tuples, largest waste first
+        """
+        groups = {}
+        for key, (size, view) in self._buffers.items():
+            if view is None or size < DUPLICATE_MIN_BYTES:
+                continue
+            digest = hashlib.blake2b(view, digest_size=16).digest()
+            groups.setdefault((size, digest), []).append(key)
+        duplicates = []
+        for (size, _), keys in groups.items():
+            if len(keys) > 1:
+                owners = sorted(set().union(*(self._owners[key] for key in keys)))
+                duplicates.append((size, owners, len(keys)))
+        duplicates.sort(key=lambda item: -item[0] * (item[2] - 1))
+        return duplicates
+
+    def to_dict(self):
+        """Get the report as JSON-serializable data."""
+        return {
+            'objects': [
+                {'name': entry['name'], 'rows': entry['rows'], 'columns': entry['columns'],
+                 'deep_bytes': entry['deep_bytes'], 'shared_bytes': self.shared_bytes(entry)}
+                for entry in self.entries
+            ],
+            'total_deep_bytes': sum(entry['deep_bytes'] for entry in self.entries),
+            'unique_buffer_bytes': self.unique_buffer_bytes(),
+            'duplicated': [
+                {'size': size, 'owners': owners, 'copies': copies}
+                for size, owners, copies in self.duplicated_buffers()
+            ],
+            'current_rss': self.current_rss,
+            'last_load': self.load_memory,
+        }
+
+    def to_text(self):
+        """Format the report as a plain-text table."""
+        width = max([len(entry['name']) for entry in self.entries] + [6])
+        lines = [f"{'Object':<{width}} {'Rows':>12} {'Deep size':>12} {'Shared':>12}"]
+        for entry in self.entries:
+            lines.append(f"{entry['name']:<{width}} {entry['rows']:>12,} "
+                         f"{format_bytes(entry['deep_bytes']):>12} {format_bytes(self.shared_bytes(entry)):>12}")
+        total = sum(entry['deep_bytes'] for entry in self.entries)
+        lines.append("")
+        lines.append(f"Sum of deep sizes:        {format_bytes(total)}")
+        lines.append(f"Distinct buffers:         {format_bytes(self.unique_buffer_bytes())}"
+                     " (shared buffers counted once)")
+
+        duplicates = self.duplicated_buffers()
+        if duplicates:
+            wasted = sum(size * (copies - 1) for size, _, copies in duplicates)
+            lines.append(f"Duplicated buffers:       {format_bytes(wasted)} in extra copies of {len(duplicates)} buffers")
+            for size, owners, copies in duplicates[:10]:
+                lines.append(f"  {copies} x {format_bytes(size)}: {', '.join(owners)}")
+        else:
+            lines.append("Duplicated buffers:       none")
+
+        lines.append(f"Current RSS:              {format_bytes(self.current_rss)}")
+        if self.load_memory:
+            load = self.load_memory
+            lines.append(f"Last load:                RSS {format_bytes(load['start_rss'])} -> "
+                         f"{format_bytes(load['end_rss'])}, peak {format_bytes(load['peak_rss'])} "
+                         f"({load['peak_source']})")
+        return "\n".join(lines)
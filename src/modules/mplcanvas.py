@@ -1,5 +1,8 @@
 # mplcanvas.py - MplCanvas class implementation
 from modules.utils import *
+import matplotlib
+matplotlib.use('QtAgg')  # Use the generic Qt backend that works with PySide6
+from modules.reportcharts import CHART_STYLE
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
@@ -28,22 +31,7 @@ class MplCanvas(FigureCanvas):
     def define_style_presets(self):
         """Define style presets for the application."""
         self.style_presets = {
-            'default': {
-                'bg_color': '#1A2742',  # Dark blue background
-                'text_color': '#FFFFFF',  # White text
-                'grid_color': '#2A3F5F',  # Medium blue grid
-                'tick_color': '#FFFFFF',  # White ticks
-                'title_color': '#D4AF37',  # Gold title
-                'title_size': 14,
-                'label_size': 12,
-                'bar_colors': ['#D4AF37', '#5991C4', '#6EC1A7', '#D46A5F'],  # Gold, Blue, Green, Red
-                'pie_colors': ['#D4AF37', '#5991C4', '#6EC1A7', '#D46A5F', '#8899AA', '#F0C75A'],
-                'line_color': '#5991C4',  # Blue
-                'line_width': 2.5,
-                'marker_size': 8,
-                'marker_color': '#D4AF37',  # Gold markers
-                'edge_color': '#1A2742'  # Dark blue edges
-            }
+            'default': dict(CHART_STYLE)
         }
     
     def apply_default_style(self):
@@ -0,0 +1,342 @@
+# partitioned.py - Clan and month partitioned chest datasets and out-of-core analysis
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from .arrowdataset import MappedDataset, PART_SUFFIX, _pyarrow, write_ipc
+from .dataprocessor import DataProcessor
+from .sketches import SKETCH_DIMENSIONS, quantile_table, score_buckets
+from .timing import stage_timer
+
+
+def partition_name(clan, month):
+    """
+    Get the directory of a partition, relative to the dataset.
+
+    Args:
+        clan (str): Clan name, '' for rows without a clan
+        month (str): 'YYYY-MM'
+
+    Returns:
+        str: e.g. 'clan=MY_CLAN/month=2025-03'; the clan is URL-quoted
+    """
+    return f"clan={quote(clan, safe='')}/month={month}"
+
+
+def _month_bounds(month):
+    """First and last day of a 'YYYY-MM' month."""
+    first = pd.Timestamp(f"{month}-01")
+    return first, first + pd.offsets.MonthEnd(0)
+
+
+class Partition:
+    """The part files of one clan and month, or the unpartitioned parts (clan and month None)."""
+
+    def __init__(self, clan, month, paths):
+        self.clan = clan
+        self.month = month
+        self.paths = paths
+
+    def __repr__(self):
+        return f"Partition(clan={self.clan!r}, month={self.month!r}, parts={len(self.paths)})"
+
+    def overlaps(self, start=None, end=None, clans=None):
+        """Check whether the partition can hold rows of a date window and clans."""
+        if self.month is None:
+            return True
+        if clans is not None and self.clan not in clans:
+            return False
+        first, last = _month_bounds(self.month)
+        if start is not None and last < pd.Timestamp(start).normalize():
+            return False
+        if end is not None and first > pd.Timestamp(end):
+            return False
+        return True
+
+
+class PartitionedDataset(MappedDataset):
+    """
+    A MappedDataset whose parts are split into one directory per clan and month.
+
+    Each part, e.g. the rows added by one import, is written as one file
+    in every clan/month directory it has rows for::
+
+        history_dataset/clan=MY_CLAN/month=2025-03/import-000042.arrow
+
+    A date window or clan selection then rules out whole directories
+    without opening them, and scan() streams the remaining files one
+    record batch at a time, so the memory used does not grow with the
+    length of the history. Part files in the dataset directory itself,
+    e.g. written before it was partitioned, are kept and always scanned.
+    """
+
+    def part_names(self):
+        """Get the distinct part names, e.g. {'import-000042'}."""
+        return {path.stem for path in self.parts()}
+
+    def write_part(self, name, df):
+        """
+        Write a part, one file per clan and month it has rows for.
+
+        Args:
+            name (str): Part name, e.g. 'import-000042'
+            df (pandas.DataFrame): Data as returned by DataProcessor.process_data, with an
+                optional CLAN column
+
+        Returns:
+            list: The written part files
+        """
+        dates = pd.to_datetime(df['DATE'])
+        months = dates.dt.strftime('%Y-%m')
+        if 'CLAN' in df.columns:
+            clans = df['CLAN'].astype(object).where(df['CLAN'].notna(), '').astype(str)
+        else:
+            clans = pd.Series('', index=df.index)
+        paths = []
+        with stage_timer.stage('partition_write', rows=len(df)):
+            for (clan, month), rows in df.groupby([clans, months], sort=True, observed=True).groups.items():
+                path = self.path / partition_name(clan, month) / f"{name}{PART_SUFFIX}"
+                write_ipc(df.loc[rows], path)
+                paths.append(path)
+        self.close()
+        return paths
+
+    def partitions(self, start=None, end=None, clans=None):
+        """
+        List the partitions that can hold rows of a date window and clans.
+
+        Args:
+            start (date-like, optional): First date, inclusive
+            end (date-like, optional): Last date, inclusive
+            clans (list, optional): Clan names; '' for rows without a clan. Defaults to all.
+
+        Returns:
+            list: Partition objects, unpartitioned parts first
+        """
+        grouped = {}
+        for path in self.parts():
+            relative = path.parent.relative_to(self.path).parts
+            if len(relative) == 2 and relative[0].startswith('clan=') and relative[1].startswith('month='):
+                key = (unquote(relative[0][5:]), relative[1][6:])
+            else:
+                key = (None, None)
+            grouped.setdefault(key, []).append(path)
+        clans = set(clans) if clans is not None else None
+        partitions = [Partition(clan, month, paths) for (clan, month), paths in grouped.items()]
+        partitions.sort(key=lambda p: (p.month is not None, p.clan or '', p.month or ''))
+        selected = [p for p in partitions if p.overlaps(start, end, clans)]
+        if DataProcessor.debug:
+            print(f"Scanning {len(selected)} of {len(partitions)} partitions")
+        return selected
+
+    def clans(self):
+        """Get the clan names of the partitions, sorted."""
+        return sorted({p.clan for p in self.partitions() if p.clan is not None})
+
+    def scan(self, columns=None, start=None, end=None, clans=None, filters=None):
+        """
+        Stream the rows of a date window, clans and filters in record batches.
+
+        Args:
+            columns (list, optional): Columns to read. Defaults to all.
+            start (date-like, optional): First date, inclusive
+            end (date-like, optional): Last date, inclusive
+            clans (list, optional): Clan names. Defaults to all.
+            filters (dict, optional): Column -> values to keep, compared as strings
+                like DataProcessor.filter_data
+
+        Yields:
+            pandas.DataFrame: The matching rows of one record batch
+        """
+        pa = _pyarrow()
+        filters = {column: values for column, values in (filters or {}).items() if values}
+        if 'CLAN' in filters:
+            clans = [clan for clan in filters['CLAN'] if clans is None or clan in clans]
+        start = pd.Timestamp(start).normalize() if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        for partition in self.partitions(start, end, clans):
+            for path in partition.paths:
+                # The mapping stays open while yielded batches still point into it
+                reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+                needed = None
+                if columns is not None:
+                    needed = list(dict.fromkeys(list(columns) + list(filters)
+                                                + (['DATE'] if start is not None or end is not None else [])
+                                                + (['CLAN'] if clans is not None and partition.month is None else [])))
+                    needed = [name for name in needed if name in reader.schema.names]
+                for index in range(reader.num_record_batches):
+                    batch = reader.get_batch(index)
+                    if needed is not None:
+                        batch = batch.select(needed)
+                    chunk = _filter_rows(batch.to_pandas(), start, end,
+                                         clans if partition.month is None else None, filters)
+                    if columns is not None:
+                        chunk = chunk[[name for name in columns if name in chunk.columns]]
+                    if len(chunk):
+                        yield chunk
+
+
+def _filter_rows(df, start, end, clans, filters):
+    """Apply a date window, clans and column filters to one batch."""
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df['DATE'] >= start).to_numpy()
+    if end is not None:
+        mask &= (df['DATE'] <= end).to_numpy()
+    if clans is not None and 'CLAN' in df.columns:
+        mask &= df['CLAN'].astype(str).isin(clans).to_numpy()
+    for column, values in filters.items():
+        if column in df.columns:
+            mask &= df[column].astype(str).isin(values).to_numpy()
+    return df if mask.all() else df[mask]
+
+
+def analysis_tables(player_sources, player_chests):
+    """
+    Build the per-player, per-chest and per-source tables of analyze_data from two aggregations.
+
+    Args:
+        player_sources (pandas.DataFrame): PLAYER, SOURCE, SCORE and CHEST_COUNT per player and source
+        player_chests (pandas.DataFrame): PLAYER, CHEST, SCORE and COUNT per player and chest
+
+    Returns:
+        dict: player_totals, chest_totals, source_totals, player_avg,
+        player_chest_freq and player_overview as from DataProcessor.analyze_data
+    """
+    def totals(df, by, count):
+        result = df.groupby(by, as_index=False, observed=True)[['SCORE', count]].sum()
+        result = result.rename(columns={count: 'CHEST_COUNT'})
+        return result.sort_values('SCORE', ascending=False, kind='stable').reset_index(drop=True)
+
+    player_totals = totals(player_sources, 'PLAYER', 'CHEST_COUNT')
+    player_avg = player_totals[['PLAYER']].copy()
+    player_avg['SCORE'] = (player_totals['SCORE'] / player_totals['CHEST_COUNT']).round(2)
+    player_avg = player_avg.sort_values('SCORE', ascending=False, kind='stable').reset_index(drop=True)
+
+    source_type_scores = player_sources.pivot_table(
+        index='PLAYER', columns='SOURCE', values='SCORE', aggfunc='sum', fill_value=0, observed=True
+    ).reset_index()
+    source_type_scores.columns.name = None
+    player_overview = player_totals.rename(columns={'SCORE': 'TOTAL_SCORE'})
+    player_overview = player_overview.merge(source_type_scores, on='PLAYER', how='left')
+    player_overview = player_overview.sort_values('TOTAL_SCORE', ascending=False)
+    return {
+        'player_totals': player_totals,
+        'chest_totals': totals(player_chests, 'CHEST', 'COUNT'),
+        'source_totals': totals(player_sources, 'SOURCE', 'CHEST_COUNT'),
+        'player_avg': player_avg,
+        'player_chest_freq': player_chests[['PLAYER', 'CHEST', 'COUNT']],
+        'player_overview': player_overview,
+    }
+
+
+class PartialAnalysis:
+    """
+    Mergeable partial aggregates from which every analyze_data table is built.
+
+    add() aggregates one batch of rows and merges it into the running
+    aggregates, whose size depends on the number of players, chests,
+    sources and days, not rows; results() builds the final tables.
+    """
+
+    # Partial aggregate -> (key columns, count column name)
+    AGGREGATES = {
+        'player_sources': (['PLAYER', 'SOURCE'], 'CHEST_COUNT'),
+        'player_chests': (['PLAYER', 'CHEST'], 'COUNT'),
+        'dates': (['DATE'], 'CHEST_COUNT'),
+    }
+
+    def __init__(self):
+        self.rows = 0
+        self.partials = {name: None for name in self.AGGREGATES}
+        self.buckets = {column: None for column in SKETCH_DIMENSIONS}
+
+    @staticmethod
+    def _merge(current, new, keys, value_columns):
+        """Merge two partial aggregates by adding their values per key."""
+        if current is None:
+            return new
+        combined = pd.concat([current, new], ignore_index=True)
+        return combined.groupby(keys, as_index=False, sort=False, observed=True)[value_columns].sum()
+
+    def add(self, df):
+        """
+        Add a batch of rows.
+
+        Args:
+            df (pandas.DataFrame): Rows with REQUIRED_COLUMNS
+        """
+        self.rows += len(df)
+        for name, (keys, count) in self.AGGREGATES.items():
+            partial = df.groupby(keys, observed=True, sort=False)['SCORE'].agg(['sum', 'size']).reset_index()
+            partial = partial.rename(columns={'sum': 'SCORE', 'size': count})
+            # Batches have different categories; plain keys merge across them
+            for key in keys:
+                if key != 'DATE':
+                    partial[key] = partial[key].astype(str)
+            self.partials[name] = self._merge(self.partials[name], partial, keys, ['SCORE', count])
+        for column in SKETCH_DIMENSIONS:
+            buckets = score_buckets(df, [column])
+            buckets[column] = buckets[column].astype(str)
+            self.buckets[column] = self._merge(self.buckets[column], buckets, [column, 'BUCKET'], ['COUNT'])
+
+    def merge(self, other):
+        """Add the aggregates of another PartialAnalysis, e.g. of another clan."""
+        self.rows += other.rows
+        for name, (keys, count) in self.AGGREGATES.items():
+            if other.partials[name] is not None:
+                self.partials[name] = self._merge(self.partials[name], other.partials[name], keys,
+                                                  ['SCORE', count])
+        for column in SKETCH_DIMENSIONS:
+            if other.buckets[column] is not None:
+                self.buckets[column] = self._merge(self.buckets[column], other.buckets[column],
+                                                   [column, 'BUCKET'], ['COUNT'])
+        return self
+
+    def results(self):
+        """
+        Build the analysis tables.
+
+        Returns:
+            dict: The same tables as DataProcessor.analyze_data, without 'raw_data'
+        """
+        if self.rows == 0:
+            return DataProcessor.analyze_data(pd.DataFrame(columns=DataProcessor.REQUIRED_COLUMNS))
+        player_chests = self.partials['player_chests'].sort_values(['PLAYER', 'CHEST'], kind='stable')
+        results = analysis_tables(self.partials['player_sources'], player_chests.reset_index(drop=True))
+        dates = self.partials['dates'].sort_values('DATE', kind='stable').reset_index(drop=True)
+        results['date_totals'] = dates[['DATE', 'SCORE', 'CHEST_COUNT']]
+        for column in SKETCH_DIMENSIONS:
+            table = quantile_table(self.buckets[column], [column])
+            results[f'{column.lower()}_quantiles'] = table.sort_values('P50', ascending=False, kind='stable')
+        results['score_quantiles'] = quantile_table(self.buckets['PLAYER'], [])
+        return results
+
+
+def analyze_dataset(dataset, start=None, end=None, clans=None, filters=None):
+    """
+    Compute the results of DataProcessor.analyze_data over a partitioned dataset.
+
+    Only the partitions of the date window and clans are opened, and their
+    rows are aggregated one record batch at a time, so any length of
+    history is analyzed in bounded memory.
+
+    Args:
+        dataset (PartitionedDataset): The dataset
+        start (date-like, optional): First date, inclusive
+        end (date-like, optional): Last date, inclusive
+        clans (list, optional): Clan names. Defaults to all.
+        filters (dict, optional): Column -> values to keep, as for scan()
+
+    Returns:
+        dict: The same tables as DataProcessor.analyze_data, without 'raw_data'
+    """
+    partial = PartialAnalysis()
+    with stage_timer.stage('dataset_analysis') as stage:
+        for chunk in dataset.scan(DataProcessor.REQUIRED_COLUMNS, start, end, clans, filters):
+            partial.add(chunk)
+        stage.rows = partial.rows
+    results = partial.results()
+    results.pop('raw_data', None)
+    return results
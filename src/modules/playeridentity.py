@@ -0,0 +1,189 @@
+# playeridentity.py - Canonical player identities and resolution of spelling variants
+import re
+
+import numpy as np
+import pandas as pd
+
+from .dataprocessor import DataProcessor
+from .timing import stage_timer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    match_key TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS player_aliases (
+    alias TEXT PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES players(id)
+) WITHOUT ROWID;
+"""
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def display_name(name):
+    """
+    Repair a spelling for display: fix mojibake, normalize to NFC and collapse whitespace.
+
+    "FeldjÃ¤ger" becomes "Feldjäger"; a correct spelling is returned unchanged.
+    """
+    repaired = DataProcessor.normalize_unicode(DataProcessor.fix_encoding(str(name)))
+    return _WHITESPACE.sub(' ', repaired).strip()
+
+
+def match_key(name):
+    """
+    Get the key under which spellings of one player match.
+
+    The repaired spelling is transliterated to ASCII and case-folded, so
+    "Feldjäger", "FeldjÃ¤ger" and "feldjager" all give "feldjager".
+
+    Args:
+        name (str): A player name as found in an export
+
+    Returns:
+        str: The match key
+    """
+    return DataProcessor.transliterate_text(display_name(name)).casefold()
+
+
+class PlayerIdentities:
+    """
+    Map every observed spelling of a player name to a stable player ID.
+
+    Each distinct spelling is resolved once: known spellings are looked up
+    in the alias table, new ones are matched on match_key() to an existing
+    player or create one. A player's canonical name is the repaired
+    display_name() of the first spelling seen and never changes, so stored
+    totals keep matching it.
+
+    With a connection the players and aliases are kept in its tables (see
+    SCHEMA), as the history store does; without one they only live as long
+    as the object, which is enough to merge the spellings within one load.
+    """
+
+    def __init__(self, connection=None):
+        """
+        Load the known players and aliases.
+
+        Args:
+            connection (sqlite3.Connection, optional): Database with the SCHEMA tables
+        """
+        self.connection = connection
+        self.names = {}
+        self._ids_by_key = {}
+        self._ids_by_alias = {}
+        if connection is not None:
+            for player_id, name, key in connection.execute("SELECT id, name, match_key FROM players"):
+                self.names[player_id] = name
+                self._ids_by_key[key] = player_id
+            self._ids_by_alias = dict(connection.execute("SELECT alias, player_id FROM player_aliases"))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _resolve_new(self, spelling):
+        """Find or create the player of a spelling not seen before."""
+        key = match_key(spelling)
+        player_id = self._ids_by_key.get(key)
+        if player_id is None:
+            name = display_name(spelling)
+            if self.connection is not None:
+                player_id = self.connection.execute(
+                    "INSERT INTO players (name, match_key) VALUES (?, ?)", (name, key)).lastrowid
+            else:
+                player_id = len(self.names) + 1
+            self.names[player_id] = name
+            self._ids_by_key[key] = player_id
+        if self.connection is not None:
+            self.connection.execute("INSERT INTO player_aliases (alias, player_id) VALUES (?, ?)",
+                                    (spelling, player_id))
+        self._ids_by_alias[spelling] = player_id
+        return player_id
+
+    def resolve(self, names):
+        """
+        Resolve a column of player names.
+
+        Args:
+            names (pandas.Series): Player names as found in an export
+
+        Returns:
+            tuple: (numpy.ndarray of int64 player IDs per row, 0 for a missing name;
+            pandas.Series of canonical names per row as a categorical with the same index)
+        """
+        with stage_timer.stage('player_identity', rows=len(names)):
+            # Missing names get code -1 and stay missing
+            codes, spellings = pd.factorize(names)
+            new = 0
+            ids = np.empty(len(spellings), dtype=np.int64)
+            for position, spelling in enumerate(map(str, spellings)):
+                player_id = self._ids_by_alias.get(spelling)
+                if player_id is None:
+                    player_id = self._resolve_new(spelling)
+                    new += 1
+                ids[position] = player_id
+
+            # One category per player, so groupby works on the player's code
+            player_ids, categories = np.unique(ids, return_inverse=True)
+            missing = codes < 0
+            category_codes = np.where(missing, -1, categories[codes] if len(spellings) else codes)
+            canonical = pd.Series(
+                pd.Categorical.from_codes(category_codes, [self.names[i] for i in player_ids.tolist()]),
+                index=names.index, name=names.name
+            )
+            row_ids = np.where(missing, 0, ids[codes] if len(spellings) else codes)
+        if DataProcessor.debug and new:
+            print(f"Resolved {new} new spellings; {len(spellings)} spellings are "
+                  f"{len(player_ids)} players")
+        return row_ids, canonical
+
+    def lookup(self, names):
+        """
+        Get the canonical names of known players without adding new ones.
+
+        Args:
+            names (list): Spellings, e.g. typed by the user ("feldjager")
+
+        Returns:
+            list: The canonical name of each known player; unknown names are returned unchanged
+        """
+        result = []
+        for name in names:
+            player_id = self._ids_by_alias.get(name) or self._ids_by_key.get(match_key(name))
+            result.append(self.names[player_id] if player_id is not None else name)
+        return result
+
+    def canonicalize(self, df, column='PLAYER'):
+        """
+        Replace the player names of a DataFrame with their canonical names.
+
+        Args:
+            df (pandas.DataFrame): Data with a player column
+            column (str, optional): The player column. Defaults to 'PLAYER'.
+
+        Returns:
+            pandas.DataFrame: A copy with canonical names in `column`
+        """
+        _, canonical = self.resolve(df[column])
+        return df.assign(**{column: canonical})
+
+    def table(self):
+        """
+        List the players and their spellings.
+
+        Returns:
+            pandas.DataFrame: Columns PLAYER_ID, PLAYER, ALIASES (the spellings seen,
+            sorted) and ALIAS_COUNT, by player ID
+        """
+        aliases = {}
+        for alias, player_id in self._ids_by_alias.items():
+            aliases.setdefault(player_id, []).append(alias)
+        player_ids = sorted(self.names)
+        return pd.DataFrame({
+            'PLAYER_ID': player_ids,
+            'PLAYER': [self.names[i] for i in player_ids],
+            'ALIASES': [", ".join(sorted(aliases.get(i, []))) for i in player_ids],
+            'ALIAS_COUNT': [len(aliases.get(i, [])) for i in player_ids],
+        })
@@ -0,0 +1,368 @@
+# reportcharts.py - Report chart rendering without Qt or pyplot
+import tempfile
+
+import numpy as np
+import pandas as pd
+from matplotlib.artist import setp
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Default chart style shared by the on-screen canvas and report charts
+CHART_STYLE = {
+    'bg_color': '#1A2742',  # Dark blue background
+    'text_color': '#FFFFFF',  # White text
+    'grid_color': '#2A3F5F',  # Medium blue grid
+    'tick_color': '#FFFFFF',  # White ticks
+    'title_color': '#D4AF37',  # Gold title
+    'title_size': 14,
+    'label_size': 12,
+    'bar_colors': ['#D4AF37', '#5991C4', '#6EC1A7', '#D46A5F'],  # Gold, Blue, Green, Red
+    'pie_colors': ['#D4AF37', '#5991C4', '#6EC1A7', '#D46A5F', '#8899AA', '#F0C75A'],
+    'line_color': '#5991C4',  # Blue
+    'line_width': 2.5,
+    'marker_size': 8,
+    'marker_color': '#D4AF37',  # Gold markers
+    'edge_color': '#1A2742'  # Dark blue edges
+}
+
+
+class ReportChartRenderer:
+    """
+    Render report charts to PNG files.
+
+    Figures are created directly with the Agg canvas instead of pyplot, so
+    rendering does not touch global matplotlib state or any Qt widget and is
+    safe to run from a worker thread or a headless process.
+    """
+
+    def __init__(self, analysis_results, style=None, debug=False):
+        """
+        Initialize the renderer.
+
+        Args:
+            analysis_results (dict): Results returned by DataProcessor.analyze_data
+            style (dict, optional): Chart style settings. Defaults to CHART_STYLE.
+            debug (bool, optional): Enable debug output. Defaults to False.
+        """
+        self.analysis_results = analysis_results or {}
+        self.style = style or CHART_STYLE
+        self.debug = debug
+
+    def __call__(self, chart_type, category_field, title):
+        """Render a chart; see render()."""
+        return self.render(chart_type, category_field, title)
+
+    def render(self, chart_type, category_field, title):
+        """
+        Generate a chart image for the report.
+
+        Args:
+            chart_type (str): The type of chart to generate (e.g., 'Bar Chart', 'Pie Chart')
+            category_field (str): The field to use for categorization (e.g., 'PLAYER', 'CHEST')
+            title (str): The title of the chart
+
+        Returns:
+            str: The path to the generated chart image file, or None on failure
+        """
+        try:
+            style = self.style
+
+            # Get appropriate dataset based on category_field
+            df = self.get_chart_data(category_field)
+            if df is None or df.empty:
+                return None
+
+            # Set measure based on chart type and category_field
+            measure = self.get_chart_measure(category_field)
+            if measure not in df.columns:
+                if self.debug:
+                    print(f"Measure {measure} not found in data: {df.columns.tolist()}")
+                return None
+
+            fig = Figure(figsize=(10, 6), facecolor=style['bg_color'])
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot(111)
+            self.apply_style(fig, ax)
+
+            colors = style['bar_colors']
+
+            # Create the chart based on chart_type
+            if chart_type == 'Bar Chart':
+                self.create_bar_chart(ax, df, category_field, measure, colors, title)
+            elif chart_type == 'Pie Chart':
+                self.create_pie_chart(ax, df, category_field, measure, colors, title)
+            elif chart_type == 'Line Chart':
+                self.create_line_chart(ax, df, category_field, measure, colors, title)
+            elif chart_type == 'Scatter Chart':
+                self.create_scatter_chart(ax, df, category_field, measure, colors, title)
+            elif chart_type == 'Bubble Chart':
+                self.create_bubble_chart(ax, df, category_field, colors, title)
+
+            # Setup grid
+            ax.grid(True, color=style['grid_color'], linestyle='--', alpha=0.3)
+
+            # Create a temporary file for the chart
+            temp_file = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
+            temp_file.close()
+
+            fig.tight_layout()
+            fig.savefig(
+                temp_file.name,
+                format='png',
+                dpi=150,
+                bbox_inches='tight',
+                facecolor=style['bg_color'],
+                edgecolor='none'
+            )
+            return temp_file.name
+
+        except Exception as e:
+            print(f"Error generating chart for report: {e}")
+            if self.debug:
+                import traceback
+                traceback.print_exc()
+            return None
+
+    def apply_style(self, fig, ax):
+        """
+        Apply consistent styling to a report chart.
+
+        Args:
+            fig: The matplotlib figure
+            ax: The matplotlib axes
+        """
+        style = self.style
+        fig.patch.set_facecolor(style['bg_color'])
+        ax.set_facecolor(style['bg_color'])
+        ax.tick_params(axis='both', colors=style['text_color'], labelcolor=style['text_color'])
+        ax.xaxis.label.set_color(style['text_color'])
+        ax.yaxis.label.set_color(style['text_color'])
+        ax.title.set_color(style['title_color'])
+
+        # Set spine colors to match theme
+        for spine in ax.spines.values():
+            spine.set_color(style['grid_color'])
+
+    def get_chart_data(self, category_field):
+        """Get the appropriate dataset for a report chart based on category field."""
+        key = {
+            'PLAYER': 'player_totals',
+            'CHEST': 'chest_totals',
+            'SOURCE': 'source_totals',
+            'DATE': 'date_totals'
+        }.get(category_field)
+        if key in self.analysis_results and not self.analysis_results[key].empty:
+            return self.analysis_results[key].copy()
+        return None
+
+    def get_chart_measure(self, category_field):
+        """Get the appropriate measure for a report chart based on category field."""
+        if category_field == 'PLAYER':
+            return 'TOTAL_SCORE'
+        else:
+            return 'SCORE'
+
+    def create_bar_chart(self, ax, df, category_field, measure, colors, title):
+        """Create a bar chart for a report."""
+        # Sort and limit data to top 15 for readability
+        data = df.sort_values(measure, ascending=False).head(15)
+
+        # Create list of colors by cycling through the palette
+        bar_colors = [colors[i % len(colors)] for i in range(len(data))]
+
+        # Create the bar chart
+        bars = ax.bar(data[category_field], data[measure], color=bar_colors)
+
+        # Set labels and title
+        ax.set_ylabel('Score', color=colors[0])
+        ax.set_title(title, color=colors[0], fontsize=14)
+        setp(ax.get_xticklabels(), rotation=45, ha='right')
+
+        # Add values on top of bars
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(
+                bar.get_x() + bar.get_width()/2.,
+                height,
+                f'{height:,.0f}',
+                ha='center',
+                va='bottom',
+                color='white',
+                fontweight='bold'
+            )
+
+    def create_pie_chart(self, ax, df, category_field, measure, colors, title):
+        """Create a pie chart for a report."""
+        # Sort and limit data to top 9 + "Others" for readability
+        data = df.sort_values(measure, ascending=False)
+
+        # Limit to top 9 items + "Others" if there are too many slices
+        pie_data = data
+        if len(data) > 10:
+            top_items = data.iloc[:9].copy()
+            others_sum = data.iloc[9:][measure].sum()
+            others_row = pd.DataFrame({
+                category_field: ['Others'],
+                measure: [others_sum]
+            })
+            pie_data = pd.concat([top_items, others_row]).reset_index(drop=True)
+
+        # Use multiple colors from the palette (cycle if needed)
+        pie_colors = [colors[i % len(colors)] for i in range(len(pie_data))]
+
+        # Create the pie chart
+        wedges, texts, autotexts = ax.pie(
+            pie_data[measure].values,
+            labels=pie_data[category_field].values,
+            autopct='%1.1f%%',
+            colors=pie_colors,
+            startangle=90,
+            wedgeprops={'edgecolor': '#1A2742', 'linewidth': 1}
+        )
+
+        # Style the pie chart text
+        for text in texts:
+            text.set_color('white')
+        for autotext in autotexts:
+            autotext.set_color('white')
+            autotext.set_fontweight('bold')
+
+        # Set title
+        ax.set_title(title, color=colors[0], fontsize=14)
+
+    def create_line_chart(self, ax, df, category_field, measure, colors, title):
+        """Create a line chart for a report."""
+        # For date data, ensure it's sorted chronologically
+        if category_field == 'DATE':
+            data = df.sort_values(category_field)
+        else:
+            # For non-date data, sort by measure
+            data = df.sort_values(measure, ascending=False)
+
+        # If too many points, limit to top 20
+        if len(data) > 20:
+            data = data.head(20)
+
+        # For non-date categories, use numeric x-axis
+        if category_field != 'DATE':
+            x = np.arange(len(data))
+        else:
+            x = data[category_field].values
+
+        ax.plot(
+            x,
+            data[measure].values,
+            marker='o',
+            color=colors[1],  # Blue
+            linewidth=2.5,
+            markersize=8,
+            markerfacecolor=colors[0],  # Gold
+            markeredgecolor='#1A2742'
+        )
+
+        if category_field != 'DATE':
+            # Set x-ticks to category names
+            ax.set_xticks(x)
+            ax.set_xticklabels(data[category_field].values)
+
+        # Add values at each point
+        for x_pos, y in zip(x, data[measure].values):
+            ax.text(
+                x_pos,
+                y,
+                f'{y:,.0f}',
+                ha='center',
+                va='bottom',
+                color='white',
+                fontweight='bold'
+            )
+
+        # Set labels and title
+        ax.set_ylabel('Score', color='white')
+        ax.set_title(title, color=colors[0], fontsize=14)
+        setp(ax.get_xticklabels(), rotation=45, ha='right')
+
+    def create_scatter_chart(self, ax, df, category_field, measure, colors, title):
+        """Create a scatter chart for a report."""
+        # Sort and limit data
+        data = df.sort_values(measure, ascending=False).head(15)
+        values = data[measure].values
+
+        # Plot each point with a different color
+        for i, value in enumerate(values):
+            color_index = i % len(colors)
+
+            # Add the scatter point
+            ax.scatter(i, value, color=colors[color_index], s=100, zorder=10)
+
+            # Connect points with lines if there are more than one
+            if i > 0:
+                ax.plot([i-1, i], [values[i-1], value], color=colors[color_index],
+                        linewidth=1.5, alpha=0.7, zorder=5)
+
+        # Set the x-tick positions and labels
+        ax.set_xticks(range(len(data)))
+        ax.set_xticklabels(data[category_field].values)
+
+        # Add values on data points
+        for i, value in enumerate(values):
+            ax.text(i, value, f'{value:,.0f}', ha='center', va='bottom', color='white', fontweight='bold')
+
+        # Set labels and title
+        ax.set_ylabel('Score', color='white')
+        ax.set_title(title, color=colors[0], fontsize=14)
+
+    def create_bubble_chart(self, ax, df, category_field, colors, title):
+        """
+        Create a bubble chart for reports where the bubble size represents a value.
+
+        Args:
+            ax: The matplotlib axis to plot on
+            df: The DataFrame containing the data
+            category_field: The category field to use for labels
+            colors: A list of colors to use for the chart
+            title: The title for the chart
+        """
+        if df is None or len(df) == 0:
+            ax.text(0.5, 0.5, "No data available for this chart",
+                    ha='center', va='center', fontsize=12, color='white')
+            return
+
+        # For bubble charts, we need player name, CHEST_COUNT (x-axis), TOTAL_SCORE (y-axis)
+        required = ['PLAYER', 'CHEST_COUNT', 'TOTAL_SCORE']
+        missing = [col for col in required if col not in df.columns]
+        if missing:
+            ax.text(0.5, 0.5, f"Missing required columns: {', '.join(missing)}",
+                    ha='center', va='center', fontsize=12, color='white')
+            return
+
+        # Top 20 players by score
+        data = df.sort_values('TOTAL_SCORE', ascending=False).head(20)
+
+        # Bubble size represents efficiency (score per chest)
+        efficiency = data['TOTAL_SCORE'] / data['CHEST_COUNT']
+        sizes = 50 * (efficiency / efficiency.max())
+
+        ax.scatter(
+            data['CHEST_COUNT'],
+            data['TOTAL_SCORE'],
+            s=sizes,
+            c=colors[0],
+            alpha=0.6,
+            edgecolors=colors[1]
+        )
+
+        # Add player labels
+        for i, player in enumerate(data['PLAYER']):
+            ax.annotate(
+                player,
+                (data['CHEST_COUNT'].iloc[i], data['TOTAL_SCORE'].iloc[i]),
+                xytext=(5, 5), textcoords='offset points',
+                color='white',
+                fontweight='bold'
+            )
+
+        # Set labels and title
+        ax.set_xlabel('Chest Count', color='white')
+        ax.set_ylabel('Total Score', color='white')
+        ax.set_title(title, color=colors[0], fontsize=14)
@@ -0,0 +1,523 @@
+# reporttemplates.py - Report layout templates and section fragment caching
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from string import Template
+
+from .timing import stage_timer
+
+# Report colors (match the application's dark theme)
+REPORT_COLORS = {
+    'background': '#0E1629',  # Dark blue background
+    'text': '#FFFFFF',        # White text
+    'accent': '#D4AF37',      # Gold accent
+    'border': '#2A3F5F',      # Border color
+    'bg_light': '#1A2742'     # Lighter background
+}
+
+# Stylesheet shared by every report type. It is substituted once at import time.
+_REPORT_CSS = Template("""
+        body {
+            font-family: Arial, sans-serif;
+            background-color: $background;
+            color: $text;
+            margin: 20px;
+        }
+        h1, h2, h3, h4 {
+            color: $accent;
+        }
+        .header {
+            border-bottom: 2px solid $accent;
+            padding-bottom: 10px;
+            margin-bottom: 20px;
+        }
+        .section, .report-section {
+            margin-bottom: 30px;
+            background-color: $bg_light;
+            padding: 15px;
+            border-radius: 5px;
+        }
+        .report-section {
+            border: 1px solid $border;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 15px 0;
+        }
+        th, td {
+            border: 1px solid $border;
+            padding: 8px;
+            text-align: left;
+        }
+        th {
+            background-color: $background;
+            color: $accent;
+        }
+        tr:hover {
+            background-color: rgba(42, 63, 95, 0.5);
+        }
+        .chart-container {
+            margin: 20px 0;
+            text-align: center;
+        }
+        .chart-container img {
+            max-width: 100%;
+            height: auto;
+        }
+        .stats-container {
+            display: flex;
+            flex-wrap: wrap;
+            justify-content: space-between;
+            margin: 20px 0;
+        }
+        .stat-box {
+            background-color: $bg_light;
+            border: 1px solid $border;
+            border-radius: 5px;
+            padding: 15px;
+            margin-bottom: 15px;
+            width: calc(33% - 20px);
+            box-sizing: border-box;
+            text-align: center;
+        }
+        .stat-box p {
+            margin: 5px 0;
+        }
+        .stat-value {
+            font-size: 24px;
+            font-weight: bold;
+            color: $accent;
+        }
+        .footer {
+            margin-top: 30px;
+            text-align: center;
+            font-size: 0.8em;
+            color: $text;
+            border-top: 1px solid $border;
+            padding-top: 10px;
+        }
+""").substitute(REPORT_COLORS)
+
+
+class ReportLayout:
+    """
+    Shared HTML layout for all reports.
+
+    The document skeleton and stylesheet are compiled once; rendering a report
+    only substitutes the title, timestamp and body.
+    """
+
+    _template = Template(
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+        '<title>Total Battle Analyzer - $title</title>\n'
+        '<style>' + _REPORT_CSS + '</style>\n'
+        '</head>\n<body>\n'
+        '<div class="header">\n<h1>Total Battle Analyzer - $title</h1>\n'
+        '<p>Generated on: $generated_on</p>\n</div>\n'
+        '$body\n'
+        '<div class="footer">\n'
+        '<p>Total Battle Analyzer - $title generated on $generated_on</p>\n'
+        '</div>\n</body>\n</html>\n'
+    )
+
+    @classmethod
+    def render(cls, title, body, generated_on=None):
+        """
+        Render a complete report document.
+
+        Args:
+            title (str): The report title (e.g. 'Full Report')
+            body (str): The HTML body fragments
+            generated_on (str, optional): Timestamp shown in the header. Defaults to now.
+
+        Returns:
+            str: The complete HTML document
+        """
+        if generated_on is None:
+            generated_on = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return cls._template.substitute(title=title, body=body, generated_on=generated_on)
+
+
+class ReportFragmentCache:
+    """
+    Least-recently-used cache for rendered report fragments.
+
+    Fragments are keyed by section name and data version; the include options
+    only decide which fragments a report uses, so switching report type or
+    toggling them reuses sections that were already rendered. Lookups are
+    locked so a report can be built on a worker thread while the GUI thread
+    clears the cache.
+    """
+
+    def __init__(self, max_entries=64):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached fragments. Defaults to 64.
+        """
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, name, data_version, builder):
+        """
+        Return a cached fragment, building and storing it on a miss.
+
+        Args:
+            name (str): The fragment name
+            data_version (int): Version of the data the fragment is built from
+            builder (callable): Zero-argument callable returning the fragment HTML
+
+        Returns:
+            str: The fragment HTML
+        """
+        key = (name, data_version)
+        with self._lock:
+            if key in self._fragments:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return self._fragments[key]
+            self.misses += 1
+
+        fragment = builder()
+        with self._lock:
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        """Remove all cached fragments."""
+        with self._lock:
+            self._fragments.clear()
+
+
+class ReportBuilder:
+    """
+    Build report documents from analysis results using cached section fragments.
+
+    Chart images are produced by the ``chart_renderer`` callable, which takes
+    ``(chart_type, category_field, title)`` and returns an image path or None.
+    """
+
+    REPORT_TYPES = ["Full Report", "Player Performance", "Chest Type Analysis", "Source Analysis"]
+
+    def __init__(self, analysis_results, chart_renderer, cache=None, data_version=0):
+        """
+        Initialize the report builder.
+
+        Args:
+            analysis_results (dict): Results returned by DataProcessor.analyze_data
+            chart_renderer (callable): Callable that renders a chart image for the report
+            cache (ReportFragmentCache, optional): Fragment cache to use. Defaults to a new cache.
+            data_version (int, optional): Version of analysis_results used in cache keys
+        """
+        self.analysis_results = analysis_results or {}
+        self.chart_renderer = chart_renderer
+        self.cache = cache if cache is not None else ReportFragmentCache()
+        self.data_version = data_version
+
+    def build(self, report_type, include_charts=True, include_tables=True, include_stats=True):
+        """
+        Build a complete report document.
+
+        Args:
+            report_type (str): One of REPORT_TYPES
+            include_charts (bool): Whether to include charts in the report
+            include_tables (bool): Whether to include tables in the report
+            include_stats (bool): Whether to include statistics in the report
+
+        Returns:
+            str: The complete HTML document
+        """
+        parts = []
+        for name, fragment in self.sections(report_type, include_charts, include_tables, include_stats):
+            with stage_timer.stage('report_section', report=report_type, section=name):
+                parts.append(fragment())
+        return ReportLayout.render(report_type, "".join(parts))
+
+    def sections(self, report_type, include_charts=True, include_tables=True, include_stats=True):
+        """
+        Get the ordered section jobs for a report type.
+
+        Args:
+            report_type (str): One of REPORT_TYPES
+            include_charts (bool): Whether to include charts in the report
+            include_tables (bool): Whether to include tables in the report
+            include_stats (bool): Whether to include statistics in the report
+
+        Returns:
+            list: (section name, zero-argument callable returning the section HTML) tuples
+        """
+        if report_type == "Full Report":
+            return [
+                ("Overview", lambda: self._section(
+                    "Overview",
+                    [self._fragment('overview_stats') if include_stats else ""])),
+                ("Player Performance", lambda: self._section(
+                    "Player Performance",
+                    [self._fragment('player_bar_chart') if include_charts else "",
+                     self._fragment('player_table') if include_tables else ""])),
+                ("Chest Analysis", lambda: self._section(
+                    "Chest Analysis",
+                    [self._fragment('chest_summary_charts') if include_charts else "",
+                     self._fragment('chest_table') if include_tables else ""])),
+                ("Source Analysis", lambda: self._section(
+                    "Source Analysis",
+                    [self._fragment('source_summary_charts') if include_charts else "",
+                     self._fragment('source_table') if include_tables else ""])),
+            ]
+        if report_type == "Player Performance":
+            return [
+                ("Player Overview", lambda: self._section(
+                    "Player Overview",
+                    [self._fragment('player_stats') if include_stats else ""])),
+                ("Player Performance Details", lambda: self._section(
+                    "Player Performance Details",
+                    [self._fragment('player_detail_charts') if include_charts else "",
+                     self._fragment('player_table') if include_tables else ""])),
+                ("Player Efficiency Analysis", lambda: self._section(
+                    "Player Efficiency Analysis",
+                    [self._fragment('player_efficiency') if include_stats else ""])),
+            ]
+        if report_type == "Chest Type Analysis":
+            return self._category_sections('CHEST', 'chest_totals', 'Chest', 'chest types',
+                                           include_charts, include_tables, include_stats)
+        if report_type == "Source Analysis":
+            return self._category_sections('SOURCE', 'source_totals', 'Source', 'chest sources',
+                                           include_charts, include_tables, include_stats)
+        return [("Invalid", lambda: "<h1>Invalid report type selected</h1>")]
+
+    def _category_sections(self, category, key, label, description, include_charts, include_tables, include_stats):
+        """Get the section jobs for the chest or source analysis reports."""
+        intro = (f"<p>This report provides an analysis of {description} in Total Battle, "
+                 f"including their distribution and value.</p>")
+        if key not in self.analysis_results:
+            return [("Introduction", lambda: intro + f"<p>No {label.lower()} analysis data available. "
+                                                    f"Please import and analyze data first.</p>")]
+
+        lower = label.lower()
+        sections = [("Introduction", lambda: intro)]
+        if include_charts:
+            sections.append(("Charts", lambda: self._section(
+                "Charts", [self._fragment(f'{lower}_detail_charts')], css_class="report-section")))
+        if include_stats:
+            sections.append(("Key Statistics", lambda: self._section(
+                "Key Statistics", [self._fragment(f'{lower}_stat_boxes')], css_class="report-section")))
+        if include_tables:
+            sections.append((f"{label} Data Table", lambda: self._section(
+                f"{label} Data Table", [self._fragment(f'{lower}_data_table')], css_class="report-section")))
+        return sections
+
+    def _section(self, title, fragments, css_class="section"):
+        """Wrap fragments in a titled section block."""
+        return f'<div class="{css_class}">\n<h2>{title}</h2>\n{"".join(fragments)}\n</div>\n'
+
+    def _fragment(self, name):
+        """Get a named fragment from the cache, building it on a miss."""
+        builder = getattr(self, f'_build_{name}', None)
+        if builder is None:
+            builder = self._named_builder(name)
+        return self.cache.get_or_build(name, self.data_version, builder)
+
+    def _named_builder(self, name):
+        """Resolve the builder for a parameterized chest/source fragment name."""
+        prefix, _, part = name.partition('_')
+        category, key, label = {
+            'chest': ('CHEST', 'chest_totals', 'Chest'),
+            'source': ('SOURCE', 'source_totals', 'Source'),
+        }[prefix]
+        builders = {
+            'summary_charts': lambda: self._build_summary_charts(category, key, label),
+            'table': lambda: self._build_sorted_table(key, f"{label} Analysis Data",
+                                                      f"No {label.lower()} analysis data available"),
+            'detail_charts': lambda: self._build_detail_charts(category, key, label),
+            'stat_boxes': lambda: self._build_stat_boxes(category, key, label),
+            'data_table': lambda: self._build_data_table(key, label),
+        }
+        return builders[part]
+
+    def _frame(self, key):
+        """Get a non-empty analysis frame or None."""
+        df = self.analysis_results.get(key)
+        if df is None or df.empty:
+            return None
+        return df
+
+    def _chart(self, chart_type, category_field, title, alt, caption=None, heading=None):
+        """Render a chart and return its HTML block, or an empty string on failure."""
+        chart_file = self.chart_renderer(chart_type, category_field, title)
+        if not chart_file:
+            return ""
+        heading_html = f"<h3>{heading}</h3>\n" if heading else ""
+        caption_html = f"<p>{caption}</p>\n" if caption else ""
+        # Relative paths are kept as-is so published reports can ship their chart files
+        src = f"file:///{chart_file}" if os.path.isabs(chart_file) else chart_file
+        return (f'<div class="chart-container">\n{heading_html}'
+                f'<img src="{src}" alt="{alt}" style="max-width:100%; height:auto;">\n'
+                f'{caption_html}</div>\n')
+
+    def _build_overview_stats(self):
+        """Overall statistics for the full report."""
+        player_df = self._frame('player_totals')
+        chest_df = self._frame('chest_totals')
+        if player_df is None or chest_df is None:
+            return "<p>No overview data available</p>"
+
+        total_score = player_df['SCORE'].sum() if 'SCORE' in player_df.columns else 0
+        total_chests = chest_df['CHEST_COUNT'].sum() if 'CHEST_COUNT' in chest_df.columns else 0
+        return (f"<p>Total Players: {len(player_df)}</p>\n"
+                f"<p>Total Chest Types: {len(chest_df)}</p>\n"
+                f"<p>Total Score: {total_score:,.0f}</p>\n"
+                f"<p>Total Chests: {total_chests:,.0f}</p>\n"
+                f"{self._percentiles_line()}")
+
+    def _percentiles_line(self):
+        """The p50/p90/p99 chest score line, empty without score quantiles."""
+        quantiles = self._frame('score_quantiles')
+        if quantiles is None:
+            return ""
+        row = quantiles.iloc[0]
+        return (f"<p>Score per Chest: median {row['P50']:,.0f}, 90th percentile {row['P90']:,.0f}, "
+                f"99th percentile {row['P99']:,.0f} (within 1%)</p>\n")
+
+    def _build_player_stats(self):
+        """Player overview statistics."""
+        player_df = self._frame('player_totals')
+        if player_df is None:
+            return "<p>No player data available for statistics</p>"
+
+        top_player = player_df.sort_values('SCORE', ascending=False).iloc[0]
+        html = (f"<p>Total Players: {len(player_df)}</p>\n"
+                f"<p>Average Score per Player: {player_df['SCORE'].mean():.2f}</p>\n"
+                f"<p>Top Player: {top_player['PLAYER']} with {top_player['SCORE']:.2f} points</p>\n"
+                f"{self._percentiles_line()}")
+        quantiles = self._frame('player_quantiles')
+        if quantiles is not None:
+            table = quantiles.head(10).to_html(index=False, classes="table")
+            html += f"<h3>Highest Median Score per Chest</h3>\n{table}\n"
+        return html
+
+    def _build_player_bar_chart(self):
+        """Player total scores bar chart."""
+        if 'player_totals' not in self.analysis_results:
+            return ""
+        return self._chart('Bar Chart', 'PLAYER', 'Player Total Scores',
+                           alt="Player Performance Chart", caption="Player Total Scores")
+
+    def _build_player_detail_charts(self):
+        """Charts for the player performance details section."""
+        if 'player_totals' not in self.analysis_results:
+            return ""
+
+        html = self._fragment('player_bar_chart')
+        player_df = self._frame('player_totals')
+        if player_df is not None and 'CHEST_COUNT' in player_df.columns and 'TOTAL_SCORE' in player_df.columns:
+            html += self._chart('Bubble Chart', 'PLAYER', 'Player Efficiency', alt="Player Efficiency Chart",
+                                caption="Player Efficiency (Score vs Chest Count)")
+        html += self._chart('Stacked Bar Chart', 'PLAYER', 'Player Overview', alt="Player Source Breakdown",
+                            caption="Player Scores by Source")
+        if not html:
+            html = ('<div class="chart-container">\n'
+                    '<p>[Could not generate Player Performance Charts]</p>\n</div>\n')
+        return html
+
+    def _build_player_table(self):
+        """Player performance data table."""
+        return self._build_sorted_table('player_totals', "Player Performance Data",
+                                        "No player performance data available")
+
+    def _build_player_efficiency(self):
+        """Player efficiency statistics and top-5 table."""
+        player_df = self._frame('player_totals')
+        if player_df is None or 'CHEST_COUNT' not in player_df.columns or 'TOTAL_SCORE' not in player_df.columns:
+            return "<p>No player efficiency data available</p>"
+
+        efficiency = player_df.assign(
+            POINTS_PER_CHEST=player_df['TOTAL_SCORE'] / player_df['CHEST_COUNT'].replace(0, 1)
+        ).sort_values('POINTS_PER_CHEST', ascending=False)
+        top = efficiency.iloc[0]
+        table = efficiency.head(5)[['PLAYER', 'POINTS_PER_CHEST', 'TOTAL_SCORE', 'CHEST_COUNT']].to_html(
+            index=False, classes="table")
+        return (f"<p>Most Efficient Player: {top['PLAYER']} with {top['POINTS_PER_CHEST']:.2f} points per chest</p>\n"
+                f"<h3>Top 5 Most Efficient Players</h3>\n{table}\n")
+
+    def _build_sorted_table(self, key, heading, empty_message):
+        """An analysis table sorted by score."""
+        if key not in self.analysis_results:
+            return ""
+        df = self._frame(key)
+        if df is None:
+            return f"<p>{empty_message}</p>"
+        table = df.sort_values('SCORE', ascending=False).to_html(index=False, classes="table")
+        return f"<h3>{heading}</h3>\n{table}\n"
+
+    def _build_summary_charts(self, category, key, label):
+        """Distribution and score charts for the full report."""
+        if key not in self.analysis_results:
+            return ""
+        return (self._chart('Pie Chart', category, f'{label} Score Distribution',
+                            alt=f"{label} Distribution Chart", caption=f"{label} Score Distribution")
+                + self._chart('Bar Chart', category, f'{label} Scores',
+                              alt=f"{label} Scores Chart", caption=f"{label} Scores by Type"))
+
+    def _build_detail_charts(self, category, key, label):
+        """Charts for the chest and source analysis reports."""
+        if self._frame(key) is None:
+            return f"<p>No {label.lower()} data available for charts.</p>"
+
+        html = ""
+        for chart_type, title in (("bar", f"{label} Score Distribution"),
+                                  ("bar", f"{label} Count Distribution"),
+                                  ("pie", f"{label} Score Proportion")):
+            html += self._chart(chart_type, category, title, alt=title, heading=title)
+        return html
+
+    def _build_stat_boxes(self, category, key, label):
+        """Key statistics boxes for the chest and source analysis reports."""
+        data = self._frame(key)
+        if data is None:
+            return f"<p>No {label.lower()} data available for statistics.</p>"
+
+        type_label = "Total Chest Types" if category == 'CHEST' else "Total Source Types"
+        avg_label = "Average Score per Chest Type" if category == 'CHEST' else "Average Score per Source"
+        total_label = "Total Score from Chests" if category == 'CHEST' else "Total Score from Sources"
+        try:
+            stats = [
+                (type_label, f"{len(data)}"),
+                (total_label, f"{data['SCORE'].sum():,.0f}"),
+                (avg_label, f"{data['SCORE'].mean():,.1f}"),
+                (f"Highest Scoring {label}", f"{data.loc[data['SCORE'].idxmax(), category]}"),
+                ("Highest Score Value", f"{data['SCORE'].max():,.0f}"),
+                ("Total Number of Chests", f"{data['CHEST_COUNT'].sum():,.0f}"),
+            ]
+            quantiles = self._frame('score_quantiles')
+            if quantiles is not None:
+                stats += [(f"{name} Score per Chest", f"{quantiles.iloc[0][column]:,.0f}")
+                          for name, column in (("Median", 'P50'), ("90th Percentile", 'P90'),
+                                               ("99th Percentile", 'P99'))]
+        except Exception as e:
+            return f"<p>Error generating statistics: {str(e)}</p>"
+
+        boxes = "".join(
+            f'<div class="stat-box">\n<p>{name}</p>\n<p class="stat-value">{value}</p>\n</div>\n'
+            for name, value in stats
+        )
+        return f'<div class="stats-container">\n{boxes}</div>\n'
+
+    def _build_data_table(self, key, label):
+        """Full data table for the chest and source analysis reports."""
+        data = self._frame(key)
+        if data is None:
+            return f"<p>No {label.lower()} data available for table display.</p>"
+        category = 'CHEST' if key == 'chest_totals' else 'SOURCE'
+        quantiles = self._frame(f'{category.lower()}_quantiles')
+        if quantiles is not None and category in data.columns:
+            data = data.merge(quantiles.drop(columns='CHEST_COUNT'), on=category, how='left')
+        table_html = data.sort_values('SCORE', ascending=False).to_html(index=False)
+        return table_html.replace('<table', '<table class="data-table"')
@@ -0,0 +1,212 @@
+# responsiveness.py - Event-loop latency probe for measuring GUI stalls
+import bisect
+import json
+import time
+
+from PySide6.QtCore import QObject, QTimer, Qt
+
+from .timing import stage_timer
+
+# Upper bounds in milliseconds of the latency histogram buckets
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+
+class EventLoopProbe(QObject):
+    """
+    Measure how long the GUI event loop is blocked.
+
+    A precise QTimer fires every ``interval_ms``. The delay between when a tick
+    was due and when it ran is the event-loop latency; every latency is added
+    to a histogram, and latencies above ``stall_threshold_ms`` are recorded as
+    stalls. Each stall is attributed to the StageTimer stage on the GUI thread
+    that spent the most of it outside its own child stages, so the stage
+    timer is enabled while the probe runs.
+
+    Works under the offscreen Qt platform, so it can be used in automated UI
+    benchmarks.
+    """
+
+    def __init__(self, interval_ms=5, stall_threshold_ms=50, timer=stage_timer, parent=None):
+        """
+        Initialize the probe.
+
+        Args:
+            interval_ms (int, optional): Heartbeat interval. Defaults to 5.
+            stall_threshold_ms (float, optional): Latency counted as a stall. Defaults to 50.
+            timer (StageTimer, optional): Stage timer used to attribute stalls
+            parent (QObject, optional): Parent object
+        """
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        self.stall_threshold_ms = stall_threshold_ms
+        self.timer = timer
+        self._heartbeat = QTimer(self)
+        self._heartbeat.setTimerType(Qt.PreciseTimer)
+        self._heartbeat.setInterval(interval_ms)
+        self._heartbeat.timeout.connect(self._on_tick)
+        self._timer_was_enabled = None
+        self.reset()
+
+    def reset(self):
+        """Clear all measurements."""
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.latencies_ms = []
+        self.stalls = []
+        self._last_tick = None
+        self._last_wall = None
+
+    def start(self):
+        """Start the heartbeat and enable the stage timer for attribution."""
+        if self._heartbeat.isActive():
+            return
+        self._timer_was_enabled = self.timer.enabled
+        self.timer.enabled = True
+        self._last_tick = time.perf_counter()
+        self._last_wall = time.time()
+        self._heartbeat.start()
+
+    def stop(self):
+        """Stop the heartbeat and restore the stage timer's previous state."""
+        if not self._heartbeat.isActive():
+            return
+        self._heartbeat.stop()
+        # Account for a stall still in progress when the probe is stopped
+        self._on_tick()
+        if self._timer_was_enabled is not None:
+            self.timer.enabled = self._timer_was_enabled
+            self._timer_was_enabled = None
+
+    def is_running(self):
+        """Check whether the heartbeat is running."""
+        return self._heartbeat.isActive()
+
+    def _on_tick(self):
+        """Record the latency of this tick."""
+        now = time.perf_counter()
+        wall = time.time()
+        latency_ms = max((now - self._last_tick) * 1000 - self.interval_ms, 0.0)
+        self.latencies_ms.append(latency_ms)
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        if latency_ms >= self.stall_threshold_ms:
+            stage, top_stage = self._attribute(self._last_wall, wall)
+            self.stalls.append({
+                'started': self._last_wall,
+                'duration_ms': round(latency_ms, 3),
+                'stage': stage,
+                'top_stage': top_stage,
+            })
+        self._last_tick = now
+        self._last_wall = wall
+
+    def _attribute(self, start, end):
+        """
+        Find the GUI-thread stage that spent the most of a stall outside its child stages.
+
+        Returns:
+            tuple: (stage name, top-level stage name), None when no stage overlapped
+        """
+        overlapping = []
+        for record in self.timer.records():
+            if record['thread'] != 'MainThread':
+                continue
+            record_start = record['started']
+            record_end = record_start + record['duration_ms'] / 1000
+            overlap = min(end, record_end) - max(start, record_start)
+            if overlap > 0:
+                overlapping.append((record, record_start, record_end, overlap))
+
+        # Blame the stage with the most overlap not spent in its own child stages
+        best, best_key = None, None
+        top, top_overlap = None, 0.0
+        for record, record_start, record_end, overlap in overlapping:
+            own = overlap - sum(
+                child_overlap for child, child_start, child_end, child_overlap in overlapping
+                if child['depth'] == record['depth'] + 1 and child['parent'] == record['stage']
+                and record_start <= child_start and child_end <= record_end
+            )
+            key = (round(own, 3), record['depth'])
+            if best_key is None or key > best_key:
+                best, best_key = record, key
+            if record['depth'] == 0 and overlap > top_overlap:
+                top, top_overlap = record, overlap
+        return (best['stage'] if best else None), (top['stage'] if top else None)
+
+    def percentile(self, percent):
+        """Latency in milliseconds below which the given percentage of ticks fall."""
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        index = min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def histogram(self):
+        """
+        Get the latency histogram.
+
+        Returns:
+            list: (bucket upper bound in ms, tick count) tuples
+        """
+        return list(zip(LATENCY_BUCKETS_MS, self.counts))
+
+    def stalls_by_stage(self):
+        """
+        Total stall time per attributed stage.
+
+        Returns:
+            dict: Stage name (or 'unattributed') -> {'count', 'total_ms', 'max_ms'}
+        """
+        result = {}
+        for stall in self.stalls:
+            entry = result.setdefault(stall['stage'] or 'unattributed', {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] = round(entry['total_ms'] + stall['duration_ms'], 3)
+            entry['max_ms'] = max(entry['max_ms'], stall['duration_ms'])
+        return result
+
+    def summary(self):
+        """Get all measurements as JSON-serializable data."""
+        return {
+            'interval_ms': self.interval_ms,
+            'stall_threshold_ms': self.stall_threshold_ms,
+            'ticks': len(self.latencies_ms),
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(max(self.latencies_ms, default=0.0), 3),
+            'stalled_ms': round(sum(stall['duration_ms'] for stall in self.stalls), 3),
+            'histogram': [[str(bound), count] for bound, count in self.histogram()],
+            'stalls_by_stage': self.stalls_by_stage(),
+            'stalls': self.stalls,
+        }
+
+    def export_json(self, filepath):
+        """Write summary() to a JSON file."""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_text(self):
+        """Format the measurements as plain text."""
+        summary = self.summary()
+        lines = [
+            f"Ticks: {summary['ticks']:,} every {self.interval_ms} ms",
+            f"Latency: p50 {summary['p50_ms']:.1f} ms, p90 {summary['p90_ms']:.1f} ms, "
+            f"p99 {summary['p99_ms']:.1f} ms, max {summary['max_ms']:,.1f} ms",
+            f"Stalls over {self.stall_threshold_ms} ms: {len(self.stalls)}, "
+            f"{summary['stalled_ms']:,.0f} ms in total",
+            "",
+            "Latency histogram:",
+        ]
+        lower = 0
+        for bound, count in self.histogram():
+            label = f"> {lower} ms" if bound == float('inf') else f"{lower}-{bound} ms"
+            if count:
+                lines.append(f"  {label:>14}: {count:,}")
+            lower = bound
+        by_stage = summary['stalls_by_stage']
+        if by_stage:
+            lines.append("")
+            lines.append("Stalls by stage:")
+            for stage, entry in sorted(by_stage.items(), key=lambda item: -item[1]['total_ms']):
+                lines.append(f"  {stage:<20} {entry['count']:>4}x {entry['total_ms']:>10,.0f} ms "
+                             f"(max {entry['max_ms']:,.0f} ms)")
+        return "\n".join(lines)
@@ -0,0 +1,165 @@
+# rollups.py - Incrementally maintained per-period chest totals of the history store
+import numpy as np
+import pandas as pd
+
+# SQL expression giving the first day of the period a DATE falls in (weeks start on Monday)
+PERIODS = {
+    'day': "DATE",
+    'week': "date(DATE, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', DATE)",
+}
+
+# Rollup tables: the period they total over and the columns they group by besides CLAN.
+# Weeks start on Monday, so a week row covers exactly one ISO week.
+ROLLUPS = {
+    'player_day': {'period': 'day', 'keys': ('PLAYER',)},
+    'player_week': {'period': 'week', 'keys': ('PLAYER',)},
+    'player_month': {'period': 'month', 'keys': ('PLAYER',)},
+    'chest_source_week': {'period': 'week', 'keys': ('CHEST', 'SOURCE')},
+}
+
+
+def rollup_schema():
+    """Get the SQL creating the rollup tables."""
+    statements = []
+    for name, rollup in ROLLUPS.items():
+        keys = ", ".join(rollup['keys'])
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS rollup_{name} (\n"
+            f"    PERIOD TEXT NOT NULL,\n"
+            f"    CLAN TEXT NOT NULL,\n"
+            + "".join(f"    {key} TEXT NOT NULL,\n" for key in rollup['keys'])
+            + f"    SCORE NUMERIC NOT NULL,\n"
+            f"    CHEST_COUNT INTEGER NOT NULL,\n"
+            f"    PRIMARY KEY (PERIOD, CLAN, {keys})\n"
+            f") WITHOUT ROWID;"
+        )
+    return "\n".join(statements)
+
+
+def update_rollups(connection, import_id=None):
+    """
+    Add chests to the rollup tables.
+
+    Only the chests of one import are aggregated, and their totals are added
+    to the existing rows, so the cost depends on the size of the import, not
+    of the history.
+
+    Args:
+        connection (sqlite3.Connection): History database
+        import_id (int, optional): Import whose chests to add. Defaults to all chests,
+            for building the rollups of a store from scratch.
+    """
+    where, params = ("WHERE import_id = ?", (import_id,)) if import_id is not None else ("WHERE true", ())
+    # Group the new chests by day once per set of key columns; the rollups are
+    # then summed from these much smaller tables instead of from the chests
+    daily = {}
+    for rollup in ROLLUPS.values():
+        keys = ", ".join(rollup['keys'])
+        if keys in daily:
+            continue
+        daily[keys] = f"temp.rollup_daily_{len(daily)}"
+        connection.execute(f"DROP TABLE IF EXISTS {daily[keys]}")
+        connection.execute(
+            f"CREATE TABLE {daily[keys]} AS SELECT DATE, CLAN, {keys}, SUM(SCORE) AS SCORE, "
+            f"COUNT(*) AS CHEST_COUNT FROM chests {where} GROUP BY DATE, CLAN, {keys}",
+            params
+        )
+    for name, rollup in ROLLUPS.items():
+        keys = ", ".join(rollup['keys'])
+        # The WHERE clause is required for SQLite to parse ON CONFLICT after a SELECT
+        connection.execute(
+            f"INSERT INTO rollup_{name} (PERIOD, CLAN, {keys}, SCORE, CHEST_COUNT) "
+            f"SELECT {PERIODS[rollup['period']]}, CLAN, {keys}, SUM(SCORE), SUM(CHEST_COUNT) "
+            f"FROM {daily[keys]} WHERE true GROUP BY 1, CLAN, {keys} "
+            f"ON CONFLICT (PERIOD, CLAN, {keys}) DO UPDATE SET "
+            f"SCORE = SCORE + excluded.SCORE, CHEST_COUNT = CHEST_COUNT + excluded.CHEST_COUNT"
+        )
+    for table in daily.values():
+        connection.execute(f"DROP TABLE {table}")
+
+
+def rebuild_rollups(connection):
+    """Recompute the rollup tables from all stored chests."""
+    for name in ROLLUPS:
+        connection.execute(f"DELETE FROM rollup_{name}")
+    update_rollups(connection)
+
+
+def find_rollup(period, by=None):
+    """
+    Find the rollup table that totals per period and column.
+
+    Args:
+        period (str): 'day', 'week' or 'month'
+        by (str, optional): Column grouped by, besides the period
+
+    Returns:
+        str or None: Rollup name, None if no rollup can answer the grouping
+    """
+    for name, rollup in ROLLUPS.items():
+        if rollup['period'] == period and (by is None or by in rollup['keys']):
+            return name
+    return None
+
+
+def period_start(value, period):
+    """Get the first day of the period a date falls in."""
+    value = pd.Timestamp(value).normalize()
+    if period == 'week':
+        return value - pd.Timedelta(days=value.weekday())
+    if period == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def rolling_sums(daily, days, by='PLAYER'):
+    """
+    Trailing sums of score and chest count over a number of days.
+
+    The daily totals are spread over a dense (day x group) matrix; one
+    cumulative sum along the days minus the same sum shifted by the window
+    gives every window total at once.
+
+    Args:
+        daily (pandas.DataFrame): Columns DATE, [by], SCORE and CHEST_COUNT, e.g. the
+            player_day rollup
+        days (int): Window length in days, including the day itself
+        by (str, optional): Column to keep separate sums for, None for one total per day.
+            Defaults to 'PLAYER'.
+
+    Returns:
+        pandas.DataFrame: Columns ['DATE', by, 'SCORE', 'CHEST_COUNT'] with the sums of the
+        window ending on DATE, for every day and group with chests in the window
+    """
+    if days < 1:
+        raise ValueError("The window must be at least one day")
+    columns = ['DATE'] + ([by] if by else []) + ['SCORE', 'CHEST_COUNT']
+    if daily.empty:
+        return pd.DataFrame(columns=columns)
+
+    dates = pd.to_datetime(daily['DATE'])
+    first = dates.min()
+    day_index = ((dates - first) // pd.Timedelta(days=1)).to_numpy()
+    if by:
+        codes, groups = pd.factorize(daily[by], sort=True)
+    else:
+        codes, groups = np.zeros(len(daily), dtype=np.intp), [None]
+    shape = (int(day_index.max()) + 1, len(groups))
+
+    sums = {}
+    for column in ('SCORE', 'CHEST_COUNT'):
+        values = pd.to_numeric(daily[column]).to_numpy()
+        matrix = np.zeros(shape, dtype=np.result_type(values.dtype, np.int64))
+        np.add.at(matrix, (day_index, codes), values)
+        cumulative = matrix.cumsum(axis=0)
+        cumulative[days:] -= cumulative[:-days].copy()
+        sums[column] = cumulative
+
+    day_positions, group_positions = np.nonzero(sums['CHEST_COUNT'])
+    result = {'DATE': first + pd.to_timedelta(day_positions, unit='D')}
+    if by:
+        result[by] = np.asarray(groups)[group_positions]
+    result['SCORE'] = sums['SCORE'][day_positions, group_positions]
+    result['CHEST_COUNT'] = sums['CHEST_COUNT'][day_positions, group_positions]
+    return pd.DataFrame(result, columns=columns)
@@ -0,0 +1,134 @@
+# schema.py - Declared column schema of chest data files, applied once when a file is parsed
+import numpy as np
+import pandas as pd
+
+
+class ChestSchema:
+    """
+    The columns of a chest data file: their standard names, the header
+    spellings accepted for them and the type each is converted to.
+
+    apply() renames and converts a parsed file in one pass and marks the
+    DataFrame as typed, so later stages (DataProcessor.process_data, the
+    main window's load) use the columns as they are instead of converting
+    them again. The marker is kept in DataFrame.attrs, which pandas carries
+    through filtering, copying and concatenating frames of the same schema.
+    """
+
+    # Version of the schema; a frame typed under another version is converted again
+    VERSION = 1
+
+    # Key of the marker in DataFrame.attrs
+    MARKER = 'chest_schema'
+
+    # Standard column name -> type and the header spellings accepted for it, matched
+    # case-insensitively. 'datetime' and 'numeric' columns are converted, 'category'
+    # columns are the low-cardinality dimensions the analysis groups by.
+    COLUMNS = {
+        'DATE': {'type': 'datetime', 'aliases': ['DATUM', 'DAY']},
+        'PLAYER': {'type': 'category', 'aliases': ['SPIELER', 'NAME']},
+        'SOURCE': {'type': 'category', 'aliases': ['QUELLE']},
+        'CHEST': {'type': 'category', 'aliases': ['TRUHE', 'CHEST TYPE']},
+        'SCORE': {'type': 'numeric', 'aliases': ['PUNKTE', 'POINTS']},
+        'CLAN': {'type': 'category', 'aliases': []},
+    }
+
+    # Date formats of DATE, in the order they are tried on a file; the first is the
+    # format the game exports. Month-first before day-first, as pandas assumes for
+    # ambiguous dates.
+    DATE_FORMATS = [
+        '%Y-%m-%d',
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%dT%H:%M:%S',
+        '%d.%m.%Y',
+        '%d.%m.%Y %H:%M',
+        '%d.%m.%Y %H:%M:%S',
+        '%m/%d/%Y',
+        '%d/%m/%Y',
+        '%Y/%m/%d',
+    ]
+
+    @staticmethod
+    def columns_of_type(column_type):
+        """Get the standard names of the columns of a type, e.g. 'category'."""
+        return [name for name, spec in ChestSchema.COLUMNS.items() if spec['type'] == column_type]
+
+    @staticmethod
+    def column_mapping(columns):
+        """
+        Match the columns of a file to the standard column names.
+
+        Args:
+            columns (iterable): Column names as found in the file's header
+
+        Returns:
+            dict: Column name -> standard name, for the columns the schema knows;
+            the first of several columns matching one name wins
+        """
+        names = {}
+        for name, spec in ChestSchema.COLUMNS.items():
+            for spelling in [name] + spec['aliases']:
+                names[spelling] = name
+        mapping = {}
+        for column in columns:
+            name = names.get(str(column).strip().upper())
+            if name is not None and name not in mapping.values():
+                mapping[column] = name
+        return mapping
+
+    @staticmethod
+    def is_typed(df):
+        """Check whether a DataFrame was converted by apply() under the current schema version."""
+        return df.attrs.get(ChestSchema.MARKER) == ChestSchema.VERSION
+
+    @staticmethod
+    def apply(df, date_format=None):
+        """
+        Rename and convert the columns of a parsed file.
+
+        Columns are renamed to their standard names. DATE is converted to
+        datetime64[ns] with date_format, SCORE to a number and the dimensions
+        to categoricals; dates are converted per distinct value, so a file of
+        a few hundred days costs as much as one of a few rows. Columns the
+        parser already read with the right type are left as they are, except
+        that dates of another resolution are converted to nanoseconds, so
+        every parser returns the same dtypes.
+        Values that do not convert become missing and are reported, rows are
+        not dropped.
+
+        Args:
+            df (pandas.DataFrame): The parsed rows
+            date_format (str, optional): strftime format of DATE. Defaults to inferring it.
+
+        Returns:
+            tuple: (pandas.DataFrame marked as typed, dict of standard column name ->
+            numpy.ndarray marking the rows whose value did not convert)
+        """
+        df = df.rename(columns=ChestSchema.column_mapping(df.columns))
+        unparseable = {}
+        converted = {}
+        for name, spec in ChestSchema.COLUMNS.items():
+            if name not in df.columns:
+                continue
+            values = df[name]
+            if spec['type'] == 'datetime' and values.dtype.kind == 'M':
+                if values.dtype != 'datetime64[ns]':
+                    converted[name] = values.astype('datetime64[ns]')
+                continue
+            elif spec['type'] == 'datetime':
+                codes, distinct = pd.factorize(values)
+                parsed = pd.to_datetime(pd.Index(distinct, dtype=object), format=date_format, errors='coerce')
+                # Code -1 (a missing value) takes the NaT appended last
+                converted[name] = np.append(parsed.to_numpy().astype('datetime64[ns]'),
+                                            np.datetime64('NaT', 'ns'))[codes]
+            elif spec['type'] == 'numeric' and not pd.api.types.is_numeric_dtype(values):
+                converted[name] = pd.to_numeric(values, errors='coerce')
+            elif spec['type'] == 'category' and not isinstance(values.dtype, pd.CategoricalDtype):
+                converted[name] = values.astype('category')
+                continue
+            else:
+                continue
+            unparseable[name] = values.notna().to_numpy() & np.asarray(pd.isna(converted[name]))
+        df = df.assign(**converted) if converted else df.copy()
+        df.attrs[ChestSchema.MARKER] = ChestSchema.VERSION
+        return df, unparseable
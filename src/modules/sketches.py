@@ -0,0 +1,229 @@
+# sketches.py - Mergeable quantile sketches of chest scores
+import math
+
+import numpy as np
+import pandas as pd
+
+# Relative accuracy of all sketches: a reported quantile is within 1% of the exact value
+RELATIVE_ACCURACY = 0.01
+
+# Quantiles shown in analysis tables and reports, with their column names
+QUANTILES = {'P50': 0.5, 'P90': 0.9, 'P99': 0.99}
+
+# Bucket of scores of zero or less; chest scores are not negative, so these are reported as 0
+ZERO_BUCKET = -2 ** 31
+
+# Columns the history store keeps per-day sketches for
+SKETCH_DIMENSIONS = ('PLAYER', 'CHEST', 'SOURCE')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_buckets (
+    DIMENSION TEXT NOT NULL,
+    DATE TEXT NOT NULL,
+    VALUE TEXT NOT NULL,
+    CLAN TEXT NOT NULL,
+    BUCKET INTEGER NOT NULL,
+    COUNT INTEGER NOT NULL,
+    PRIMARY KEY (DIMENSION, DATE, VALUE, CLAN, BUCKET)
+) WITHOUT ROWID;
+"""
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def bucket_keys(values):
+    """
+    Map scores to sketch buckets.
+
+    Bucket k holds the values in (gamma^(k-1), gamma^k] with
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY), so every value
+    in a bucket is within RELATIVE_ACCURACY of the bucket's representative
+    value 2 * gamma^k / (gamma + 1).
+
+    Args:
+        values (array-like): Scores
+
+    Returns:
+        numpy.ndarray: int64 bucket key per value, ZERO_BUCKET for values <= 0
+    """
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.full(len(values), ZERO_BUCKET, dtype=np.int64)
+    positive = values > 0
+    keys[positive] = np.ceil(np.log(values[positive]) / _LOG_GAMMA).astype(np.int64)
+    return keys
+
+
+def bucket_values(keys):
+    """Get the representative value of sketch buckets."""
+    keys = np.asarray(keys, dtype=np.int64)
+    values = 2 * np.power(_GAMMA, keys.astype(np.float64)) / (_GAMMA + 1)
+    return np.where(keys == ZERO_BUCKET, 0.0, values)
+
+
+def _score_bucket(score):
+    """SQLite function: the sketch bucket of one score."""
+    if score is None or score <= 0:
+        return ZERO_BUCKET
+    return math.ceil(math.log(score) / _LOG_GAMMA)
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative error guarantees (DDSketch).
+
+    Values are counted in logarithmically sized buckets, so memory depends
+    on the range of the values, not their number: scores from 1 to 10^9
+    need at most about 1,050 buckets. Two sketches merge by adding their
+    bucket counts, and the merged sketch is the same as one built from all
+    values, so sketches of days or groups can be combined freely.
+
+    For a quantile q the sketch returns a value within RELATIVE_ACCURACY of
+    the exact lower q-quantile (numpy.quantile(values, q, method='lower')).
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    @classmethod
+    def from_values(cls, values):
+        """Create a sketch of an array of values."""
+        sketch = cls()
+        sketch.add(values)
+        return sketch
+
+    @classmethod
+    def from_buckets(cls, keys, counts):
+        """Create a sketch from bucket keys and counts, e.g. read from the history store."""
+        sketch = cls()
+        for key, count in zip(np.asarray(keys).tolist(), np.asarray(counts).tolist()):
+            sketch.counts[key] = sketch.counts.get(key, 0) + count
+        return sketch
+
+    @property
+    def count(self):
+        """Number of values added."""
+        return sum(self.counts.values())
+
+    def add(self, values):
+        """Add an array of values."""
+        keys, counts = np.unique(bucket_keys(np.atleast_1d(values)), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def merge(self, other):
+        """Add the values of another sketch to this one."""
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: The estimate, or NaN for an empty sketch
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("The quantile must be between 0 and 1")
+        total = self.count
+        if total == 0:
+            return float('nan')
+        rank = math.floor(q * (total - 1))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen > rank:
+                return float(bucket_values([key])[0])
+        return float(bucket_values([max(self.counts)])[0])
+
+
+def score_buckets(df, by):
+    """
+    Count the scores of every group per sketch bucket.
+
+    Args:
+        df (pandas.DataFrame): Data with SCORE and the `by` columns
+        by (list): Columns identifying a sketch, e.g. ['PLAYER'] or ['DATE', 'CHEST']
+
+    Returns:
+        pandas.DataFrame: Columns [*by, 'BUCKET', 'COUNT'], one row per non-empty bucket
+    """
+    keys = df[by].copy()
+    keys['BUCKET'] = bucket_keys(pd.to_numeric(df['SCORE'], errors='coerce').fillna(0))
+    return keys.groupby(by + ['BUCKET'], sort=False, observed=True).size().reset_index(name='COUNT')
+
+
+def quantile_table(buckets, by, quantiles=QUANTILES):
+    """
+    Estimate quantiles of many sketches at once.
+
+    Args:
+        buckets (pandas.DataFrame): Columns [*by, 'BUCKET', 'COUNT'] as from score_buckets();
+            rows of the same group and bucket are merged
+        by (list): Columns identifying a sketch; empty for one sketch of all rows
+        quantiles (dict, optional): Column name -> quantile. Defaults to QUANTILES.
+
+    Returns:
+        pandas.DataFrame: Columns [*by, 'CHEST_COUNT', *quantiles], one row per group
+    """
+    columns = list(by) + ['CHEST_COUNT'] + list(quantiles)
+    if buckets.empty:
+        return pd.DataFrame(columns=columns)
+    by = list(by)
+    merged = buckets.groupby(by + ['BUCKET'], observed=True)['COUNT'].sum().reset_index()
+    merged = merged.sort_values(by + ['BUCKET'], kind='stable').reset_index(drop=True)
+
+    group_ids = merged.groupby(by, sort=False, observed=True).ngroup().to_numpy() if by \
+        else np.zeros(len(merged), dtype=np.int64)
+    counts = merged['COUNT'].to_numpy(dtype=np.int64)
+    cumulative = np.cumsum(counts)
+    group_end = np.flatnonzero(np.r_[group_ids[1:] != group_ids[:-1], True])
+    group_totals = np.diff(np.r_[0, cumulative[group_end]])
+    before_group = (cumulative[group_end] - group_totals)[group_ids]
+    within = cumulative - before_group
+
+    result = merged.iloc[group_end][by].reset_index(drop=True)
+    result['CHEST_COUNT'] = group_totals
+    values = bucket_values(merged['BUCKET'].to_numpy())
+    for name, q in quantiles.items():
+        rank = np.floor(q * (group_totals - 1)).astype(np.int64)
+        # First bucket of each group whose cumulative count passes the rank
+        passed = within > rank[group_ids]
+        first = pd.Series(np.flatnonzero(passed)).groupby(group_ids[passed]).first().to_numpy()
+        result[name] = values[first].round(2)
+    return result[columns]
+
+
+def register_functions(connection):
+    """Make score_bucket(SCORE) available in SQL on a connection."""
+    connection.create_function('score_bucket', 1, _score_bucket, deterministic=True)
+
+
+def update_score_buckets(connection, import_id=None):
+    """
+    Add chests to the per-day sketches of the history store.
+
+    Args:
+        connection (sqlite3.Connection): History database with register_functions() applied
+        import_id (int, optional): Import whose chests to add. Defaults to all chests.
+    """
+    where, params = ("WHERE import_id = ?", (import_id,)) if import_id is not None else ("WHERE true", ())
+    for dimension in SKETCH_DIMENSIONS:
+        # The WHERE clause is required for SQLite to parse ON CONFLICT after a SELECT
+        connection.execute(
+            "INSERT INTO score_buckets (DIMENSION, DATE, VALUE, CLAN, BUCKET, COUNT) "
+            f"SELECT '{dimension}', DATE, {dimension}, CLAN, score_bucket(SCORE) AS BUCKET, COUNT(*) "
+            f"FROM chests {where} GROUP BY DATE, {dimension}, CLAN, BUCKET "
+            "ON CONFLICT (DIMENSION, DATE, VALUE, CLAN, BUCKET) DO UPDATE SET COUNT = COUNT + excluded.COUNT",
+            params
+        )
+
+
+def rebuild_score_buckets(connection):
+    """Recompute the per-day sketches from all stored chests."""
+    connection.execute("DELETE FROM score_buckets")
+    update_score_buckets(connection)
@@ -0,0 +1,263 @@
+# timing.py - Stage timing instrumentation for the data pipeline
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+
+class _NullStage:
+    """Stage returned while timing is disabled; every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """A running stage. Set ``rows`` inside the ``with`` block to record a row count."""
+
+    __slots__ = ('timer', 'name', 'rows', 'info', 'parent', 'depth', '_start', '_started_at',
+                 '_memory', '_peak')
+
+    def __init__(self, timer, name, rows, info):
+        self.timer = timer
+        self.name = name
+        self.rows = rows
+        self.info = info
+
+    def __enter__(self):
+        stack = self.timer._stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        if self.timer.track_allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack and stack[-1]._memory is not None:
+                # Keep the parent's peak so far before resetting it for this stage
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+            tracemalloc.reset_peak()
+            self._memory = current
+            self._peak = current
+        else:
+            self._memory = None
+        stack.append(self)
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        duration = time.perf_counter() - self._start
+        stack = self.timer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        record = {
+            'stage': self.name,
+            'started': self._started_at,
+            'duration_ms': round(duration * 1000, 3),
+            'rows': self.rows,
+            'parent': self.parent,
+            'depth': self.depth,
+            'thread': threading.current_thread().name,
+            'ok': exc_type is None,
+        }
+        if self._memory is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record['alloc_kb'] = round((current - self._memory) / 1024, 1)
+            record['peak_kb'] = round((max(self._peak, peak) - self._memory) / 1024, 1)
+        if self.info:
+            record.update(self.info)
+        self.timer._add(record)
+        return False
+
+
+def _row_count(args, result):
+    """Row count of the first DataFrame argument or of the result, if any."""
+    for value in args:
+        if hasattr(value, 'columns') and hasattr(value, '__len__'):
+            return len(value)
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if hasattr(result, 'columns') and hasattr(result, '__len__'):
+        return len(result)
+    return None
+
+
+class StageTimer:
+    """
+    Record how long each pipeline stage takes.
+
+    Stages are timed with a context manager and kept in a ring buffer of the
+    most recent records::
+
+        with stage_timer.stage('read', file=path) as stage:
+            df = read(path)
+            stage.rows = len(df)
+
+    Each record holds the duration, row count, parent stage and thread, plus
+    the net and peak Python allocations when ``track_allocations`` is on
+    (this uses tracemalloc, which slows allocation-heavy code noticeably).
+    While the timer is disabled ``stage()`` returns a shared no-op object, so
+    instrumented code pays only for one attribute check.
+    """
+
+    def __init__(self, capacity=2000, enabled=False, track_allocations=False):
+        """
+        Initialize the timer.
+
+        Args:
+            capacity (int, optional): Number of records kept. Defaults to 2000.
+            enabled (bool, optional): Start recording immediately. Defaults to False.
+            track_allocations (bool, optional): Record allocations with tracemalloc. Defaults to False.
+        """
+        self.enabled = enabled
+        self.track_allocations = False
+        self._records = deque(maxlen=capacity)
+        # Number of records ever added, including those dropped from the buffer
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._listeners = []
+        self.set_track_allocations(track_allocations)
+
+    def stage(self, name, rows=None, **info):
+        """
+        Time a stage.
+
+        Args:
+            name (str): Stage name, e.g. 'read' or 'analysis'
+            rows (int, optional): Number of rows the stage works on
+            **info: Extra JSON-serializable values stored with the record
+
+        Returns:
+            Context manager for the stage
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows, info)
+
+    def timed(self, name):
+        """
+        Decorator that times every call of a function as a stage.
+
+        The row count is taken from the first DataFrame argument, or from the
+        returned DataFrame (or the first item of a returned tuple).
+
+        Args:
+            name (str): Stage name
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.stage(name) as stage:
+                    result = func(*args, **kwargs)
+                    stage.rows = _row_count(args, result)
+                    return result
+            return wrapper
+        return decorator
+
+    def set_track_allocations(self, enabled):
+        """Start or stop recording allocations (starts tracemalloc if needed)."""
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif not enabled and getattr(self, '_started_tracemalloc', False):
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.track_allocations = enabled
+
+    def add_listener(self, listener):
+        """Call listener(record) for every finished stage, from the thread that ran it."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Remove a listener added with add_listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def records(self, stage=None):
+        """
+        Get the recorded stages, oldest first.
+
+        Args:
+            stage (str, optional): Only return records of this stage
+
+        Returns:
+            list: Record dicts
+        """
+        with self._lock:
+            records = list(self._records)
+        if stage is not None:
+            records = [record for record in records if record['stage'] == stage]
+        return records
+
+    def summary(self):
+        """
+        Aggregate the recorded stages.
+
+        Returns:
+            dict: Stage name -> {'count', 'total_ms', 'mean_ms', 'max_ms', 'rows'}
+        """
+        summary = {}
+        for record in self.records():
+            entry = summary.setdefault(record['stage'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+            entry['count'] += 1
+            entry['total_ms'] += record['duration_ms']
+            entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+            entry['rows'] += record['rows'] or 0
+        for entry in summary.values():
+            entry['total_ms'] = round(entry['total_ms'], 3)
+            entry['mean_ms'] = round(entry['total_ms'] / entry['count'], 3)
+        return summary
+
+    def clear(self):
+        """Remove all records."""
+        with self._lock:
+            self._records.clear()
+
+    def export_jsonl(self, filepath):
+        """
+        Write the records to a JSON lines file, one record per line.
+
+        Args:
+            filepath (str or Path): Destination file
+
+        Returns:
+            int: Number of records written
+        """
+        records = self.records()
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        return len(records)
+
+    def _stack(self):
+        """Stages currently running on this thread, outermost first."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, record):
+        """Store a finished record and notify the listeners."""
+        with self._lock:
+            self._records.append(record)
+            self.recorded += 1
+        for listener in list(self._listeners):
+            listener(record)
+
+
+# Timer shared by the data processor, the main window and the command-line tool
+stage_timer = StageTimer()
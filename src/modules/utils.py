@@ -7,12 +7,7 @@ import numpy as np
 import configparser
 import datetime
 from pathlib import Path
-import matplotlib.pyplot as plt
 import traceback
-import matplotlib
-matplotlib.use('QtAgg')  # Use the generic Qt backend that works with PySide6
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
 import types  # Add this import for method binding
 import re  # Add this import for regular expressions
 import time
@@ -28,7 +23,6 @@ from PySide6.QtWidgets import (
     QLineEdit, QListWidget, QDateEdit, QCheckBox, QListWidgetItem,
     QGridLayout, QTextBrowser
 )
-from PySide6.QtPrintSupport import QPrinter, QPageSetupDialog
 from PySide6.QtCore import (
     Qt, QAbstractTableModel, QModelIndex, Signal, QMimeData, 
     QUrl, QSize, Slot, QSortFilterProxyModel, QObject, QEvent, QTimer,
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Check the per-clan partitions and the clan comparison.
+
+Every clan must be compared on its own rows only, whether its partition
+is analyzed in this process or in a spawned worker.
+"""
+
+from modules.clans import ClanAnalyzer, split_by_clan
+
+CLANS = ['A', 'B', 'C']
+
+
+def expected_players(df):
+    """Distinct players per clan, counted on the rows."""
+    return {clan: part['PLAYER'].astype(str).nunique() for clan, part in df.groupby(df['CLAN'].astype(str))}
+
+
+def test_partitions_keep_only_their_categories(chest_data):
+    df = chest_data(20_000, seed=17, clans=CLANS)
+    partitions = split_by_clan(df)
+    assert sorted(partitions) == CLANS
+    for clan, part in partitions.items():
+        assert len(part['PLAYER'].cat.categories) == part['PLAYER'].nunique(), clan
+        assert part['CLAN'].cat.categories.tolist() == [clan]
+
+
+def test_comparison_counts_each_clans_players(chest_data):
+    df = chest_data(20_000, seed=17, clans=CLANS)
+    expected = expected_players(df)
+    for analyzer in (ClanAnalyzer(max_workers=1), ClanAnalyzer(max_workers=2, parallel_min_rows=0)):
+        comparison = analyzer.comparison(df).set_index('CLAN')
+        assert comparison['PLAYERS'].to_dict() == expected
+        assert comparison['CHEST_COUNT'].sum() == len(df)
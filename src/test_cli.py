@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Check that the command-line interface runs without Qt.
+
+chestparser is imported in a fresh interpreter, so modules already loaded
+by other tests do not hide an import of PySide6.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+
+
+def loaded_modules(statement, env=None):
+    """Run a statement in a fresh interpreter and return the names of the modules it loaded."""
+    code = f"import sys\n{statement}\nprint('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, check=True,
+                            env=env)
+    return result.stdout.split()
+
+
+def test_import_loads_no_qt():
+    qt = [name for name in loaded_modules('import chestparser') if name.startswith('PySide6')]
+    assert not qt, f"import chestparser loaded {', '.join(qt[:5])}"
+
+
+def test_history_without_database_loads_no_qt():
+    with tempfile.TemporaryDirectory() as home:
+        # The default database is the desktop application's, found through its config in the home directory
+        env = dict(os.environ, HOME=home, USERPROFILE=home)
+        modules = loaded_modules("import chestparser\n"
+                                 "assert chestparser.main(['history', 'info']) == 0", env=env)
+        assert os.path.exists(os.path.join(home, '.config', 'TotalBattleAnalyzer', 'history.sqlite3'))
+    qt = [name for name in modules if name.startswith('PySide6')]
+    assert not qt, f"history without --db loaded {', '.join(qt[:5])}"
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Check the CSV parser engines and the quarantine of malformed lines.
+
+Every engine must return the same typed rows, with the same dtypes, and
+quarantine the same lines for the same reasons, whatever kind of
+malformed line a file has.
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from modules import csvengine
+from modules.schema import ChestSchema
+
+HEADER = 'DATE,PLAYER,SOURCE,CHEST,SCORE,CLAN'
+
+# Malformed line written as line 101 of a file, and the reason it is quarantined for
+MALFORMED = {
+    'bad score': ('2025-01-01,Nyx,Arena,Orc Chest,abc,A', csvengine.BAD_SCORE),
+    'bad date': ('2025-02-31,Nyx,Arena,Orc Chest,5,A', csvengine.BAD_DATE),
+    'short line': ('2025-01-01,Nyx', csvengine.BAD_FIELD_COUNT),
+    'long line': ('2025-01-01,Nyx,Arena,Orc Chest,5,A,extra', csvengine.BAD_FIELD_COUNT),
+}
+
+
+def write_file(directory, malformed=None, rows=2_000, encoding='utf-8'):
+    """Write a chest file whose line 101 is replaced by a malformed line; returns its path."""
+    lines = [HEADER] + [f'2025-01-0{i % 9 + 1},Feldjäger{i % 50},Arena,Orc Chest,{i},A' for i in range(rows)]
+    if malformed is not None:
+        lines[100] = malformed
+    path = os.path.join(directory, 'chests.csv')
+    with open(path, 'wb') as f:
+        f.write(('\n'.join(lines) + '\n').encode(encoding, errors='surrogateescape'))
+    return path
+
+
+def read_with_every_engine(path):
+    """Parse a file with every available engine; engine name -> (rows, quarantine)."""
+    results = {}
+    for name in csvengine.available_engines():
+        df, _, used, quarantine = csvengine.read_csv(path, engine=name)
+        assert used == name, f"{name} fell back to {used}"
+        results[name] = (df, quarantine)
+    return results
+
+
+def assert_same_results(results):
+    """Assert that every engine returned the rows and quarantine of the pandas engine."""
+    expected_df, expected_quarantine = results['pandas']
+    for name, (df, quarantine) in results.items():
+        assert df.dtypes.to_dict() == expected_df.dtypes.to_dict(), f"{name}: {df.dtypes.to_dict()}"
+        assert df.equals(expected_df), f"{name} returned other rows"
+        assert quarantine.equals(expected_quarantine), f"{name} quarantined other lines"
+
+
+def test_engines_agree_on_malformed_lines():
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, (line, reason) in MALFORMED.items():
+            results = read_with_every_engine(write_file(directory, line))
+            assert_same_results(results)
+            df, quarantine = results['pandas']
+            assert len(df) == 1_999, kind
+            assert quarantine['LINE'].tolist() == [101], kind
+            assert quarantine['REASON'].tolist() == [reason], kind
+            assert quarantine['TEXT'].tolist() == [line], kind
+            # The integer scores stay integers once the malformed line is left out
+            assert df['SCORE'].dtype == 'int64', kind
+            assert 'Nyx' not in df['PLAYER'].cat.categories, kind
+
+
+def test_clean_file_is_typed():
+    with tempfile.TemporaryDirectory() as directory:
+        results = read_with_every_engine(write_file(directory))
+        assert_same_results(results)
+        df, quarantine = results['pandas']
+        assert quarantine.empty and len(df) == 2_000
+        assert ChestSchema.is_typed(df)
+        assert df['DATE'].dtype == 'datetime64[ns]'
+        for column in ChestSchema.columns_of_type('category'):
+            assert isinstance(df[column].dtype, pd.CategoricalDtype), column
+
+
+def test_windows_1252_value_in_utf8_file():
+    with tempfile.TemporaryDirectory() as directory:
+        # A value saved as Windows-1252 ('ä' is byte 0xE4) among UTF-8 lines, on a valid and a malformed line
+        path = write_file(directory, '2025-01-01,Ny\udce4x,Bank,Orc Chest,3,A')
+        with open(path, 'ab') as f:
+            f.write(b'2025-01-01,Bad\xe4\n')
+        results = read_with_every_engine(path)
+        assert_same_results(results)
+        df, quarantine = results['pandas']
+        assert 'Nyäx' in df['PLAYER'].cat.categories
+        assert quarantine['LINE'].tolist() == [2_002]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Check the analysis tables of filtered data.
+
+PLAYER, SOURCE, CHEST and CLAN are categoricals that keep the categories
+of the unfiltered data, so every table of a filtered subset must only
+list the values its rows have, whatever pandas' default for observed.
+DATE is a datetime column, so date windows can be selected.
+"""
+
+import pandas as pd
+
+from modules.datagenerator import ChestDataGenerator
+from modules.dataprocessor import DataProcessor
+
+
+def test_player_filter_analyzes_one_player(chest_data):
+    df = chest_data(20_000, seed=13)
+    player = str(df['PLAYER'].iloc[0])
+    filtered = DataProcessor.filter_data(df, 'PLAYER', [player])
+    results = DataProcessor.analyze_data(filtered)
+    assert results['player_totals']['PLAYER'].astype(str).tolist() == [player]
+    assert results['player_totals']['CHEST_COUNT'].tolist() == [len(filtered)]
+    assert len(results['player_avg']) == 1
+    assert len(results['player_overview']) == 1
+    assert set(results['player_chest_freq']['PLAYER'].astype(str)) == {player}
+    assert results['player_chest_freq']['COUNT'].gt(0).all()
+
+
+def test_chest_and_source_filters_analyze_observed_values(chest_data):
+    df = chest_data(20_000, seed=13)
+    for column, table in (('CHEST', 'chest_totals'), ('SOURCE', 'source_totals')):
+        kept = df[column].astype(str).unique()[:2].tolist()
+        filtered = DataProcessor.filter_data(df, column, kept)
+        results = DataProcessor.analyze_data(filtered)
+        assert sorted(results[table][column].astype(str)) == sorted(kept), column
+        assert results[table]['CHEST_COUNT'].sum() == len(filtered), column
+        assert len(results['player_totals']) == filtered['PLAYER'].nunique(), column
+
+    # A date window is not filtered with filter_data, so its categoricals keep every category
+    window = df[df['DATE'] <= df['DATE'].min() + pd.Timedelta(days=6)]
+    results = DataProcessor.analyze_data(window)
+    assert set(results['chest_totals']['CHEST'].astype(str)) == set(window['CHEST'].astype(str))
+    assert set(results['source_totals']['SOURCE'].astype(str)) == set(window['SOURCE'].astype(str))
+    sources = [column for column in results['player_overview'].columns if column not in
+               ('PLAYER', 'TOTAL_SCORE', 'CHEST_COUNT')]
+    assert set(map(str, sources)) == set(window['SOURCE'].astype(str))
+
+
+def test_dates_are_datetimes():
+    generated = ChestDataGenerator(seed=3, days=30).generate(5_000)
+    # As the generator makes them, and as a file read with categorical columns has them
+    for df in (generated, generated.assign(DATE=generated['DATE'].dt.strftime('%Y-%m-%d').astype('category'))):
+        dates = DataProcessor.process_data(df)['DATE']
+        assert pd.api.types.is_datetime64_dtype(dates), dates.dtype
+        start = pd.Timestamp('2025-01-08')
+        window = dates[(dates >= start) & (dates < start + pd.Timedelta(days=7))]
+        assert window.dt.normalize().nunique() == 7
+        assert len(window) == generated['DATE'].between(start, start + pd.Timedelta(days=6)).sum()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Check the rows the raw data export takes from the table's sort proxy.
+
+The export replays the proxy's sorts on the source DataFrame; the rows
+must come out in the order the proxy shows them, ties included.
+"""
+
+import os
+
+import pytest
+
+# The view needs a platform plugin; none with a display is needed
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication, QTableView
+
+from modules.customtablemodel import CustomTableModel, TimedSortProxyModel
+from modules.mainwindow import MainWindow
+
+app = QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def model(chest_data):
+    """Processed chest data behind a sort proxy like the raw data table's."""
+    model = TimedSortProxyModel()
+    model.setSourceModel(CustomTableModel(chest_data(400, seed=5)))
+    model.setSortRole(Qt.UserRole)
+    return model
+
+
+def shown_rows(model):
+    """Source rows of the proxy, mapped row by row."""
+    return [model.mapToSource(model.index(i, 0)).row() for i in range(model.rowCount())]
+
+
+def exported_rows(model):
+    """Source rows the raw data export writes."""
+    df, rows = MainWindow._visible_row_indexer(None, model)
+    return list(range(len(df))) if rows is None else rows.tolist()
+
+
+def test_unsorted_rows_export_in_source_order(model):
+    assert model.source_rows() is None
+    assert exported_rows(model) == shown_rows(model)
+
+
+def test_rows_sorted_twice_export_as_shown(model):
+    df = model.sourceModel().dataframe()
+    columns = [df.columns.get_loc(column) for column in ('CHEST', 'SOURCE', 'DATE', 'PLAYER', 'SCORE')]
+    # Columns with many ties: each sort keeps the tied rows in the order the previous one left
+    for first, second in zip(columns, columns[1:]):
+        for order in (Qt.AscendingOrder, Qt.DescendingOrder):
+            model.sort(first, order)
+            model.sort(second, Qt.DescendingOrder if order == Qt.AscendingOrder else Qt.AscendingOrder)
+            assert exported_rows(model) == shown_rows(model)
+
+
+def test_rows_sorted_through_the_view_export_as_shown(model):
+    view = QTableView()
+    view.setModel(model)
+    # Enabling sorting sorts by the header's sort indicator right away
+    view.setSortingEnabled(True)
+    assert exported_rows(model) == shown_rows(model)
+    for column in range(model.columnCount()):
+        view.sortByColumn(column, Qt.DescendingOrder if column % 2 else Qt.AscendingOrder)
+    assert exported_rows(model) == shown_rows(model)
+
+
+def test_new_source_model_is_sorted_again(model):
+    model.sort(2, Qt.DescendingOrder)
+    model.setSourceModel(CustomTableModel(model.sourceModel().dataframe().iloc[::-1].reset_index(drop=True)))
+    assert exported_rows(model) == shown_rows(model)
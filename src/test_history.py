@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Check the history store: deduplication of overlapping imports, migration
+of old databases, the rollup tables and the leaderboard snapshots.
+
+Rollups and snapshots are maintained by every import, so they must match
+the totals computed from the stored chests.
+"""
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from modules.dataprocessor import DataProcessor
+from modules.historystore import SCHEMA_VERSION, HistoryStore
+
+# Tables of a version 1 database, before fingerprints, rollups, snapshots, sketches and player IDs
+V1_SCHEMA = """
+CREATE TABLE imports (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    imported_at REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    first_date TEXT,
+    last_date TEXT
+);
+CREATE TABLE chests (
+    DATE TEXT NOT NULL,
+    PLAYER TEXT NOT NULL,
+    SOURCE TEXT NOT NULL,
+    CHEST TEXT NOT NULL,
+    SCORE NUMERIC NOT NULL,
+    CLAN TEXT NOT NULL DEFAULT '',
+    import_id INTEGER NOT NULL REFERENCES imports(id)
+);
+CREATE INDEX idx_chests_date ON chests (DATE);
+CREATE INDEX idx_chests_player_date ON chests (PLAYER, DATE);
+CREATE INDEX idx_chests_clan_date ON chests (CLAN, DATE);
+PRAGMA user_version = 1;
+"""
+
+
+def chests(rows):
+    """Build processed chest data from (DATE, PLAYER, SOURCE, CHEST, SCORE) tuples."""
+    df = pd.DataFrame(rows, columns=DataProcessor.REQUIRED_COLUMNS)
+    return df.assign(DATE=pd.to_datetime(df['DATE']))
+
+
+@pytest.fixture
+def df(chest_data):
+    """Processed chest data of a few weeks."""
+    return chest_data(5_000, seed=23, players=40, days=35)
+
+
+def stored(store):
+    """Read the stored chests."""
+    return pd.read_sql_query("SELECT DATE, PLAYER, SOURCE, CHEST, SCORE, CLAN, PLAYER_ID FROM chests",
+                             store.connection)
+
+
+def test_reimport_adds_nothing(df):
+    with HistoryStore(':memory:') as store:
+        assert store.ingest(df, source='first.csv') == len(df)
+        assert store.ingest(df, source='again.csv') == 0
+        assert store.row_count() == len(df)
+        assert store.imports()['added'].tolist() == [len(df), 0]
+
+
+def test_overlapping_export_adds_only_new_chests(df):
+    half = len(df) // 2
+    with HistoryStore(':memory:') as store:
+        store.ingest(df.iloc[:half + 500])
+        assert store.ingest(df.iloc[half:]) == len(df) - half - 500
+        assert store.row_count() == len(df)
+
+
+def test_identical_chests_of_one_export_are_kept():
+    chest = ('2025-01-06', 'Ragnar', 'Arena', 'Wooden chest', 5)
+    with HistoryStore(':memory:') as store:
+        assert store.ingest(chests([chest, chest])) == 2
+        # The same export again matches both by their ordinals, a third identical chest is new
+        assert store.ingest(chests([chest, chest, chest])) == 1
+        assert store.row_count() == 3
+
+
+def test_version_1_database_is_migrated():
+    rows = [
+        # First import
+        (1, '2025-01-06', 'Feldjäger', 'Arena', 'Wooden chest', 5),
+        (1, '2025-01-06', 'Feldjäger', 'Arena', 'Wooden chest', 5),
+        (1, '2025-01-07', 'Ragnar', 'Crypt', 'Stone chest', 10),
+        # Overlapping second import: the chests of 2025-01-06 again under a mangled spelling
+        (2, '2025-01-06', 'FeldjÃ¤ger', 'Arena', 'Wooden chest', 5),
+        (2, '2025-01-06', 'FeldjÃ¤ger', 'Arena', 'Wooden chest', 5),
+        (2, '2025-01-07', 'Ragnar', 'Crypt', 'Stone chest', 10),
+        (2, '2025-01-14', 'feldjager', 'Crypt', 'Stone chest', 20),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'history.sqlite3'
+        connection = sqlite3.connect(path)
+        connection.executescript(V1_SCHEMA)
+        for import_id in (1, 2):
+            count = sum(1 for row in rows if row[0] == import_id)
+            connection.execute("INSERT INTO imports (id, source, imported_at, rows) VALUES (?, ?, 0, ?)",
+                               (import_id, f"import{import_id}.csv", count))
+        connection.executemany(
+            "INSERT INTO chests (import_id, DATE, PLAYER, SOURCE, CHEST, SCORE) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        connection.commit()
+        connection.close()
+
+        with HistoryStore(path) as store:
+            assert store.connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            chests_now = stored(store)
+            # Each chest once, the identical chests of one day twice, all under one name and ID
+            assert len(chests_now) == 4
+            assert sorted(set(chests_now['PLAYER'])) == ['Feldjäger', 'Ragnar']
+            assert (chests_now['PLAYER_ID'] > 0).all()
+            assert chests_now.groupby('PLAYER')['PLAYER_ID'].nunique().eq(1).all()
+            assert store.imports()['added'].tolist() == [3, 1]
+
+            # The aggregates are rebuilt from the migrated chests
+            weekly = store.rollup('player_week').set_index(['DATE', 'PLAYER'])['SCORE']
+            assert weekly.to_dict() == {
+                (pd.Timestamp('2025-01-06'), 'Feldjäger'): 10,
+                (pd.Timestamp('2025-01-06'), 'Ragnar'): 10,
+                (pd.Timestamp('2025-01-13'), 'Feldjäger'): 20,
+            }
+            assert store.leaderboard()[['PLAYER', 'SCORE']].values.tolist() == [['Feldjäger', 30], ['Ragnar', 10]]
+            assert store.score_quantiles()['CHEST_COUNT'].sum() == 4
+
+            # Importing either file again adds nothing
+            for import_id in (1, 2):
+                assert store.ingest(chests([row[1:] for row in rows if row[0] == import_id])) == 0
+
+
+def test_current_database_opens_unchanged(chest_data):
+    df = chest_data(1_000, seed=23, players=40, days=35)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'history.sqlite3'
+        with HistoryStore(path) as store:
+            store.ingest(df)
+            before = stored(store)
+        with HistoryStore(path) as store:
+            assert store.connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            pd.testing.assert_frame_equal(stored(store), before)
+
+
+def test_rollups_match_the_chests(df):
+    with HistoryStore(':memory:') as store:
+        # Two imports, so the rollups are updated, not only built
+        store.ingest(df.iloc[:2_000])
+        store.ingest(df.iloc[2_000:])
+        chests_now = stored(store).assign(DATE=lambda d: pd.to_datetime(d['DATE']))
+        # Weeks ending on Sunday start on Monday
+        for period, freq in (('day', 'D'), ('week', 'W-SUN'), ('month', 'M')):
+            expected = chests_now.assign(DATE=chests_now['DATE'].dt.to_period(freq).dt.start_time).groupby(
+                ['DATE', 'PLAYER'], as_index=False).agg(SCORE=('SCORE', 'sum'), CHEST_COUNT=('SCORE', 'size'))
+            rollup = store.rollup(f'player_{period}')
+            pd.testing.assert_frame_equal(
+                rollup.sort_values(['DATE', 'PLAYER']).reset_index(drop=True)[expected.columns],
+                expected.sort_values(['DATE', 'PLAYER']).reset_index(drop=True),
+                check_dtype=False
+            )
+
+
+def test_leaderboard_snapshot_per_import(df):
+    with HistoryStore(':memory:') as store:
+        store.ingest(df.iloc[:2_000])
+        store.ingest(df.iloc[2_000:])
+        first_id, second_id = store.imports()['id'].tolist()
+
+        chests_now = pd.read_sql_query("SELECT PLAYER, SCORE, import_id FROM chests", store.connection)
+        for import_id in (first_id, second_id):
+            board = store.leaderboard(import_id)
+            # The snapshot after an import totals the chests stored up to it
+            totals = chests_now[chests_now['import_id'] <= import_id].groupby('PLAYER')['SCORE'].sum()
+            assert dict(zip(board['PLAYER'], board['SCORE'])) == totals.to_dict()
+            assert board['SCORE'].is_monotonic_decreasing
+            assert board['RANK'].iloc[0] == 1
+
+        changes, described = store.rank_changes()
+        assert described.startswith("data up to")
+        previous = store.leaderboard(first_id).set_index('PLAYER')['RANK']
+        current = store.leaderboard(second_id).set_index('PLAYER')['RANK']
+        for _, row in changes.dropna(subset=['PREVIOUS_RANK']).iterrows():
+            assert row['PREVIOUS_RANK'] == previous[row['PLAYER']]
+            assert row['RANK_CHANGE'] == previous[row['PLAYER']] - current[row['PLAYER']]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Check the resolution of player name spellings to canonical players.
+
+Mangled, differently cased or transliterated spellings of one name must
+resolve to one player ID and the canonical name of the first spelling
+seen, also after the history database is reopened.
+"""
+
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from modules.historystore import HistoryStore
+from modules.playeridentity import PlayerIdentities, display_name, match_key
+
+SPELLINGS = ['Feldjäger', 'FeldjÃ¤ger', 'feldjager', ' FELDJÄGER ', 'Feldjäger  ']
+
+
+def test_spellings_share_a_match_key():
+    assert display_name('FeldjÃ¤ger') == 'Feldjäger'
+    assert display_name('  Sturm   Wolf ') == 'Sturm Wolf'
+    assert {match_key(name) for name in SPELLINGS} == {'feldjager'}
+    assert match_key('Feldjäger') != match_key('Feldjagd')
+
+
+def test_aliases_resolve_to_the_first_spelling():
+    identities = PlayerIdentities()
+    names = pd.Series(SPELLINGS + ['Ragnar', None, 'ragnar'], index=range(10, 18))
+    ids, canonical = identities.resolve(names)
+    assert len(identities) == 2
+    assert len(set(ids[:len(SPELLINGS)])) == 1
+    assert ids[-3] == ids[-1] != ids[0]
+    assert ids[-2] == 0
+    assert canonical.index.equals(names.index)
+    assert canonical.tolist()[:len(SPELLINGS)] == ['Feldjäger'] * len(SPELLINGS)
+    assert canonical.iloc[-1] == 'Ragnar'
+    assert pd.isna(canonical.iloc[-2])
+    # One category per player, so grouping counts players rather than spellings
+    assert sorted(canonical.cat.categories) == ['Feldjäger', 'Ragnar']
+
+
+def test_canonical_name_does_not_change():
+    identities = PlayerIdentities()
+    identities.resolve(pd.Series(['feldjager']))
+    _, canonical = identities.resolve(pd.Series(['Feldjäger']))
+    assert canonical.tolist() == ['feldjager']
+    assert identities.lookup(['FELDJAGER', 'Unknown']) == ['feldjager', 'Unknown']
+
+
+def test_store_keeps_aliases_across_sessions():
+    chests = pd.DataFrame({
+        'DATE': pd.to_datetime(['2025-01-06'] * len(SPELLINGS)),
+        'PLAYER': SPELLINGS,
+        'SOURCE': 'Arena',
+        'CHEST': 'Wooden chest',
+        'SCORE': range(1, len(SPELLINGS) + 1),
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'history.sqlite3'
+        with HistoryStore(path) as store:
+            store.ingest(chests)
+            assert store.totals('PLAYER')[['PLAYER', 'SCORE']].values.tolist() == [['Feldjäger', 15]]
+        with HistoryStore(path) as store:
+            players = store.players()
+            assert players['PLAYER'].tolist() == ['Feldjäger']
+            assert players['ALIAS_COUNT'].tolist() == [len(set(SPELLINGS))]
+            # A new spelling of a known player adds no player
+            store.ingest(chests.assign(PLAYER='FELDJAGER', DATE=pd.Timestamp('2025-01-07')))
+            assert len(store.players()) == 1
+            assert store.totals('PLAYER', players=['Feldjäger'])['SCORE'].tolist() == [30]
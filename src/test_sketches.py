@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Check the quantile sketches against exact percentiles.
+
+Every estimate must be within RELATIVE_ACCURACY of
+numpy.quantile(values, q, method='lower'), for single sketches, merged
+sketches, the vectorized quantile_table() and the per-day sketches of the
+history store merged over a date window.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.datagenerator import ChestDataGenerator
+from modules.historystore import HistoryStore
+from modules.sketches import DDSketch, RELATIVE_ACCURACY, QUANTILES, quantile_table, score_buckets
+
+TEST_QUANTILES = [0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999, 1.0]
+
+
+def relative_error(estimate, exact):
+    """Relative error of an estimate; exact zeros must be estimated as zero."""
+    if exact == 0:
+        return abs(estimate)
+    return abs(estimate - exact) / abs(exact)
+
+
+def check_sketch(sketch, values):
+    """Assert that a sketch's quantiles are within the error bound of the exact ones."""
+    for q in TEST_QUANTILES:
+        exact = np.quantile(values, q, method='lower')
+        error = relative_error(sketch.quantile(q), exact)
+        assert error <= RELATIVE_ACCURACY + 1e-9, f"q={q}: error {error:.5f} over the bound"
+
+
+def test_single_sketch_distributions():
+    rng = np.random.default_rng(7)
+    for name, values in {
+        'uniform': rng.uniform(1, 1000, 100_000),
+        'lognormal': rng.lognormal(5, 2, 100_000),
+        'pareto': (rng.pareto(1.2, 100_000) + 1) * 10,
+        'integers': rng.integers(1, 5000, 100_000).astype(float),
+        'with zeros': np.where(rng.random(10_000) < 0.1, 0.0, rng.uniform(1, 100, 10_000)),
+    }.items():
+        check_sketch(DDSketch.from_values(values), values)
+
+
+def test_merged_sketches_match_one_sketch():
+    rng = np.random.default_rng(11)
+    parts = [rng.lognormal(4, 1.5, size) for size in (10, 1_000, 50_000)]
+    merged = DDSketch()
+    for part in parts:
+        merged.merge(DDSketch.from_values(part))
+    values = np.concatenate(parts)
+    assert merged.counts == DDSketch.from_values(values).counts
+    check_sketch(merged, values)
+
+
+def test_memory_depends_on_range_not_count():
+    values = np.random.default_rng(3).uniform(1, 1e9, 1_000_000)
+    sketch = DDSketch.from_values(values)
+    assert len(sketch.counts) <= np.ceil(np.log(1e9) / np.log((1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY))) + 1
+
+
+def test_quantile_table_matches_sketches():
+    df = ChestDataGenerator(seed=5).generate(50_000)
+    table = quantile_table(score_buckets(df, ['PLAYER']), ['PLAYER']).set_index('PLAYER')
+    for player, scores in df.groupby('PLAYER', observed=True)['SCORE']:
+        sketch = DDSketch.from_values(scores.to_numpy())
+        assert table.loc[player, 'CHEST_COUNT'] == len(scores)
+        for column, q in QUANTILES.items():
+            assert abs(table.loc[player, column] - sketch.quantile(q)) <= 0.005
+            exact = np.quantile(scores.to_numpy(), q, method='lower')
+            assert relative_error(table.loc[player, column], exact) <= RELATIVE_ACCURACY + 1e-4
+
+
+def test_history_window_matches_exact_percentiles(chest_data):
+    df = chest_data(30_000, seed=9)
+    with HistoryStore(':memory:') as store:
+        # Overlapping imports must not count any chest twice
+        store.ingest(df.iloc[:20_000])
+        store.ingest(df.iloc[10_000:])
+        start, end = df['DATE'].min() + pd.Timedelta(days=10), df['DATE'].min() + pd.Timedelta(days=40)
+        window = df[(df['DATE'] >= start) & (df['DATE'] <= end)]
+        for by in ('CHEST', 'SOURCE', None):
+            result = store.score_quantiles(by, start, end)
+            groups = window.groupby(by, observed=True)['SCORE'] if by else [(None, window['SCORE'])]
+            result = result.set_index(by) if by else result
+            for key, scores in groups:
+                row = result.loc[key] if by else result.iloc[0]
+                assert row['CHEST_COUNT'] == len(scores)
+                for column, q in QUANTILES.items():
+                    exact = np.quantile(scores.to_numpy(), q, method='lower')
+                    assert relative_error(row[column], exact) <= RELATIVE_ACCURACY + 1e-4